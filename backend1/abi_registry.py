@@ -0,0 +1,324 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+from eth_abi import decode as abi_decode
+from eth_utils import keccak
+from eth_utils.abi import collapse_if_tuple
+from web3 import Web3
+from web3._utils.abi import map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+from logging_config import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+def abi_hash(abi: List[Dict]) -> str:
+    """Content hash of an ABI; key order and whitespace do not matter"""
+    canonical = json.dumps(abi, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _types(params: List[Dict]) -> List[str]:
+    return [collapse_if_tuple(param) for param in params]
+
+
+def _decode(types: List[str], data: bytes) -> List[Any]:
+    # Same normalization web3 applies to call results (checksummed addresses)
+    return map_abi_data(BASE_RETURN_NORMALIZERS, types, abi_decode(types, data))
+
+
+def _compile(abi: List[Dict]) -> Dict[str, Any]:
+    """Precompute selectors, topics and codec type lists for one ABI"""
+    functions = {}
+    events = {}
+    for item in abi:
+        if item.get('type') == 'function':
+            input_types = _types(item.get('inputs', []))
+            signature = f"{item['name']}({','.join(input_types)})"
+            functions[Web3.to_hex(keccak(text=signature)[:4])] = {
+                'name': item['name'],
+                'signature': signature,
+                'input_names': [param.get('name', '') for param in item.get('inputs', [])],
+                'input_types': input_types,
+                'output_types': _types(item.get('outputs', []))
+            }
+        elif item.get('type') == 'event' and not item.get('anonymous'):
+            inputs = item.get('inputs', [])
+            signature = f"{item['name']}({','.join(_types(inputs))})"
+            events[Web3.to_hex(keccak(text=signature))] = {
+                'name': item['name'],
+                'signature': signature,
+                'input_names': [param.get('name', '') for param in inputs],
+                'indexed': [bool(param.get('indexed')) for param in inputs],
+                'indexed_types': _types([param for param in inputs if param.get('indexed')]),
+                'data_types': _types([param for param in inputs if not param.get('indexed')])
+            }
+    return {'functions': functions, 'events': events}
+
+
+class AbiEntry:
+    """One content-hashed ABI with its precomputed selector and topic tables"""
+
+    def __init__(self, abi: List[Dict], hash_: str = None, compiled: Dict[str, Any] = None):
+        self.abi = abi
+        self.hash = hash_ or abi_hash(abi)
+        compiled = compiled or _compile(abi)
+        self.functions: Dict[str, Dict[str, Any]] = compiled['functions']
+        self.events: Dict[str, Dict[str, Any]] = compiled['events']
+
+    def to_snapshot(self) -> Dict[str, Any]:
+        return {'abi': self.abi, 'hash': self.hash, 'functions': self.functions, 'events': self.events}
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> 'AbiEntry':
+        return cls(data['abi'], data['hash'], {'functions': data['functions'], 'events': data['events']})
+
+
+class AbiRegistry:
+    """Content-hashed ABI store with a global selector and topic0 index
+
+    ABIs are stored once per content hash, however many paths or inline
+    copies refer to them. Each entry has its 4-byte selectors, event topics
+    and argument type lists computed once. The registry-wide indexes map a
+    selector or topic0 straight to a decoder, so calldata and log decoding
+    never walk the ABI JSON. The whole registry can be written to and
+    loaded from a JSON snapshot, so workers start warm.
+
+    Only ABI files and explicitly registered ABIs enter the global
+    indexes. Inline ABIs sent by clients are kept apart in an LRU of
+    max_inline entries, so a client can neither grow the registry without
+    bound nor claim a selector or topic for everyone else.
+    """
+
+    def __init__(self, base_dir: str = None, max_inline: int = 1000):
+        self.base_dir = base_dir
+        self.max_inline = max_inline
+        self._entries: Dict[str, AbiEntry] = {}
+        self._inline: 'OrderedDict[str, AbiEntry]' = OrderedDict()
+        self._names: Dict[str, str] = {}  # abi path -> content hash
+        self._selectors: Dict[str, Dict[str, Any]] = {}
+        self._topics: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, entry: AbiEntry) -> AbiEntry:
+        existing = self._entries.get(entry.hash)
+        if existing:
+            return existing
+        self._entries[entry.hash] = entry
+        for selector, function in entry.functions.items():
+            self._selectors.setdefault(selector, function)
+        for topic, event_info in entry.events.items():
+            self._topics.setdefault(topic, event_info)
+        return entry
+
+    def register(self, abi: List[Dict], name: str = None) -> AbiEntry:
+        """Add an ABI (no-op if the same content is already stored) and optionally name it"""
+        hash_ = abi_hash(abi)
+        with self._lock:
+            entry = self._entries.get(hash_) or self._add(AbiEntry(abi, hash_))
+            if name:
+                self._names[name] = entry.hash
+        return entry
+
+    def _resolve_path(self, abi_path: str) -> str:
+        if os.path.exists(abi_path):
+            return abi_path
+        # Try with default ABI path
+        full_path = os.path.join(self.base_dir or '', abi_path)
+        if not os.path.exists(full_path):
+            raise FileNotFoundError(f"ABI file not found: {abi_path}")
+        return full_path
+
+    def load_file(self, abi_path: str) -> AbiEntry:
+        """Entry for an ABI file, read from disk only the first time the path is seen"""
+        with self._lock:
+            hash_ = self._names.get(abi_path)
+            if hash_:
+                return self._entries[hash_]
+
+        with open(self._resolve_path(abi_path), 'r') as f:
+            data = json.load(f)
+        # Accept Hardhat/Truffle artifacts as well as bare ABI arrays
+        abi = data['abi'] if isinstance(data, dict) else data
+        return self.register(abi, name=abi_path)
+
+    def load_directory(self, directory: str) -> int:
+        """Register every *.json ABI under directory by its relative path"""
+        count = 0
+        for root, _, files in os.walk(directory):
+            for filename in sorted(files):
+                if not filename.endswith('.json'):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    self.load_file(os.path.relpath(path, directory))
+                    count += 1
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning('abi_file_skipped', path=path, error=str(e))
+        return count
+
+    def resolve(self, abi_path: str = None, abi: List[Dict] = None) -> AbiEntry:
+        """Entry for an inline ABI or an ABI path"""
+        if abi is not None:
+            return self._inline_entry(abi)
+        if abi_path is None:
+            raise ValueError("Either abi_path or abi must be provided")
+        return self.load_file(abi_path)
+
+    def _inline_entry(self, abi: List[Dict]) -> AbiEntry:
+        hash_ = abi_hash(abi)
+        with self._lock:
+            entry = self._entries.get(hash_)
+            if entry is None:
+                entry = self._inline.get(hash_)
+                if entry is not None:
+                    self._inline.move_to_end(hash_)
+        if entry is not None:
+            return entry
+
+        entry = AbiEntry(abi, hash_)
+        with self._lock:
+            self._inline[hash_] = entry
+            while len(self._inline) > self.max_inline:
+                self._inline.popitem(last=False)
+        return entry
+
+    def function_by_selector(self, selector: str) -> Optional[Dict[str, Any]]:
+        return self._selectors.get(selector.lower())
+
+    def event_by_topic(self, topic: str) -> Optional[Dict[str, Any]]:
+        return self._topics.get(topic.lower())
+
+    def decode_function_input(self, data: str, entry: AbiEntry = None) -> Dict[str, Any]:
+        """Decode transaction calldata with entry's functions first, then the selector index"""
+        data = Web3.to_bytes(hexstr=data) if isinstance(data, str) else bytes(data)
+        selector = Web3.to_hex(data[:4])
+        function = (entry and entry.functions.get(selector)) or self.function_by_selector(selector)
+        if function is None:
+            raise ValueError(f"Unknown function selector {Web3.to_hex(data[:4])}")
+        values = _decode(function['input_types'], data[4:])
+        return {
+            'function': function['name'],
+            'signature': function['signature'],
+            'args': dict(zip(function['input_names'], values))
+        }
+
+    def decode_log(self, topics: List[str], data: str, entry: AbiEntry = None) -> Dict[str, Any]:
+        """Decode an event log with entry's events first, then the topic0 index
+
+        Indexed dynamic values (string, bytes, arrays) are stored as hashes
+        in topics and are returned as the raw topic.
+        """
+        topics = [Web3.to_hex(topic) if isinstance(topic, (bytes, bytearray)) else topic for topic in topics]
+        event_info = None
+        if topics:
+            event_info = (entry and entry.events.get(topics[0].lower())) or self.event_by_topic(topics[0])
+        if event_info is None:
+            raise ValueError(f"Unknown event topic {topics[0] if topics else None}")
+
+        data = Web3.to_bytes(hexstr=data) if isinstance(data, str) else bytes(data)
+        data_values = iter(_decode(event_info['data_types'], data))
+        indexed_values = iter(zip(event_info['indexed_types'], topics[1:]))
+
+        args = {}
+        for name, indexed in zip(event_info['input_names'], event_info['indexed']):
+            if not indexed:
+                args[name] = next(data_values)
+                continue
+            type_str, topic = next(indexed_values)
+            if type_str in ('string', 'bytes') or type_str.endswith(']') or type_str.startswith('('):
+                args[name] = topic
+            else:
+                args[name] = _decode([type_str], Web3.to_bytes(hexstr=topic))[0]
+        return {'event': event_info['name'], 'signature': event_info['signature'], 'args': args}
+
+    def save_snapshot(self, path: str):
+        """Write every entry and name mapping to a JSON snapshot"""
+        with self._lock:
+            snapshot = {
+                'version': SNAPSHOT_VERSION,
+                'entries': [entry.to_snapshot() for entry in self._entries.values()],
+                'names': dict(self._names)
+            }
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    def load_snapshot(self, path: str) -> bool:
+        """Load a snapshot written by save_snapshot; False if missing or outdated"""
+        try:
+            with open(path, 'r') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            return False
+
+        with self._lock:
+            for data in snapshot['entries']:
+                self._add(AbiEntry.from_snapshot(data))
+            self._names.update(snapshot['names'])
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'abis': len(self._entries),
+            'inline_abis': len(self._inline),
+            'named': len(self._names),
+            'selectors': len(self._selectors),
+            'event_topics': len(self._topics)
+        }
+
+
+def _snapshot_is_current(snapshot_path: str, directory: str) -> bool:
+    """The snapshot is current when it is newer than every ABI file"""
+    try:
+        snapshot_mtime = os.path.getmtime(snapshot_path)
+    except OSError:
+        return False
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            if filename.endswith('.json') and os.path.getmtime(os.path.join(root, filename)) > snapshot_mtime:
+                return False
+    return True
+
+
+def create_abi_registry(config) -> AbiRegistry:
+    """Build the ABI registry, preferring a current snapshot over parsing every ABI file"""
+    registry = AbiRegistry(base_dir=config.DEFAULT_CONTRACT_ABI_PATH, max_inline=config.ABI_INLINE_CACHE_SIZE)
+    directory = config.DEFAULT_CONTRACT_ABI_PATH
+    if not config.ABI_PRELOAD or not os.path.isdir(directory):
+        return registry
+
+    snapshot_path = config.ABI_SNAPSHOT_PATH
+    if snapshot_path and _snapshot_is_current(snapshot_path, directory) and registry.load_snapshot(snapshot_path):
+        logger.info('abi_snapshot_loaded', **registry.stats())
+        return registry
+
+    count = registry.load_directory(directory)
+    logger.info('abis_loaded', directory=directory, count=count)
+    if snapshot_path:
+        try:
+            registry.save_snapshot(snapshot_path)
+        except OSError as e:
+            logger.warning('abi_snapshot_write_failed', path=snapshot_path, error=str(e))
+    return registry
+
+
+if __name__ == '__main__':
+    # Prebuild the snapshot, e.g. during deploys before workers start
+    from config import Config
+
+    configure_logging(Config)
+    if not Config.ABI_SNAPSHOT_PATH:
+        raise SystemExit("Set ABI_SNAPSHOT_PATH to build a snapshot")
+    built = AbiRegistry(base_dir=Config.DEFAULT_CONTRACT_ABI_PATH)
+    built.load_directory(Config.DEFAULT_CONTRACT_ABI_PATH)
+    built.save_snapshot(Config.ABI_SNAPSHOT_PATH)
+    print(f"Wrote {Config.ABI_SNAPSHOT_PATH}: {built.stats()}")
@@ -1,56 +1,276 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-import logging
+import functools
+import inspect
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
 from config import Config
-from contract_handler.web3 import ContractHandler
+from abi_registry import create_abi_registry
+from worker_runtime import WorkerRuntime
+from http_cache import NO_CACHE
+from event_export import ARROW_STREAM_MIMETYPE, table_to_columns, table_to_ipc
+from live_events import EventFilter, TooManyClients, parse_cursor
+from serialization import Web3JSONProvider, dumps, format_wei, parse_block_identifier, to_block_number
+from logging_config import configure_logging, get_logger
+from metrics import REGISTRY, HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT, rate_limiter_collector
+from rate_limit import create_rate_limiter
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+configure_logging(Config)
+logger = get_logger(__name__)
+
+# Probes and scrapes are never rate limited
+RATE_LIMIT_EXEMPT_ENDPOINTS = {'health_check', 'liveness', 'readiness', 'metrics'}
+
+async def resolve(result):
+    """Await handler results from the async handler, pass sync results through"""
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+def run_inline(view):
+    """Run an async view without an event loop when the handler is synchronous
+
+    With the sync ContractHandler a view never suspends, so driving the
+    coroutine directly avoids creating an event loop per request.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        coro = view(*args, **kwargs)
+        try:
+            coro.send(None)
+        except StopIteration as stop:
+            return stop.value
+        coro.close()
+        raise RuntimeError("View suspended without an event loop; enable ASYNC_HANDLER")
+    return wrapper
+
+def wants_stream():
+    """Whether the client asked for NDJSON with ?stream=1 or Accept: application/x-ndjson"""
+    return request.args.get('stream', '').lower() in ('1', 'true') or \
+        request.accept_mimetypes.best == 'application/x-ndjson'
+
+def ndjson_response(items):
+    """Stream items as newline-delimited JSON, ending with a 'done' or 'error' line
+
+    The trailing line lets clients tell a complete stream from a dropped
+    connection; it carries the last cursor seen so they can resume.
+    """
+    def lines():
+        count = 0
+        cursor = None
+        try:
+            for item in items:
+                count += 1
+                cursor = item.get('cursor', cursor)
+                yield dumps(item) + b'\n'
+        except Exception as e:
+            logger.error('stream_failed', count=count, cursor=cursor, error=str(e))
+            yield dumps({'error': str(e), 'count': count, 'cursor': cursor}) + b'\n'
+            return
+        yield dumps({'done': True, 'count': count, 'cursor': cursor}) + b'\n'
+    
+    # X-Accel-Buffering stops nginx from holding the stream until it ends
+    return Response(lines(), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def not_modified(tag):
+    """Empty 304 carrying the validator and lifetime of the response the client already holds"""
+    return tag.apply(Response(status=304))
+
+def rate_limit_key():
+    """Client identity for rate limiting: API key header, forwarded client IP or peer address"""
+    header = Config.RATE_LIMIT_KEY_HEADER
+    if header and request.headers.get(header):
+        return 'key:' + request.headers[header]
+    if Config.RATE_LIMIT_TRUST_FORWARDED and request.access_route:
+        return 'ip:' + request.access_route[0]
+    return 'ip:' + (request.remote_addr or 'unknown')
 
 def create_app():
     """Application factory pattern"""
     app = Flask(__name__)
     app.config.from_object(Config)
     
+    # HexBytes, AttributeDict and struct results encode directly, via orjson when installed
+    app.json = Web3JSONProvider(app)
+    
     # Enable CORS for all routes
     CORS(app)
     
-    # Initialize Web3 contract handler
-    contract_handler = ContractHandler()
+    # Parsed ABIs are read-only, so they are built once here and shared with forked workers;
+    # the handler, pools and background threads are built per worker on first use
+    runtime = WorkerRuntime(Config, create_abi_registry(Config))
+    app.extensions['worker_runtime'] = runtime
+    if app.config['WARMUP_ON_START']:
+        runtime.start_warmup()
+    
+    if app.config['METRICS_ENABLED']:
+        
+        @app.before_request
+        def start_request_timer():
+            g.request_started = time.perf_counter()
+            HTTP_REQUESTS_IN_FLIGHT.inc()
+        
+        @app.after_request
+        def record_request_metrics(response):
+            duration = time.perf_counter() - g.request_started
+            # The URL rule, not the path, keeps label cardinality bounded
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_REQUEST_DURATION.labels(request.method, route, response.status_code).observe(duration)
+            logger.info('http_request', method=request.method, route=route, status=response.status_code,
+                        duration_ms=round(duration * 1000, 2), sample_rate=app.config['LOG_SAMPLE_RATE'])
+            return response
+        
+        @app.teardown_request
+        def finish_request(error=None):
+            if 'request_started' in g:
+                HTTP_REQUESTS_IN_FLIGHT.dec()
+    
+    # Per-client token buckets enforcing API_RATE_LIMIT
+    rate_limiter = create_rate_limiter(Config)
+    if rate_limiter:
+        if app.config['METRICS_ENABLED']:
+            REGISTRY.set_collector('rate_limiter', rate_limiter_collector(rate_limiter))
+        
+        @app.before_request
+        def enforce_rate_limit():
+            if request.method == 'OPTIONS' or request.endpoint in RATE_LIMIT_EXEMPT_ENDPOINTS:
+                return None
+            allowed, remaining, retry_after = rate_limiter.check(rate_limit_key())
+            g.rate_limit_remaining = remaining
+            if not allowed:
+                response = jsonify({
+                    'success': False,
+                    'error': f"Rate limit exceeded ({rate_limiter.limit})"
+                })
+                response.status_code = 429
+                response.headers['Retry-After'] = str(retry_after)
+                return response
+            return None
+        
+        @app.after_request
+        def add_rate_limit_headers(response):
+            if 'rate_limit_remaining' in g:
+                response.headers['X-RateLimit-Limit'] = str(rate_limiter.buckets.capacity)
+                response.headers['X-RateLimit-Remaining'] = str(g.rate_limit_remaining)
+            return response
+    
+    def handler_route(rule, **options):
+        """Register a view that awaits the contract handler"""
+        def decorator(view):
+            if not app.config['ASYNC_HANDLER']:
+                view = run_inline(view)
+            return app.route(rule, **options)(view)
+        return decorator
     
-    @app.route('/', methods=['GET'])
-    def health_check():
+    @handler_route('/', methods=['GET'])
+    async def health_check():
         """Health check endpoint"""
+        contract_handler = runtime.handler
         return jsonify({
             'status': 'healthy',
             'message': 'Flask Web3 server is running',
-            'network': contract_handler.get_network_info()
+            'network': await resolve(contract_handler.get_network_info()),
+            'cache': contract_handler.read_cache.stats() if contract_handler.read_cache else None,
+            'providers': contract_handler.get_provider_stats()
+        })
+    
+    @app.route('/health/live', methods=['GET'])
+    def liveness():
+        """Liveness probe: the worker is serving requests; makes no RPC calls"""
+        return jsonify({
+            'status': 'alive',
+            'pid': runtime.pid
         })
     
-    @app.route('/api/balance/<address>', methods=['GET'])
-    def get_balance(address):
-        """Get ETH balance for an address"""
+    @app.route('/health/ready', methods=['GET'])
+    def readiness():
+        """Readiness probe: 503 until this worker has built its services and reached the node"""
+        runtime.start_warmup()
+        status = runtime.readiness()
+        return jsonify(status), 200 if status['ready'] else 503
+    
+    @handler_route('/api/balance/<address>', methods=['GET'])
+    async def get_balance(address):
+        """Get ETH balance for an address, at the latest or a given block"""
         try:
-            balance = contract_handler.get_balance(address)
-            return jsonify({
+            block = parse_block_identifier(request.args.get('block'))
+            http_cache = runtime.http_cache
+            # The ETag only needs the block hash, so a revalidation is answered before any read
+            tag = http_cache.read_tag(('balance', address.lower()), block) if http_cache else None
+            if tag and tag.matches(request.if_none_match):
+                return not_modified(tag)
+            
+            balance_wei = await resolve(runtime.handler.get_balance(
+                address,
+                block_identifier=tag.block_number if tag else block
+            ))
+            # Exact strings, as in /api/balances: floats lose wei precision
+            response = jsonify({
                 'success': True,
                 'address': address,
-                'balance': balance,
+                'wei': str(balance_wei),
+                'balance': format_wei(balance_wei),
                 'unit': 'ETH'
             })
+            return tag.apply(response) if tag else response
         except Exception as e:
-            logger.error(f"Error getting balance: {str(e)}")
+            logger.error('request_failed', route='balance', error=str(e))
             return jsonify({
                 'success': False,
                 'error': str(e)
             }), 400
     
-    @app.route('/api/contract/call', methods=['POST'])
-    def call_contract():
-        """Call a read-only contract function"""
+    @handler_route('/api/balances', methods=['POST'])
+    async def get_balances():
+        """Get exact ETH balances for many addresses at one block"""
         try:
             data = request.get_json()
+            addresses = data.get('addresses')
+            
+            if not isinstance(addresses, list) or not addresses:
+                return jsonify({
+                    'success': False,
+                    'error': 'addresses must be a non-empty list'
+                }), 400
+            
+            if len(addresses) > app.config['MAX_BATCH_SIZE']:
+                return jsonify({
+                    'success': False,
+                    'error': f"Batch size exceeds limit of {app.config['MAX_BATCH_SIZE']}"
+                }), 400
+            
+            result = await resolve(runtime.handler.get_balances(
+                addresses,
+                block_identifier=parse_block_identifier(data.get('block'))
+            ))
+            
+            return jsonify({
+                'success': True,
+                **result
+            })
+            
+        except Exception as e:
+            logger.error('request_failed', route='balances', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @handler_route('/api/contract/call', methods=['GET', 'POST'])
+    async def call_contract():
+        """Call a read-only contract function; GET takes query parameters and can be cached"""
+        try:
+            if request.method == 'GET':
+                data = request.args.to_dict()
+                for field in ('function_args', 'abi'):
+                    if field in data:
+                        data[field] = json.loads(data[field])
+            else:
+                data = request.get_json()
             contract_address = data.get('contract_address')
             function_name = data.get('function_name')
             function_args = data.get('function_args', [])
@@ -61,28 +281,101 @@ def create_app():
                     'error': 'contract_address and function_name are required'
                 }), 400
             
-            result = contract_handler.call_contract_function(
+            block = parse_block_identifier(data.get('block'))
+            http_cache = runtime.http_cache
+            tag = http_cache.read_tag(
+                ('call', contract_address.lower(), function_name, function_args, data.get('abi_path'), data.get('abi')),
+                block
+            ) if http_cache else None
+            # If-None-Match only short-circuits safe methods
+            if tag and request.method == 'GET' and tag.matches(request.if_none_match):
+                return not_modified(tag)
+            
+            result = await resolve(runtime.handler.call_contract_function(
                 contract_address, 
                 function_name, 
-                function_args
-            )
+                function_args,
+                abi_path=data.get('abi_path'),
+                abi=data.get('abi'),
+                block_identifier=tag.block_number if tag else block
+            ))
             
-            return jsonify({
+            response = jsonify({
                 'success': True,
                 'result': result,
                 'contract_address': contract_address,
                 'function_name': function_name
             })
+            return tag.apply(response) if tag else response
+            
+        except Exception as e:
+            logger.error('request_failed', route='contract_call', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @handler_route('/api/contract/call/batch', methods=['POST'])
+    async def call_contract_batch():
+        """Call several read-only contract functions in one JSON-RPC batch"""
+        try:
+            data = request.get_json()
+            calls = data.get('calls')
+            aggregate = bool(data.get('aggregate', False))  # Multicall3 aggregation mode
+            block = parse_block_identifier(data.get('block'))
+            
+            if not isinstance(calls, list) or not calls:
+                return jsonify({
+                    'success': False,
+                    'error': 'calls must be a non-empty list'
+                }), 400
+            
+            if len(calls) > app.config['MAX_BATCH_SIZE']:
+                return jsonify({
+                    'success': False,
+                    'error': f"Batch size exceeds limit of {app.config['MAX_BATCH_SIZE']}"
+                }), 400
+            
+            # Validate items up front; invalid ones are reported in place
+            results = [None] * len(calls)
+            valid_calls = []
+            for index, call in enumerate(calls):
+                if not isinstance(call, dict) or not call.get('contract_address') or not call.get('function_name'):
+                    results[index] = {
+                        'success': False,
+                        'error': 'contract_address and function_name are required'
+                    }
+                else:
+                    valid_calls.append((index, call))
+            
+            batch_results = await resolve(runtime.handler.call_contract_functions_batch(
+                [call for _, call in valid_calls],
+                aggregate=aggregate,
+                block_identifier=block
+            ))
+            for (index, _), item in zip(valid_calls, batch_results):
+                results[index] = item
+            
+            for call, item in zip(calls, results):
+                if isinstance(call, dict):
+                    item['contract_address'] = call.get('contract_address')
+                    item['function_name'] = call.get('function_name')
+            
+            return jsonify({
+                'success': True,
+                'results': results,
+                'count': len(results)
+            })
             
         except Exception as e:
-            logger.error(f"Error calling contract: {str(e)}")
+            logger.error('request_failed', route='contract_call_batch', error=str(e))
             return jsonify({
                 'success': False,
                 'error': str(e)
             }), 400
     
-    @app.route('/api/contract/transaction', methods=['POST'])
-    def send_transaction():
+    @handler_route('/api/contract/transaction', methods=['POST'])
+    async def send_transaction():
         """Send a transaction to a contract"""
         try:
             data = request.get_json()
@@ -90,6 +383,8 @@ def create_app():
             function_name = data.get('function_name')
             function_args = data.get('function_args', [])
             value = data.get('value', 0)  # ETH value to send
+            urgency = data.get('urgency')  # fee level, e.g. 'slow', 'standard', 'fast'
+            # Signer: 'from' pins a pool account, 'shard' lets the pool pick one, otherwise the primary account
             
             if not contract_address or not function_name:
                 return jsonify({
@@ -97,12 +392,32 @@ def create_app():
                     'error': 'contract_address and function_name are required'
                 }), 400
             
-            tx_hash = contract_handler.send_transaction(
+            # Dry run: simulate against the chain and report the outcome without signing or sending
+            if data.get('dry_run'):
+                simulation = await resolve(runtime.handler.simulate_transactions(
+                    [data],
+                    block_identifier=parse_block_identifier(data.get('block'))
+                ))
+                return jsonify({
+                    'success': True,
+                    'dry_run': True,
+                    'block_number': simulation['block_number'],
+                    'simulation': simulation['results'][0],
+                    'contract_address': contract_address,
+                    'function_name': function_name
+                })
+            
+            tx_hash = await resolve(runtime.handler.send_transaction(
                 contract_address,
                 function_name,
                 function_args,
-                value
-            )
+                value,
+                abi_path=data.get('abi_path'),
+                abi=data.get('abi'),
+                urgency=urgency,
+                sender=data.get('from'),
+                shard=bool(data.get('shard', False))
+            ))
             
             return jsonify({
                 'success': True,
@@ -112,30 +427,279 @@ def create_app():
             })
             
         except Exception as e:
-            logger.error(f"Error sending transaction: {str(e)}")
+            logger.error('request_failed', route='transaction', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @handler_route('/api/contract/transaction/batch', methods=['POST'])
+    async def send_transaction_batch():
+        """Sign several contract transactions locally and submit them together"""
+        try:
+            data = request.get_json()
+            transactions = data.get('transactions')
+            
+            if not isinstance(transactions, list) or not transactions:
+                return jsonify({
+                    'success': False,
+                    'error': 'transactions must be a non-empty list'
+                }), 400
+            
+            if len(transactions) > app.config['MAX_BATCH_SIZE']:
+                return jsonify({
+                    'success': False,
+                    'error': f"Batch size exceeds limit of {app.config['MAX_BATCH_SIZE']}"
+                }), 400
+            
+            for item in transactions:
+                if not isinstance(item, dict) or not item.get('contract_address') or not item.get('function_name'):
+                    return jsonify({
+                        'success': False,
+                        'error': 'contract_address and function_name are required for every transaction'
+                    }), 400
+            
+            # simulate: send only the items that pass a dry run; require_all: send nothing unless all pass
+            results = await resolve(runtime.handler.send_transactions(
+                transactions,
+                simulate=bool(data.get('simulate', False)),
+                require_all=bool(data.get('require_all', False))
+            ))
+            
+            return jsonify({
+                'success': True,
+                'results': results,
+                'count': len(results)
+            })
+            
+        except Exception as e:
+            logger.error('request_failed', route='transaction_batch', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @handler_route('/api/contract/transaction/simulate', methods=['POST'])
+    async def simulate_transaction_batch():
+        """Dry-run several contract transactions at one block: revert reasons and gas per item"""
+        try:
+            data = request.get_json()
+            transactions = data.get('transactions')
+            
+            if not isinstance(transactions, list) or not transactions:
+                return jsonify({
+                    'success': False,
+                    'error': 'transactions must be a non-empty list'
+                }), 400
+            
+            if len(transactions) > app.config['MAX_BATCH_SIZE']:
+                return jsonify({
+                    'success': False,
+                    'error': f"Batch size exceeds limit of {app.config['MAX_BATCH_SIZE']}"
+                }), 400
+            
+            for item in transactions:
+                if not isinstance(item, dict) or not item.get('contract_address') or not item.get('function_name'):
+                    return jsonify({
+                        'success': False,
+                        'error': 'contract_address and function_name are required for every transaction'
+                    }), 400
+            
+            simulation = await resolve(runtime.handler.simulate_transactions(
+                transactions,
+                block_identifier=parse_block_identifier(data.get('block'))
+            ))
+            
+            return jsonify({
+                'success': True,
+                **simulation,
+                'count': len(simulation['results'])
+            })
+            
+        except Exception as e:
+            logger.error('request_failed', route='transaction_simulate', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @handler_route('/api/transaction/<tx_hash>/receipt', methods=['GET'])
+    async def get_transaction_receipt(tx_hash):
+        """Get a transaction receipt, optionally waiting up to ?wait= seconds for it"""
+        try:
+            wait = min(float(request.args.get('wait', 0)), app.config['RECEIPT_TIMEOUT'])
+            
+            if wait > 0:
+                try:
+                    receipt = await resolve(runtime.handler.wait_for_transaction_receipt(tx_hash, timeout=wait))
+                except TimeoutError:
+                    receipt = None
+            else:
+                receipt = await resolve(runtime.handler.get_transaction_receipt(tx_hash))
+            
+            return jsonify({
+                'success': True,
+                'transaction_hash': tx_hash,
+                'mined': receipt is not None,
+                'receipt': receipt
+            })
+            
+        except Exception as e:
+            logger.error('request_failed', route='receipt', tx_hash=tx_hash, error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    # Each open receipt stream holds a request thread for up to RECEIPT_TIMEOUT
+    receipt_streams = threading.BoundedSemaphore(max(1, app.config['RECEIPT_MAX_STREAMS']))
+    
+    @app.route('/api/transactions/receipts/stream', methods=['GET'])
+    def stream_transaction_receipts():
+        """Server-sent events: one 'receipt' or 'timeout' event per hash as it resolves"""
+        hashes = [tx_hash.strip() for tx_hash in request.args.get('hashes', '').split(',') if tx_hash.strip()]
+        if not hashes or len(hashes) > app.config['MAX_BATCH_SIZE']:
+            return jsonify({
+                'success': False,
+                'error': f"hashes must list between 1 and {app.config['MAX_BATCH_SIZE']} transaction hashes"
+            }), 400
+        
+        if not receipt_streams.acquire(blocking=False):
+            return jsonify({
+                'success': False,
+                'error': f"Receipt stream limit of {app.config['RECEIPT_MAX_STREAMS']} streams reached"
+            }), 503
+        try:
+            timeout = min(float(request.args.get('timeout', app.config['RECEIPT_TIMEOUT'])), app.config['RECEIPT_TIMEOUT'])
+            watcher = runtime.handler.receipt_watcher
+            futures = {watcher.watch(tx_hash, timeout): tx_hash for tx_hash in hashes}
+        except Exception:
+            receipt_streams.release()
+            raise
+        
+        def events():
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=15, return_when=FIRST_COMPLETED)
+                if not done:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ': keepalive\n\n'
+                for future in done:
+                    if future.exception() is None:
+                        payload = {'transaction_hash': futures[future], 'receipt': future.result()}
+                        yield f"event: receipt\ndata: {dumps(payload).decode()}\n\n"
+                    else:
+                        payload = {'transaction_hash': futures[future], 'error': str(future.exception())}
+                        yield f"event: timeout\ndata: {dumps(payload).decode()}\n\n"
+            yield 'event: done\ndata: {}\n\n'
+        
+        response = Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+        # Runs when the server closes the response, whether the stream finished or the client left
+        response.call_on_close(receipt_streams.release)
+        return response
+    
+    @app.route('/api/events/live/<contract_address>', methods=['GET'])
+    def stream_live_events(contract_address):
+        """Server-sent events: decoded events of a tracked contract as blocks arrive"""
+        live_events = runtime.live_events
+        if not live_events:
+            return jsonify({
+                'success': False,
+                'error': 'Live events are not enabled'
+            }), 400
+        
+        try:
+            if not live_events.is_tracked(contract_address):
+                return jsonify({
+                    'success': False,
+                    'error': f"Contract {contract_address} is not tracked for live events"
+                }), 404
+            
+            # Filters: ?events=Transfer,Approval, ?topic1..topic3= and ?account= (any indexed address).
+            # Resumes after Last-Event-ID (sent by EventSource on reconnect), ?cursor= or from ?from_block=
+            after = parse_cursor(request.headers.get('Last-Event-ID') or request.args.get('cursor'),
+                                 request.args.get('from_block'))
+            client = live_events.subscribe(contract_address, EventFilter.from_params(request.args), after)
+            
+        except TooManyClients as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 503
+        except Exception as e:
+            logger.error('request_failed', route='live_events', error=str(e))
             return jsonify({
                 'success': False,
                 'error': str(e)
             }), 400
+        
+        return Response(live_events.stream(client), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    
+    @app.route('/api/events/live', methods=['GET'])
+    def live_events_status():
+        """Get live event hub clients and progress"""
+        if not runtime.live_events:
+            return jsonify({
+                'success': False,
+                'error': 'Live events are not enabled'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'live_events': runtime.live_events.stats()
+        })
     
-    @app.route('/api/transaction/<tx_hash>', methods=['GET'])
-    def get_transaction(tx_hash):
-        """Get transaction details"""
+    @handler_route('/api/gas/fees', methods=['GET'])
+    async def get_gas_fees():
+        """Get suggested transaction fees for each urgency level"""
         try:
-            tx_details = contract_handler.get_transaction_details(tx_hash)
             return jsonify({
+                'success': True,
+                'fees': await resolve(runtime.handler.get_gas_fees())
+            })
+            
+        except Exception as e:
+            logger.error('request_failed', route='gas_fees', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @handler_route('/api/transaction/<tx_hash>', methods=['GET'])
+    async def get_transaction(tx_hash):
+        """Get transaction details; mined transactions are tagged with their block hash"""
+        try:
+            http_cache = runtime.http_cache
+            # A transaction served from a finalized block revalidates without a lookup
+            tag = http_cache.known_transaction_tag(tx_hash) if http_cache else None
+            if tag and tag.matches(request.if_none_match):
+                return not_modified(tag)
+            
+            tx_details = await resolve(runtime.handler.get_transaction_details(tx_hash))
+            response = jsonify({
                 'success': True,
                 'transaction': tx_details
             })
+            if not http_cache:
+                return response
+            
+            tag = http_cache.transaction_tag(tx_hash, tx_details)
+            if tag is None:
+                response.headers['Cache-Control'] = NO_CACHE
+                return response
+            if tag.matches(request.if_none_match):
+                return not_modified(tag)
+            return tag.apply(response)
         except Exception as e:
-            logger.error(f"Error getting transaction: {str(e)}")
+            logger.error('request_failed', route='transaction_details', error=str(e))
             return jsonify({
                 'success': False,
                 'error': str(e)
             }), 400
     
-    @app.route('/api/contract/events', methods=['POST'])
-    def get_contract_events():
+    @handler_route('/api/contract/events', methods=['POST'])
+    async def get_contract_events():
         """Get contract events"""
         try:
             data = request.get_json()
@@ -150,12 +714,95 @@ def create_app():
                     'error': 'contract_address and event_name are required'
                 }), 400
             
-            events = contract_handler.get_contract_events(
+            # Answer tracked contracts from the local index instead of the node
+            event_indexer = runtime.event_indexer
+            if event_indexer and event_indexer.is_tracked(contract_address):
+                # 'latest' is pinned to the head, as on the node path, so both paths return the same range
+                get_head = functools.lru_cache(maxsize=1)(lambda: event_indexer.w3.eth.block_number)
+                query = {
+                    'from_block': to_block_number(from_block, get_head),
+                    'to_block': to_block_number(to_block, get_head),
+                    'filters': data.get('filters')
+                }
+                # Blocks the indexer has not reached yet are read from the node after the indexed ones
+                indexed_block = event_indexer.indexed_block(contract_address)
+                tail_start = max(query['from_block'], -1 if indexed_block is None else indexed_block + 1)
+                has_tail = query['to_block'] >= tail_start
+                
+                def tail_events(cursor):
+                    events = runtime.handler.iter_contract_events(
+                        contract_address, event_name, tail_start, query['to_block'],
+                        abi=event_indexer.get_abi(contract_address), cursor=cursor
+                    )
+                    filters = query['filters'] or {}
+                    for event in events:
+                        # Same matching the index applies to topics, on the decoded arguments
+                        if all(str(event['args'].get(name)).lower() == str(value).lower()
+                               for name, value in filters.items()):
+                            yield event
+                
+                if wants_stream():
+                    def indexed_events(cursor):
+                        while True:
+                            page = event_indexer.query_events(contract_address, event_name, limit=1000,
+                                                              cursor=cursor, **query)
+                            for event in page['events']:
+                                event['cursor'] = f"{event['block_number']}:{event['log_index']}"
+                                yield event
+                            if not page['next_cursor']:
+                                break
+                            cursor = page['next_cursor']
+                        if has_tail:
+                            if page['events']:
+                                cursor = page['events'][-1]['cursor']
+                            yield from tail_events(cursor)
+                    return ndjson_response(indexed_events(data.get('cursor')))
+                
+                page = event_indexer.query_events(
+                    contract_address,
+                    event_name,
+                    limit=min(int(data.get('limit', app.config['EVENTS_PAGE_SIZE'])), 1000),
+                    cursor=data.get('cursor'),
+                    **query
+                )
+                source = 'index'
+                if has_tail and not page['next_cursor']:
+                    last = page['events'][-1] if page['events'] else None
+                    tail = list(tail_events(f"{last['block_number']}:{last['log_index']}" if last else data.get('cursor')))
+                    for event in tail:
+                        event.pop('cursor', None)
+                    page['events'].extend(tail)
+                    source = 'index+node'
+                return jsonify({
+                    'success': True,
+                    'events': page['events'],
+                    'count': len(page['events']),
+                    'next_cursor': page['next_cursor'],
+                    'indexed_block': page['indexed_block'],
+                    'source': source
+                })
+            
+            if wants_stream():
+                # Sync generator: chunks are fetched while the response is written
+                return ndjson_response(runtime.handler.iter_contract_events(
+                    contract_address,
+                    event_name,
+                    from_block,
+                    to_block,
+                    abi_path=data.get('abi_path'),
+                    abi=data.get('abi'),
+                    cursor=data.get('cursor'),
+                    chunk_size=data.get('chunk_size') and int(data['chunk_size'])
+                ))
+            
+            events = await resolve(runtime.handler.get_contract_events(
                 contract_address,
                 event_name,
                 from_block,
-                to_block
-            )
+                to_block,
+                abi_path=data.get('abi_path'),
+                abi=data.get('abi')
+            ))
             
             return jsonify({
                 'success': True,
@@ -164,12 +811,670 @@ def create_app():
             })
             
         except Exception as e:
-            logger.error(f"Error getting events: {str(e)}")
+            logger.error('request_failed', route='contract_events', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @app.route('/api/abi/decode', methods=['POST'])
+    def decode_abi_data():
+        """Decode calldata or an event log with the ABI registry's selector index"""
+        try:
+            data = request.get_json()
+            registry = runtime.abi_registry
+            entry = None
+            if data.get('abi') or data.get('abi_path'):
+                entry = registry.resolve(abi_path=data.get('abi_path'), abi=data.get('abi'))
+    
+            if data.get('topics'):
+                decoded = registry.decode_log(data['topics'], data.get('data', '0x'), entry)
+            elif data.get('data'):
+                decoded = registry.decode_function_input(data['data'], entry)
+            else:
+                return jsonify({
+                    'success': False,
+                    'error': 'data (calldata) or topics and data (event log) are required'
+                }), 400
+    
+            return jsonify({
+                'success': True,
+                **decoded
+            })
+    
+        except Exception as e:
+            logger.error('request_failed', route='abi_decode', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @app.route('/api/indexer/contracts', methods=['POST'])
+    def track_contract_events():
+        """Start indexing events for a contract"""
+        try:
+            if not runtime.event_indexer:
+                return jsonify({
+                    'success': False,
+                    'error': 'Event indexer is not enabled'
+                }), 400
+            
+            data = request.get_json()
+            contract_address = data.get('contract_address')
+            abi = data.get('abi') or (data.get('abi_path') and runtime.handler.load_contract_abi(data.get('abi_path')))
+            
+            if not contract_address or not abi:
+                return jsonify({
+                    'success': False,
+                    'error': 'contract_address and abi or abi_path are required'
+                }), 400
+            
+            runtime.event_indexer.track(contract_address, abi, int(data.get('start_block', 0)))
+            return jsonify({
+                'success': True,
+                'contract_address': contract_address
+            })
+            
+        except Exception as e:
+            logger.error('request_failed', route='indexer_track', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @app.route('/api/indexer/status', methods=['GET'])
+    def indexer_status():
+        """Get event indexer progress"""
+        if not runtime.event_indexer:
+            return jsonify({
+                'success': False,
+                'error': 'Event indexer is not enabled'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'indexer': runtime.event_indexer.status()
+        })
+    
+    @app.route('/api/exports/<contract_address>', methods=['GET', 'POST'])
+    def contract_exports(contract_address):
+        """List a contract's exported datasets, or export newly indexed events (POST)"""
+        try:
+            exporter = runtime.event_exporter
+            if not exporter:
+                return jsonify({
+                    'success': False,
+                    'error': 'Event export is not enabled'
+                }), 400
+            
+            if request.method == 'POST':
+                data = request.get_json(silent=True) or {}
+                return jsonify({
+                    'success': True,
+                    **exporter.export(contract_address, data.get('event_names'))
+                })
+            
+            return jsonify({
+                'success': True,
+                **exporter.manifest(contract_address)
+            })
+            
+        except Exception as e:
+            logger.error('request_failed', route='exports', error=str(e))
             return jsonify({
                 'success': False,
                 'error': str(e)
             }), 400
     
+    @app.route('/api/exports/query', methods=['POST'])
+    def query_exports():
+        """Filter or aggregate exported events (e.g. volume per day or per holder) from memory-mapped files"""
+        try:
+            exporter = runtime.event_exporter
+            if not exporter:
+                return jsonify({
+                    'success': False,
+                    'error': 'Event export is not enabled'
+                }), 400
+            
+            data = request.get_json()
+            contract_address = data.get('contract_address')
+            dataset = data.get('event_name') or ('_transactions' if data.get('transactions') else None)
+            
+            if not contract_address or not dataset:
+                return jsonify({
+                    'success': False,
+                    'error': 'contract_address and event_name (or transactions: true) are required'
+                }), 400
+            
+            table = exporter.query(
+                contract_address,
+                dataset,
+                from_block=data.get('from_block'),
+                to_block=data.get('to_block'),
+                filters=data.get('filters'),
+                columns=data.get('columns'),
+                group_by=data.get('group_by'),
+                aggregates=data.get('aggregates'),
+                order_by=data.get('order_by'),
+                descending=bool(data.get('descending', False)),
+                limit=min(int(data.get('limit', app.config['EXPORT_QUERY_LIMIT'])), app.config['EXPORT_QUERY_LIMIT'])
+            )
+            
+            # Arrow clients get the result table as is; JSON clients get one list per column
+            if request.accept_mimetypes.best == ARROW_STREAM_MIMETYPE:
+                return Response(table_to_ipc(table), mimetype=ARROW_STREAM_MIMETYPE)
+            return jsonify({
+                'success': True,
+                'column_names': table.column_names,
+                'columns': table_to_columns(table),
+                'count': table.num_rows
+            })
+            
+        except Exception as e:
+            logger.error('request_failed', route='exports_query', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @app.route('/api/token/<token_address>/holders', methods=['GET'])
+    def get_token_holders(token_address):
+        """Get token holders ordered by balance from the materialized holder table"""
+        try:
+            holder_balances = runtime.holder_balances
+            if not holder_balances or not holder_balances.is_token(token_address):
+                return jsonify({
+                    'success': False,
+                    'error': 'Token is not tracked by the event indexer'
+                }), 404
+            
+            if request.args.get('check', '').lower() in ('1', 'true'):
+                return jsonify({
+                    'success': True,
+                    'consistency': holder_balances.check_consistency(token_address)
+                })
+            
+            min_balance = request.args.get('min_balance')
+            max_balance = request.args.get('max_balance')
+            if wants_stream():
+                return ndjson_response(holder_balances.iter_holders(
+                    token_address,
+                    min_balance=int(min_balance) if min_balance else None,
+                    max_balance=int(max_balance) if max_balance else None,
+                    cursor=request.args.get('cursor')
+                ))
+            
+            result = holder_balances.get_holders(
+                token_address,
+                limit=min(int(request.args.get('limit', 100)), 1000),
+                offset=int(request.args.get('offset', 0)),
+                min_balance=int(min_balance) if min_balance else None,
+                max_balance=int(max_balance) if max_balance else None,
+                cursor=request.args.get('cursor')
+            )
+            
+            return jsonify({
+                'success': True,
+                'token_address': token_address,
+                **result
+            })
+            
+        except Exception as e:
+            logger.error('request_failed', route='token_holders', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @app.route('/api/token/<token_address>/balance/<holder_address>', methods=['GET'])
+    def get_token_holder_balance(token_address, holder_address):
+        """Get one holder's token balance from the materialized holder table"""
+        try:
+            if not runtime.holder_balances or not runtime.holder_balances.is_token(token_address):
+                return jsonify({
+                    'success': False,
+                    'error': 'Token is not tracked by the event indexer'
+                }), 404
+            
+            return jsonify({
+                'success': True,
+                'token_address': token_address,
+                **runtime.holder_balances.get_balance(token_address, holder_address)
+            })
+            
+        except Exception as e:
+            logger.error('request_failed', route='token_balance', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @app.route('/api/portfolio/<address>', methods=['GET'])
+    def get_portfolio(address):
+        """Value an investor's holdings across all registered property tokens"""
+        try:
+            portfolio = runtime.portfolio
+            if not portfolio:
+                return jsonify({
+                    'success': False,
+                    'error': 'Portfolio valuation is not enabled'
+                }), 400
+            
+            block = parse_block_identifier(request.args.get('block'))
+            return jsonify({
+                'success': True,
+                **portfolio.get_portfolio(address, block_number=None if block == 'latest' else to_block_number(block))
+            })
+            
+        except Exception as e:
+            logger.error('request_failed', route='portfolio', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @app.route('/api/portfolios', methods=['POST'])
+    def get_portfolios():
+        """Value several investors' holdings at one block"""
+        try:
+            portfolio = runtime.portfolio
+            if not portfolio:
+                return jsonify({
+                    'success': False,
+                    'error': 'Portfolio valuation is not enabled'
+                }), 400
+            
+            data = request.get_json()
+            addresses = data.get('addresses')
+            
+            if not isinstance(addresses, list) or not addresses:
+                return jsonify({
+                    'success': False,
+                    'error': 'addresses must be a non-empty list'
+                }), 400
+            
+            if len(addresses) > app.config['MAX_BATCH_SIZE']:
+                return jsonify({
+                    'success': False,
+                    'error': f"Batch size exceeds limit of {app.config['MAX_BATCH_SIZE']}"
+                }), 400
+            
+            block = parse_block_identifier(data.get('block'))
+            return jsonify({
+                'success': True,
+                **portfolio.valuate(addresses, block_number=None if block == 'latest' else to_block_number(block))
+            })
+            
+        except Exception as e:
+            logger.error('request_failed', route='portfolios', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @app.route('/api/properties', methods=['GET', 'POST'])
+    def property_tokens():
+        """List registered property tokens, or register one with its valuation"""
+        try:
+            portfolio = runtime.portfolio
+            if not portfolio:
+                return jsonify({
+                    'success': False,
+                    'error': 'Portfolio valuation is not enabled'
+                }), 400
+            
+            if request.method == 'GET':
+                properties = portfolio.list_properties()
+                return jsonify({
+                    'success': True,
+                    'properties': properties,
+                    'count': len(properties)
+                })
+            
+            data = request.get_json()
+            if not data.get('contract_address') or data.get('valuation') is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'contract_address and valuation are required'
+                }), 400
+            
+            decimals = data.get('decimals')
+            return jsonify({
+                'success': True,
+                'property': portfolio.register_property(
+                    data['contract_address'],
+                    data.get('name'),
+                    data['valuation'],
+                    decimals=int(decimals) if decimals is not None else None
+                )
+            })
+            
+        except Exception as e:
+            logger.error('request_failed', route='properties', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @app.route('/api/properties/<address>', methods=['DELETE'])
+    def remove_property_token(address):
+        """Stop valuing a property token"""
+        try:
+            portfolio = runtime.portfolio
+            if not portfolio:
+                return jsonify({
+                    'success': False,
+                    'error': 'Portfolio valuation is not enabled'
+                }), 400
+            
+            if not portfolio.remove_property(address):
+                return jsonify({
+                    'success': False,
+                    'error': 'Property not found'
+                }), 404
+            
+            return jsonify({
+                'success': True,
+                'contract_address': address
+            })
+            
+        except Exception as e:
+            logger.error('request_failed', route='property_remove', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @app.route('/api/jobs/transactions', methods=['POST'])
+    def create_transaction_job():
+        """Queue a batch of contract transactions and return the job id immediately"""
+        try:
+            if not runtime.job_manager:
+                return jsonify({
+                    'success': False,
+                    'error': 'No account loaded for sending transactions'
+                }), 400
+            
+            data = request.get_json()
+            transactions = data.get('transactions')
+            
+            if not isinstance(transactions, list) or not transactions:
+                return jsonify({
+                    'success': False,
+                    'error': 'transactions must be a non-empty list'
+                }), 400
+            
+            if len(transactions) > app.config['JOB_MAX_ITEMS']:
+                return jsonify({
+                    'success': False,
+                    'error': f"Job size exceeds limit of {app.config['JOB_MAX_ITEMS']}"
+                }), 400
+            
+            for index, item in enumerate(transactions):
+                if not isinstance(item, dict) or not item.get('contract_address') or not item.get('function_name'):
+                    return jsonify({
+                        'success': False,
+                        'error': f"contract_address and function_name are required (item {index})"
+                    }), 400
+            
+            job = runtime.job_manager.create_job(
+                transactions,
+                idempotency_key=data.get('idempotency_key') or request.headers.get('Idempotency-Key')
+            )
+            
+            return jsonify({
+                'success': True,
+                'job': job
+            }), 202
+            
+        except Exception as e:
+            logger.error('request_failed', route='job_create', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @app.route('/api/jobs/<job_id>', methods=['GET'])
+    def get_transaction_job(job_id):
+        """Get job progress, per-item status and, once finished, throughput and latency"""
+        if not runtime.job_manager:
+            return jsonify({
+                'success': False,
+                'error': 'No account loaded for sending transactions'
+            }), 400
+        
+        include_items = request.args.get('items', 'true').lower() != 'false'
+        job = runtime.job_manager.get_job(job_id, include_items=include_items)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'error': 'Job not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'job': job
+        })
+    
+    @app.route('/api/jobs/<job_id>/retry', methods=['POST'])
+    def retry_transaction_job(job_id):
+        """Resubmit failed items of a job that have not taken effect on chain"""
+        try:
+            if not runtime.job_manager:
+                return jsonify({
+                    'success': False,
+                    'error': 'No account loaded for sending transactions'
+                }), 400
+            
+            return jsonify({
+                'success': True,
+                **runtime.job_manager.retry_job(job_id)
+            })
+            
+        except KeyError:
+            return jsonify({
+                'success': False,
+                'error': 'Job not found'
+            }), 404
+        except Exception as e:
+            logger.error('request_failed', route='job_retry', job_id=job_id, error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @app.route('/api/token/<token_address>/snapshot', methods=['GET'])
+    def get_token_snapshot(token_address):
+        """Get every holder's token balance at a past block, replayed from indexed Transfer events"""
+        try:
+            if not runtime.dividends:
+                return jsonify({
+                    'success': False,
+                    'error': 'Dividend distributions are not enabled'
+                }), 400
+            
+            block_number = to_block_number(request.args['block'])
+            balances = runtime.dividends.snapshots.balances_at(token_address, block_number)
+            limit = min(int(request.args.get('limit', 100)), 1000)
+            offset = int(request.args.get('offset', 0))
+            holders = sorted(balances.items(), key=lambda entry: (-entry[1], entry[0]))[offset:offset + limit]
+            
+            return jsonify({
+                'success': True,
+                'token_address': token_address,
+                'block_number': block_number,
+                'holder_count': len(balances),
+                'total_supply': str(sum(balances.values())),
+                'holders': [{'address': holder, 'balance': str(balance)} for holder, balance in holders]
+            })
+            
+        except KeyError:
+            return jsonify({
+                'success': False,
+                'error': 'block is required'
+            }), 400
+        except Exception as e:
+            logger.error('request_failed', route='token_snapshot', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @app.route('/api/distributions', methods=['POST'])
+    def create_distribution():
+        """Compute pro-rata payouts at a record block, store them and queue the payout transactions"""
+        try:
+            dividends = runtime.dividends
+            if not dividends:
+                return jsonify({
+                    'success': False,
+                    'error': 'Dividend distributions are not enabled'
+                }), 400
+            
+            data = request.get_json()
+            for field in ('token_address', 'record_block', 'total_amount'):
+                if data.get(field) is None:
+                    return jsonify({
+                        'success': False,
+                        'error': f'{field} is required'
+                    }), 400
+            
+            # Amounts are integers in the payout token's base units; strings avoid JSON float rounding
+            options = {
+                'exclude': data.get('exclude', []),
+                'min_payout': int(str(data.get('min_payout', 0))),
+                'dust': data.get('dust', 'distribute')
+            }
+            record_block = int(data['record_block'])
+            total_amount = int(str(data['total_amount']))
+            
+            if data.get('dry_run'):
+                allocation = dividends.compute(data['token_address'], record_block, total_amount, **options)
+                return jsonify({
+                    'success': True,
+                    'dry_run': True,
+                    **{key: str(value) if key in ('total_amount', 'distributed', 'dust', 'eligible_supply') else value
+                       for key, value in allocation.items() if key != 'payouts'},
+                    'payouts': [
+                        {'holder': payout['holder'], 'balance': str(payout['balance']), 'amount': str(payout['amount'])}
+                        for payout in allocation['payouts']
+                    ]
+                })
+            
+            if not data.get('payout_token'):
+                return jsonify({
+                    'success': False,
+                    'error': 'payout_token is required'
+                }), 400
+            
+            distribution = dividends.create_distribution(
+                data['token_address'], record_block, data['payout_token'], total_amount,
+                payout_source=data.get('payout_source'),
+                idempotency_key=data.get('idempotency_key') or request.headers.get('Idempotency-Key'),
+                **options
+            )
+            if data.get('execute', True):
+                distribution = dividends.execute(distribution['distribution_id'])
+            
+            return jsonify({
+                'success': True,
+                'distribution': distribution
+            }), 202
+            
+        except Exception as e:
+            logger.error('request_failed', route='distribution_create', error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @app.route('/api/distributions/<distribution_id>', methods=['GET'])
+    def get_distribution(distribution_id):
+        """Get a distribution with its aggregated payout progress and, optionally, every payout"""
+        if not runtime.dividends:
+            return jsonify({
+                'success': False,
+                'error': 'Dividend distributions are not enabled'
+            }), 400
+        
+        include_payouts = request.args.get('payouts', 'false').lower() == 'true'
+        distribution = runtime.dividends.get_distribution(distribution_id, include_payouts=include_payouts)
+        if distribution is None:
+            return jsonify({
+                'success': False,
+                'error': 'Distribution not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'distribution': distribution
+        })
+    
+    @app.route('/api/distributions/<distribution_id>/execute', methods=['POST'])
+    def execute_distribution(distribution_id):
+        """Queue the payout jobs of a stored distribution that do not exist yet; safe to repeat"""
+        try:
+            if not runtime.dividends:
+                return jsonify({
+                    'success': False,
+                    'error': 'Dividend distributions are not enabled'
+                }), 400
+            
+            return jsonify({
+                'success': True,
+                'distribution': runtime.dividends.execute(distribution_id)
+            }), 202
+            
+        except KeyError:
+            return jsonify({
+                'success': False,
+                'error': 'Distribution not found'
+            }), 404
+        except Exception as e:
+            logger.error('request_failed', route='distribution_execute', distribution_id=distribution_id, error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @app.route('/api/distributions/<distribution_id>/retry', methods=['POST'])
+    def retry_distribution(distribution_id):
+        """Resubmit payouts of a distribution that failed or never took effect on chain"""
+        try:
+            if not runtime.dividends:
+                return jsonify({
+                    'success': False,
+                    'error': 'Dividend distributions are not enabled'
+                }), 400
+            
+            return jsonify({
+                'success': True,
+                **runtime.dividends.retry(distribution_id)
+            })
+            
+        except KeyError:
+            return jsonify({
+                'success': False,
+                'error': 'Distribution not found'
+            }), 404
+        except Exception as e:
+            logger.error('request_failed', route='distribution_retry', distribution_id=distribution_id, error=str(e))
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Prometheus text exposition of this worker's metrics"""
+        if not app.config['METRICS_ENABLED']:
+            return jsonify({
+                'success': False,
+                'error': 'Metrics are disabled'
+            }), 404
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+    
     @app.errorhandler(404)
     def not_found(error):
         return jsonify({
@@ -179,7 +1484,7 @@ def create_app():
     
     @app.errorhandler(500)
     def internal_error(error):
-        logger.error(f"Internal server error: {str(error)}")
+        logger.error('internal_server_error', error=str(error))
         return jsonify({
             'success': False,
             'error': 'Internal server error'
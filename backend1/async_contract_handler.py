@@ -0,0 +1,723 @@
+import asyncio
+import functools
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from hexbytes import HexBytes
+from web3 import AsyncWeb3, AsyncHTTPProvider, Web3
+from web3.middleware import async_geth_poa_middleware, geth_poa_middleware
+from eth_account import Account
+from config import Config
+from contract_handler import ContractHandler
+from read_cache import create_read_cache
+from rpc_pool import create_rpc_provider
+from nonce_manager import create_nonce_manager, is_known_transaction_error, is_nonce_error
+from gas_oracle import GasEstimateCache, create_gas_oracle, create_gas_estimate_cache
+from receipt_watcher import create_receipt_watcher, format_receipt
+from single_flight import create_single_flight
+from abi_registry import create_abi_registry
+from signer_pool import create_signer_pool, signed_transactions
+from log_decoder import get_event_decoder
+from serialization import to_block_number, to_jsonable
+from logging_config import get_logger
+from metrics import RPC_REQUEST_DURATION, RPC_REQUEST_ERRORS, TRANSACTIONS_SENT, async_metrics_middleware
+from rpc_batch import MULTICALL3_ABI, AsyncJSONRPCBatch, decode_revert_reason, rpc_error_message
+
+logger = get_logger(__name__)
+
+
+def _on_handler_loop(method):
+    """Run a handler coroutine on the handler's own event loop
+
+    Callers may await from any loop (e.g. the per-request loop Flask creates
+    for async views); the RPC I/O always happens on the handler loop, so all
+    requests share one aiohttp connection pool.
+    """
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        coro = method(self, *args, **kwargs)
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self._loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+    return wrapper
+
+
+class AsyncContractHandler:
+    """Asyncio Web3 contract interaction handler"""
+
+    # ABI loading, contract instances, result formatting and event streaming are shared with the sync handler
+    load_contract_abi = ContractHandler.load_contract_abi
+    get_contract = ContractHandler.get_contract
+    iter_contract_events = ContractHandler.iter_contract_events
+    _iter_event_chunks = ContractHandler._iter_event_chunks
+    _format_event = staticmethod(ContractHandler._format_event)
+    _decode_call_output = ContractHandler._decode_call_output
+    _format_call_result = staticmethod(ContractHandler._format_call_result)
+    _checksum_addresses = staticmethod(ContractHandler._checksum_addresses)
+    _parse_balance_responses = ContractHandler._parse_balance_responses
+    _format_balances = staticmethod(ContractHandler._format_balances)
+    _reserve_nonces = ContractHandler._reserve_nonces
+    _prepare_simulation = ContractHandler._prepare_simulation
+    _simulation_requests = staticmethod(ContractHandler._simulation_requests)
+    _record_simulation = ContractHandler._record_simulation
+    _screen_simulation = staticmethod(ContractHandler._screen_simulation)
+
+    def __init__(self, abi_registry=None):
+        """Start the handler event loop, then configure Web3 and the account without RPC calls"""
+        self.config = Config()
+        self._contract_cache = {}
+        self.abi_registry = abi_registry or create_abi_registry(self.config)
+        self._chain_id = None
+
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(
+            target=self._loop.run_forever,
+            name='async-contract-handler',
+            daemon=True
+        )
+        self._loop_thread.start()
+
+        self.w3 = asyncio.run_coroutine_threadsafe(self._initialize_web3(), self._loop).result()
+        self.account = Account.from_key(self.config.PRIVATE_KEY) if self.config.PRIVATE_KEY else None
+
+        # Nonce state, the fee sampler, the receipt watcher and the read cache's head tracker
+        # use blocking I/O, so they get a sync client and are called off the loop
+        self.sync_w3 = self._initialize_sync_web3()
+        self.read_cache = create_read_cache(self.sync_w3, self.config)
+        self.single_flight = create_single_flight(self.config, use_async=True)
+        self.gas_oracle = create_gas_oracle(self.sync_w3, self.config)
+        self.gas_estimates = create_gas_estimate_cache(self.config)
+        self.receipt_watcher = create_receipt_watcher(self.sync_w3, self.config)
+        self.signers = create_signer_pool(self.config, self.account, self.receipt_watcher)
+        self.account = self.account or (self.signers.primary if self.signers else None)
+        self.nonce_manager = create_nonce_manager(self.sync_w3, self.config) if self.signers else None
+
+    def close(self):
+        """Stop the handler event loop, its default executor and its thread"""
+        asyncio.run_coroutine_threadsafe(self._loop.shutdown_default_executor(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join(timeout=5)
+
+    async def _initialize_web3(self) -> AsyncWeb3:
+        """Initialize AsyncWeb3 connection with a sized keep-alive session pool"""
+        try:
+            provider_url = self.config.get_web3_provider_url()
+
+            if not provider_url.startswith('http'):
+                raise ValueError(f"AsyncContractHandler requires an HTTP provider URL: {provider_url}")
+
+            provider = AsyncHTTPProvider(provider_url)
+
+            # Web3 caches sessions per thread, and all handler I/O runs on the loop thread
+            session = ClientSession(
+                connector=TCPConnector(
+                    limit=self.config.ASYNC_POOL_SIZE,
+                    keepalive_timeout=self.config.ASYNC_KEEPALIVE_TIMEOUT
+                ),
+                timeout=ClientTimeout(total=self.config.ASYNC_REQUEST_TIMEOUT),
+                raise_for_status=True
+            )
+            await provider.cache_async_session(session)
+            self._session = session
+
+            w3 = AsyncWeb3(provider)
+
+            # Add PoA middleware if on a testnet (required for some testnets)
+            if self.config.is_testnet():
+                w3.middleware_onion.inject(async_geth_poa_middleware, layer=0)
+
+            if self.config.METRICS_ENABLED:
+                w3.middleware_onion.add(async_metrics_middleware, 'metrics')
+
+            # Connectivity is checked by the readiness probe, not here
+            logger.info('web3_configured', provider=provider_url, mode='async')
+            return w3
+
+        except Exception as e:
+            logger.error('web3_init_failed', mode='async', error=str(e))
+            raise
+
+    def _initialize_sync_web3(self) -> Web3:
+        """Sync client over the same pooled, failover-aware endpoints as ContractHandler"""
+        w3 = Web3(create_rpc_provider(self.config))
+        if self.config.is_testnet():
+            w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+        return w3
+
+    @_on_handler_loop
+    async def get_network_info(self) -> Dict[str, Any]:
+        """Get network information"""
+        try:
+            if self._chain_id is None:
+                self._chain_id = await self.w3.eth.chain_id
+
+            latest_block, gas_price, connected = await asyncio.gather(
+                self.w3.eth.block_number,
+                asyncio.to_thread(self.gas_oracle.get_gas_price) if self.gas_oracle else self.w3.eth.gas_price,
+                self.w3.is_connected()
+            )
+
+            return {
+                'network_id': self._chain_id,
+                'network_name': self.config.NETWORK_NAME,
+                'latest_block': latest_block,
+                'gas_price': str(gas_price),
+                'is_testnet': self.config.is_testnet(),
+                'connected': connected
+            }
+        except Exception as e:
+            logger.error('network_info_failed', error=str(e))
+            return {'error': str(e)}
+
+    def get_provider_stats(self) -> List[Dict[str, Any]]:
+        """Per-endpoint stats of the sync client
+
+        Reads on the handler loop go to the primary endpoint over aiohttp,
+        without failover or hedging, so they are not counted here.
+        """
+        return self.sync_w3.provider.stats()
+
+    async def _coalesce(self, key: Tuple, loader) -> Any:
+        """Share one upstream call between identical reads that are in flight together"""
+        if self.single_flight:
+            return await self.single_flight.do(key, loader)
+        return await loader()
+
+    async def _cached_read(self, namespace: str, key_parts: Tuple, block_identifier: Any, loader) -> Any:
+        """Read through the block-keyed cache; loader(block_number) runs on a miss
+
+        The head tracker and a Redis store do blocking I/O, so cache access
+        runs off the loop.
+        """
+        if not self.read_cache:
+            return await loader(block_identifier)
+
+        def probe():
+            block_number = self.read_cache.resolve_block(block_identifier)
+            key, volatile = self.read_cache.make_key(namespace, key_parts, block_number)
+            return block_number, key, volatile, self.read_cache.lookup(key)
+
+        block_number, key, volatile, cached = await asyncio.to_thread(probe)
+        if not self.read_cache.is_missing(cached):
+            return cached
+        value = await loader(block_number)
+        await asyncio.to_thread(self.read_cache.store.set, key, value, volatile)
+        return value
+
+    @_on_handler_loop
+    async def get_balance(self, address: str, block_identifier: Any = 'latest') -> int:
+        """Get the ETH balance of an address in wei"""
+        try:
+            if not Web3.is_address(address):
+                raise ValueError(f"Invalid address: {address}")
+
+            checksum_address = Web3.to_checksum_address(address)
+            balance_wei = await self._cached_read(
+                'balance', (checksum_address,), block_identifier,
+                lambda block: self._coalesce(
+                    ('balance', checksum_address, block),
+                    lambda: self.w3.eth.get_balance(checksum_address, block_identifier=block)
+                )
+            )
+            return balance_wei
+
+        except Exception as e:
+            logger.error('balance_failed', address=address, error=str(e))
+            raise
+
+    @_on_handler_loop
+    async def get_balances(self, addresses: List[str], block_identifier: Any = 'latest') -> Dict[str, Any]:
+        """Get exact ETH balances for many addresses, all read at one pinned block"""
+        try:
+            checksum_addresses = self._checksum_addresses(addresses)
+
+            # Balances already read at this block (e.g. by /api/balance) skip the batch
+            balances: Dict[str, int] = {}
+            cache_keys = {}
+            if self.read_cache:
+                def probe():
+                    pinned = self.read_cache.resolve_block(block_identifier)
+                    found = {}
+                    for address in checksum_addresses:
+                        key, volatile = self.read_cache.make_key('balance', (address,), pinned)
+                        found[address] = (key, volatile, self.read_cache.lookup(key))
+                    return pinned, found
+
+                block_number, found = await asyncio.to_thread(probe)
+                for address, (key, volatile, cached) in found.items():
+                    if self.read_cache.is_missing(cached):
+                        cache_keys[address] = (key, volatile)
+                    else:
+                        balances[address] = cached
+            elif block_identifier in (None, 'latest'):
+                block_number = await self.w3.eth.block_number
+            else:
+                block_number = to_block_number(block_identifier)
+
+            missing = [address for address in checksum_addresses if address not in balances]
+            batch = AsyncJSONRPCBatch(self._session, self.w3.provider.endpoint_uri)
+            batch_size = self.config.BALANCE_BATCH_SIZE
+            chunks = [missing[start:start + batch_size] for start in range(0, len(missing), batch_size)]
+            responses = await asyncio.gather(*(
+                batch.execute([('eth_getBalance', [address, hex(block_number)]) for address in chunk])
+                for chunk in chunks
+            ))
+
+            fetched = {}
+            for chunk, chunk_responses in zip(chunks, responses):
+                fetched.update(zip(chunk, self._parse_balance_responses(chunk, chunk_responses)))
+            balances.update(fetched)
+            if cache_keys:
+                def store():
+                    for address, balance in fetched.items():
+                        key, volatile = cache_keys[address]
+                        self.read_cache.store.set(key, balance, volatile=volatile)
+                await asyncio.to_thread(store)
+            return self._format_balances(checksum_addresses, balances, block_number)
+
+        except Exception as e:
+            logger.error('balances_failed', addresses=len(addresses or []), error=str(e))
+            raise
+
+    @_on_handler_loop
+    async def call_contract_function(self, contract_address: str, function_name: str,
+                                     function_args: List = None, abi_path: str = None,
+                                     abi: List[Dict] = None, block_identifier: Any = 'latest') -> Any:
+        """Call a read-only contract function"""
+        try:
+            contract = self.get_contract(contract_address, abi_path, abi)
+            contract_function = getattr(contract.functions, function_name)
+            bound_function = contract_function(*(function_args or []))
+
+            calldata = bound_function._encode_transaction_data()
+
+            async def load(block):
+                result = await bound_function.call(block_identifier=block)
+                return self._format_call_result(result)
+
+            return await self._cached_read(
+                'call', (contract.address, calldata), block_identifier,
+                lambda block: self._coalesce(('call', contract.address, calldata, block), lambda: load(block))
+            )
+
+        except Exception as e:
+            logger.error('contract_call_failed', contract=contract_address, function=function_name, error=str(e))
+            raise
+
+    @_on_handler_loop
+    async def call_contract_functions_batch(self, calls: List[Dict[str, Any]], aggregate: bool = False,
+                                            block_identifier: Any = 'latest') -> List[Dict[str, Any]]:
+        """Call several read-only contract functions concurrently over the shared pool"""
+        if aggregate:
+            return await self._call_multicall(calls, block_identifier)
+
+        async def call_one(call):
+            try:
+                result = await self.call_contract_function(
+                    call.get('contract_address'),
+                    call.get('function_name'),
+                    call.get('function_args'),
+                    call.get('abi_path'),
+                    call.get('abi'),
+                    block_identifier=block_identifier
+                )
+                return {'success': True, 'result': result}
+            except Exception as e:
+                return {'success': False, 'error': str(e)}
+
+        return list(await asyncio.gather(*(call_one(call) for call in calls)))
+
+    async def _call_multicall(self, calls: List[Dict[str, Any]], block_identifier: Any) -> List[Dict[str, Any]]:
+        """Aggregate all items into a single Multicall3 aggregate3 eth_call"""
+        results: List[Any] = [None] * len(calls)
+        prepared = []
+        for index, call in enumerate(calls):
+            try:
+                contract = self.get_contract(call.get('contract_address'), call.get('abi_path'), call.get('abi'))
+                contract_function = getattr(contract.functions, call.get('function_name'))
+                prepared.append((index, contract.address, contract_function(*(call.get('function_args') or []))))
+            except Exception as e:
+                results[index] = {'success': False, 'error': str(e)}
+
+        if not prepared:
+            return results
+
+        multicall = self.get_contract(self.config.MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+        try:
+            return_data = await multicall.functions.aggregate3([
+                (address, True, HexBytes(bound_function._encode_transaction_data()))
+                for _, address, bound_function in prepared
+            ]).call(block_identifier=block_identifier)
+        except Exception as e:
+            for index, _, _ in prepared:
+                results[index] = {'success': False, 'error': f"Multicall failed: {str(e)}"}
+            return results
+
+        for (index, _, bound_function), (success, data) in zip(prepared, return_data):
+            if not success:
+                results[index] = {'success': False, 'error': decode_revert_reason(self.w3, data)}
+                continue
+            try:
+                results[index] = {'success': True, 'result': self._decode_call_output(bound_function, data)}
+            except Exception as e:
+                results[index] = {'success': False, 'error': f"Could not decode result: {str(e)}"}
+        return results
+
+    @_on_handler_loop
+    async def send_transaction(self, contract_address: str, function_name: str,
+                               function_args: List = None, value: int = 0,
+                               abi_path: str = None, abi: List[Dict] = None,
+                               urgency: str = None, sender: str = None, shard: bool = False) -> str:
+        """Send a transaction to a contract function, from sender, any pool signer with shard, or the primary"""
+        try:
+            if not self.signers:
+                raise ValueError("No account loaded for sending transactions")
+
+            address = self.signers.assign_transactions([{'from': sender, 'shard': shard}])[0]
+            try:
+                # Build before reserving so a bad call never takes a nonce
+                transaction = await self._build_transaction(
+                    contract_address, function_name, function_args, value, abi_path, abi, urgency, sender=address
+                )
+                await asyncio.to_thread(self.nonce_manager.maybe_resync, address)
+                nonce = await asyncio.to_thread(self.nonce_manager.reserve, address)
+                raw_transaction = self.signers.sign(address, {**transaction, 'from': address, 'nonce': nonce})
+
+                try:
+                    tx_hash = await self.w3.eth.send_raw_transaction(raw_transaction)
+                except Exception as e:
+                    await self._handle_send_error(address, nonce, e)
+                    raise
+            except Exception:
+                self.signers.release(address)
+                raise
+            tx_hash_hex = Web3.to_hex(tx_hash)
+            self.signers.sent(address, tx_hash_hex)
+            TRANSACTIONS_SENT.labels('accepted').inc()
+
+            logger.info('transaction_sent', tx_hash=tx_hash_hex, sender=address, contract=contract_address,
+                        function=function_name)
+            return tx_hash_hex
+
+        except Exception as e:
+            logger.error('transaction_send_failed', contract=contract_address, function=function_name, error=str(e))
+            raise
+
+    @_on_handler_loop
+    async def send_transactions(self, transactions: List[Dict[str, Any]], simulate: bool = False,
+                                require_all: bool = False, on_signed=None) -> List[Dict[str, Any]]:
+        """Build, sign and submit several contract transactions as one pipeline
+
+        Transactions are built concurrently, each from the signer chosen as in
+        ContractHandler.send_transactions ('from', 'shard' or the primary).
+        Each signer's share takes consecutive nonces in one reservation and is
+        broadcast in nonce order so the node never sees a gap; signers are
+        broadcast concurrently. With simulate, only the items that pass a dry
+        run from their assigned signer are sent (all or none with require_all).
+        on_signed and 'unknown' results work as in ContractHandler.send_transactions.
+        """
+        if not self.signers:
+            raise ValueError("No account loaded for sending transactions")
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(transactions)
+        assigned = self.signers.assign_transactions(transactions)
+        pending = []
+        try:
+            gas_limits = {}
+            if simulate:
+                simulation = await self.simulate_transactions(transactions, senders=assigned)
+                gas_limits = self._screen_simulation(simulation['results'], results, require_all)
+
+            candidates = [index for index in range(len(transactions)) if results[index] is None]
+            built = await asyncio.gather(*(
+                self._build_transaction(
+                    transactions[index].get('contract_address'),
+                    transactions[index].get('function_name'),
+                    transactions[index].get('function_args'),
+                    transactions[index].get('value', 0),
+                    transactions[index].get('abi_path'),
+                    transactions[index].get('abi'),
+                    transactions[index].get('urgency'),
+                    sender=assigned[index],
+                    gas_limit=gas_limits.get(index)
+                )
+                for index in candidates
+            ), return_exceptions=True)
+            for index, transaction in zip(candidates, built):
+                if isinstance(transaction, Exception):
+                    results[index] = {'success': False, 'error': str(transaction)}
+                else:
+                    pending.append((index, transaction))
+        finally:
+            sending = {index for index, _ in pending}
+            for index, address in enumerate(assigned):
+                if index not in sending:
+                    self.signers.release(address)
+        if not pending:
+            return results
+
+        addresses = [assigned[index] for index, _ in pending]
+        try:
+            nonces = await asyncio.to_thread(self._reserve_nonces, addresses)
+            # Signing is CPU bound, so it runs off the loop (in worker processes for large batches)
+            raw_transactions = await asyncio.to_thread(self.signers.sign_many, [
+                (address, {**transaction, 'from': address, 'nonce': nonce})
+                for (_, transaction), address, nonce in zip(pending, addresses, nonces)
+            ])
+            signed = signed_transactions([index for index, _ in pending], addresses, nonces, raw_transactions)
+            if on_signed:
+                await asyncio.to_thread(on_signed, signed)
+        except Exception:
+            for address in addresses:
+                self.signers.release(address)
+            raise
+
+        async def broadcast(positions):
+            for position in positions:
+                index, address, nonce = pending[position][0], addresses[position], nonces[position]
+                tx_hash = signed[position]['transaction_hash']
+                try:
+                    await self.w3.eth.send_raw_transaction(raw_transactions[position])
+                except ValueError as e:
+                    # The node answered with an error, so the outcome is known
+                    if is_known_transaction_error(e):
+                        self.signers.sent(address, tx_hash)
+                        results[index] = {'success': True, 'transaction_hash': tx_hash, 'from': address,
+                                          'nonce': nonce}
+                        continue
+                    await self._handle_send_error(address, nonce, e)
+                    self.signers.release(address)
+                    results[index] = {'success': False, 'error': str(e), 'from': address, 'nonce': nonce}
+                    continue
+                except Exception as e:
+                    # Timeouts and dropped connections can follow a successful broadcast
+                    self.signers.sent(address, tx_hash)
+                    results[index] = {'success': False, 'unknown': True, 'error': str(e), 'transaction_hash': tx_hash,
+                                      'from': address, 'nonce': nonce}
+                    continue
+                self.signers.sent(address, tx_hash)
+                results[index] = {'success': True, 'transaction_hash': tx_hash, 'from': address, 'nonce': nonce}
+                TRANSACTIONS_SENT.labels('accepted').inc()
+
+        lanes: Dict[str, List[int]] = {}
+        for position, address in enumerate(addresses):
+            lanes.setdefault(address, []).append(position)
+        await asyncio.gather(*(broadcast(positions) for positions in lanes.values()))
+
+        logger.info('transaction_batch_sent', submitted=len(pending), requested=len(transactions), signers=len(lanes),
+                    simulated=simulate)
+        return results
+
+    @_on_handler_loop
+    async def simulate_transactions(self, transactions: List[Dict[str, Any]], block_identifier: Any = 'latest',
+                                    senders: List[str] = None) -> Dict[str, Any]:
+        """Dry-run contract transactions against one pinned block without signing or sending"""
+        try:
+            results, prepared = self._prepare_simulation(transactions, senders)
+            if block_identifier in (None, 'latest'):
+                block_number = await self.w3.eth.block_number
+            else:
+                block_number = to_block_number(block_identifier)
+
+            batch = AsyncJSONRPCBatch(self._session, self.w3.provider.endpoint_uri)
+            batch_size = self.config.SIMULATION_BATCH_SIZE
+            chunks = [prepared[start:start + batch_size] for start in range(0, len(prepared), batch_size)]
+            responses = await asyncio.gather(*(
+                batch.execute(self._simulation_requests(chunk, block_number)) for chunk in chunks
+            ))
+            for chunk, chunk_responses in zip(chunks, responses):
+                self._record_simulation(chunk, chunk_responses, results)
+
+            failed = sum(1 for result in results if not result['success'])
+            logger.info('transactions_simulated', transactions=len(transactions), failed=failed,
+                        block_number=block_number, sample_rate=self.config.LOG_SAMPLE_RATE)
+            return {
+                'block_number': block_number,
+                'results': results,
+                'passed': len(results) - failed,
+                'failed': failed
+            }
+
+        except Exception as e:
+            logger.error('simulation_failed', transactions=len(transactions or []), error=str(e))
+            raise
+
+    async def _handle_send_error(self, address: str, nonce: int, error: Exception):
+        """Keep local nonce state correct after a failed broadcast"""
+        TRANSACTIONS_SENT.labels('rejected').inc()
+        if is_nonce_error(error):
+            await asyncio.to_thread(self.nonce_manager.resync, address)
+        elif isinstance(error, ValueError):
+            await asyncio.to_thread(self.nonce_manager.release, address, nonce)
+
+    async def _build_transaction(self, contract_address: str, function_name: str, function_args: List,
+                                 value: int, abi_path: str, abi: List[Dict], urgency: str = None,
+                                 sender: str = None, gas_limit: int = None) -> Dict[str, Any]:
+        """Build an unsigned contract transaction from sender; the caller sets the nonce"""
+        sender = sender or self.account.address
+        if self._chain_id is None:
+            self._chain_id = await self.w3.eth.chain_id
+        contract = self.get_contract(contract_address, abi_path, abi)
+        bound_function = getattr(contract.functions, function_name)(*(function_args or []))
+
+        if self.gas_oracle:
+            fees = await asyncio.to_thread(self.gas_oracle.get_fees, urgency)
+        else:
+            fees = {'gasPrice': self.config.get_gas_price_wei()}
+
+        # A gas limit from a simulation skips estimation
+        if gas_limit is None and self.gas_estimates:
+            key = GasEstimateCache.make_key(bound_function.address, function_name, function_args, value, sender)
+            gas_limit = self.gas_estimates.get(key)
+            if gas_limit is None:
+                estimate = await bound_function.estimate_gas({'from': sender, 'value': value})
+                gas_limit = self.gas_estimates.put(key, estimate)
+        elif gas_limit is None:
+            gas_limit = self.config.GAS_LIMIT
+
+        # Every field is supplied, so web3 does not fill any defaults from the node
+        return await bound_function.build_transaction({
+            'from': sender,
+            'chainId': self._chain_id,
+            'gas': gas_limit,
+            'nonce': 0,
+            'value': value,
+            **fees
+        })
+
+    @_on_handler_loop
+    async def get_gas_fees(self) -> Dict[str, Any]:
+        """Current fee suggestions for every urgency level"""
+        if not self.gas_oracle:
+            return {'legacy': {'gasPrice': self.config.get_gas_price_wei()}}
+        return {
+            urgency: await asyncio.to_thread(self.gas_oracle.get_fees, urgency)
+            for urgency in self.gas_oracle.urgency_percentiles
+        }
+
+    @_on_handler_loop
+    async def get_transaction_details(self, tx_hash: str) -> Dict[str, Any]:
+        """Get transaction details and receipt"""
+        try:
+            # A receipt the watcher already resolved skips the receipt call
+            receipt_data = self.receipt_watcher.get_cached(tx_hash)
+            if receipt_data is None:
+                # Fetch the transaction and receipt concurrently
+                tx, receipt = await asyncio.gather(
+                    self.w3.eth.get_transaction(tx_hash),
+                    self.w3.eth.get_transaction_receipt(tx_hash),
+                    return_exceptions=True
+                )
+                if not isinstance(receipt, Exception):
+                    receipt_data = format_receipt(to_jsonable(receipt))
+            else:
+                tx = await self.w3.eth.get_transaction(tx_hash)
+            if isinstance(tx, Exception):
+                raise tx
+
+            return {
+                'hash': tx_hash,
+                'from': tx['from'],
+                'to': tx['to'],
+                'value': str(tx['value']),
+                'gas': tx['gas'],
+                'gas_price': str(tx['gasPrice']),
+                'nonce': tx['nonce'],
+                'block_number': tx.get('blockNumber'),
+                'transaction_index': tx.get('transactionIndex'),
+                'receipt': receipt_data
+            }
+
+        except Exception as e:
+            logger.error('transaction_details_failed', tx_hash=tx_hash, error=str(e))
+            raise
+
+    @_on_handler_loop
+    async def get_contract_events(self, contract_address: str, event_name: str,
+                                  from_block: str = 'latest', to_block: str = 'latest',
+                                  abi_path: str = None, abi: List[Dict] = None) -> List[Dict]:
+        """Get contract events"""
+        try:
+            contract = self.get_contract(contract_address, abi_path, abi)
+            result = await self._fetch_events(contract, event_name, from_block, to_block)
+
+            logger.info('events_fetched', contract=contract_address, event_name=event_name, count=len(result),
+                        sample_rate=self.config.LOG_SAMPLE_RATE)
+            return result
+
+        except Exception as e:
+            logger.error('events_failed', contract=contract_address, event_name=event_name, error=str(e))
+            raise
+
+    async def _fetch_events(self, contract, event_name: str, from_block: Any, to_block: Any) -> List[Dict[str, Any]]:
+        """Formatted events of one block range (see ContractHandler._get_event_chunk)"""
+        event = getattr(contract.events, event_name)
+        if not self.config.EVENTS_FAST_DECODE:
+            logs = await event.get_logs(fromBlock=from_block, toBlock=to_block)
+            return [self._format_event(event_name, log) for log in logs]
+
+        decoder = get_event_decoder(event._get_event_abi())
+        params = decoder.filter_params(contract.address, from_block, to_block)
+        try:
+            with RPC_REQUEST_DURATION.labels('eth_getLogs').time():
+                response = await self.w3.provider.make_request('eth_getLogs', [params])
+        except Exception:
+            RPC_REQUEST_ERRORS.labels('eth_getLogs').inc()
+            raise
+        if 'error' in response:
+            raise ValueError(rpc_error_message(self.w3, response['error']))
+        return decoder.decode(response['result'])
+
+    # Streaming responses are iterated on a worker thread; each fetch runs on the handler loop
+    def _get_event_chunk(self, contract, event_name: str, from_block: int, to_block: int) -> List[Dict[str, Any]]:
+        coro = self._fetch_events(contract, event_name, from_block, to_block)
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _get_block_number(self) -> int:
+        return asyncio.run_coroutine_threadsafe(self.w3.eth.block_number, self._loop).result()
+
+    @_on_handler_loop
+    async def wait_for_transaction_receipt(self, tx_hash: str, timeout: int = 120) -> Dict:
+        """Wait for transaction to be mined without blocking a worker thread"""
+        try:
+            return await asyncio.wrap_future(self.receipt_watcher.watch(tx_hash, timeout))
+        except Exception as e:
+            logger.error('receipt_wait_failed', tx_hash=tx_hash, error=str(e))
+            raise
+
+    @_on_handler_loop
+    async def get_transaction_receipt(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        """Get a receipt from the watcher cache or the node; None if not yet mined"""
+        receipt = self.receipt_watcher.get_cached(tx_hash)
+        if receipt is None:
+            receipt = (await asyncio.to_thread(self.receipt_watcher.fetch_receipts, [tx_hash]))[0]
+        return receipt
+
+    @_on_handler_loop
+    async def estimate_gas(self, contract_address: str, function_name: str,
+                           function_args: List = None, value: int = 0,
+                           abi_path: str = None, abi: List[Dict] = None, sender: str = None) -> int:
+        """Estimate gas for a transaction sent from sender, by default the primary account"""
+        try:
+            if not self.account:
+                raise ValueError("No account loaded for gas estimation")
+
+            contract = self.get_contract(contract_address, abi_path, abi)
+            contract_function = getattr(contract.functions, function_name)
+
+            gas_estimate = await contract_function(*(function_args or [])).estimate_gas({
+                'from': sender or self.account.address,
+                'value': value
+            })
+
+            logger.debug('gas_estimated', function=function_name, gas=gas_estimate)
+            return gas_estimate
+
+        except Exception as e:
+            logger.error('gas_estimate_failed', function=function_name, error=str(e))
+            raise
@@ -0,0 +1,96 @@
+"""Compare the sync and async contract handler serving paths.
+
+Start a local dev chain first (e.g. `npx hardhat node` from the repo root),
+then run from backend1/:
+
+    python benchmarks/async_vs_sync.py --requests 5000 --concurrency 200 \
+        --contract 0x... --abi-path path/to/Token.json
+
+The read cache is disabled so every request reaches the RPC node.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loadgen import run_load, start_server, stop_server
+
+# Default first Hardhat/anvil dev account
+DEFAULT_ADDRESS = '0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266'
+
+MODES = {
+    'sync': {'env': {'ASYNC_HANDLER': 'false'}, 'worker_class': 'sync'},
+    'async': {'env': {'ASYNC_HANDLER': 'true'}, 'worker_class': 'gthread'}
+}
+
+
+def build_scenarios(args):
+    scenarios = {
+        'balance': lambda i: {'method': 'GET', 'path': f'/api/balance/{args.address}'}
+    }
+    if args.contract:
+        scenarios['call'] = lambda i: {
+            'method': 'POST',
+            'path': '/api/contract/call',
+            'json': {
+                'contract_address': args.contract,
+                'function_name': 'balanceOf',
+                'function_args': [args.address],
+                'abi_path': args.abi_path
+            }
+        }
+    return scenarios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--provider-url', default='http://127.0.0.1:8545')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=64, help='gthread threads per worker in async mode')
+    parser.add_argument('--address', default=DEFAULT_ADDRESS)
+    parser.add_argument('--contract', help='token contract for the contract call scenario')
+    parser.add_argument('--abi-path', help='ABI file for --contract')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    base_env = {
+        'WEB3_PROVIDER_URL': args.provider_url,
+        'READ_CACHE_ENABLED': 'false',
+        'RATE_LIMIT_ENABLED': 'false'
+    }
+
+    results = {}
+    for mode, settings in MODES.items():
+        threads = args.threads if settings['worker_class'] == 'gthread' else 1
+        server = start_server(
+            args.port,
+            {**base_env, **settings['env']},
+            worker_class=settings['worker_class'],
+            workers=args.workers,
+            threads=threads
+        )
+        try:
+            for name, make_request in build_scenarios(args).items():
+                summary = asyncio.run(run_load(
+                    f'http://127.0.0.1:{args.port}', make_request, args.requests, args.concurrency
+                ))
+                results[f'{mode}/{name}'] = summary
+                print(f"{mode:>5} {name:<8} {summary['req_per_s']:>9.1f} req/s  "
+                      f"p50 {summary['p50_ms']:>8.2f} ms  p99 {summary['p99_ms']:>8.2f} ms  "
+                      f"errors {summary['errors']}")
+        finally:
+            stop_server(server)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
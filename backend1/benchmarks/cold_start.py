@@ -0,0 +1,140 @@
+"""Measure worker cold start with and without gunicorn --preload.
+
+Start a local dev chain first (e.g. `npx hardhat node` from the repo root),
+then run from backend1/:
+
+    python benchmarks/cold_start.py --runs 5 --workers 4
+
+For each case the server is spawned and timed until:
+
+- live: /health/live first answers 200 (the worker accepts requests)
+- ready: /health/ready first answers 200 (services built, node reached)
+- first/second request: latency of the first two /api/balance requests
+
+The 'node down' cases point WEB3_PROVIDER_URL at a closed port. Workers
+must still start and answer liveness while readiness stays 503 (ready
+is reported as null). With several workers each probe is answered by
+whichever worker accepts the connection first.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loadgen import spawn_server, stop_server
+
+# Default first Hardhat/anvil dev account
+DEFAULT_ADDRESS = '0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266'
+
+
+def _get(url: str, timeout: float = 5.0) -> Optional[int]:
+    """Status code of a GET, or None when the server is not accepting connections"""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return None
+
+
+def _wait_for(url: str, started: float, timeout: float, process) -> Optional[float]:
+    """Seconds from started until url answers 200, or None on timeout"""
+    deadline = started + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        if _get(url, timeout=1.0) == 200:
+            return time.perf_counter() - started
+        time.sleep(0.01)
+    return None
+
+
+def _timed_get(url: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    status = _get(url, timeout=30.0)
+    return {'status': status, 'ms': round((time.perf_counter() - started) * 1000, 2)}
+
+
+def measure(args, env: Dict[str, str], preload: bool, node_up: bool) -> Dict[str, Any]:
+    base_url = f'http://127.0.0.1:{args.port}'
+    started = time.perf_counter()
+    process = spawn_server(args.port, env, workers=args.workers, preload=preload)
+    try:
+        live = _wait_for(base_url + '/health/live', started, args.timeout, process)
+        if live is None:
+            raise TimeoutError(f"No liveness response within {args.timeout}s")
+
+        # With the node down readiness must stay 503, so only probe for a short while
+        ready = _wait_for(base_url + '/health/ready', started, args.timeout if node_up else live + 2.0, process)
+        first = _timed_get(f'{base_url}/api/balance/{args.address}')
+        second = _timed_get(f'{base_url}/api/balance/{args.address}')
+        return {
+            'live_s': round(live, 3),
+            'ready_s': round(ready, 3) if ready is not None else None,
+            'first_request': first,
+            'second_request': second
+        }
+    finally:
+        stop_server(process)
+
+
+def _median(runs, key):
+    values = [key(run) for run in runs if key(run) is not None]
+    return round(statistics.median(values), 3) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--provider-url', default='http://127.0.0.1:8545')
+    parser.add_argument('--down-url', default='http://127.0.0.1:9', help='provider URL nothing listens on')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds to wait for each probe')
+    parser.add_argument('--address', default=DEFAULT_ADDRESS)
+    parser.add_argument('--port', type=int, default=5098)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='cold-start-') as workdir:
+        base_env = {
+            'NONCE_STATE_DIR': os.path.join(workdir, 'nonces'),
+            'JOBS_DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'jobs.db')}",
+            'PORTFOLIO_DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'portfolio.db')}",
+            'INDEXER_ENABLED': 'false',
+            'RATE_LIMIT_ENABLED': 'false',
+            'LOG_LEVEL': 'WARNING'
+        }
+        for preload in (False, True):
+            for node_up in (True, False):
+                name = f"{'preload' if preload else 'no-preload'}/{'node-up' if node_up else 'node-down'}"
+                env = {**base_env, 'WEB3_PROVIDER_URL': args.provider_url if node_up else args.down_url}
+                runs = [measure(args, env, preload, node_up) for _ in range(args.runs)]
+                results[name] = {
+                    'live_s': _median(runs, lambda run: run['live_s']),
+                    'ready_s': _median(runs, lambda run: run['ready_s']),
+                    'first_request_ms': _median(runs, lambda run: run['first_request']['ms']),
+                    'second_request_ms': _median(runs, lambda run: run['second_request']['ms']),
+                    'first_request_status': runs[-1]['first_request']['status'],
+                    'runs': runs
+                }
+                summary = {key: value for key, value in results[name].items() if key != 'runs'}
+                print(f"{name:24} {json.dumps(summary)}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
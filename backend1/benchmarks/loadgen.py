@@ -0,0 +1,150 @@
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Any, Callable
+import aiohttp
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# One Prometheus text sample: name{labels} value
+SAMPLE_PATTERN = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})?\s+(\S+)$')
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Summarize request latencies (seconds) into throughput and percentiles (ms)"""
+    completed = len(latencies)
+    return {
+        'requests': completed + errors,
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'req_per_s': round(completed / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2)
+    }
+
+
+async def run_load(base_url: str, make_request: Callable[[int], Dict[str, Any]],
+                   total_requests: int, concurrency: int) -> Dict[str, Any]:
+    """Drive total_requests through concurrency client connections"""
+    latencies = []
+    errors = 0
+    counter = iter(range(total_requests))
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(base_url, connector=connector) as session:
+        async def client():
+            nonlocal errors
+            for index in counter:
+                spec = make_request(index)
+                started = time.perf_counter()
+                try:
+                    async with session.request(spec['method'], spec['path'], json=spec.get('json')) as response:
+                        await response.read()
+                        if response.status >= 400:
+                            errors += 1
+                            continue
+                except aiohttp.ClientError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return summarize(latencies, errors, elapsed)
+
+
+def spawn_server(port: int, env: Dict[str, str], worker_class: str = 'sync', workers: int = 1,
+                 threads: int = 1, preload: bool = False) -> subprocess.Popen:
+    """Start app.py under gunicorn without waiting for it"""
+    command = [
+        sys.executable, '-m', 'gunicorn',
+        '--bind', f'127.0.0.1:{port}',
+        '--workers', str(workers),
+        '--worker-class', worker_class,
+        '--threads', str(threads),
+        '--log-level', 'warning'
+    ]
+    if preload:
+        command.append('--preload')
+    command.append('app:create_app()')
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env={**os.environ, **env})
+
+
+def start_server(port: int, env: Dict[str, str], worker_class: str = 'sync', workers: int = 1,
+                 threads: int = 1, timeout: float = 30.0, health_path: str = '/',
+                 preload: bool = False) -> subprocess.Popen:
+    """Start app.py under gunicorn and wait until health_path answers"""
+    process = spawn_server(port, env, worker_class, workers, threads, preload)
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            asyncio.run(_ping(f'http://127.0.0.1:{port}{health_path}'))
+            return process
+        except Exception:
+            time.sleep(0.2)
+
+    process.terminate()
+    raise TimeoutError(f"Server on port {port} did not become healthy within {timeout}s")
+
+
+async def _ping(url: str):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            response.raise_for_status()
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def _fetch_metrics(url: str) -> Dict[str, float]:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            text = await response.text()
+
+    samples = {}
+    for line in text.splitlines():
+        match = SAMPLE_PATTERN.match(line)
+        if match:
+            samples[match.group(1) + (match.group(2) or '')] = float(match.group(3))
+    return samples
+
+
+def fetch_metrics(base_url: str) -> Dict[str, float]:
+    """Samples from the app's /metrics endpoint keyed by 'name{labels}'"""
+    return asyncio.run(_fetch_metrics(f'{base_url}/metrics'))
+
+
+def rpc_call_counts(before: Dict[str, float], after: Dict[str, float]) -> Dict[str, float]:
+    """JSON-RPC requests per method made between two /metrics scrapes"""
+    prefix = 'rpc_request_duration_seconds_count{method="'
+    counts = {}
+    for key, value in after.items():
+        if key.startswith(prefix):
+            delta = value - before.get(key, 0.0)
+            if delta:
+                counts[key[len(prefix):-2]] = delta
+    return counts
@@ -0,0 +1,132 @@
+"""Benchmark decoding of raw eth_getLogs results.
+
+Run from backend1/:
+
+    python benchmarks/log_decoding.py --sizes 10000,100000,1000000
+
+Decodes synthetic ERC-20 Transfer logs, shaped like a node's JSON-RPC
+response, through web3's path (result formatters, get_event_data, then
+ContractHandler._format_event) and through log_decoder: the columnar fast
+path with and without building the response dicts, the numpy views, and
+the per-log generic fallback. No chain is needed. Large sizes take a few
+GB of memory and the web3 path takes minutes at 1M logs; use --skip to
+leave paths out.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from web3 import Web3
+from web3._utils.events import get_event_data
+from web3._utils.method_formatters import log_entry_formatter
+
+from contract_handler import ContractHandler
+from log_decoder import EventLogDecoder, np
+
+TRANSFER_ABI = {
+    'anonymous': False,
+    'name': 'Transfer',
+    'type': 'event',
+    'inputs': [
+        {'indexed': True, 'name': 'from', 'type': 'address'},
+        {'indexed': True, 'name': 'to', 'type': 'address'},
+        {'indexed': False, 'name': 'value', 'type': 'uint256'}
+    ]
+}
+TOKEN_ADDRESS = '0x' + '33' * 20
+
+
+def make_logs(count: int, holders: int = 5000, seed: int = 1) -> List[Dict[str, Any]]:
+    """Raw Transfer logs among a fixed set of holders, 50 per block"""
+    rng = random.Random(seed)
+    decoder = EventLogDecoder(TRANSFER_ABI)
+    holder_topics = ['0x' + '00' * 12 + rng.randbytes(20).hex() for _ in range(holders)]
+    logs = []
+    for index in range(count):
+        block = 19000000 + index // 50
+        logs.append({
+            'address': TOKEN_ADDRESS,
+            'blockHash': '0x' + block.to_bytes(32, 'big').hex(),
+            'blockNumber': hex(block),
+            'data': '0x' + rng.getrandbits(96).to_bytes(32, 'big').hex(),
+            'logIndex': hex(index % 50),
+            'removed': False,
+            'topics': [decoder.topic, rng.choice(holder_topics), rng.choice(holder_topics)],
+            'transactionHash': '0x' + index.to_bytes(32, 'big').hex(),
+            'transactionIndex': hex(index % 50)
+        })
+    return logs
+
+
+def web3_decode(logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """What ContractHandler did for every log before the fast path"""
+    codec = Web3().codec
+    return [
+        ContractHandler._format_event('Transfer', get_event_data(codec, TRANSFER_ABI, log_entry_formatter(log)))
+        for log in logs
+    ]
+
+
+def time_once(decode: Callable[[List[Dict[str, Any]]], Any], logs: List[Dict[str, Any]]) -> float:
+    gc.collect()
+    started = time.perf_counter()
+    result = decode(logs)
+    elapsed = time.perf_counter() - started
+    del result
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000,1000000', help='comma-separated log counts')
+    parser.add_argument('--skip', default='', help='comma-separated paths to leave out, e.g. web3,fallback')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    decoder = EventLogDecoder(TRANSFER_ABI)
+    paths = {
+        'web3': web3_decode,
+        'fast_dicts': decoder.decode,
+        'fast_columns': lambda logs: [decoder.decode_columns(logs).column(name) for name in ('from', 'to', 'value')],
+        'fallback': lambda logs: [decoder.decode_log(log) for log in logs]
+    }
+    if np is not None:
+        paths['fast_numpy'] = lambda logs: (lambda decoded: (decoded.raw('from'), decoded.raw('to'),
+                                                             decoded.limbs('value')))(decoder.decode_columns(logs))
+    else:
+        print("numpy is not installed; skipping the raw()/limbs() views")
+    skipped = {name for name in args.skip.split(',') if name}
+
+    # Both paths must agree before anything is timed
+    sample = make_logs(500)
+    if decoder.decode(sample) != web3_decode(sample):
+        raise SystemExit("fast path output differs from web3")
+
+    results = {}
+    for size in [int(size) for size in args.sizes.split(',')]:
+        logs = make_logs(size)
+        baseline = None
+        for name, decode in paths.items():
+            if name in skipped:
+                continue
+            elapsed = time_once(decode, logs)
+            baseline = baseline or elapsed
+            results[f'{size}/{name}'] = {'seconds': round(elapsed, 4), 'logs_per_second': round(size / elapsed)}
+            print(f"{size:>9} {name:<13} {elapsed:>9.3f} s  {size / elapsed:>12,.0f} logs/s  "
+                  f"{baseline / elapsed:>6.1f}x")
+        del logs
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
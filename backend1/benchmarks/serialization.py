@@ -0,0 +1,145 @@
+"""Microbenchmark JSON encoding of large Web3 results.
+
+Run from backend1/:
+
+    python benchmarks/serialization.py --logs 500 --events 2000
+
+Compares the old Web3.to_json round trip, the pure-Python fallback and
+the orjson path (when installed) on a receipt with many logs and on event
+pages with 64-bit and uint256-sized values. No chain is needed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.datastructures import AttributeDict
+
+import serialization
+
+
+def make_receipt(log_count: int) -> AttributeDict:
+    """Receipt shaped like web3's get_transaction_receipt result"""
+    def word(seed: int) -> HexBytes:
+        return HexBytes(seed.to_bytes(32, 'big'))
+
+    logs = [AttributeDict({
+        'address': Web3.to_checksum_address(f'0x{index + 1:040x}'),
+        'blockHash': word(1),
+        'blockNumber': 19000000,
+        'data': HexBytes(b'\x01' * 64),
+        'logIndex': index,
+        'removed': False,
+        'topics': [word(100), word(index), word(index + 1)],
+        'transactionHash': word(2),
+        'transactionIndex': 7
+    }) for index in range(log_count)]
+    return AttributeDict({
+        'blockHash': word(1),
+        'blockNumber': 19000000,
+        'contractAddress': None,
+        'cumulativeGasUsed': 12000000,
+        'effectiveGasPrice': 30000000000,
+        'from': Web3.to_checksum_address('0x' + '11' * 20),
+        'gasUsed': 21000 + 30000 * log_count,
+        'logs': logs,
+        'logsBloom': HexBytes(b'\x00' * 256),
+        'status': 1,
+        'to': Web3.to_checksum_address('0x' + '22' * 20),
+        'transactionHash': word(2),
+        'transactionIndex': 7,
+        'type': 2
+    })
+
+
+def make_event_page(event_count: int, value: int) -> Dict[str, Any]:
+    """An /api/contract/events response body"""
+    events = [{
+        'event': 'Transfer',
+        'transaction_hash': Web3.to_hex(index.to_bytes(32, 'big')),
+        'block_number': 19000000 + index // 10,
+        'args': {
+            'from': Web3.to_checksum_address(f'0x{index + 1:040x}'),
+            'to': Web3.to_checksum_address(f'0x{index + 2:040x}'),
+            'value': value + index
+        },
+        'address': Web3.to_checksum_address('0x' + '33' * 20),
+        'log_index': index % 10
+    } for index in range(event_count)]
+    return {'success': True, 'events': events, 'count': event_count}
+
+
+def legacy_encode(value: Any) -> bytes:
+    """What the handlers did before: Web3.to_json, parse back, then jsonify"""
+    if isinstance(value, AttributeDict):
+        value = json.loads(Web3.to_json(value))
+    return json.dumps(value, sort_keys=True, separators=(',', ':')).encode()
+
+
+def fallback_encode(value: Any) -> bytes:
+    """serialization.dumps as it runs without orjson"""
+    saved, serialization.orjson = serialization.orjson, None
+    try:
+        return serialization.dumps(value, sort_keys=True)
+    finally:
+        serialization.orjson = saved
+
+
+def time_encoder(encode: Callable[[Any], bytes], payload: Any, min_time: float) -> Dict[str, float]:
+    """Best per-call time over repeated rounds of at least min_time seconds"""
+    size = len(encode(payload))
+    best = float('inf')
+    deadline = time.perf_counter() + min_time
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        encode(payload)
+        best = min(best, time.perf_counter() - started)
+    return {'ms': round(best * 1000, 3), 'bytes': size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logs', type=int, default=500, help='logs in the receipt payload')
+    parser.add_argument('--events', type=int, default=2000, help='events in each event page payload')
+    parser.add_argument('--min-time', type=float, default=1.0, help='seconds spent per measurement')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    payloads = {
+        'receipt': make_receipt(args.logs),
+        'events_u64': make_event_page(args.events, 10 ** 6),
+        'events_u256': make_event_page(args.events, 10 ** 24)  # exceeds 64 bits
+    }
+    encoders = {
+        'legacy': legacy_encode,
+        'fallback': fallback_encode
+    }
+    if serialization.orjson is not None:
+        encoders['orjson'] = lambda value: serialization.dumps(value, sort_keys=True)
+    else:
+        print("orjson is not installed; only measuring the stdlib paths")
+
+    results = {}
+    for payload_name, payload in payloads.items():
+        for encoder_name, encode in encoders.items():
+            try:
+                summary = time_encoder(encode, payload, args.min_time)
+            except (TypeError, ValueError) as e:
+                print(f"{payload_name:<12} {encoder_name:<9} failed: {str(e)}")
+                continue
+            results[f'{payload_name}/{encoder_name}'] = summary
+            print(f"{payload_name:<12} {encoder_name:<9} {summary['ms']:>9.3f} ms  {summary['bytes']:>9} bytes")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+"""Reproducible load test of the API against a local dev chain.
+
+Starts a Hardhat or anvil node (or uses --provider-url with --node none),
+deploys the token from a compiled artifact, seeds holder balances and
+Transfer events, then drives app.py under gunicorn through the read,
+balance, events and transaction scenarios. Run from backend1/:
+
+    npx hardhat compile   # from the repo root
+    python benchmarks/suite.py run --node hardhat \\
+        --artifact ../artifacts/contracts/Token.sol/Token.json \\
+        --constructor-args '["Token", "TKN"]' --seed-function mint
+
+    python benchmarks/suite.py compare benchmarks/baselines/abc1234.json \\
+        benchmarks/baselines/def5678.json
+
+Each scenario reports req/s, p50/p95/p99 and JSON-RPC calls per request,
+read from the app's /metrics endpoint (keep --workers 1 so one scrape
+covers every request). Calls made by background pollers while idle are
+measured first and subtracted. Results are written as a JSON baseline
+named after the current commit; compare exits non-zero on regressions.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from eth_account import Account
+from eth_utils import keccak
+from web3 import Web3
+
+from async_vs_sync import MODES
+from loadgen import BACKEND_DIR, fetch_metrics, rpc_call_counts, run_load, start_server, stop_server
+
+REPO_ROOT = os.path.dirname(BACKEND_DIR)
+BASELINE_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'baselines')
+BASELINE_VERSION = 1
+
+# Hardhat/anvil dev account #0; publicly known, only valid on local chains
+DEV_PRIVATE_KEY = '0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80'
+
+# Transactions run last so the event scenario sees a fixed number of logs
+SCENARIOS = ('read', 'balance', 'events', 'transaction')
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def start_node(kind: str, port: int) -> subprocess.Popen:
+    if kind == 'anvil':
+        command = ['anvil', '--port', str(port), '--silent']
+    else:
+        command = ['npx', 'hardhat', 'node', '--port', str(port)]
+    return subprocess.Popen(command, cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_for_node(w3: Web3, process: subprocess.Popen = None, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Dev node exited with code {process.returncode}")
+        try:
+            w3.eth.block_number
+            return
+        except Exception:
+            time.sleep(0.5)
+    raise TimeoutError(f"Dev node did not answer within {timeout}s")
+
+
+def holder_addresses(count: int) -> List[str]:
+    """Deterministic holder addresses, so runs on a fresh chain are identical"""
+    return [Web3.to_checksum_address(keccak(text=f'holder-{index}')[-20:]) for index in range(count)]
+
+
+def deploy_token(w3: Web3, artifact: Dict[str, Any], constructor_args: List[Any],
+                 seed_function: str, holders: List[str], signer: str) -> str:
+    """Deploy the token, give every holder a balance and fund the signer"""
+    deployer = w3.eth.accounts[0]
+    factory = w3.eth.contract(abi=artifact['abi'], bytecode=artifact['bytecode'])
+    tx_hash = factory.constructor(*constructor_args).transact({'from': deployer})
+    address = w3.eth.wait_for_transaction_receipt(tx_hash)['contractAddress']
+    token = w3.eth.contract(address=address, abi=artifact['abi'])
+
+    seed = getattr(token.functions, seed_function)
+    pending = [seed(holder, 10 ** 18 + index).transact({'from': deployer}) for index, holder in enumerate(holders)]
+    if signer != deployer:
+        pending.append(seed(signer, 10 ** 24).transact({'from': deployer}))
+        if w3.eth.get_balance(signer) < Web3.to_wei(1, 'ether'):
+            pending.append(w3.eth.send_transaction({'from': deployer, 'to': signer, 'value': Web3.to_wei(10, 'ether')}))
+    for tx_hash in pending:
+        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        if receipt['status'] != 1:
+            raise RuntimeError(f"Seeding transaction {Web3.to_hex(tx_hash)} reverted")
+    return address
+
+
+def build_scenarios(token: str, holders: List[str]) -> Dict[str, Any]:
+    def holder(index: int) -> str:
+        return holders[index % len(holders)]
+
+    return {
+        'read': lambda i: {
+            'method': 'POST',
+            'path': '/api/contract/call',
+            'json': {'contract_address': token, 'function_name': 'balanceOf',
+                     'function_args': [holder(i)], 'abi_path': 'Token.json'}
+        },
+        'balance': lambda i: {'method': 'GET', 'path': f'/api/balance/{holder(i)}'},
+        'events': lambda i: {
+            'method': 'POST',
+            'path': '/api/contract/events',
+            'json': {'contract_address': token, 'event_name': 'Transfer', 'from_block': 0,
+                     'to_block': 'latest', 'abi_path': 'Token.json'}
+        },
+        'transaction': lambda i: {
+            'method': 'POST',
+            'path': '/api/contract/transaction',
+            'json': {'contract_address': token, 'function_name': 'transfer',
+                     'function_args': [holder(i), 1], 'abi_path': 'Token.json'}
+        }
+    }
+
+
+def measure_scenario(base_url: str, make_request, requests: int, concurrency: int,
+                     background_rpc_per_s: float) -> Dict[str, Any]:
+    before = fetch_metrics(base_url)
+    summary = asyncio.run(run_load(base_url, make_request, requests, concurrency))
+    calls = rpc_call_counts(before, fetch_metrics(base_url))
+
+    # The scrape itself is not an API request, so it adds no RPC calls
+    total = max(0.0, sum(calls.values()) - background_rpc_per_s * summary['elapsed_s'])
+    completed = summary['requests'] - summary['errors']
+    summary['rpc_per_request'] = round(total / completed, 3) if completed else None
+    summary['rpc_methods'] = {method: int(count) for method, count in sorted(calls.items())}
+    return summary
+
+
+def run(args) -> int:
+    artifact_path = args.artifact
+    if not artifact_path or not os.path.exists(artifact_path):
+        print("Compile the token with `npx hardhat compile` and pass its artifact, e.g. "
+              "--artifact ../artifacts/contracts/Token.sol/Token.json")
+        return 2
+    with open(artifact_path, 'r') as f:
+        artifact = json.load(f)
+
+    provider_url = args.provider_url or f'http://127.0.0.1:{args.node_port}'
+    node = start_node(args.node, args.node_port) if args.node != 'none' else None
+    workdir = tempfile.mkdtemp(prefix='web3-bench-')
+    results = {}
+    try:
+        w3 = Web3(Web3.HTTPProvider(provider_url))
+        wait_for_node(w3, node)
+        signer = Account.from_key(args.private_key).address
+        holders = holder_addresses(args.holders)
+        token = deploy_token(w3, artifact, json.loads(args.constructor_args), args.seed_function, holders, signer)
+        print(f"Token deployed at {token} with {len(holders)} holders on chain {w3.eth.chain_id}")
+
+        # The app resolves abi_path 'Token.json' from this directory
+        abi_dir = os.path.join(workdir, 'abi')
+        os.makedirs(abi_dir)
+        with open(os.path.join(abi_dir, 'Token.json'), 'w') as f:
+            json.dump(artifact['abi'], f)
+
+        env = {
+            'WEB3_PROVIDER_URL': provider_url,
+            'NETWORK_ID': str(w3.eth.chain_id),
+            'PRIVATE_KEY': args.private_key,
+            'WALLET_ADDRESS': signer,
+            'DEFAULT_CONTRACT_ABI_PATH': abi_dir,
+            'ABI_SNAPSHOT_PATH': '',
+            'NONCE_STATE_DIR': os.path.join(workdir, 'nonces'),
+            'JOBS_DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'jobs.db')}",
+            'PORTFOLIO_DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'portfolio.db')}",
+            'INDEXER_ENABLED': 'false',
+            'READ_CACHE_ENABLED': str(args.read_cache).lower(),
+            'METRICS_ENABLED': 'true',
+            'RATE_LIMIT_ENABLED': 'false',
+            'LOG_LEVEL': 'WARNING'
+        }
+        scenarios = build_scenarios(token, holders)
+        selected = [name for name in SCENARIOS if name in args.scenarios]
+        base_url = f'http://127.0.0.1:{args.port}'
+
+        for mode in args.modes:
+            settings = MODES[mode]
+            threads = args.threads if settings['worker_class'] == 'gthread' else 1
+            server = start_server(args.port, {**env, **settings['env']}, worker_class=settings['worker_class'],
+                                  workers=args.workers, threads=threads, health_path='/health/ready')
+            try:
+                idle = fetch_metrics(base_url)
+                time.sleep(args.idle_window)
+                background = sum(rpc_call_counts(idle, fetch_metrics(base_url)).values()) / args.idle_window
+
+                for name in selected:
+                    requests = args.tx_requests if name == 'transaction' else args.requests
+                    summary = measure_scenario(base_url, scenarios[name], requests, args.concurrency, background)
+                    results[f'{mode}/{name}'] = summary
+                    print(f"{mode:>5} {name:<11} {summary['req_per_s']:>9.1f} req/s  "
+                          f"p50 {summary['p50_ms']:>8.2f}  p95 {summary['p95_ms']:>8.2f}  "
+                          f"p99 {summary['p99_ms']:>8.2f} ms  rpc/req {summary['rpc_per_request']}  "
+                          f"errors {summary['errors']}")
+            finally:
+                stop_server(server)
+    finally:
+        if node is not None:
+            stop_server(node)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = {
+        'version': BASELINE_VERSION,
+        'commit': git_commit(),
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'settings': {
+            'node': args.node,
+            'requests': args.requests,
+            'tx_requests': args.tx_requests,
+            'concurrency': args.concurrency,
+            'workers': args.workers,
+            'threads': args.threads,
+            'holders': args.holders,
+            'read_cache': args.read_cache
+        },
+        'results': results
+    }
+    output = args.output or os.path.join(BASELINE_DIR, f"{baseline['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+    print(f"Wrote {output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            return compare(json.load(f), baseline, args.tolerance)
+    return 0
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float) -> int:
+    """Print per-scenario changes; 1 if throughput, p95 or RPC calls regressed beyond tolerance"""
+    if baseline.get('settings') != current.get('settings'):
+        print("Warning: the two runs used different settings; differences may not be regressions")
+
+    regressions = 0
+    print(f"{'scenario':<20} {'req/s':>18} {'p95 ms':>20} {'rpc/req':>14}")
+    for key in sorted(set(baseline['results']) & set(current['results'])):
+        old, new = baseline['results'][key], current['results'][key]
+        flags = []
+        if old['req_per_s'] and new['req_per_s'] < old['req_per_s'] * (1 - tolerance):
+            flags.append('throughput')
+        if old['p95_ms'] and new['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+            flags.append('p95')
+        if old.get('rpc_per_request') is not None and new.get('rpc_per_request') is not None \
+                and new['rpc_per_request'] > old['rpc_per_request'] + 0.05:
+            flags.append('rpc calls')
+        if new['errors'] > old['errors']:
+            flags.append('errors')
+        regressions += bool(flags)
+        print(f"{key:<20} {old['req_per_s']:>8.1f} -> {new['req_per_s']:<8.1f}"
+              f"{old['p95_ms']:>9.2f} -> {new['p95_ms']:<9.2f}"
+              f"{str(old.get('rpc_per_request')):>6} -> {str(new.get('rpc_per_request')):<6}"
+              f"{'  REGRESSION: ' + ', '.join(flags) if flags else ''}")
+
+    print(f"{baseline.get('commit')} -> {current.get('commit')}: {regressions} regressed scenario(s)")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='deploy, load test and write a baseline')
+    run_parser.add_argument('--node', choices=('hardhat', 'anvil', 'none'), default='hardhat',
+                            help="dev node to start; 'none' uses --provider-url")
+    run_parser.add_argument('--node-port', type=int, default=8545)
+    run_parser.add_argument('--provider-url', help='existing dev node, defaults to the started one')
+    run_parser.add_argument('--artifact', help='Hardhat artifact (abi and bytecode) of the token')
+    run_parser.add_argument('--constructor-args', default='[]', help='JSON list of constructor arguments')
+    run_parser.add_argument('--seed-function', default='transfer',
+                            help="token function(address, amount) used to give holders a balance, e.g. 'mint'")
+    run_parser.add_argument('--private-key', default=DEV_PRIVATE_KEY, help='signer for the transaction scenario')
+    run_parser.add_argument('--holders', type=int, default=200, help='seeded holders (and Transfer events)')
+    run_parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    run_parser.add_argument('--modes', nargs='+', choices=tuple(MODES), default=['sync'])
+    run_parser.add_argument('--requests', type=int, default=2000)
+    run_parser.add_argument('--tx-requests', type=int, default=200, help='requests in the transaction scenario')
+    run_parser.add_argument('--concurrency', type=int, default=50)
+    run_parser.add_argument('--workers', type=int, default=1)
+    run_parser.add_argument('--threads', type=int, default=64, help='gthread threads per worker in async mode')
+    run_parser.add_argument('--read-cache', action='store_true', help='leave the read cache enabled')
+    run_parser.add_argument('--idle-window', type=float, default=2.0,
+                            help='seconds used to measure background RPC calls')
+    run_parser.add_argument('--port', type=int, default=5099)
+    run_parser.add_argument('--output', help='baseline file, defaults to benchmarks/baselines/<commit>.json')
+    run_parser.add_argument('--compare', help='baseline to compare the new results against')
+    run_parser.add_argument('--tolerance', type=float, default=0.1, help='allowed relative slowdown')
+
+    compare_parser = commands.add_parser('compare', help='diff two baselines')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--tolerance', type=float, default=0.1, help='allowed relative slowdown')
+
+    args = parser.parse_args()
+    if args.command == 'compare':
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        with open(args.current, 'r') as f:
+            current = json.load(f)
+        sys.exit(compare(baseline, current, args.tolerance))
+    sys.exit(run(args))
+
+
+if __name__ == '__main__':
+    main()
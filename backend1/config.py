@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 from web3 import Web3
 
@@ -13,9 +14,14 @@ class Config:
     DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     HOST = os.environ.get('FLASK_HOST', '0.0.0.0')
     PORT = int(os.environ.get('FLASK_PORT', 5000))
+    WARMUP_ON_START = os.environ.get('WARMUP_ON_START', 'True').lower() == 'true'  # connect in the background at startup; gunicorn.conf.py does it per worker
+    WORKER_THREADS = int(os.environ.get('WORKER_THREADS', 32))  # request threads per gunicorn (gthread) worker; gunicorn.conf.py reads it too
+    STREAM_RESERVED_THREADS = int(os.environ.get('STREAM_RESERVED_THREADS', 4))  # threads per worker never taken by server-sent event streams
     
     # Web3 Configuration
     WEB3_PROVIDER_URL = os.environ.get('WEB3_PROVIDER_URL', 'https://mainnet.infura.io/v3/YOUR_PROJECT_ID')
+    # Optional comma-separated fallback endpoints, tried after WEB3_PROVIDER_URL
+    WEB3_FALLBACK_PROVIDER_URLS = [url.strip() for url in os.environ.get('WEB3_FALLBACK_PROVIDER_URLS', '').split(',') if url.strip()]
     PRIVATE_KEY = os.environ.get('PRIVATE_KEY')  # Private key for transactions
     WALLET_ADDRESS = os.environ.get('WALLET_ADDRESS')  # Address corresponding to private key
     
@@ -27,15 +33,152 @@ class Config:
     GAS_PRICE_GWEI = int(os.environ.get('GAS_PRICE_GWEI', 20))
     GAS_LIMIT = int(os.environ.get('GAS_LIMIT', 300000))
     
+    # Gas Oracle Configuration (replaces the fixed GAS_PRICE_GWEI / GAS_LIMIT when enabled)
+    GAS_ORACLE_ENABLED = os.environ.get('GAS_ORACLE_ENABLED', 'True').lower() == 'true'
+    GAS_ORACLE_REFRESH_INTERVAL = float(os.environ.get('GAS_ORACLE_REFRESH_INTERVAL', 6.0))  # seconds between fee history samples
+    GAS_ORACLE_WINDOW_BLOCKS = int(os.environ.get('GAS_ORACLE_WINDOW_BLOCKS', 100))  # rolling window of blocks
+    GAS_URGENCY_PERCENTILES = os.environ.get('GAS_URGENCY_PERCENTILES', 'slow:10,standard:50,fast:90')
+    GAS_DEFAULT_URGENCY = os.environ.get('GAS_DEFAULT_URGENCY', 'standard')
+    GAS_BASE_FEE_MULTIPLIER = float(os.environ.get('GAS_BASE_FEE_MULTIPLIER', 2.0))  # headroom for base fee increases
+    GAS_MAX_FEE_GWEI = float(os.environ.get('GAS_MAX_FEE_GWEI', 0))  # 0 for no cap
+    GAS_ESTIMATE_ENABLED = os.environ.get('GAS_ESTIMATE_ENABLED', 'True').lower() == 'true'
+    GAS_ESTIMATE_MARGIN = float(os.environ.get('GAS_ESTIMATE_MARGIN', 0.2))  # added on top of eth_estimateGas
+    GAS_ESTIMATE_TTL = float(os.environ.get('GAS_ESTIMATE_TTL', 300))  # seconds a cached estimate is reused
+    
+    # Nonce Management Configuration
+    NONCE_STORE = os.environ.get('NONCE_STORE', 'file')  # 'memory', 'file' (all workers on one host) or 'redis'
+    NONCE_STATE_DIR = os.environ.get('NONCE_STATE_DIR', os.path.join(tempfile.gettempdir(), 'web3-nonces'))
+    NONCE_RESYNC_INTERVAL = float(os.environ.get('NONCE_RESYNC_INTERVAL', 30))  # seconds between node checks
+    NONCE_GAP_TIMEOUT = float(os.environ.get('NONCE_GAP_TIMEOUT', 60))  # seconds before rewinding over a gap
+    
+    # Signer Pool Configuration
+    SIGNER_KEYSTORE_DIR = os.environ.get('SIGNER_KEYSTORE_DIR')  # encrypted V3 keyfiles; sends that set 'shard' are spread across them
+    SIGNER_KEYSTORE_PASSWORD = os.environ.get('SIGNER_KEYSTORE_PASSWORD')
+    SIGNER_KEYSTORE_PASSWORD_FILE = os.environ.get('SIGNER_KEYSTORE_PASSWORD_FILE')  # preferred over the variable
+    SIGNER_PROCESSES = int(os.environ.get('SIGNER_PROCESSES', 0))  # signing processes; 0 uses one per CPU, 1 signs in-thread
+    SIGNER_PROCESS_MIN_BATCH = int(os.environ.get('SIGNER_PROCESS_MIN_BATCH', 64))  # smaller batches are signed in-thread
+    
     # Contract Configuration
     DEFAULT_CONTRACT_ABI_PATH = os.environ.get('DEFAULT_CONTRACT_ABI_PATH', 'contracts/abi/')
+    ABI_PRELOAD = os.environ.get('ABI_PRELOAD', 'True').lower() == 'true'  # register every ABI file at startup
+    ABI_SNAPSHOT_PATH = os.environ.get('ABI_SNAPSHOT_PATH', '')  # precompiled registry, e.g. abi_registry.json
+    ABI_INLINE_CACHE_SIZE = int(os.environ.get('ABI_INLINE_CACHE_SIZE', 1000))  # inline client ABIs kept compiled, outside the global index
+    
+    # Batch Call Configuration
+    MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 500))
+    MULTICALL3_ADDRESS = os.environ.get('MULTICALL3_ADDRESS', '0xcA11bde05977b3631167028862bE2a173976CA11')
+    BALANCE_BATCH_SIZE = int(os.environ.get('BALANCE_BATCH_SIZE', 500))  # eth_getBalance requests per JSON-RPC batch
+    SIMULATION_BATCH_SIZE = int(os.environ.get('SIMULATION_BATCH_SIZE', 250))  # simulated transactions per JSON-RPC batch (2 requests each)
+    
+    # RPC Client Configuration
+    RPC_POOL_SIZE = int(os.environ.get('RPC_POOL_SIZE', 20))  # keep-alive connections per endpoint
+    RPC_TIMEOUT = float(os.environ.get('RPC_TIMEOUT', 30))  # seconds
+    RPC_HEDGE_ENABLED = os.environ.get('RPC_HEDGE_ENABLED', 'False').lower() == 'true'
+    RPC_HEDGE_MIN_DELAY = float(os.environ.get('RPC_HEDGE_MIN_DELAY', 0.05))  # seconds before hedging a read
+    
+    # Async Handler Configuration
+    ASYNC_HANDLER = os.environ.get('ASYNC_HANDLER', 'False').lower() == 'true'  # loop reads skip RPC failover/hedging
+    ASYNC_POOL_SIZE = int(os.environ.get('ASYNC_POOL_SIZE', 100))  # max open connections to the provider
+    ASYNC_KEEPALIVE_TIMEOUT = float(os.environ.get('ASYNC_KEEPALIVE_TIMEOUT', 30))  # seconds
+    ASYNC_REQUEST_TIMEOUT = float(os.environ.get('ASYNC_REQUEST_TIMEOUT', 30))  # seconds
+    
+    # Read Cache Configuration
+    READ_CACHE_ENABLED = os.environ.get('READ_CACHE_ENABLED', 'True').lower() == 'true'
+    READ_CACHE_BACKEND = os.environ.get('READ_CACHE_BACKEND', 'memory')  # 'memory' or 'redis'
+    READ_CACHE_MAX_ENTRIES = int(os.environ.get('READ_CACHE_MAX_ENTRIES', 10000))
+    READ_CACHE_VOLATILE_TTL = int(os.environ.get('READ_CACHE_VOLATILE_TTL', 60))  # seconds, redis only
+    HEAD_REFRESH_INTERVAL = float(os.environ.get('HEAD_REFRESH_INTERVAL', 1.0))  # seconds
+    FINALITY_DEPTH = int(os.environ.get('FINALITY_DEPTH', 64))  # blocks until a read is never invalidated
+    
+    # HTTP Cache Configuration (ETags and Cache-Control on balance, transaction and contract call reads)
+    HTTP_CACHE_ENABLED = os.environ.get('HTTP_CACHE_ENABLED', 'True').lower() == 'true'
+    HTTP_CACHE_FINALIZED_MAX_AGE = int(os.environ.get('HTTP_CACHE_FINALIZED_MAX_AGE', 31536000))  # seconds, reads older than FINALITY_DEPTH
+    HTTP_CACHE_RECENT_MAX_AGE = int(os.environ.get('HTTP_CACHE_RECENT_MAX_AGE', 1))  # seconds, reads at 'latest' or recent blocks
+    HTTP_CACHE_MAX_ENTRIES = int(os.environ.get('HTTP_CACHE_MAX_ENTRIES', 10000))  # finalized block hashes and mined transactions kept
+    
+    # Event Indexer Configuration
+    INDEXER_ENABLED = os.environ.get('INDEXER_ENABLED', 'False').lower() == 'true'
+    INDEXER_RUN_IN_APP = os.environ.get('INDEXER_RUN_IN_APP', 'True').lower() == 'true'  # False when run via event_indexer.py
+    INDEXER_DATABASE_URL = os.environ.get('INDEXER_DATABASE_URL', 'sqlite:///event_index.db')
+    INDEXER_CONTRACTS = [entry.strip() for entry in os.environ.get('INDEXER_CONTRACTS', '').split(',') if entry.strip()]
+    INDEXER_POLL_INTERVAL = float(os.environ.get('INDEXER_POLL_INTERVAL', 2.0))  # seconds
+    INDEXER_CHUNK_SIZE = int(os.environ.get('INDEXER_CHUNK_SIZE', 2000))  # initial blocks per get_logs
+    INDEXER_MAX_CHUNK_SIZE = int(os.environ.get('INDEXER_MAX_CHUNK_SIZE', 10000))
+    INDEXER_REORG_WINDOW = int(os.environ.get('INDEXER_REORG_WINDOW', 64))  # blocks of checkpoints kept
+    EVENTS_PAGE_SIZE = int(os.environ.get('EVENTS_PAGE_SIZE', 100))
+    EVENTS_STREAM_CHUNK_SIZE = int(os.environ.get('EVENTS_STREAM_CHUNK_SIZE', 2000))  # blocks per get_logs when streaming
+    EVENTS_FAST_DECODE = os.environ.get('EVENTS_FAST_DECODE', 'true').lower() == 'true'  # bulk-decode raw eth_getLogs results
+    
+    # Columnar Export Configuration (needs the event indexer and pyarrow)
+    EXPORT_ENABLED = os.environ.get('EXPORT_ENABLED', 'False').lower() == 'true'
+    EXPORT_DIR = os.environ.get('EXPORT_DIR', 'exports')
+    EXPORT_PARTITION_BLOCKS = int(os.environ.get('EXPORT_PARTITION_BLOCKS', 100000))  # blocks per Arrow file
+    EXPORT_INCLUDE_TRANSACTIONS = os.environ.get('EXPORT_INCLUDE_TRANSACTIONS', 'True').lower() == 'true'  # export receipts too
+    EXPORT_RPC_BATCH_SIZE = int(os.environ.get('EXPORT_RPC_BATCH_SIZE', 200))  # block / receipt reads per JSON-RPC batch
+    EXPORT_QUERY_LIMIT = int(os.environ.get('EXPORT_QUERY_LIMIT', 10000))  # max rows per query response
+    
+    # Live Event Configuration (server-sent events pushed to clients as blocks arrive)
+    LIVE_EVENTS_ENABLED = os.environ.get('LIVE_EVENTS_ENABLED', 'False').lower() == 'true'
+    # Comma-separated address=abi_path entries; defaults to INDEXER_CONTRACTS
+    LIVE_EVENTS_CONTRACTS = [entry.strip() for entry in os.environ.get('LIVE_EVENTS_CONTRACTS', os.environ.get('INDEXER_CONTRACTS', '')).split(',') if entry.strip()]
+    LIVE_EVENTS_WS_URL = os.environ.get('LIVE_EVENTS_WS_URL')  # ws:// endpoint for newHeads; defaults to RECEIPT_WS_URL
+    LIVE_EVENTS_POLL_INTERVAL = float(os.environ.get('LIVE_EVENTS_POLL_INTERVAL', 1.0))  # seconds between head polls without a WebSocket
+    LIVE_EVENTS_CONFIRMATIONS = int(os.environ.get('LIVE_EVENTS_CONFIRMATIONS', INDEXER_REORG_WINDOW))  # blocks behind the head events are published
+    LIVE_EVENTS_QUEUE_SIZE = int(os.environ.get('LIVE_EVENTS_QUEUE_SIZE', 1000))  # events held per client before the oldest are dropped
+    LIVE_EVENTS_REPLAY_BLOCKS = int(os.environ.get('LIVE_EVENTS_REPLAY_BLOCKS', 1000))  # recent blocks kept in memory for reconnects
+    LIVE_EVENTS_MAX_REPLAY_BLOCKS = int(os.environ.get('LIVE_EVENTS_MAX_REPLAY_BLOCKS', 100000))  # furthest resume, fetched with eth_getLogs
+    LIVE_EVENTS_MAX_CLIENTS = int(os.environ.get('LIVE_EVENTS_MAX_CLIENTS', 5000))  # open streams per worker, capped by the stream threads left after receipt streams
+    
+    # Receipt Watcher Configuration
+    RECEIPT_WS_URL = os.environ.get('RECEIPT_WS_URL')  # ws:// endpoint for newHeads; defaults to a ws:// WEB3_PROVIDER_URL
+    RECEIPT_POLL_INTERVAL = float(os.environ.get('RECEIPT_POLL_INTERVAL', 1.0))  # seconds between head polls
+    RECEIPT_TIMEOUT = float(os.environ.get('RECEIPT_TIMEOUT', 120))  # default seconds a waiter is kept
+    RECEIPT_BATCH_SIZE = int(os.environ.get('RECEIPT_BATCH_SIZE', 100))  # receipts per JSON-RPC batch
+    RECEIPT_CACHE_SIZE = int(os.environ.get('RECEIPT_CACHE_SIZE', 10000))
+    RECEIPT_REORG_DEPTH = int(os.environ.get('RECEIPT_REORG_DEPTH', INDEXER_REORG_WINDOW))  # receipts this close to the head are not cached
+    RECEIPT_MAX_STREAMS = int(os.environ.get('RECEIPT_MAX_STREAMS', 8))  # open receipt event streams per worker
+    
+    # Transaction Job Configuration
+    JOBS_DATABASE_URL = os.environ.get('JOBS_DATABASE_URL', 'sqlite:///transaction_jobs.db')
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))  # chunks signed and broadcast concurrently
+    JOB_SUBMIT_BATCH_SIZE = int(os.environ.get('JOB_SUBMIT_BATCH_SIZE', 25))  # transactions per JSON-RPC batch
+    JOB_MAX_ITEMS = int(os.environ.get('JOB_MAX_ITEMS', 5000))
+    JOB_RECEIPT_POLL_INTERVAL = float(os.environ.get('JOB_RECEIPT_POLL_INTERVAL', 2.0))  # seconds between handing new items to the receipt watcher
+    JOB_RECEIPT_TIMEOUT = float(os.environ.get('JOB_RECEIPT_TIMEOUT', 600))  # seconds before an item times out
+    JOB_LEASE_TIMEOUT = float(os.environ.get('JOB_LEASE_TIMEOUT', 60))  # seconds without an owner heartbeat before another worker takes a running job over
+    
+    # Dividend Distribution Configuration (needs the event indexer; payouts need an account)
+    DIVIDENDS_ENABLED = os.environ.get('DIVIDENDS_ENABLED', 'True').lower() == 'true'
+    DIVIDEND_CHECKPOINT_INTERVAL = int(os.environ.get('DIVIDEND_CHECKPOINT_INTERVAL', 10000))  # blocks between stored balance checkpoints
+    
+    # Portfolio Valuation Configuration
+    PORTFOLIO_ENABLED = os.environ.get('PORTFOLIO_ENABLED', 'True').lower() == 'true'
+    PORTFOLIO_DATABASE_URL = os.environ.get('PORTFOLIO_DATABASE_URL', 'sqlite:///portfolio.db')
+    # Comma-separated address=valuation entries registered at startup
+    PORTFOLIO_PROPERTIES = [entry.strip() for entry in os.environ.get('PORTFOLIO_PROPERTIES', '').split(',') if entry.strip()]
+    PORTFOLIO_CURRENCY = os.environ.get('PORTFOLIO_CURRENCY', 'USD')
+    PORTFOLIO_USE_MULTICALL = os.environ.get('PORTFOLIO_USE_MULTICALL', 'True').lower() == 'true'  # JSON-RPC batches of eth_call otherwise
+    PORTFOLIO_CALL_CHUNK_SIZE = int(os.environ.get('PORTFOLIO_CALL_CHUNK_SIZE', 1000))  # calls per aggregate3 call or batch
+    PORTFOLIO_CACHE_SIZE = int(os.environ.get('PORTFOLIO_CACHE_SIZE', 1000))  # investors whose holdings are kept per worker
     
     # API Configuration
-    API_RATE_LIMIT = os.environ.get('API_RATE_LIMIT', '100/hour')
+    API_RATE_LIMIT = os.environ.get('API_RATE_LIMIT', '100/hour')  # per client, e.g. '10/second', '1000/day'
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')  # 'memory' (per worker) or 'redis'
+    RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', 0))  # bucket size; 0 uses the API_RATE_LIMIT count
+    RATE_LIMIT_KEY_HEADER = os.environ.get('RATE_LIMIT_KEY_HEADER', '')  # e.g. X-API-Key; clients are keyed by IP otherwise
+    RATE_LIMIT_TRUST_FORWARDED = os.environ.get('RATE_LIMIT_TRUST_FORWARDED', 'False').lower() == 'true'  # behind a proxy
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 100000))  # in-process buckets kept
+    SINGLE_FLIGHT_ENABLED = os.environ.get('SINGLE_FLIGHT_ENABLED', 'True').lower() == 'true'  # coalesce identical in-flight reads
     
     # Logging Configuration
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     LOG_FILE = os.environ.get('LOG_FILE', 'app.log')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'console')  # 'console' or 'json'
+    LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 0.01))  # fraction of per-call events kept on hot paths
+    
+    # Metrics Configuration
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'  # Prometheus text on /metrics
     
     # Database Configuration (if needed for caching, etc.)
     DATABASE_URL = os.environ.get('DATABASE_URL')
@@ -85,6 +228,18 @@ class Config:
         
         return provider_url
     
+    @classmethod
+    def get_web3_provider_urls(cls):
+        """Get the primary provider URL followed by any fallback URLs"""
+        urls = [cls.get_web3_provider_url()]
+        for url in cls.WEB3_FALLBACK_PROVIDER_URLS:
+            if cls.INFURA_PROJECT_ID and 'infura.io' in url:
+                url = url.replace('YOUR_PROJECT_ID', cls.INFURA_PROJECT_ID)
+            elif cls.ALCHEMY_API_KEY and 'alchemyapi.io' in url:
+                url = url.replace('YOUR_API_KEY', cls.ALCHEMY_API_KEY)
+            urls.append(url)
+        return urls
+    
     @classmethod
     def get_gas_price_wei(cls):
         """Convert gas price from Gwei to Wei"""
@@ -1,24 +1,49 @@
-import json
-import os
-from typing import Dict, List, Any, Optional
+import functools
+from concurrent.futures import Future
+from typing import Dict, List, Any, Iterator, Optional, Tuple
 from web3 import Web3
 from web3.middleware import geth_poa_middleware
+from web3._utils.abi import get_abi_output_types, map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
 from eth_account import Account
-import logging
+from hexbytes import HexBytes
 from config import Config
+from rpc_batch import JSONRPCBatch, MULTICALL3_ABI, decode_revert_reason, rpc_error_message
+from read_cache import create_read_cache
+from single_flight import create_single_flight
+from rpc_pool import MultiEndpointProvider, create_rpc_provider
+from nonce_manager import create_nonce_manager, is_known_transaction_error, is_nonce_error
+from gas_oracle import GasEstimateCache, create_gas_oracle, create_gas_estimate_cache
+from receipt_watcher import create_receipt_watcher, format_receipt
+from abi_registry import create_abi_registry
+from signer_pool import create_signer_pool, signed_transactions
+from log_decoder import get_event_decoder
+from serialization import format_wei, to_block_number, to_jsonable
+from logging_config import get_logger
+from metrics import RPC_REQUEST_DURATION, RPC_REQUEST_ERRORS, TRANSACTIONS_SENT, metrics_middleware
 
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
 class ContractHandler:
     """Web3 contract interaction handler"""
     
-    def __init__(self):
-        """Initialize Web3 connection and account"""
+    def __init__(self, abi_registry=None):
+        """Configure Web3 and the account; no RPC calls are made until first use"""
         self.config = Config()
         self.w3 = self._initialize_web3()
         self.account = self._load_account() if self.config.PRIVATE_KEY else None
         self._contract_cache = {}
-        self._abi_cache = {}
+        self.abi_registry = abi_registry or create_abi_registry(self.config)
+        self._chain_id = None
+        self.read_cache = create_read_cache(self.w3, self.config)
+        self.single_flight = create_single_flight(self.config)
+        self.gas_oracle = create_gas_oracle(self.w3, self.config)
+        self.gas_estimates = create_gas_estimate_cache(self.config)
+        self.receipt_watcher = create_receipt_watcher(self.w3, self.config)
+        # Sends are sharded across the PRIVATE_KEY account and any keystore accounts
+        self.signers = create_signer_pool(self.config, self.account, self.receipt_watcher)
+        self.account = self.account or (self.signers.primary if self.signers else None)
+        self.nonce_manager = create_nonce_manager(self.w3, self.config) if self.signers else None
     
     def _initialize_web3(self) -> Web3:
         """Initialize Web3 connection"""
@@ -26,7 +51,7 @@ class ContractHandler:
             provider_url = self.config.get_web3_provider_url()
             
             if provider_url.startswith('http'):
-                w3 = Web3(Web3.HTTPProvider(provider_url))
+                w3 = Web3(create_rpc_provider(self.config))
             elif provider_url.startswith('ws'):
                 w3 = Web3(Web3.WebsocketProvider(provider_url))
             else:
@@ -36,17 +61,17 @@ class ContractHandler:
             if self.config.is_testnet():
                 w3.middleware_onion.inject(geth_poa_middleware, layer=0)
             
-            # Test connection
-            if not w3.is_connected():
-                raise ConnectionError("Failed to connect to Web3 provider")
+            if self.config.METRICS_ENABLED:
+                w3.middleware_onion.add(metrics_middleware, 'metrics')
             
-            logger.info(f"Connected to Web3 provider: {provider_url}")
-            logger.info(f"Latest block: {w3.eth.block_number}")
+            # Connectivity is checked by the readiness probe, not here, so workers start
+            # without waiting on the node
+            logger.info('web3_configured', provider=str(w3.provider))
             
             return w3
             
         except Exception as e:
-            logger.error(f"Failed to initialize Web3: {str(e)}")
+            logger.error('web3_init_failed', error=str(e))
             raise
     
     def _load_account(self) -> Account:
@@ -61,64 +86,178 @@ class ContractHandler:
                 if account.address.lower() != self.config.WALLET_ADDRESS.lower():
                     raise ValueError("Private key does not match wallet address")
             
-            logger.info(f"Loaded account: {account.address}")
+            logger.info('account_loaded', address=account.address)
             return account
             
         except Exception as e:
-            logger.error(f"Failed to load account: {str(e)}")
+            logger.error('account_load_failed', error=str(e))
             raise
     
     def get_network_info(self) -> Dict[str, Any]:
         """Get network information"""
         try:
+            if self.read_cache:
+                latest_block = self.read_cache.resolve_block('latest')
+            else:
+                latest_block = self.w3.eth.block_number
+            
+            if self.gas_oracle:
+                gas_price = str(self.gas_oracle.get_gas_price())
+            elif self.read_cache:
+                gas_price = self.read_cache.get_or_load(
+                    'gas_price', (), latest_block,
+                    lambda: str(self.w3.eth.gas_price)
+                )
+            else:
+                gas_price = str(self.w3.eth.gas_price)
+            
             return {
-                'network_id': self.w3.eth.chain_id,
+                'network_id': self.get_chain_id(),
                 'network_name': self.config.NETWORK_NAME,
-                'latest_block': self.w3.eth.block_number,
-                'gas_price': str(self.w3.eth.gas_price),
+                'latest_block': latest_block,
+                'gas_price': gas_price,
                 'is_testnet': self.config.is_testnet(),
                 'connected': self.w3.is_connected()
             }
         except Exception as e:
-            logger.error(f"Error getting network info: {str(e)}")
+            logger.error('network_info_failed', error=str(e))
             return {'error': str(e)}
     
-    def get_balance(self, address: str) -> float:
-        """Get ETH balance for an address"""
+    def get_chain_id(self) -> int:
+        """Get the chain id, fetched once since it never changes for a provider"""
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+    
+    def get_provider_stats(self) -> Optional[List[Dict[str, Any]]]:
+        """Get per-endpoint latency and error statistics"""
+        if isinstance(self.w3.provider, MultiEndpointProvider):
+            return self.w3.provider.stats()
+        return None
+    
+    def get_balance(self, address: str, block_identifier: Any = 'latest') -> int:
+        """Get the ETH balance of an address in wei"""
         try:
             if not Web3.is_address(address):
                 raise ValueError(f"Invalid address: {address}")
             
-            balance_wei = self.w3.eth.get_balance(Web3.to_checksum_address(address))
-            balance_eth = self.w3.from_wei(balance_wei, 'ether')
+            checksum_address = Web3.to_checksum_address(address)
+            if self.read_cache:
+                block_number = self.read_cache.resolve_block(block_identifier)
+                balance_wei = self.read_cache.get_or_load(
+                    'balance', (checksum_address,), block_number,
+                    lambda: self._coalesce(
+                        ('balance', checksum_address, block_number),
+                        lambda: self.w3.eth.get_balance(checksum_address, block_identifier=block_number)
+                    )
+                )
+            else:
+                balance_wei = self._coalesce(
+                    ('balance', checksum_address, block_identifier),
+                    lambda: self.w3.eth.get_balance(checksum_address, block_identifier=block_identifier)
+                )
+            return balance_wei
             
-            return float(balance_eth)
+        except Exception as e:
+            logger.error('balance_failed', address=address, error=str(e))
+            raise
+    
+    def get_balances(self, addresses: List[str], block_identifier: Any = 'latest') -> Dict[str, Any]:
+        """Get exact ETH balances for many addresses, all read at one pinned block"""
+        try:
+            checksum_addresses = self._checksum_addresses(addresses)
+            block_number = self._pin_block_number(block_identifier)
+            
+            # Balances already read at this block (e.g. by /api/balance) skip the batch
+            balances: Dict[str, int] = {}
+            cache_keys = {}
+            if self.read_cache:
+                for address in checksum_addresses:
+                    key, volatile = self.read_cache.make_key('balance', (address,), block_number)
+                    cached = self.read_cache.lookup(key)
+                    if self.read_cache.is_missing(cached):
+                        cache_keys[address] = (key, volatile)
+                    else:
+                        balances[address] = cached
+            
+            missing = [address for address in checksum_addresses if address not in balances]
+            batch_size = self.config.BALANCE_BATCH_SIZE
+            for start in range(0, len(missing), batch_size):
+                chunk = missing[start:start + batch_size]
+                responses = JSONRPCBatch(self.w3).execute(
+                    [('eth_getBalance', [address, hex(block_number)]) for address in chunk]
+                )
+                for address, balance in zip(chunk, self._parse_balance_responses(chunk, responses)):
+                    balances[address] = balance
+                    if address in cache_keys:
+                        key, volatile = cache_keys[address]
+                        self.read_cache.store.set(key, balance, volatile=volatile)
+            
+            logger.info('balances_fetched', addresses=len(checksum_addresses), rpc_reads=len(missing),
+                        block_number=block_number, sample_rate=self.config.LOG_SAMPLE_RATE)
+            return self._format_balances(checksum_addresses, balances, block_number)
             
         except Exception as e:
-            logger.error(f"Error getting balance for {address}: {str(e)}")
+            logger.error('balances_failed', addresses=len(addresses or []), error=str(e))
             raise
     
+    @staticmethod
+    def _checksum_addresses(addresses: List[str]) -> List[str]:
+        """Validate and checksum addresses in one pass, dropping duplicates but keeping order"""
+        invalid = [address for address in addresses if not isinstance(address, str) or not Web3.is_address(address)]
+        if invalid:
+            shown = ', '.join(str(address) for address in invalid[:5])
+            more = f" and {len(invalid) - 5} more" if len(invalid) > 5 else ''
+            raise ValueError(f"Invalid addresses: {shown}{more}")
+        return list(dict.fromkeys(Web3.to_checksum_address(address) for address in addresses))
+    
+    def _pin_block_number(self, block_identifier: Any) -> int:
+        """Resolve a block identifier to a number, via the head tracker when caching"""
+        if self.read_cache:
+            return self.read_cache.resolve_block(block_identifier)
+        if block_identifier in (None, 'latest'):
+            return self.w3.eth.block_number
+        return to_block_number(block_identifier)
+    
+    def _parse_balance_responses(self, addresses: List[str], responses: List[Dict[str, Any]]) -> List[int]:
+        """Wei balances from eth_getBalance responses; any error fails the whole read"""
+        balances = []
+        for address, response in zip(addresses, responses):
+            if 'error' in response:
+                raise ValueError(f"eth_getBalance failed for {address}: "
+                                 f"{rpc_error_message(self.w3, response['error'])}")
+            result = response.get('result')
+            balances.append(int(result, 16) if isinstance(result, str) else int(result))
+        return balances
+    
+    @staticmethod
+    def _format_balances(addresses: List[str], balances: Dict[str, int], block_number: int) -> Dict[str, Any]:
+        # Wei as strings: JavaScript clients lose precision on integers above 2**53
+        total = sum(balances[address] for address in addresses)
+        return {
+            'block_number': block_number,
+            'balances': [
+                {'address': address, 'wei': str(balances[address]), 'balance': format_wei(balances[address])}
+                for address in addresses
+            ],
+            'total_wei': str(total),
+            'total': format_wei(total),
+            'unit': 'ETH'
+        }
+    
+    def _coalesce(self, key: Tuple, loader) -> Any:
+        """Share one upstream call between identical reads that are in flight together"""
+        if self.single_flight:
+            return self.single_flight.do(key, loader)
+        return loader()
+    
     def load_contract_abi(self, abi_path: str) -> List[Dict]:
         """Load contract ABI from file"""
         try:
-            if abi_path in self._abi_cache:
-                return self._abi_cache[abi_path]
-            
-            if not os.path.exists(abi_path):
-                # Try with default ABI path
-                full_path = os.path.join(self.config.DEFAULT_CONTRACT_ABI_PATH, abi_path)
-                if not os.path.exists(full_path):
-                    raise FileNotFoundError(f"ABI file not found: {abi_path}")
-                abi_path = full_path
-            
-            with open(abi_path, 'r') as f:
-                abi = json.load(f)
-            
-            self._abi_cache[abi_path] = abi
-            return abi
+            return self.abi_registry.load_file(abi_path).abi
             
         except Exception as e:
-            logger.error(f"Error loading ABI from {abi_path}: {str(e)}")
+            logger.error('abi_load_failed', abi_path=abi_path, error=str(e))
             raise
     
     def get_contract(self, contract_address: str, abi_path: str = None, abi: List[Dict] = None):
@@ -128,28 +267,25 @@ class ContractHandler:
                 raise ValueError(f"Invalid contract address: {contract_address}")
             
             checksum_address = Web3.to_checksum_address(contract_address)
-            cache_key = f"{checksum_address}_{abi_path or 'custom'}"
+            # Keyed by ABI content, so different inline ABIs never share an instance
+            entry = self.abi_registry.resolve(abi_path=abi_path, abi=abi)
+            cache_key = (checksum_address, entry.hash)
             
             if cache_key in self._contract_cache:
                 return self._contract_cache[cache_key]
             
-            if abi is None:
-                if abi_path is None:
-                    raise ValueError("Either abi_path or abi must be provided")
-                abi = self.load_contract_abi(abi_path)
-            
-            contract = self.w3.eth.contract(address=checksum_address, abi=abi)
+            contract = self.w3.eth.contract(address=checksum_address, abi=entry.abi)
             self._contract_cache[cache_key] = contract
             
             return contract
             
         except Exception as e:
-            logger.error(f"Error getting contract {contract_address}: {str(e)}")
+            logger.error('contract_load_failed', contract=contract_address, error=str(e))
             raise
     
     def call_contract_function(self, contract_address: str, function_name: str, 
                              function_args: List = None, abi_path: str = None, 
-                             abi: List[Dict] = None) -> Any:
+                             abi: List[Dict] = None, block_identifier: Any = 'latest') -> Any:
         """Call a read-only contract function"""
         try:
             contract = self.get_contract(contract_address, abi_path, abi)
@@ -157,93 +293,529 @@ class ContractHandler:
             
             # Get the contract function
             contract_function = getattr(contract.functions, function_name)
+            bound_function = contract_function(*function_args)
+            
+            # Call the function, converting Web3 data types to serializable formats
+            # Calldata is the selector plus encoded args, so it identifies the read
+            calldata = bound_function._encode_transaction_data()
+            if self.read_cache:
+                block_number = self.read_cache.resolve_block(block_identifier)
+                result = self.read_cache.get_or_load(
+                    'call', (contract.address, calldata), block_number,
+                    lambda: self._coalesce(
+                        ('call', contract.address, calldata, block_number),
+                        lambda: self._format_call_result(bound_function.call(block_identifier=block_number))
+                    )
+                )
+            else:
+                result = self._coalesce(
+                    ('call', contract.address, calldata, block_identifier),
+                    lambda: self._format_call_result(bound_function.call(block_identifier=block_identifier))
+                )
             
-            # Call the function
-            result = contract_function(*function_args).call()
-            
-            # Convert Web3 data types to serializable formats
-            if isinstance(result, bytes):
-                result = result.hex()
-            elif hasattr(result, '_asdict'):  # Named tuple
-                result = result._asdict()
-            
-            logger.info(f"Called {function_name} on {contract_address}: {result}")
+            logger.info('contract_call', contract=contract_address, function=function_name,
+                        sample_rate=self.config.LOG_SAMPLE_RATE)
             return result
             
         except Exception as e:
-            logger.error(f"Error calling {function_name} on {contract_address}: {str(e)}")
+            logger.error('contract_call_failed', contract=contract_address, function=function_name, error=str(e))
             raise
     
+    def call_contract_functions_batch(self, calls: List[Dict[str, Any]], aggregate: bool = False,
+                                      block_identifier: Any = 'latest') -> List[Dict[str, Any]]:
+        """Call several read-only contract functions in one round trip"""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+        prepared = []
+        
+        # Encode every call up front so bad items fail individually
+        for index, call in enumerate(calls):
+            try:
+                contract = self.get_contract(
+                    call.get('contract_address'),
+                    call.get('abi_path'),
+                    call.get('abi')
+                )
+                contract_function = getattr(contract.functions, call.get('function_name'))
+                bound_function = contract_function(*(call.get('function_args') or []))
+                prepared.append((index, contract.address, bound_function))
+            except Exception as e:
+                results[index] = {'success': False, 'error': str(e)}
+        
+        # Serve repeated reads from the block-level cache and only send the misses
+        cache_keys = {}
+        if self.read_cache and prepared:
+            block_identifier = self.read_cache.resolve_block(block_identifier)
+            pending = []
+            for item in prepared:
+                index, address, bound_function = item
+                key, volatile = self.read_cache.make_key(
+                    'call', (address, bound_function._encode_transaction_data()), block_identifier
+                )
+                cached = self.read_cache.lookup(key)
+                if self.read_cache.is_missing(cached):
+                    cache_keys[index] = (key, volatile)
+                    pending.append(item)
+                else:
+                    results[index] = {'success': True, 'result': cached}
+            prepared = pending
+        
+        if prepared:
+            if aggregate:
+                outcomes = self._execute_multicall(prepared, block_identifier)
+            else:
+                outcomes = self._execute_call_batch(prepared, block_identifier)
+            
+            for (index, _, bound_function), (success, payload) in zip(prepared, outcomes):
+                if not success:
+                    results[index] = {'success': False, 'error': payload}
+                    continue
+                try:
+                    result = self._decode_call_output(bound_function, payload)
+                except Exception as e:
+                    results[index] = {'success': False, 'error': f"Could not decode result: {str(e)}"}
+                    continue
+                
+                results[index] = {'success': True, 'result': result}
+                if index in cache_keys:
+                    key, volatile = cache_keys[index]
+                    self.read_cache.store.set(key, result, volatile=volatile)
+        
+        logger.info('contract_call_batch', calls=len(calls), aggregate=aggregate,
+                    sample_rate=self.config.LOG_SAMPLE_RATE)
+        return results
+    
+    def _execute_call_batch(self, prepared: List, block_identifier: Any) -> List:
+        """Send one eth_call per item inside a single JSON-RPC batch"""
+        block = self._format_block_identifier(block_identifier)
+        requests = [
+            ('eth_call', [{'to': address, 'data': bound_function._encode_transaction_data()}, block])
+            for _, address, bound_function in prepared
+        ]
+        
+        outcomes = []
+        for response in JSONRPCBatch(self.w3).execute(requests):
+            if 'error' in response:
+                outcomes.append((False, rpc_error_message(self.w3, response['error'])))
+            else:
+                outcomes.append((True, HexBytes(response.get('result') or b'')))
+        return outcomes
+    
+    def _execute_multicall(self, prepared: List, block_identifier: Any) -> List:
+        """Aggregate all items into a single Multicall3 aggregate3 eth_call"""
+        multicall = self.get_contract(self.config.MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+        call_args = [
+            (address, True, HexBytes(bound_function._encode_transaction_data()))
+            for _, address, bound_function in prepared
+        ]
+        
+        try:
+            return_data = multicall.functions.aggregate3(call_args).call(
+                block_identifier=block_identifier
+            )
+        except Exception as e:
+            return [(False, f"Multicall failed: {str(e)}")] * len(prepared)
+        
+        return [
+            (True, HexBytes(data)) if success else (False, decode_revert_reason(self.w3, data))
+            for success, data in return_data
+        ]
+    
+    def _decode_call_output(self, bound_function, return_data: bytes) -> Any:
+        """Decode raw eth_call return data for a bound contract function"""
+        if not return_data:
+            raise ValueError("empty return data, is the contract deployed?")
+        
+        output_types = get_abi_output_types(bound_function.abi)
+        decoded = self.w3.codec.decode(output_types, return_data)
+        normalized = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, decoded)
+        
+        result = normalized[0] if len(normalized) == 1 else normalized
+        return self._format_call_result(result)
+    
+    @staticmethod
+    def _format_block_identifier(block_identifier: Any) -> Any:
+        """Convert a block number to the hex quantity expected by raw RPC params"""
+        if isinstance(block_identifier, int):
+            return hex(block_identifier)
+        return block_identifier
+    
+    @staticmethod
+    def _format_call_result(result: Any) -> Any:
+        """Convert Web3 call results to JSON-serializable formats"""
+        return to_jsonable(result)
+    
     def send_transaction(self, contract_address: str, function_name: str,
                         function_args: List = None, value: int = 0,
-                        abi_path: str = None, abi: List[Dict] = None) -> str:
-        """Send a transaction to a contract function"""
+                        abi_path: str = None, abi: List[Dict] = None,
+                        urgency: str = None, sender: str = None, shard: bool = False) -> str:
+        """Send a transaction to a contract function
+        
+        It is sent from sender when given, from any signer in the pool with
+        shard, and otherwise from the primary account.
+        """
         try:
-            if not self.account:
+            if not self.signers:
                 raise ValueError("No account loaded for sending transactions")
             
-            contract = self.get_contract(contract_address, abi_path, abi)
-            function_args = function_args or []
-            
-            # Get the contract function
-            contract_function = getattr(contract.functions, function_name)
-            
-            # Build transaction
-            transaction = contract_function(*function_args).build_transaction({
-                'from': self.account.address,
-                'gas': self.config.GAS_LIMIT,
-                'gasPrice': self.config.get_gas_price_wei(),
-                'nonce': self.w3.eth.get_transaction_count(self.account.address),
-                'value': value
-            })
-            
-            # Sign transaction
-            signed_txn = self.account.sign_transaction(transaction)
+            address = self.signers.assign_transactions([{'from': sender, 'shard': shard}])[0]
+            try:
+                # Build before reserving so a bad call never takes a nonce
+                transaction = self._build_transaction(
+                    contract_address, function_name, function_args, value, abi_path, abi, urgency, sender=address
+                )
+                self.nonce_manager.maybe_resync(address)
+                nonce = self.nonce_manager.reserve(address)
+                raw_transaction = self.signers.sign(address, {**transaction, 'from': address, 'nonce': nonce})
+                
+                # Send transaction
+                try:
+                    tx_hash = self.w3.eth.send_raw_transaction(raw_transaction)
+                except Exception as e:
+                    self._handle_send_error(address, nonce, e)
+                    raise
+            except Exception:
+                self.signers.release(address)
+                raise
+            tx_hash_hex = Web3.to_hex(tx_hash)
+            self.signers.sent(address, tx_hash_hex)
+            TRANSACTIONS_SENT.labels('accepted').inc()
+            
+            logger.info('transaction_sent', tx_hash=tx_hash_hex, sender=address, contract=contract_address,
+                        function=function_name)
+            return tx_hash_hex
             
-            # Send transaction
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            tx_hash_hex = tx_hash.hex()
+        except Exception as e:
+            logger.error('transaction_send_failed', contract=contract_address, function=function_name, error=str(e))
+            raise
+    
+    def send_transactions(self, transactions: List[Dict[str, Any]], simulate: bool = False,
+                          require_all: bool = False, on_signed=None) -> List[Dict[str, Any]]:
+        """Build, sign and submit several contract transactions as one pipeline
+        
+        Transactions that fail to build are reported without taking a nonce.
+        The rest are spread over the signer pool, take consecutive nonces in
+        one reservation per signer, are signed (in worker processes for large
+        batches) and are broadcast in a single JSON-RPC batch, in input order.
+        
+        Items are sent from their 'from' address, from any pool signer when
+        they set 'shard', and otherwise from the primary account.
+        
+        With simulate, every item is first dry-run from its assigned signer
+        and only the items that pass are sent, with their simulated gas. With
+        require_all as well, nothing is sent unless every item passes.
+        
+        on_signed, when given, is called with every signed transaction (index,
+        from, nonce, transaction_hash, raw_transaction) before the broadcast,
+        so callers can record them durably. If the broadcast itself fails, the
+        node may still have received it: those items come back with 'unknown'
+        set instead of being reported as rejected.
+        """
+        if not self.signers:
+            raise ValueError("No account loaded for sending transactions")
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(transactions)
+        # Signers are assigned up front so a simulation runs from the account that will send
+        addresses = self.signers.assign_transactions(transactions)
+        built = []
+        try:
+            gas_limits = {}
+            if simulate:
+                simulation = self.simulate_transactions(transactions, senders=addresses)
+                gas_limits = self._screen_simulation(simulation['results'], results, require_all)
+            
+            for index, item in enumerate(transactions):
+                if results[index] is not None:
+                    continue
+                try:
+                    built.append((index, self._build_transaction(
+                        item.get('contract_address'),
+                        item.get('function_name'),
+                        item.get('function_args'),
+                        item.get('value', 0),
+                        item.get('abi_path'),
+                        item.get('abi'),
+                        item.get('urgency'),
+                        sender=addresses[index],
+                        gas_limit=gas_limits.get(index)
+                    )))
+                except Exception as e:
+                    results[index] = {'success': False, 'error': str(e)}
+        finally:
+            sending = {index for index, _ in built}
+            for index, address in enumerate(addresses):
+                if index not in sending:
+                    self.signers.release(address)
+        
+        senders = [addresses[index] for index, _ in built]
+        if built:
+            try:
+                nonces = self._reserve_nonces(senders)
+                raw_transactions = self.signers.sign_many([
+                    (address, {**transaction, 'from': address, 'nonce': nonce})
+                    for (_, transaction), address, nonce in zip(built, senders, nonces)
+                ])
+                signed = signed_transactions([index for index, _ in built], senders, nonces, raw_transactions)
+                if on_signed:
+                    on_signed(signed)
+            except Exception:
+                for address in senders:
+                    self.signers.release(address)
+                raise
             
-            logger.info(f"Sent transaction {tx_hash_hex} to {function_name} on {contract_address}")
-            return tx_hash_hex
+            try:
+                responses = JSONRPCBatch(self.w3).execute([
+                    ('eth_sendRawTransaction', [raw_transaction]) for raw_transaction in raw_transactions
+                ])
+            except Exception as e:
+                # A transport failure can follow a successful broadcast, so nothing here is known to be rejected
+                responses = [{'unknown': str(e)}] * len(signed)
+            
+            for (index, _), address, nonce, response, item in zip(built, senders, nonces, responses, signed):
+                if 'unknown' in response or (
+                        'error' in response and is_known_transaction_error(rpc_error_message(self.w3, response['error']))):
+                    # Counted as sent: it stays pending until a receipt arrives or the watch times out
+                    self.signers.sent(address, item['transaction_hash'])
+                    if 'unknown' in response:
+                        results[index] = {'success': False, 'unknown': True, 'error': response['unknown'],
+                                          'transaction_hash': item['transaction_hash'], 'from': address, 'nonce': nonce}
+                    else:
+                        results[index] = {'success': True, 'transaction_hash': item['transaction_hash'],
+                                          'from': address, 'nonce': nonce}
+                elif 'error' in response:
+                    error = ValueError(rpc_error_message(self.w3, response['error']))
+                    self._handle_send_error(address, nonce, error)
+                    self.signers.release(address)
+                    results[index] = {'success': False, 'error': str(error), 'from': address, 'nonce': nonce}
+                else:
+                    self.signers.sent(address, response['result'])
+                    results[index] = {'success': True, 'transaction_hash': response['result'], 'from': address,
+                                      'nonce': nonce}
+                    TRANSACTIONS_SENT.labels('accepted').inc()
+        
+        logger.info('transaction_batch_sent', submitted=len(built), requested=len(transactions),
+                    signers=len(set(senders)), simulated=simulate)
+        return results
+    
+    def simulate_transactions(self, transactions: List[Dict[str, Any]], block_identifier: Any = 'latest',
+                              senders: List[str] = None) -> Dict[str, Any]:
+        """Dry-run contract transactions against one pinned block without signing or sending
+        
+        Each item costs an eth_call, for its revert reason and return value,
+        and an eth_estimateGas, for its gas; all of them go out in JSON-RPC
+        batches at the same block. Items are run from senders (one address
+        per item) or else the primary account, each against the block state
+        alone: items do not see each other's effects.
+        """
+        try:
+            results, prepared = self._prepare_simulation(transactions, senders)
+            block_number = self._pin_block_number(block_identifier)
+            
+            batch_size = self.config.SIMULATION_BATCH_SIZE
+            for start in range(0, len(prepared), batch_size):
+                chunk = prepared[start:start + batch_size]
+                responses = JSONRPCBatch(self.w3).execute(self._simulation_requests(chunk, block_number))
+                self._record_simulation(chunk, responses, results)
+            
+            failed = sum(1 for result in results if not result['success'])
+            logger.info('transactions_simulated', transactions=len(transactions), failed=failed,
+                        block_number=block_number, sample_rate=self.config.LOG_SAMPLE_RATE)
+            return {
+                'block_number': block_number,
+                'results': results,
+                'passed': len(results) - failed,
+                'failed': failed
+            }
             
         except Exception as e:
-            logger.error(f"Error sending transaction to {function_name} on {contract_address}: {str(e)}")
+            logger.error('simulation_failed', transactions=len(transactions or []), error=str(e))
             raise
     
+    def _prepare_simulation(self, transactions: List[Dict[str, Any]], senders: List[str] = None) -> Tuple[List, List]:
+        """Encode every item for simulation; items that cannot be encoded fail in place"""
+        default_sender = self.account.address if self.account else None
+        results: List[Dict[str, Any]] = []
+        prepared = []
+        for index, item in enumerate(transactions):
+            sender = senders[index] if senders else item.get('from') or default_sender
+            results.append({'success': False, 'from': sender})
+            try:
+                contract = self.get_contract(item.get('contract_address'), item.get('abi_path'), item.get('abi'))
+                function_args = item.get('function_args') or []
+                value = int(item.get('value', 0) or 0)
+                bound_function = getattr(contract.functions, item.get('function_name'))(*function_args)
+                
+                call = {'to': contract.address, 'data': bound_function._encode_transaction_data()}
+                if sender:
+                    call['from'] = sender
+                if value:
+                    call['value'] = hex(value)
+                gas_key = GasEstimateCache.make_key(contract.address, bound_function.fn_name, function_args, value,
+                                                   sender)
+                prepared.append((index, call, bound_function, gas_key))
+            except Exception as e:
+                results[index]['error'] = str(e)
+        return results, prepared
+    
+    @staticmethod
+    def _simulation_requests(prepared: List, block_number: int) -> List[Tuple[str, List]]:
+        """An eth_call and an eth_estimateGas per item, both at block_number"""
+        requests = []
+        for _, call, _, _ in prepared:
+            requests.append(('eth_call', [call, hex(block_number)]))
+            requests.append(('eth_estimateGas', [call, hex(block_number)]))
+        return requests
+    
+    def _record_simulation(self, prepared: List, responses: List[Dict[str, Any]], results: List[Dict[str, Any]]):
+        """Fill in results from paired eth_call / eth_estimateGas responses"""
+        for (index, _, bound_function, gas_key), call_response, gas_response in zip(
+                prepared, responses[0::2], responses[1::2]):
+            result = results[index]
+            if 'error' in call_response:
+                result['error'] = rpc_error_message(self.w3, call_response['error'])
+                continue
+            if 'error' in gas_response:
+                result['error'] = rpc_error_message(self.w3, gas_response['error'])
+                continue
+            
+            try:
+                # A call to an address without code also succeeds, but returns nothing to decode
+                output = None
+                if bound_function.abi.get('outputs'):
+                    output = self._decode_call_output(bound_function, HexBytes(call_response.get('result') or b''))
+            except Exception as e:
+                result['error'] = f"Could not decode result: {str(e)}"
+                continue
+            
+            gas_estimate = int(gas_response['result'], 16)
+            # Warms the estimate cache, so a later send of the same shape skips estimation
+            if self.gas_estimates:
+                gas_limit = self.gas_estimates.put(gas_key, gas_estimate)
+            else:
+                gas_limit = int(gas_estimate * (1 + self.config.GAS_ESTIMATE_MARGIN))
+            result.update(success=True, result=output, gas_estimate=gas_estimate, gas_limit=gas_limit)
+    
+    @staticmethod
+    def _screen_simulation(outcomes: List[Dict[str, Any]], results: List[Optional[Dict[str, Any]]],
+                           require_all: bool) -> Dict[int, int]:
+        """Fail the items whose simulation failed; returns the gas limit of each item to send"""
+        gas_limits = {}
+        for index, outcome in enumerate(outcomes):
+            if outcome['success']:
+                gas_limits[index] = outcome['gas_limit']
+            else:
+                results[index] = {'success': False, 'error': f"Simulation failed: {outcome.get('error')}",
+                                  'from': outcome['from']}
+        
+        if require_all and len(gas_limits) < len(outcomes):
+            for index in gas_limits:
+                results[index] = {'success': False, 'error': 'Not sent: another transaction failed simulation'}
+            return {}
+        return gas_limits
+    
+    def _reserve_nonces(self, addresses: List[str]) -> List[int]:
+        """Nonces for transactions assigned to addresses, one reservation per signer"""
+        lanes: Dict[str, List[int]] = {}
+        for position, address in enumerate(addresses):
+            lanes.setdefault(address, []).append(position)
+        
+        nonces = [0] * len(addresses)
+        for address, positions in lanes.items():
+            self.nonce_manager.maybe_resync(address)
+            for position, nonce in zip(positions, self.nonce_manager.reserve_many(address, len(positions))):
+                nonces[position] = nonce
+        return nonces
+    
+    def _build_transaction(self, contract_address: str, function_name: str, function_args: List,
+                           value: int, abi_path: str, abi: List[Dict], urgency: str = None,
+                           sender: str = None, gas_limit: int = None) -> Dict[str, Any]:
+        """Build an unsigned contract transaction from sender; the caller sets the nonce"""
+        sender = sender or self.account.address
+        contract = self.get_contract(contract_address, abi_path, abi)
+        bound_function = getattr(contract.functions, function_name)(*(function_args or []))
+        
+        if self.gas_oracle:
+            fees = self.gas_oracle.get_fees(urgency)
+        else:
+            fees = {'gasPrice': self.config.get_gas_price_wei()}
+        
+        # Every field is supplied, so web3 does not fill any defaults from the node
+        return bound_function.build_transaction({
+            'from': sender,
+            'chainId': self.get_chain_id(),
+            'gas': gas_limit or self._get_gas_limit(bound_function, function_args, value, sender),
+            'nonce': 0,
+            'value': value,
+            **fees
+        })
+    
+    def _get_gas_limit(self, bound_function, function_args: List, value: int, sender: str) -> int:
+        """Gas limit from the estimate cache, estimating only on a miss"""
+        if not self.gas_estimates:
+            return self.config.GAS_LIMIT
+        
+        key = GasEstimateCache.make_key(bound_function.address, bound_function.fn_name, function_args, value, sender)
+        gas_limit = self.gas_estimates.get(key)
+        if gas_limit is None:
+            estimate = bound_function.estimate_gas({'from': sender, 'value': value})
+            gas_limit = self.gas_estimates.put(key, estimate)
+        return gas_limit
+    
+    def get_gas_fees(self) -> Dict[str, Any]:
+        """Current fee suggestions for every urgency level"""
+        if not self.gas_oracle:
+            return {'legacy': {'gasPrice': self.config.get_gas_price_wei()}}
+        return {
+            urgency: self.gas_oracle.get_fees(urgency)
+            for urgency in self.gas_oracle.urgency_percentiles
+        }
+    
+    def _handle_send_error(self, address: str, nonce: int, error: Exception):
+        """Keep local nonce state correct after a failed broadcast"""
+        TRANSACTIONS_SENT.labels('rejected').inc()
+        if is_nonce_error(error):
+            self.nonce_manager.resync(address)
+        elif isinstance(error, ValueError):
+            # The node rejected the transaction outright, so the nonce is still unused
+            self.nonce_manager.release(address, nonce)
+        # Transport errors may hide a successful broadcast; leave the nonce to resync
+    
     def get_transaction_details(self, tx_hash: str) -> Dict[str, Any]:
         """Get transaction details and receipt"""
         try:
-            # Get transaction
-            tx = self.w3.eth.get_transaction(tx_hash)
-            
-            # Try to get receipt (may not exist if not mined yet)
-            try:
-                receipt = self.w3.eth.get_transaction_receipt(tx_hash)
-                receipt_data = {
-                    'block_number': receipt.blockNumber,
-                    'gas_used': receipt.gasUsed,
-                    'status': receipt.status,
-                    'logs': [dict(log) for log in receipt.logs]
-                }
-            except:
-                receipt_data = None
+            # Transaction and receipt in one round trip; a watched receipt skips the second call
+            receipt_data = self.receipt_watcher.get_cached(tx_hash)
+            requests = [('eth_getTransactionByHash', [tx_hash])]
+            if receipt_data is None:
+                requests.append(('eth_getTransactionReceipt', [tx_hash]))
+            responses = JSONRPCBatch(self.w3).execute(requests)
+            
+            for response in responses:
+                if 'error' in response:
+                    raise ValueError(rpc_error_message(self.w3, response['error']))
+            tx = responses[0].get('result')
+            if tx is None:
+                raise ValueError(f"Transaction {tx_hash} not found")
+            if receipt_data is None and responses[1].get('result'):
+                receipt_data = format_receipt(responses[1]['result'])
+            
+            def to_int(value):
+                return int(value, 16) if isinstance(value, str) else value
             
             return {
                 'hash': tx_hash,
-                'from': tx['from'],
-                'to': tx['to'],
-                'value': str(tx['value']),
-                'gas': tx['gas'],
-                'gas_price': str(tx['gasPrice']),
-                'nonce': tx['nonce'],
-                'block_number': tx.get('blockNumber'),
-                'transaction_index': tx.get('transactionIndex'),
+                'from': Web3.to_checksum_address(tx['from']),
+                'to': Web3.to_checksum_address(tx['to']) if tx.get('to') else None,
+                'value': str(to_int(tx['value'])),
+                'gas': to_int(tx['gas']),
+                'gas_price': str(to_int(tx['gasPrice'])),
+                'nonce': to_int(tx['nonce']),
+                'block_number': to_int(tx.get('blockNumber')),
+                'transaction_index': to_int(tx.get('transactionIndex')),
                 'receipt': receipt_data
             }
             
         except Exception as e:
-            logger.error(f"Error getting transaction details for {tx_hash}: {str(e)}")
+            logger.error('transaction_details_failed', tx_hash=tx_hash, error=str(e))
             raise
     
     def get_contract_events(self, contract_address: str, event_name: str,
@@ -253,45 +825,125 @@ class ContractHandler:
         try:
             contract = self.get_contract(contract_address, abi_path, abi)
             
-            # Get the event
-            event_filter = getattr(contract.events, event_name)
-            
             # Get events
-            events = event_filter.get_logs(fromBlock=from_block, toBlock=to_block)
-            
-            # Convert to serializable format
-            result = []
-            for event in events:
-                event_data = {
-                    'event': event_name,
-                    'transaction_hash': event['transactionHash'].hex(),
-                    'block_number': event['blockNumber'],
-                    'args': dict(event['args']),
-                    'address': event['address'],
-                    'log_index': event['logIndex']
-                }
-                result.append(event_data)
-            
-            logger.info(f"Retrieved {len(result)} {event_name} events from {contract_address}")
+            result = self._get_event_chunk(contract, event_name, from_block, to_block)
+            
+            logger.info('events_fetched', contract=contract_address, event_name=event_name, count=len(result),
+                        sample_rate=self.config.LOG_SAMPLE_RATE)
             return result
             
         except Exception as e:
-            logger.error(f"Error getting {event_name} events from {contract_address}: {str(e)}")
+            logger.error('events_failed', contract=contract_address, event_name=event_name, error=str(e))
             raise
     
+    @staticmethod
+    def _format_event(event_name: str, event) -> Dict[str, Any]:
+        return {
+            'event': event_name,
+            'transaction_hash': Web3.to_hex(event['transactionHash']),
+            'block_number': event['blockNumber'],
+            'args': dict(event['args']),
+            'address': event['address'],
+            'log_index': event['logIndex']
+        }
+    
+    def _get_event_chunk(self, contract, event_name: str, from_block: Any, to_block: Any) -> List[Dict[str, Any]]:
+        """Formatted events of one block range
+        
+        Raw eth_getLogs results are decoded in bulk by the event's
+        EventLogDecoder; web3's per-log formatting and decoding is only used
+        when EVENTS_FAST_DECODE is off.
+        """
+        event = getattr(contract.events, event_name)
+        if not self.config.EVENTS_FAST_DECODE:
+            return [self._format_event(event_name, log) for log in event.get_logs(fromBlock=from_block, toBlock=to_block)]
+        
+        decoder = get_event_decoder(event._get_event_abi())
+        params = decoder.filter_params(contract.address, from_block, to_block)
+        # Straight to the provider, which bypasses middleware: web3's result
+        # formatters would convert every field of every log first
+        try:
+            with RPC_REQUEST_DURATION.labels('eth_getLogs').time():
+                response = self.w3.provider.make_request('eth_getLogs', [params])
+        except Exception:
+            RPC_REQUEST_ERRORS.labels('eth_getLogs').inc()
+            raise
+        if 'error' in response:
+            raise ValueError(rpc_error_message(self.w3, response['error']))
+        return decoder.decode(response['result'])
+    
+    def _get_block_number(self) -> int:
+        return self.w3.eth.block_number
+    
+    def iter_contract_events(self, contract_address: str, event_name: str,
+                             from_block: Any = 'latest', to_block: Any = 'latest',
+                             abi_path: str = None, abi: List[Dict] = None,
+                             cursor: str = None, chunk_size: int = None) -> Iterator[Dict[str, Any]]:
+        """Stream contract events, fetching logs one block-range chunk at a time
+        
+        The contract, event and block range are resolved up front so bad
+        requests fail before anything is streamed; 'latest' is pinned to the
+        head at that moment. Each event carries a 'cursor' (block:log_index);
+        passing the last one received resumes right after that event.
+        """
+        contract = self.get_contract(contract_address, abi_path, abi)
+        getattr(contract.events, event_name)  # raises for unknown events
+        
+        get_head = functools.lru_cache(maxsize=1)(self._get_block_number)
+        start, end = to_block_number(from_block, get_head), to_block_number(to_block, get_head)
+        after = None
+        if cursor:
+            after = tuple(int(part) for part in cursor.split(':'))
+            start = max(start, after[0])
+        
+        return self._iter_event_chunks(contract, event_name, start, end, after,
+                                       chunk_size or self.config.EVENTS_STREAM_CHUNK_SIZE)
+    
+    def _iter_event_chunks(self, contract, event_name: str, start: int, end: int,
+                           after: Optional[Tuple[int, int]], chunk_size: int) -> Iterator[Dict[str, Any]]:
+        next_block = start
+        while next_block <= end:
+            chunk_end = min(end, next_block + chunk_size - 1)
+            try:
+                logs = self._get_event_chunk(contract, event_name, next_block, chunk_end)
+            except Exception as e:
+                # Providers cap range size or result count; retry with a smaller range
+                if chunk_end == next_block:
+                    raise
+                chunk_size = max(1, (chunk_end - next_block + 1) // 2)
+                logger.info('event_stream_chunk_shrunk', chunk_size=chunk_size, error=str(e))
+                continue
+            
+            for event_data in logs:
+                if after and (event_data['block_number'], event_data['log_index']) <= after:
+                    continue
+                event_data['cursor'] = f"{event_data['block_number']}:{event_data['log_index']}"
+                yield event_data
+            next_block = chunk_end + 1
+    
     def wait_for_transaction_receipt(self, tx_hash: str, timeout: int = 120) -> Dict:
         """Wait for transaction to be mined"""
         try:
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
-            return dict(receipt)
+            return self.receipt_watcher.wait(tx_hash, timeout=timeout)
         except Exception as e:
-            logger.error(f"Error waiting for transaction receipt {tx_hash}: {str(e)}")
+            logger.error('receipt_wait_failed', tx_hash=tx_hash, error=str(e))
             raise
     
+    def get_transaction_receipt(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        """Get a receipt from the watcher cache or the node; None if not yet mined"""
+        receipt = self.receipt_watcher.get_cached(tx_hash)
+        if receipt is None:
+            receipt = self.receipt_watcher.fetch_receipts([tx_hash])[0]
+        return receipt
+    
+    def watch_transaction(self, tx_hash: str, timeout: float = None) -> Future:
+        """Future resolving to the receipt once the transaction is mined"""
+        return self.receipt_watcher.watch(tx_hash, timeout)
+    
     def estimate_gas(self, contract_address: str, function_name: str,
                     function_args: List = None, value: int = 0,
-                    abi_path: str = None, abi: List[Dict] = None) -> int:
-        """Estimate gas for a transaction"""
+                    abi_path: str = None, abi: List[Dict] = None, sender: str = None) -> int:
+        """Estimate gas for a transaction sent from sender, by default the primary account"""
         try:
             if not self.account:
                 raise ValueError("No account loaded for gas estimation")
@@ -304,13 +956,13 @@ class ContractHandler:
             
             # Estimate gas
             gas_estimate = contract_function(*function_args).estimate_gas({
-                'from': self.account.address,
+                'from': sender or self.account.address,
                 'value': value
             })
             
-            logger.info(f"Gas estimate for {function_name}: {gas_estimate}")
+            logger.debug('gas_estimated', function=function_name, gas=gas_estimate)
             return gas_estimate
             
         except Exception as e:
-            logger.error(f"Error estimating gas for {function_name}: {str(e)}")
+            logger.error('gas_estimate_failed', function=function_name, error=str(e))
             raise
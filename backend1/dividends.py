@@ -0,0 +1,482 @@
+import json
+import time
+import uuid
+from typing import Dict, List, Any, Iterable, Optional
+from sqlalchemy import select, insert, delete, func, String, Integer, Float, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from web3 import Web3
+from event_indexer import Base, EventIndexer, IndexedEvent
+from holder_balances import ZERO_ADDRESS
+from logging_config import get_logger
+from transaction_jobs import (
+    ITEM_CONFIRMED, ITEM_REVERTED, ITEM_FAILED, ITEM_TIMEOUT, JOB_COMPLETED, JOB_COMPLETED_WITH_ERRORS
+)
+
+logger = get_logger(__name__)
+
+# Distribution states; job progress is reported on top of 'submitted'
+DISTRIBUTION_COMPUTED = 'computed'
+DISTRIBUTION_SUBMITTED = 'submitted'
+
+DUST_DISTRIBUTE = 'distribute'
+DUST_RETAIN = 'retain'
+
+PAYOUT_FUNCTION_ABIS = {
+    'transfer': {
+        'name': 'transfer', 'type': 'function', 'stateMutability': 'nonpayable',
+        'inputs': [{'name': 'to', 'type': 'address'}, {'name': 'amount', 'type': 'uint256'}],
+        'outputs': [{'name': '', 'type': 'bool'}]
+    },
+    'transferFrom': {
+        'name': 'transferFrom', 'type': 'function', 'stateMutability': 'nonpayable',
+        'inputs': [{'name': 'from', 'type': 'address'}, {'name': 'to', 'type': 'address'},
+                   {'name': 'amount', 'type': 'uint256'}],
+        'outputs': [{'name': '', 'type': 'bool'}]
+    }
+}
+
+
+class BalanceCheckpoint(Base):
+    """Every holder's balance of a token after all Transfers up to a block"""
+    __tablename__ = 'balance_checkpoints'
+
+    token_address: Mapped[str] = mapped_column(String(42), primary_key=True)
+    block_number: Mapped[int] = mapped_column(Integer, primary_key=True)
+    holder_address: Mapped[str] = mapped_column(String(42), primary_key=True)
+    balance: Mapped[str] = mapped_column(String(78))
+
+
+class BalanceCheckpointBlock(Base):
+    """Blocks with a stored checkpoint; a token with no holders yet still has a row here"""
+    __tablename__ = 'balance_checkpoint_blocks'
+
+    token_address: Mapped[str] = mapped_column(String(42), primary_key=True)
+    block_number: Mapped[int] = mapped_column(Integer, primary_key=True)
+    holder_count: Mapped[int] = mapped_column(Integer)
+    created_at: Mapped[float] = mapped_column(Float)
+
+
+class Distribution(Base):
+    """A pro-rata payout of a fixed amount to a token's holders at a record block"""
+    __tablename__ = 'distributions'
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(128), unique=True, nullable=True)
+    token_address: Mapped[str] = mapped_column(String(42))
+    record_block: Mapped[int] = mapped_column(Integer)
+    payout_token: Mapped[str] = mapped_column(String(42))
+    payout_source: Mapped[Optional[str]] = mapped_column(String(42), nullable=True)
+    total_amount: Mapped[str] = mapped_column(String(78))
+    distributed: Mapped[str] = mapped_column(String(78))
+    dust: Mapped[str] = mapped_column(String(78))
+    eligible_supply: Mapped[str] = mapped_column(String(78))
+    holder_count: Mapped[int] = mapped_column(Integer)
+    payout_count: Mapped[int] = mapped_column(Integer)
+    options: Mapped[str] = mapped_column(Text)
+    status: Mapped[str] = mapped_column(String(16))
+    job_ids: Mapped[str] = mapped_column(Text, default='[]')
+    created_at: Mapped[float] = mapped_column(Float)
+
+
+class DistributionPayout(Base):
+    """One holder's payout; part and item_index locate its transaction job item"""
+    __tablename__ = 'distribution_payouts'
+
+    distribution_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    payout_index: Mapped[int] = mapped_column(Integer, primary_key=True)
+    holder_address: Mapped[str] = mapped_column(String(42))
+    balance: Mapped[str] = mapped_column(String(78))
+    amount: Mapped[str] = mapped_column(String(78))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'holder': self.holder_address, 'balance': self.balance, 'amount': self.amount}
+
+
+def allocate(balances: Dict[str, int], total_amount: int, min_payout: int = 0,
+             dust: str = DUST_DISTRIBUTE) -> Dict[str, Any]:
+    """Split total_amount pro rata over balances with integer math
+
+    Each holder first gets floor(total * balance / supply). With dust
+    'distribute' the units left over (fewer than the number of holders) go
+    one each to the holders with the largest remainders, ties broken by
+    address, so exactly total_amount is paid. Amounts below min_payout are
+    not paid and, like undistributed units, are reported as dust.
+    """
+    if dust not in (DUST_DISTRIBUTE, DUST_RETAIN):
+        raise ValueError(f"dust must be '{DUST_DISTRIBUTE}' or '{DUST_RETAIN}'")
+    holders = sorted(holder for holder, balance in balances.items() if balance > 0)
+    supply = sum(balances[holder] for holder in holders)
+    if total_amount <= 0:
+        raise ValueError("total_amount must be positive")
+    if supply == 0:
+        raise ValueError("No eligible holders at the record block")
+
+    amounts = []
+    remainders = []
+    for position, holder in enumerate(holders):
+        amount, remainder = divmod(total_amount * balances[holder], supply)
+        amounts.append(amount)
+        remainders.append((-remainder, position))
+    if dust == DUST_DISTRIBUTE:
+        for _, position in sorted(remainders)[:total_amount - sum(amounts)]:
+            amounts[position] += 1
+
+    payouts = [
+        {'holder': holder, 'balance': balances[holder], 'amount': amount}
+        for holder, amount in zip(holders, amounts)
+        if amount > 0 and amount >= min_payout
+    ]
+    distributed = sum(payout['amount'] for payout in payouts)
+    return {
+        'payouts': payouts,
+        'eligible_supply': supply,
+        'holder_count': len(holders),
+        'distributed': distributed,
+        'dust': total_amount - distributed
+    }
+
+
+class BalanceSnapshots:
+    """Token holder balances at any indexed block, replayed from Transfer events
+
+    A snapshot starts from the closest stored checkpoint at or before the
+    block and applies only the Transfers after it, so its cost grows with
+    the changes since that checkpoint rather than with holders times RPC
+    calls. Replaying past a multiple of checkpoint_interval that is already
+    beyond the reorg window stores a new checkpoint there, so later
+    snapshots start closer. Registered as an indexer listener, it drops
+    checkpoints that a deep reorg has invalidated.
+    """
+
+    def __init__(self, indexer: EventIndexer, checkpoint_interval: int = 10000):
+        self.indexer = indexer
+        self.checkpoint_interval = checkpoint_interval
+        Base.metadata.create_all(indexer.engine)
+        indexer.add_listener(self)
+
+    def on_events(self, session, address: str, events: List[Dict[str, Any]]):
+        pass
+
+    def on_rollback(self, session, address: str, removed_events: List[Dict[str, Any]]):
+        if not removed_events:
+            return
+        first_block = min(event['block_number'] for event in removed_events)
+        for table in (BalanceCheckpoint, BalanceCheckpointBlock):
+            session.execute(delete(table).where(table.token_address == address, table.block_number >= first_block))
+
+    def balances_at(self, token_address: str, block_number: int) -> Dict[str, int]:
+        """Every non-zero holder balance after all Transfers up to and including block_number"""
+        token = Web3.to_checksum_address(token_address)
+        if not self.indexer.is_tracked(token) or self.indexer.get_event_abi(token, 'Transfer') is None:
+            raise ValueError(f"Token {token} is not indexed or has no Transfer event")
+        indexed_block = self.indexer.indexed_block(token)
+        if indexed_block is None or block_number > indexed_block:
+            raise ValueError(f"Block {block_number} is not indexed yet for {token} (indexed to {indexed_block})")
+
+        # Only blocks past the reorg window are checkpointed
+        final_block = min(block_number, indexed_block - self.indexer.reorg_window)
+        target = final_block - final_block % self.checkpoint_interval
+
+        with self.indexer.Session() as session:
+            start = session.scalar(
+                select(func.max(BalanceCheckpointBlock.block_number))
+                .where(BalanceCheckpointBlock.token_address == token,
+                       BalanceCheckpointBlock.block_number <= block_number)
+            )
+            balances = {} if start is None else {
+                holder: int(balance) for holder, balance in session.execute(
+                    select(BalanceCheckpoint.holder_address, BalanceCheckpoint.balance)
+                    .where(BalanceCheckpoint.token_address == token, BalanceCheckpoint.block_number == start)
+                )
+            }
+            start = -1 if start is None else start
+
+            rows = session.execute(
+                select(IndexedEvent.block_number, IndexedEvent.args)
+                .where(IndexedEvent.contract_address == token,
+                       IndexedEvent.event_name == 'Transfer',
+                       IndexedEvent.block_number > start,
+                       IndexedEvent.block_number <= block_number)
+                .order_by(IndexedEvent.block_number, IndexedEvent.log_index)
+            )
+            checkpoint = None
+            changes = 0
+            for event_block, args in rows:
+                if checkpoint is None and start < target < event_block:
+                    checkpoint = dict(balances)
+                sender, receiver, value = json.loads(args).values()
+                _apply_transfer(balances, sender, receiver, int(value))
+                changes += 1
+            if checkpoint is None and start < target:
+                checkpoint = dict(balances)
+
+        if checkpoint is not None and target > 0:
+            self._save_checkpoint(token, target, checkpoint)
+        logger.info('balance_snapshot', token=token, block=block_number, from_checkpoint=start,
+                    transfers_replayed=changes, holders=len(balances))
+        return balances
+
+    def _save_checkpoint(self, token: str, block_number: int, balances: Dict[str, int]):
+        with self.indexer.Session() as session, session.begin():
+            if session.get(BalanceCheckpointBlock, (token, block_number)):
+                return
+            session.add(BalanceCheckpointBlock(token_address=token, block_number=block_number,
+                                               holder_count=len(balances), created_at=time.time()))
+            if balances:
+                session.execute(insert(BalanceCheckpoint), [
+                    {'token_address': token, 'block_number': block_number,
+                     'holder_address': holder, 'balance': str(balance)}
+                    for holder, balance in balances.items()
+                ])
+
+    def checkpoints(self, token_address: str) -> List[Dict[str, Any]]:
+        token = Web3.to_checksum_address(token_address)
+        with self.indexer.Session() as session:
+            return [
+                {'block_number': row.block_number, 'holder_count': row.holder_count}
+                for row in session.scalars(
+                    select(BalanceCheckpointBlock)
+                    .where(BalanceCheckpointBlock.token_address == token)
+                    .order_by(BalanceCheckpointBlock.block_number)
+                )
+            ]
+
+
+def _apply_transfer(balances: Dict[str, int], sender: str, receiver: str, value: int):
+    if sender != ZERO_ADDRESS:
+        balance = balances.get(sender, 0) - value
+        if balance < 0:
+            logger.warning('negative_snapshot_balance', holder=sender)
+        if balance > 0:
+            balances[sender] = balance
+        else:
+            balances.pop(sender, None)
+    if receiver != ZERO_ADDRESS:
+        balances[receiver] = balances.get(receiver, 0) + value
+
+
+class DividendEngine:
+    """Compute rental-income distributions and pay them through transaction jobs
+
+    A distribution is computed from the record-block snapshot, which must
+    be older than the indexer's reorg window, and stored with every payout
+    before anything is sent. Executing it queues the
+    payouts as transaction jobs of at most max_job_items items, each with
+    an idempotency key derived from the distribution, so executing again
+    after a crash or restart creates only the jobs that are missing and
+    the job manager resumes the rest.
+    """
+
+    def __init__(self, snapshots: BalanceSnapshots, job_manager=None, max_job_items: int = 5000):
+        self.snapshots = snapshots
+        self.indexer = snapshots.indexer
+        self.job_manager = job_manager
+        self.max_job_items = max_job_items
+
+    def compute(self, token_address: str, record_block: int, total_amount: int, exclude: Iterable[str] = (),
+                min_payout: int = 0, dust: str = DUST_DISTRIBUTE) -> Dict[str, Any]:
+        """Payout amounts for every eligible holder at the record block, without storing anything"""
+        balances = self.snapshots.balances_at(token_address, record_block)
+        for address in exclude:
+            balances.pop(Web3.to_checksum_address(address), None)
+        return {
+            'token_address': Web3.to_checksum_address(token_address),
+            'record_block': record_block,
+            'total_amount': total_amount,
+            **allocate(balances, total_amount, min_payout, dust)
+        }
+
+    def create_distribution(self, token_address: str, record_block: int, payout_token: str, total_amount: int,
+                            exclude: Iterable[str] = (), min_payout: int = 0, dust: str = DUST_DISTRIBUTE,
+                            payout_source: str = None, idempotency_key: str = None) -> Dict[str, Any]:
+        """Compute and store a distribution; a repeated idempotency key returns the existing one"""
+        if idempotency_key:
+            with self.indexer.Session() as session:
+                existing = session.scalar(select(Distribution).where(Distribution.idempotency_key == idempotency_key))
+                if existing:
+                    return self._summary(existing)
+        if not Web3.is_address(payout_token):
+            raise ValueError(f"Invalid payout token address: {payout_token}")
+        if payout_source and not Web3.is_address(payout_source):
+            raise ValueError(f"Invalid payout source address: {payout_source}")
+        # A reorg could still change the balances of a more recent block after the payouts are stored
+        indexed_block = self.indexer.indexed_block(token_address) if Web3.is_address(token_address) else None
+        if indexed_block is not None and record_block > indexed_block - self.indexer.reorg_window:
+            raise ValueError(f"Record block {record_block} is within the reorg window; distributions need "
+                             f"a block at or before {indexed_block - self.indexer.reorg_window}")
+
+        exclude = sorted({Web3.to_checksum_address(address) for address in exclude})
+        allocation = self.compute(token_address, record_block, total_amount, exclude, min_payout, dust)
+        distribution = Distribution(
+            id=uuid.uuid4().hex,
+            idempotency_key=idempotency_key,
+            token_address=allocation['token_address'],
+            record_block=record_block,
+            payout_token=Web3.to_checksum_address(payout_token),
+            payout_source=payout_source and Web3.to_checksum_address(payout_source),
+            total_amount=str(total_amount),
+            distributed=str(allocation['distributed']),
+            dust=str(allocation['dust']),
+            eligible_supply=str(allocation['eligible_supply']),
+            holder_count=allocation['holder_count'],
+            payout_count=len(allocation['payouts']),
+            options=json.dumps({'exclude': exclude, 'min_payout': str(min_payout), 'dust': dust}),
+            status=DISTRIBUTION_COMPUTED,
+            job_ids='[]',
+            created_at=time.time()
+        )
+        with self.indexer.Session() as session, session.begin():
+            session.add(distribution)
+            session.add_all(
+                DistributionPayout(distribution_id=distribution.id, payout_index=index,
+                                   holder_address=payout['holder'], balance=str(payout['balance']),
+                                   amount=str(payout['amount']))
+                for index, payout in enumerate(allocation['payouts'])
+            )
+        logger.info('distribution_created', distribution_id=distribution.id, token=distribution.token_address,
+                    record_block=record_block, payouts=len(allocation['payouts']), dust=allocation['dust'])
+        return self._summary(distribution)
+
+    def execute(self, distribution_id: str) -> Dict[str, Any]:
+        """Queue the payout jobs that do not exist yet"""
+        if not self.job_manager:
+            raise ValueError("No account loaded for sending transactions")
+        with self.indexer.Session() as session:
+            distribution = session.get(Distribution, distribution_id)
+            if distribution is None:
+                raise KeyError(distribution_id)
+            payouts = session.scalars(
+                select(DistributionPayout)
+                .where(DistributionPayout.distribution_id == distribution_id)
+                .order_by(DistributionPayout.payout_index)
+            ).all()
+
+        job_ids = []
+        for part, start in enumerate(range(0, len(payouts), self.max_job_items)):
+            job = self.job_manager.create_job(
+                [self._payout_transaction(distribution, payout) for payout in payouts[start:start + self.max_job_items]],
+                idempotency_key=f'distribution:{distribution_id}:{part}'
+            )
+            job_ids.append(job['job_id'])
+            # Recorded after every part so progress survives a crash between jobs
+            self._record_jobs(distribution_id, job_ids)
+
+        with self.indexer.Session() as session, session.begin():
+            distribution = session.get(Distribution, distribution_id)
+            distribution.status = DISTRIBUTION_SUBMITTED
+            distribution.job_ids = json.dumps(job_ids)
+        logger.info('distribution_submitted', distribution_id=distribution_id, jobs=len(job_ids))
+        return self.get_distribution(distribution_id)
+
+    def _record_jobs(self, distribution_id: str, job_ids: List[str]):
+        with self.indexer.Session() as session, session.begin():
+            session.get(Distribution, distribution_id).job_ids = json.dumps(job_ids)
+
+    @staticmethod
+    def _payout_transaction(distribution: Distribution, payout: DistributionPayout) -> Dict[str, Any]:
+        # transferFrom lets every signer in the pool pay out of one approved treasury, so it is sharded;
+        # transfer pays from the sender's own balance, so it stays on the primary account
+        if distribution.payout_source:
+            function_name = 'transferFrom'
+            function_args = [distribution.payout_source, payout.holder_address, int(payout.amount)]
+        else:
+            function_name = 'transfer'
+            function_args = [payout.holder_address, int(payout.amount)]
+        return {
+            'contract_address': distribution.payout_token,
+            'function_name': function_name,
+            'function_args': function_args,
+            'abi': [PAYOUT_FUNCTION_ABIS[function_name]],
+            'shard': bool(distribution.payout_source)
+        }
+
+    def retry(self, distribution_id: str) -> Dict[str, Any]:
+        """Resubmit payouts whose transactions failed, reverted or provably never landed"""
+        if not self.job_manager:
+            raise ValueError("No account loaded for sending transactions")
+        summary = self.get_distribution(distribution_id)
+        if summary is None:
+            raise KeyError(distribution_id)
+        results = [self.job_manager.retry_job(job['job_id']) for job in summary['jobs']
+                   if job['status'] == JOB_COMPLETED_WITH_ERRORS]
+        return {
+            'distribution_id': distribution_id,
+            'requeued': sum(result['requeued'] for result in results),
+            'still_pending': sum(result['still_pending'] for result in results)
+        }
+
+    def get_distribution(self, distribution_id: str, include_payouts: bool = False) -> Optional[Dict[str, Any]]:
+        with self.indexer.Session() as session:
+            distribution = session.get(Distribution, distribution_id)
+            if distribution is None:
+                return None
+            payouts = session.scalars(
+                select(DistributionPayout)
+                .where(DistributionPayout.distribution_id == distribution_id)
+                .order_by(DistributionPayout.payout_index)
+            ).all() if include_payouts else None
+
+        summary = self._summary(distribution)
+        job_ids = json.loads(distribution.job_ids)
+        jobs = [self.job_manager.get_job(job_id, include_items=include_payouts) for job_id in job_ids] \
+            if self.job_manager else []
+        summary['jobs'] = [{key: value for key, value in job.items() if key != 'items'} for job in jobs if job]
+        if jobs:
+            counts: Dict[str, int] = {}
+            for job in summary['jobs']:
+                for status, count in job['counts'].items():
+                    counts[status] = counts.get(status, 0) + count
+            done = sum(counts.get(status, 0) for status in (ITEM_CONFIRMED, ITEM_REVERTED, ITEM_FAILED, ITEM_TIMEOUT))
+            summary['counts'] = counts
+            summary['progress'] = round(done / summary['payout_count'], 4) if summary['payout_count'] else 1.0
+            summary['status'] = _distribution_status(summary['jobs'], len(job_ids))
+
+        if include_payouts:
+            items = [item for job in jobs if job for item in job.get('items', [])]
+            summary['payouts'] = []
+            for index, payout in enumerate(payouts):
+                entry = payout.to_dict()
+                if index < len(items):
+                    item = items[index]
+                    entry.update(status=item['status'], transaction_hash=item['transaction_hash'], error=item['error'])
+                summary['payouts'].append(entry)
+        return summary
+
+    @staticmethod
+    def _summary(distribution: Distribution) -> Dict[str, Any]:
+        options = json.loads(distribution.options)
+        return {
+            'distribution_id': distribution.id,
+            'status': distribution.status,
+            'token_address': distribution.token_address,
+            'record_block': distribution.record_block,
+            'payout_token': distribution.payout_token,
+            'payout_source': distribution.payout_source,
+            'total_amount': distribution.total_amount,
+            'distributed': distribution.distributed,
+            'dust': distribution.dust,
+            'eligible_supply': distribution.eligible_supply,
+            'holder_count': distribution.holder_count,
+            'payout_count': distribution.payout_count,
+            'exclude': options['exclude'],
+            'min_payout': options['min_payout'],
+            'dust_mode': options['dust'],
+            'created_at': distribution.created_at
+        }
+
+
+def _distribution_status(jobs: List[Dict[str, Any]], expected_jobs: int) -> str:
+    if len(jobs) < expected_jobs or any(job['status'] not in (JOB_COMPLETED, JOB_COMPLETED_WITH_ERRORS) for job in jobs):
+        return 'in_progress'
+    if any(job['status'] == JOB_COMPLETED_WITH_ERRORS for job in jobs):
+        return JOB_COMPLETED_WITH_ERRORS
+    return JOB_COMPLETED
+
+
+def create_dividend_engine(event_indexer: Optional[EventIndexer], job_manager, config) -> Optional[DividendEngine]:
+    """Build the dividend engine on top of the event indexer"""
+    if not config.DIVIDENDS_ENABLED or event_indexer is None:
+        return None
+
+    snapshots = BalanceSnapshots(event_indexer, checkpoint_interval=config.DIVIDEND_CHECKPOINT_INTERVAL)
+    return DividendEngine(snapshots, job_manager, max_job_items=config.JOB_MAX_ITEMS)
@@ -0,0 +1,505 @@
+import json
+import os
+import re
+import time
+from decimal import Decimal
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+from sqlalchemy import select, func
+from web3 import Web3
+from event_indexer import EventIndexer, IndexedEvent
+from rpc_batch import JSONRPCBatch, rpc_error_message
+from logging_config import get_logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+except ImportError:  # Columnar export is optional
+    pa = None
+
+logger = get_logger(__name__)
+
+# Arrow decimals hold at most 76 digits; larger uint256 values (unlimited allowances) are stored as null
+DECIMAL_DIGITS = 76
+DECIMAL_LIMIT = 10 ** DECIMAL_DIGITS
+
+# Transaction details of a contract's events live next to its event directories
+TRANSACTIONS_DATASET = '_transactions'
+
+ARROW_STREAM_MIMETYPE = 'application/vnd.apache.arrow.stream'
+PARTITION_PATTERN = re.compile(r'^(\d{12})-(\d{12})\.arrow$')
+AGGREGATE_FUNCTIONS = ('sum', 'count', 'min', 'max', 'mean', 'count_distinct')
+
+
+def _arrow_type(abi_type: str):
+    """Column type for an event argument; values that do not map cleanly are JSON strings"""
+    if abi_type.endswith(']') or abi_type.startswith('tuple'):
+        return pa.string()
+    if abi_type == 'bool':
+        return pa.bool_()
+    if abi_type.startswith(('uint', 'int')):
+        bits = int(abi_type.lstrip('uint') or 256)
+        if bits <= 64:
+            return pa.uint64() if abi_type.startswith('u') else pa.int64()
+        return pa.decimal256(DECIMAL_DIGITS, 0)
+    return pa.string()  # address, string, bytes, bytesN
+
+
+def _to_decimal(value: Any) -> Optional[Decimal]:
+    value = int(value)
+    return Decimal(value) if -DECIMAL_LIMIT < value < DECIMAL_LIMIT else None
+
+
+class EventExporter:
+    """Export indexed events to partitioned Arrow files and answer queries from them
+
+    Each file holds one event type of one contract over a fixed block range,
+    as an uncompressed Arrow IPC file, so readers memory-map it instead of
+    parsing it: a query touches only the partitions overlapping its block
+    range and only the columns it uses. Events come from the local event
+    index; the node is only asked for block timestamps and, optionally, the
+    receipts of the exported transactions.
+
+    Only blocks older than the indexer's reorg window are exported. The
+    newest partition is rewritten as it fills up; complete partitions are
+    written once.
+    """
+
+    def __init__(self, indexer: EventIndexer, w3: Web3, directory: str, partition_blocks: int = 100000,
+                 finality_depth: int = 64, include_transactions: bool = True, rpc_batch_size: int = 200,
+                 row_batch_size: int = 50000):
+        if pa is None:
+            raise ImportError("pyarrow package is required for columnar event export")
+
+        self.indexer = indexer
+        self.w3 = w3
+        self.directory = directory
+        self.partition_blocks = partition_blocks
+        self.finality_depth = finality_depth
+        self.include_transactions = include_transactions
+        self.rpc_batch_size = rpc_batch_size
+        self.row_batch_size = row_batch_size
+        # Reads go through mmap: pages are shared between workers and nothing is copied up front
+        self.filesystem = pafs.LocalFileSystem(use_mmap=True)
+        os.makedirs(directory, exist_ok=True)
+
+    # Schemas
+
+    def event_schema(self, address: str, event_name: str):
+        event_abi = self.indexer.get_event_abi(address, event_name)
+        if event_abi is None:
+            raise ValueError(f"Event {event_name} not found in tracked ABI for {address}")
+
+        fields = [
+            pa.field('block_number', pa.uint64()),
+            pa.field('log_index', pa.uint32()),
+            pa.field('timestamp', pa.timestamp('s', tz='UTC')),
+            pa.field('transaction_hash', pa.string())
+        ]
+        reserved = {field.name for field in fields}
+        for item in event_abi['inputs']:
+            name = item['name'] if item['name'] not in reserved else f"arg_{item['name']}"
+            fields.append(pa.field(name, _arrow_type(item['type']), metadata={'abi_type': item['type']}))
+        return pa.schema(fields)
+
+    @staticmethod
+    def transaction_schema():
+        return pa.schema([
+            pa.field('block_number', pa.uint64()),
+            pa.field('transaction_hash', pa.string()),
+            pa.field('from', pa.string()),
+            pa.field('to', pa.string()),
+            pa.field('status', pa.uint8()),
+            pa.field('gas_used', pa.uint64()),
+            pa.field('effective_gas_price', pa.uint64()),
+            pa.field('fee', pa.decimal256(DECIMAL_DIGITS, 0))
+        ])
+
+    # Export
+
+    def export(self, contract_address: str, event_names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Write every missing or incomplete partition of a tracked contract up to the final block"""
+        if not self.indexer.is_tracked(contract_address):
+            raise ValueError(f"Contract {contract_address} is not tracked by the event indexer")
+        address = Web3.to_checksum_address(contract_address)
+        started = time.perf_counter()
+
+        indexed_block = self.indexer.indexed_block(address)
+        if indexed_block is None:
+            raise ValueError(f"Contract {address} has not been indexed yet")
+        final_block = indexed_block - self.finality_depth
+
+        abi_events = [item['name'] for item in self.indexer.get_abi(address)
+                      if item.get('type') == 'event' and not item.get('anonymous')]
+        for name in event_names or []:
+            if name not in abi_events:
+                raise ValueError(f"Event {name} not found in tracked ABI for {address}")
+        datasets = list(dict.fromkeys(event_names or abi_events))
+        if self.include_transactions:
+            datasets.append(TRANSACTIONS_DATASET)
+
+        with self.indexer.Session() as session:
+            first_block = session.scalar(
+                select(func.min(IndexedEvent.block_number)).where(IndexedEvent.contract_address == address)
+            )
+
+        written = []
+        rows = 0
+        if first_block is not None and first_block <= final_block:
+            start = first_block - first_block % self.partition_blocks
+            while start <= final_block:
+                end = start + self.partition_blocks - 1
+                covered_to = min(end, final_block)
+                stale = [name for name in datasets
+                         if self._covered_to(self._partition_path(address, name, start, end)) < covered_to]
+                if stale:
+                    timestamps = self._block_timestamps(address, start, covered_to)
+                    for name in stale:
+                        count = self._write_partition(address, name, start, end, covered_to, timestamps)
+                        written.append(self._partition_path(address, name, start, end))
+                        rows += count
+                start = end + 1
+
+        logger.info('events_exported', contract=address, files=len(written), rows=rows, final_block=final_block,
+                    duration_ms=round((time.perf_counter() - started) * 1000, 2))
+        return {
+            'contract_address': address,
+            'exported_block': final_block if first_block is not None else None,
+            'indexed_block': indexed_block,
+            'files_written': len(written),
+            'rows_written': rows
+        }
+
+    def _partition_path(self, address: str, dataset: str, start: int, end: int) -> str:
+        return os.path.join(self.directory, address, dataset, f'{start:012d}-{end:012d}.arrow')
+
+    def _covered_to(self, path: str) -> int:
+        """Last block a partition file was written through, or -1 if there is none"""
+        if not os.path.exists(path):
+            return -1
+        with pa.memory_map(path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+        return int(metadata.get(b'covered_to', -1))
+
+    def _block_timestamps(self, address: str, from_block: int, to_block: int) -> Dict[int, int]:
+        """Timestamps of the blocks holding the contract's events in a range, fetched in JSON-RPC batches"""
+        with self.indexer.Session() as session:
+            blocks = list(session.scalars(
+                select(IndexedEvent.block_number).distinct()
+                .where(IndexedEvent.contract_address == address,
+                       IndexedEvent.block_number.between(from_block, to_block))
+            ))
+
+        timestamps = {}
+        for start in range(0, len(blocks), self.rpc_batch_size):
+            chunk = blocks[start:start + self.rpc_batch_size]
+            responses = JSONRPCBatch(self.w3).execute(
+                [('eth_getBlockByNumber', [hex(block), False]) for block in chunk]
+            )
+            for block, response in zip(chunk, responses):
+                if 'error' in response or not response.get('result'):
+                    raise ValueError(f"Could not read block {block}: "
+                                     f"{rpc_error_message(self.w3, response.get('error', 'block not found'))}")
+                timestamps[block] = int(response['result']['timestamp'], 16)
+        return timestamps
+
+    def _write_partition(self, address: str, dataset: str, start: int, end: int, covered_to: int,
+                         timestamps: Dict[int, int]) -> int:
+        if dataset == TRANSACTIONS_DATASET:
+            schema = self.transaction_schema()
+            batches = self._transaction_batches(address, start, covered_to, schema)
+        else:
+            schema = self.event_schema(address, dataset)
+            batches = self._event_batches(address, dataset, start, covered_to, timestamps, schema)
+
+        schema = schema.with_metadata({
+            'contract_address': address,
+            'dataset': dataset,
+            'from_block': str(start),
+            'to_block': str(end),
+            'covered_to': str(covered_to)
+        })
+        path = self._partition_path(address, dataset, start, end)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Readers keep mapping the old file until the new one is complete
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        rows = 0
+        with pa.OSFile(temporary_path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        os.replace(temporary_path, path)
+        return rows
+
+    def _event_rows(self, address: str, event_name: str, from_block: int, to_block: int) -> Iterator[List[Tuple]]:
+        """Indexed event rows in (block_number, log_index) order, in lists of row_batch_size"""
+        with self.indexer.Session() as session:
+            result = session.execute(
+                select(IndexedEvent.block_number, IndexedEvent.log_index, IndexedEvent.transaction_hash,
+                       IndexedEvent.args)
+                .where(IndexedEvent.contract_address == address,
+                       IndexedEvent.event_name == event_name,
+                       IndexedEvent.block_number.between(from_block, to_block))
+                .order_by(IndexedEvent.block_number, IndexedEvent.log_index)
+                .execution_options(yield_per=self.row_batch_size)
+            )
+            for partition in result.partitions():
+                yield partition
+
+    def _event_batches(self, address: str, event_name: str, from_block: int, to_block: int,
+                       timestamps: Dict[int, int], schema) -> Iterator:
+        arg_fields = list(schema)[4:]
+        arg_names = [item['name'] for item in self.indexer.get_event_abi(address, event_name)['inputs']]
+
+        for rows in self._event_rows(address, event_name, from_block, to_block):
+            columns = {field.name: [] for field in arg_fields}
+            for _, _, _, args in rows:
+                args = json.loads(args)
+                for field, name in zip(arg_fields, arg_names):
+                    value = args.get(name)
+                    if value is None:
+                        pass
+                    elif pa.types.is_decimal(field.type):
+                        value = _to_decimal(value)
+                    elif pa.types.is_string(field.type) and not isinstance(value, str):
+                        value = json.dumps(value)
+                    columns[field.name].append(value)
+
+            block_numbers = [row[0] for row in rows]
+            yield pa.record_batch([
+                pa.array(block_numbers, pa.uint64()),
+                pa.array([row[1] for row in rows], pa.uint32()),
+                pa.array([timestamps[block] for block in block_numbers], pa.timestamp('s', tz='UTC')),
+                pa.array([row[2] for row in rows], pa.string()),
+                *(pa.array(columns[field.name], field.type) for field in arg_fields)
+            ], schema=schema)
+
+    def _transaction_batches(self, address: str, from_block: int, to_block: int, schema) -> Iterator:
+        """Receipt details of every transaction that emitted an exported event of the contract"""
+        with self.indexer.Session() as session:
+            transactions = session.execute(
+                select(IndexedEvent.transaction_hash, func.min(IndexedEvent.block_number).label('block_number'))
+                .where(IndexedEvent.contract_address == address,
+                       IndexedEvent.block_number.between(from_block, to_block))
+                .group_by(IndexedEvent.transaction_hash)
+                .order_by('block_number', IndexedEvent.transaction_hash)
+            ).all()
+
+        for start in range(0, len(transactions), self.rpc_batch_size):
+            chunk = transactions[start:start + self.rpc_batch_size]
+            responses = JSONRPCBatch(self.w3).execute(
+                [('eth_getTransactionReceipt', [tx_hash]) for tx_hash, _ in chunk]
+            )
+            columns = {name: [] for name in schema.names}
+            for (tx_hash, block_number), response in zip(chunk, responses):
+                receipt = response.get('result')
+                if 'error' in response or not receipt:
+                    raise ValueError(f"Could not read receipt of {tx_hash}: "
+                                     f"{rpc_error_message(self.w3, response.get('error', 'receipt not found'))}")
+                gas_used = int(receipt['gasUsed'], 16)
+                gas_price = receipt.get('effectiveGasPrice')
+                gas_price = int(gas_price, 16) if gas_price else None
+                columns['block_number'].append(block_number)
+                columns['transaction_hash'].append(tx_hash)
+                columns['from'].append(Web3.to_checksum_address(receipt['from']))
+                columns['to'].append(Web3.to_checksum_address(receipt['to']) if receipt.get('to') else None)
+                columns['status'].append(int(receipt['status'], 16) if receipt.get('status') else None)
+                columns['gas_used'].append(gas_used)
+                columns['effective_gas_price'].append(gas_price)
+                columns['fee'].append(Decimal(gas_used * gas_price) if gas_price is not None else None)
+            yield pa.record_batch([pa.array(columns[field.name], field.type) for field in schema], schema=schema)
+
+    # Reads
+
+    def partitions(self, contract_address: str, dataset: str) -> List[Dict[str, Any]]:
+        """Exported partition files of one dataset, in block order"""
+        directory = os.path.join(self.directory, Web3.to_checksum_address(contract_address), dataset)
+        if not os.path.isdir(directory):
+            return []
+
+        partitions = []
+        for filename in sorted(os.listdir(directory)):
+            match = PARTITION_PATTERN.match(filename)
+            if match:
+                path = os.path.join(directory, filename)
+                partitions.append({
+                    'path': path,
+                    'from_block': int(match.group(1)),
+                    'to_block': int(match.group(2)),
+                    'covered_to': self._covered_to(path),
+                    'bytes': os.path.getsize(path)
+                })
+        return partitions
+
+    def manifest(self, contract_address: str) -> Dict[str, Any]:
+        """Exported datasets of a contract and the block range each one covers"""
+        address = Web3.to_checksum_address(contract_address)
+        directory = os.path.join(self.directory, address)
+        datasets = {}
+        for dataset in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+            partitions = self.partitions(address, dataset)
+            if partitions:
+                datasets[dataset] = {
+                    'files': len(partitions),
+                    'from_block': partitions[0]['from_block'],
+                    'covered_to': partitions[-1]['covered_to'],
+                    'bytes': sum(partition['bytes'] for partition in partitions)
+                }
+        return {'contract_address': address, 'datasets': datasets}
+
+    def query(self, contract_address: str, dataset: str, from_block: Optional[int] = None,
+              to_block: Optional[int] = None, filters: Optional[Dict[str, Any]] = None,
+              columns: Optional[List[str]] = None, group_by: Optional[List[str]] = None,
+              aggregates: Optional[List[str]] = None, order_by: Optional[str] = None,
+              descending: bool = False, limit: int = 1000):
+        """Filter, and optionally aggregate, one exported dataset; returns an Arrow table
+
+        group_by takes column names plus two derived keys: 'day' (the UTC
+        date of the block) and 'holder' (every address argument of an
+        event, so each Transfer counts for both sender and receiver).
+        aggregates are 'column:function' entries with function one of
+        AGGREGATE_FUNCTIONS, or 'count' for the number of rows.
+        """
+        files = [
+            partition['path'] for partition in self.partitions(contract_address, dataset)
+            if (from_block is None or partition['to_block'] >= from_block)
+            and (to_block is None or partition['from_block'] <= to_block)
+        ]
+        if not files:
+            raise ValueError(f"No exported {dataset} data for {contract_address} in the requested block range")
+
+        source = ds.dataset(files, format='ipc', filesystem=self.filesystem)
+        schema = source.schema
+        expression = self._filter_expression(schema, from_block, to_block, filters or {})
+
+        if not group_by:
+            if columns:
+                self._check_columns(schema, columns)
+            # Partitions are scanned in block order, so head stops reading after limit rows
+            return source.head(limit, columns=columns, filter=expression)
+
+        keys = list(group_by)
+        measures = self._parse_aggregates(aggregates or ['count'])
+        self._check_columns(schema, [key for key in keys if key not in ('day', 'holder')] +
+                            [column for column, _ in measures if column])
+        needed = {key for key in keys if key not in ('day', 'holder')} | {column for column, _ in measures if column}
+        if 'day' in keys:
+            needed.add('timestamp')
+        holder_columns = []
+        if 'holder' in keys:
+            holder_columns = [field.name for field in schema
+                              if (field.metadata or {}).get(b'abi_type') == b'address']
+            if not holder_columns:
+                raise ValueError(f"{dataset} has no address arguments to group by holder")
+            needed.update(holder_columns)
+
+        table = source.to_table(columns=sorted(needed), filter=expression)
+        if 'day' in keys:
+            table = table.append_column('day', pc.cast(pc.floor_temporal(table['timestamp'], unit='day'), pa.date32()))
+        if holder_columns:
+            # One row per (event, address argument); the zero address of mints and burns is not a holder
+            parts = []
+            for column in holder_columns:
+                part = table.append_column('holder', table[column])
+                parts.append(part.filter(pc.not_equal(part['holder'], '0x' + '00' * 20)))
+            table = pa.concat_tables(parts)
+
+        result = table.group_by(keys).aggregate([
+            ([], 'count_all') if column is None else (column, function) for column, function in measures
+        ])
+        if order_by:
+            self._check_columns(result.schema, [order_by])
+        result = result.sort_by([(order_by or keys[0], 'descending' if descending else 'ascending')])
+        return result.slice(0, limit)
+
+    @staticmethod
+    def _check_columns(schema, columns: List[str]):
+        missing = [column for column in columns if column not in schema.names]
+        if missing:
+            raise ValueError(f"Unknown columns: {', '.join(missing)}; available: {', '.join(schema.names)}")
+
+    @staticmethod
+    def _parse_aggregates(aggregates: List[str]) -> List[Tuple[Optional[str], str]]:
+        measures = []
+        for entry in aggregates:
+            column, _, function = entry.rpartition(':')
+            if entry == 'count':
+                measures.append((None, 'count'))
+            elif column and function in AGGREGATE_FUNCTIONS:
+                measures.append((column, function))
+            else:
+                raise ValueError(f"Invalid aggregate {entry}; use 'count' or column:function "
+                                 f"with function one of {', '.join(AGGREGATE_FUNCTIONS)}")
+        return measures
+
+    def _filter_expression(self, schema, from_block: Optional[int], to_block: Optional[int],
+                           filters: Dict[str, Any]):
+        """Dataset filter: block range plus {column: value or [values]} equality filters"""
+        expression = ds.scalar(True)
+        if from_block is not None:
+            expression &= ds.field('block_number') >= from_block
+        if to_block is not None:
+            expression &= ds.field('block_number') <= to_block
+
+        self._check_columns(schema, list(filters))
+        for column, value in filters.items():
+            field = schema.field(column)
+            values = value if isinstance(value, list) else [value]
+            if (field.metadata or {}).get(b'abi_type') == b'address' or column in ('from', 'to'):
+                values = [Web3.to_checksum_address(item) for item in values]
+            elif pa.types.is_decimal(field.type):
+                values = [Decimal(int(item)) for item in values]
+            expression &= ds.field(column).isin(pa.array(values, field.type))
+        return expression
+
+
+def table_to_columns(table) -> Dict[str, List[Any]]:
+    """JSON-ready column lists; big integers and timestamps become strings so no precision is lost"""
+    columns = {}
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_decimal(column.type) or pa.types.is_temporal(column.type):
+            column = pc.cast(column, pa.string())
+        columns[name] = column.to_pylist()
+    return columns
+
+
+def table_to_ipc(table) -> bytes:
+    """Serialize a result table as an Arrow IPC stream, readable with pyarrow.ipc.open_stream"""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def create_event_exporter(indexer: Optional[EventIndexer], w3: Web3, config) -> Optional[EventExporter]:
+    """Build the columnar exporter over the event index, or None when disabled"""
+    if not config.EXPORT_ENABLED or indexer is None:
+        return None
+
+    return EventExporter(
+        indexer,
+        w3,
+        config.EXPORT_DIR,
+        partition_blocks=config.EXPORT_PARTITION_BLOCKS,
+        finality_depth=config.INDEXER_REORG_WINDOW,
+        include_transactions=config.EXPORT_INCLUDE_TRANSACTIONS,
+        rpc_batch_size=config.EXPORT_RPC_BATCH_SIZE
+    )
+
+
+if __name__ == '__main__':
+    # Export every tracked contract, e.g. from cron next to a standalone event indexer
+    import sys
+    from config import Config
+    from contract_handler import ContractHandler
+    from event_indexer import create_event_indexer
+
+    handler = ContractHandler()
+    exporter = create_event_exporter(create_event_indexer(handler.w3, Config, handler.load_contract_abi),
+                                     handler.w3, Config)
+    if exporter is None:
+        raise SystemExit("Set INDEXER_ENABLED=true and EXPORT_ENABLED=true to export events")
+    for contract in sys.argv[1:] or exporter.indexer.tracked_contracts():
+        print(json.dumps(exporter.export(contract)))
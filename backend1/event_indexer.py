@@ -0,0 +1,434 @@
+import json
+import threading
+from typing import Dict, List, Any, Optional, Callable
+from eth_abi import encode as abi_encode
+from eth_utils import event_abi_to_log_topic
+from hexbytes import HexBytes
+from sqlalchemy import (
+    create_engine, event, select, delete, and_, or_, func,
+    String, Integer, Text, Index, UniqueConstraint
+)
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
+from web3 import Web3
+from logging_config import configure_logging, get_logger
+from serialization import to_jsonable
+
+logger = get_logger(__name__)
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class TrackedContract(Base):
+    """A contract whose logs are ingested into the index"""
+    __tablename__ = 'tracked_contracts'
+
+    address: Mapped[str] = mapped_column(String(42), primary_key=True)
+    abi: Mapped[str] = mapped_column(Text)
+    start_block: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class IndexerCheckpoint(Base):
+    """Block hash recorded after each ingested chunk, used to detect reorgs"""
+    __tablename__ = 'indexer_checkpoints'
+    __table_args__ = (
+        Index('ix_checkpoints_contract_block', 'contract_address', 'block_number'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    contract_address: Mapped[str] = mapped_column(String(42))
+    block_number: Mapped[int] = mapped_column(Integer)
+    block_hash: Mapped[str] = mapped_column(String(66))
+
+
+class IndexedEvent(Base):
+    """A decoded contract event"""
+    __tablename__ = 'indexed_events'
+    __table_args__ = (
+        UniqueConstraint('block_hash', 'log_index', name='uq_events_block_log'),
+        Index('ix_events_contract_event_block', 'contract_address', 'event_name', 'block_number', 'log_index'),
+        Index('ix_events_topic1', 'contract_address', 'event_name', 'topic1', 'block_number'),
+        Index('ix_events_topic2', 'contract_address', 'event_name', 'topic2', 'block_number'),
+        Index('ix_events_topic3', 'contract_address', 'event_name', 'topic3', 'block_number'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    contract_address: Mapped[str] = mapped_column(String(42))
+    event_name: Mapped[str] = mapped_column(String(128))
+    block_number: Mapped[int] = mapped_column(Integer)
+    block_hash: Mapped[str] = mapped_column(String(66))
+    transaction_hash: Mapped[str] = mapped_column(String(66))
+    log_index: Mapped[int] = mapped_column(Integer)
+    topic1: Mapped[Optional[str]] = mapped_column(String(66), nullable=True)
+    topic2: Mapped[Optional[str]] = mapped_column(String(66), nullable=True)
+    topic3: Mapped[Optional[str]] = mapped_column(String(66), nullable=True)
+    args: Mapped[str] = mapped_column(Text)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Same shape as ContractHandler.get_contract_events results"""
+        return {
+            'event': self.event_name,
+            'transaction_hash': self.transaction_hash,
+            'block_number': self.block_number,
+            'args': json.loads(self.args),
+            'address': self.contract_address,
+            'log_index': self.log_index
+        }
+
+
+class EventIndexer:
+    """Background indexer that tails new blocks into a local event store
+
+    Logs are fetched per tracked contract in adaptive block-range chunks,
+    sized per contract: a chunk shrinks when the provider rejects a range
+    and grows again while requests succeed. After each chunk the block hash
+    at the chunk end is checkpointed; if a later check finds a different
+    hash at that height, events are rolled back to the newest checkpoint
+    still on the canonical chain and re-ingested. The hash is read before
+    the logs, so a reorg between the two reads shows up as a mismatch on
+    the next check instead of being recorded as canonical.
+    """
+
+    def __init__(self, w3: Web3, database_url: str, chunk_size: int = 2000,
+                 max_chunk_size: int = 10000, reorg_window: int = 64, poll_interval: float = 2.0):
+        self.w3 = w3
+        self.chunk_size = chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.reorg_window = reorg_window
+        self.poll_interval = poll_interval
+
+        connect_args = {'check_same_thread': False} if database_url.startswith('sqlite') else {}
+        self.engine = create_engine(database_url, connect_args=connect_args)
+        if database_url.startswith('sqlite'):
+            event.listen(self.engine, 'connect', _enable_sqlite_wal)
+        Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(self.engine, expire_on_commit=False)
+
+        self._contracts: Dict[str, Dict[str, Any]] = {}
+        self._chunk_sizes: Dict[str, int] = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_error = None
+
+        with self.Session() as session:
+            for tracked in session.scalars(select(TrackedContract)):
+                self._register(tracked.address, json.loads(tracked.abi))
+
+    def add_listener(self, listener):
+        """Register a derived-table listener
+
+        The listener provides on_events(session, address, events) and
+        on_rollback(session, address, removed_events); both run inside the
+        indexer's transaction so derived tables never drift from the events.
+        """
+        self._listeners.append(listener)
+
+    def _register(self, address: str, abi: List[Dict]):
+        contract = self.w3.eth.contract(address=address, abi=abi)
+        events_by_topic = {}
+        for item in abi:
+            if item.get('type') == 'event' and not item.get('anonymous'):
+                events_by_topic[HexBytes(event_abi_to_log_topic(item))] = (
+                    item, getattr(contract.events, item['name'])()
+                )
+        self._contracts[address] = {'abi': abi, 'events_by_topic': events_by_topic}
+
+    def track(self, contract_address: str, abi: List[Dict], start_block: int = 0):
+        """Start indexing a contract from start_block"""
+        if not Web3.is_address(contract_address):
+            raise ValueError(f"Invalid contract address: {contract_address}")
+        address = Web3.to_checksum_address(contract_address)
+
+        with self.Session() as session, session.begin():
+            session.merge(TrackedContract(address=address, abi=json.dumps(abi), start_block=start_block))
+
+        with self._lock:
+            self._register(address, abi)
+        logger.info('indexer_tracking', contract=address, from_block=start_block)
+
+    def tracked_contracts(self) -> List[str]:
+        return list(self._contracts)
+
+    def get_abi(self, contract_address: str) -> List[Dict]:
+        return self._contracts[Web3.to_checksum_address(contract_address)]['abi']
+
+    def get_event_abi(self, contract_address: str, event_name: str) -> Optional[Dict]:
+        return next(
+            (item for item in self.get_abi(contract_address)
+             if item.get('type') == 'event' and item.get('name') == event_name),
+            None
+        )
+
+    def is_tracked(self, contract_address: str) -> bool:
+        return Web3.is_address(contract_address) and Web3.to_checksum_address(contract_address) in self._contracts
+
+    def indexed_block(self, contract_address: str) -> Optional[int]:
+        """Highest block fully ingested for a contract"""
+        address = Web3.to_checksum_address(contract_address)
+        with self.Session() as session:
+            return session.scalar(
+                select(func.max(IndexerCheckpoint.block_number))
+                .where(IndexerCheckpoint.contract_address == address)
+            )
+
+    def start(self):
+        """Start tailing new blocks in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='event-indexer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 5)
+
+    def run_forever(self):
+        """Poll for new blocks until stopped"""
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error('indexer_iteration_failed', error=str(e))
+            self._stop.wait(self.poll_interval)
+
+    def run_once(self) -> int:
+        """Ingest all tracked contracts up to the current head; returns events stored"""
+        head = self.w3.eth.block_number
+        stored = 0
+        for address in list(self._contracts):
+            stored += self._sync_contract(address, head)
+        return stored
+
+    def _sync_contract(self, address: str, head: int) -> int:
+        next_block = self._check_reorg(address)
+        stored = 0
+
+        while next_block <= head and not self._stop.is_set():
+            chunk_size = self._chunk_sizes.get(address, self.chunk_size)
+            to_block = min(head, next_block + chunk_size - 1)
+            block_hash = Web3.to_hex(self.w3.eth.get_block(to_block)['hash'])
+            try:
+                logs = self.w3.eth.get_logs({'address': address, 'fromBlock': next_block, 'toBlock': to_block})
+            except Exception as e:
+                if to_block > next_block:
+                    # Most providers reject wide ranges or large result sets; retry narrower
+                    self._chunk_sizes[address] = max(1, (to_block - next_block + 1) // 2)
+                    logger.info('indexer_chunk_shrunk', contract=address, chunk_size=self._chunk_sizes[address],
+                                error=str(e))
+                    continue
+                raise
+
+            if any(log['blockNumber'] == to_block and Web3.to_hex(log['blockHash']) != block_hash for log in logs):
+                # The chain end moved between the two reads; fetch the chunk again
+                continue
+            stored += self._ingest(address, logs, to_block, block_hash)
+            next_block = to_block + 1
+            self._chunk_sizes[address] = min(self.max_chunk_size, int(chunk_size * 1.5) + 1)
+
+        return stored
+
+    def _ingest(self, address: str, logs: List, to_block: int, block_hash: str) -> int:
+        events_by_topic = self._contracts[address]['events_by_topic']
+        rows = []
+        for log in logs:
+            if not log['topics'] or log.get('removed'):
+                continue
+            match = events_by_topic.get(HexBytes(log['topics'][0]))
+            if match is None:
+                continue
+            event_abi, event_decoder = match
+            decoded = event_decoder.process_log(log)
+            topics = [Web3.to_hex(topic) for topic in log['topics'][1:]] + [None, None, None]
+            rows.append(IndexedEvent(
+                contract_address=address,
+                event_name=event_abi['name'],
+                block_number=log['blockNumber'],
+                block_hash=Web3.to_hex(log['blockHash']),
+                transaction_hash=Web3.to_hex(log['transactionHash']),
+                log_index=log['logIndex'],
+                topic1=topics[0],
+                topic2=topics[1],
+                topic3=topics[2],
+                args=json.dumps(to_jsonable(decoded['args']))
+            ))
+
+        with self.Session() as session, session.begin():
+            session.add_all(rows)
+            session.add(IndexerCheckpoint(contract_address=address, block_number=to_block, block_hash=block_hash))
+            # Only checkpoints inside the reorg window are needed to find a common ancestor
+            session.execute(delete(IndexerCheckpoint).where(
+                IndexerCheckpoint.contract_address == address,
+                IndexerCheckpoint.block_number < to_block - self.reorg_window
+            ))
+
+            # Derived tables are updated in the same transaction as the events
+            if rows:
+                events = [row.to_dict() for row in rows]
+                for listener in self._listeners:
+                    listener.on_events(session, address, events)
+        return len(rows)
+
+    def _check_reorg(self, address: str) -> int:
+        """Roll back past any reorg and return the next block to ingest"""
+        with self.Session() as session:
+            checkpoints = session.scalars(
+                select(IndexerCheckpoint)
+                .where(IndexerCheckpoint.contract_address == address)
+                .order_by(IndexerCheckpoint.block_number.desc())
+            ).all()
+            start_block = session.get(TrackedContract, address).start_block
+
+        if not checkpoints:
+            return start_block
+
+        ancestor = None
+        for checkpoint in checkpoints:
+            chain_block = self.w3.eth.get_block(checkpoint.block_number)
+            if Web3.to_hex(chain_block['hash']) == checkpoint.block_hash:
+                ancestor = checkpoint.block_number
+                break
+
+        if ancestor == checkpoints[0].block_number:
+            return ancestor + 1
+
+        # Reorg deeper than the window falls back to a full re-index
+        rollback_to = ancestor if ancestor is not None else start_block - 1
+        logger.warning('indexer_reorg', contract=address, rollback_to=rollback_to)
+        with self.Session() as session, session.begin():
+            if self._listeners:
+                removed = session.scalars(
+                    select(IndexedEvent)
+                    .where(IndexedEvent.contract_address == address, IndexedEvent.block_number > rollback_to)
+                    .order_by(IndexedEvent.block_number, IndexedEvent.log_index)
+                ).all()
+                removed_events = [row.to_dict() for row in removed]
+                for listener in self._listeners:
+                    listener.on_rollback(session, address, removed_events)
+
+            session.execute(delete(IndexedEvent).where(
+                IndexedEvent.contract_address == address,
+                IndexedEvent.block_number > rollback_to
+            ))
+            session.execute(delete(IndexerCheckpoint).where(
+                IndexerCheckpoint.contract_address == address,
+                IndexerCheckpoint.block_number > rollback_to
+            ))
+        return rollback_to + 1
+
+    def _topic_filter(self, address: str, event_name: str, filters: Dict[str, Any]) -> List:
+        """Translate {indexed_arg: value} filters into topic column conditions"""
+        event_abi = self.get_event_abi(address, event_name)
+        if event_abi is None:
+            raise ValueError(f"Event {event_name} not found in tracked ABI for {address}")
+
+        indexed_inputs = [item for item in event_abi['inputs'] if item.get('indexed')]
+        columns = [IndexedEvent.topic1, IndexedEvent.topic2, IndexedEvent.topic3]
+        conditions = []
+        for name, value in filters.items():
+            position = next((i for i, item in enumerate(indexed_inputs) if item['name'] == name), None)
+            if position is None:
+                raise ValueError(f"{name} is not an indexed argument of {event_name}")
+            abi_type = indexed_inputs[position]['type']
+            if abi_type in ('bytes', 'string') or abi_type.endswith(']') or abi_type.startswith('tuple'):
+                # Dynamic indexed values are stored as their keccak hash
+                raise ValueError(f"Filtering on dynamic indexed argument {name} is not supported")
+            if abi_type == 'address':
+                value = Web3.to_checksum_address(value)
+            conditions.append(columns[position] == Web3.to_hex(abi_encode([abi_type], [value])))
+        return conditions
+
+    def query_events(self, contract_address: str, event_name: str, from_block: Optional[int] = None,
+                     to_block: Optional[int] = None, filters: Optional[Dict[str, Any]] = None,
+                     limit: int = 100, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Page through indexed events ordered by (block_number, log_index)"""
+        address = Web3.to_checksum_address(contract_address)
+        conditions = [IndexedEvent.contract_address == address, IndexedEvent.event_name == event_name]
+
+        if from_block is not None:
+            conditions.append(IndexedEvent.block_number >= from_block)
+        if to_block is not None:
+            conditions.append(IndexedEvent.block_number <= to_block)
+        if filters:
+            conditions.extend(self._topic_filter(address, event_name, filters))
+        if cursor:
+            cursor_block, cursor_log = (int(part) for part in cursor.split(':'))
+            conditions.append(or_(
+                IndexedEvent.block_number > cursor_block,
+                and_(IndexedEvent.block_number == cursor_block, IndexedEvent.log_index > cursor_log)
+            ))
+
+        with self.Session() as session:
+            rows = session.scalars(
+                select(IndexedEvent)
+                .where(*conditions)
+                .order_by(IndexedEvent.block_number, IndexedEvent.log_index)
+                .limit(limit + 1)
+            ).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'events': [row.to_dict() for row in rows],
+            'next_cursor': f"{rows[-1].block_number}:{rows[-1].log_index}" if has_more else None,
+            'indexed_block': self.indexed_block(address)
+        }
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'chunk_size': self.chunk_size,
+            'chunk_sizes': dict(self._chunk_sizes),
+            'last_error': self.last_error,
+            'contracts': {address: self.indexed_block(address) for address in self._contracts}
+        }
+
+
+def _enable_sqlite_wal(dbapi_connection, connection_record):
+    """Let API readers query while the indexer thread writes"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.close()
+
+
+def create_event_indexer(w3: Web3, config, load_abi: Callable[[str], List[Dict]]) -> Optional[EventIndexer]:
+    """Build the event indexer and track contracts listed in configuration"""
+    if not config.INDEXER_ENABLED:
+        return None
+
+    indexer = EventIndexer(
+        w3,
+        config.INDEXER_DATABASE_URL,
+        chunk_size=config.INDEXER_CHUNK_SIZE,
+        max_chunk_size=config.INDEXER_MAX_CHUNK_SIZE,
+        reorg_window=config.INDEXER_REORG_WINDOW,
+        poll_interval=config.INDEXER_POLL_INTERVAL
+    )
+
+    # INDEXER_CONTRACTS entries look like address=abi_path[@start_block]
+    for entry in config.INDEXER_CONTRACTS:
+        address, _, spec = entry.partition('=')
+        abi_path, _, start_block = spec.partition('@')
+        if not indexer.is_tracked(address):
+            indexer.track(address, load_abi(abi_path), int(start_block or 0))
+
+    return indexer
+
+
+if __name__ == '__main__':
+    # Run the indexer on its own, e.g. when the API runs several gunicorn workers
+    from config import Config
+    from contract_handler import ContractHandler
+
+    configure_logging(Config)
+    handler = ContractHandler()
+    standalone = create_event_indexer(handler.w3, Config, handler.load_contract_abi)
+    if standalone is None:
+        raise SystemExit("Set INDEXER_ENABLED=true to run the event indexer")
+    standalone.run_forever()
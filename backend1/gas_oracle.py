@@ -0,0 +1,272 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+from web3 import Web3
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def _percentile(values: List[int], pct: float) -> int:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _is_unsupported_method(error: Exception) -> bool:
+    details = error.args[0] if error.args and isinstance(error.args[0], dict) else {}
+    message = str(details.get('message', error)).lower()
+    return details.get('code') == -32601 or 'not implemented' in message or 'not supported' in message
+
+
+class GasOracle:
+    """EIP-1559 fee suggestions from a rolling window of eth_feeHistory samples
+
+    A background thread fetches fee history for the blocks added since the
+    last refresh, so each refresh costs one RPC call no matter how many
+    sends are in flight. For each urgency level, the priority fee is a
+    percentile of the per-block reward percentiles over the window. The
+    max fee is the pending base fee times base_fee_multiplier, which
+    survives several full blocks, plus that priority fee. Chains without
+    a base fee fall back to eth_gasPrice, refreshed on the same timer.
+    """
+
+    def __init__(self, w3: Web3, urgency_percentiles: Dict[str, float], default_urgency: str = 'standard',
+                 refresh_interval: float = 6.0, window_blocks: int = 100, base_fee_multiplier: float = 2.0,
+                 max_fee_cap: Optional[int] = None):
+        if default_urgency not in urgency_percentiles:
+            raise ValueError(f"Default urgency {default_urgency} is not configured")
+
+        self.w3 = w3
+        self.urgency_percentiles = urgency_percentiles
+        self.default_urgency = default_urgency
+        self.refresh_interval = refresh_interval
+        self.window_blocks = window_blocks
+        self.base_fee_multiplier = base_fee_multiplier
+        self.max_fee_cap = max_fee_cap
+
+        # Percentile list requested from the node, in the order rewards come back
+        self._reward_percentiles = sorted(set(urgency_percentiles.values()))
+        self._rewards: 'OrderedDict[int, List[int]]' = OrderedDict()
+        self._pending_base_fee: Optional[int] = None
+        self._legacy_gas_price: Optional[int] = None
+        self._supports_1559: Optional[bool] = None
+        self._updated_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='gas-oracle', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning('gas_oracle_refresh_failed', error=str(e))
+            if self._stop.wait(self.refresh_interval):
+                break
+
+    def refresh(self):
+        """Fetch fee history for blocks not yet in the window"""
+        if self._supports_1559 is False:
+            gas_price = self.w3.eth.gas_price
+            with self._lock:
+                self._legacy_gas_price = gas_price
+                self._updated_at = time.monotonic()
+            return
+
+        with self._lock:
+            newest_known = next(reversed(self._rewards)) if self._rewards else None
+        head = self.w3.eth.block_number
+        block_count = self.window_blocks if newest_known is None else min(head - newest_known, self.window_blocks)
+        if block_count <= 0 and self._pending_base_fee is not None:
+            # No new block since the last pass, so the window is still current
+            with self._lock:
+                self._updated_at = time.monotonic()
+            return
+
+        try:
+            history = self.w3.eth.fee_history(max(block_count, 1), head, self._reward_percentiles)
+        except ValueError as e:
+            if self._supports_1559 is None and _is_unsupported_method(e):
+                logger.info('gas_oracle_fallback', reason='eth_feeHistory unsupported')
+                self._supports_1559 = False
+                return self.refresh()
+            raise
+
+        base_fees = history['baseFeePerGas']
+        if not any(base_fees):
+            logger.info('gas_oracle_fallback', reason='no base fee')
+            self._supports_1559 = False
+            return self.refresh()
+
+        with self._lock:
+            self._supports_1559 = True
+            for offset, rewards in enumerate(history.get('reward') or []):
+                self._rewards[history['oldestBlock'] + offset] = rewards
+            while len(self._rewards) > self.window_blocks:
+                self._rewards.popitem(last=False)
+            # The last base fee is the one for the next (pending) block
+            self._pending_base_fee = base_fees[-1]
+            self._updated_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        # The sampler starts on first use; until its first pass (or if it stalls) refresh inline
+        if self._thread is None:
+            self.start()
+        if time.monotonic() - self._updated_at > max(self.refresh_interval * 3, 1.0):
+            self.refresh()
+
+    def get_fees(self, urgency: str = None) -> Dict[str, int]:
+        """Fee fields for a transaction at the given urgency level"""
+        urgency = urgency or self.default_urgency
+        if urgency not in self.urgency_percentiles:
+            raise ValueError(f"Unknown urgency '{urgency}'; expected one of {sorted(self.urgency_percentiles)}")
+        self._ensure_fresh()
+
+        with self._lock:
+            if not self._supports_1559:
+                return {'gasPrice': self._legacy_gas_price}
+
+            column = self._reward_percentiles.index(self.urgency_percentiles[urgency])
+            samples = [rewards[column] for rewards in self._rewards.values() if rewards]
+            priority_fee = _percentile(samples, self.urgency_percentiles[urgency]) if samples else 0
+            base_fee = self._pending_base_fee
+
+        max_fee = int(base_fee * self.base_fee_multiplier) + priority_fee
+        if self.max_fee_cap:
+            max_fee = min(max_fee, self.max_fee_cap)
+            priority_fee = min(priority_fee, max_fee)
+        return {'maxFeePerGas': max_fee, 'maxPriorityFeePerGas': priority_fee}
+
+    def get_gas_price(self) -> int:
+        """Single effective gas price for display, e.g. the health check"""
+        fees = self.get_fees()
+        if 'gasPrice' in fees:
+            return fees['gasPrice']
+        with self._lock:
+            return min(self._pending_base_fee + fees['maxPriorityFeePerGas'], fees['maxFeePerGas'])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'eip1559': self._supports_1559,
+                'pending_base_fee': self._pending_base_fee,
+                'window_blocks': len(self._rewards),
+                'age_seconds': round(time.monotonic() - self._updated_at, 2) if self._updated_at else None
+            }
+
+
+def _arg_key(value: Any) -> Any:
+    """Hashable form of a call argument for the estimate cache"""
+    if isinstance(value, str) and Web3.is_address(value):
+        return value.lower()
+    if isinstance(value, (bytes, bytearray)):
+        return Web3.to_hex(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_arg_key(item) for item in value)
+    if isinstance(value, dict):
+        return tuple((key, _arg_key(item)) for key, item in sorted(value.items()))
+    return value
+
+
+class GasEstimateCache:
+    """Cache eth_estimateGas results per (contract, function, sender, arguments, value)
+
+    Gas depends on the storage a call touches, which depends on who sends
+    it and with which arguments, so only repeats of the same call from
+    the same sender share an estimate; a cached estimate plus a safety
+    margin then replaces the estimation round trip. The highest estimate
+    seen for a key is kept until it expires.
+    """
+
+    def __init__(self, margin: float = 0.2, ttl: float = 300.0, max_entries: int = 5000):
+        self.margin = margin
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple, Tuple[int, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(contract_address: str, function_name: str, function_args: List, value: int,
+                 sender: Optional[str]) -> Tuple:
+        return (contract_address.lower(), function_name, (sender or '').lower(),
+                _arg_key(list(function_args or [])), int(value or 0))
+
+    def get(self, key: Tuple) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Tuple, estimate: int) -> int:
+        """Record a raw estimate and return the gas limit to use"""
+        gas_limit = int(estimate * (1 + self.margin))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[1] <= self.ttl:
+                gas_limit = max(gas_limit, entry[0])
+            self._entries[key] = (gas_limit, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return gas_limit
+
+    def invalidate(self, key: Tuple):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def parse_urgency_percentiles(spec: str) -> Dict[str, float]:
+    """Parse 'slow:10,standard:50,fast:90' into {'slow': 10.0, ...}"""
+    levels = {}
+    for entry in spec.split(','):
+        name, _, pct = entry.strip().partition(':')
+        if name:
+            levels[name] = float(pct)
+    return levels
+
+
+def create_gas_oracle(w3: Web3, config) -> Optional[GasOracle]:
+    """Build the fee oracle when enabled; otherwise sends use GAS_PRICE_GWEI"""
+    if not config.GAS_ORACLE_ENABLED:
+        return None
+
+    return GasOracle(
+        w3,
+        parse_urgency_percentiles(config.GAS_URGENCY_PERCENTILES),
+        default_urgency=config.GAS_DEFAULT_URGENCY,
+        refresh_interval=config.GAS_ORACLE_REFRESH_INTERVAL,
+        window_blocks=config.GAS_ORACLE_WINDOW_BLOCKS,
+        base_fee_multiplier=config.GAS_BASE_FEE_MULTIPLIER,
+        max_fee_cap=Web3.to_wei(config.GAS_MAX_FEE_GWEI, 'gwei') if config.GAS_MAX_FEE_GWEI else None
+    )
+
+
+def create_gas_estimate_cache(config) -> Optional[GasEstimateCache]:
+    """Build the estimate cache when enabled; otherwise sends use the fixed GAS_LIMIT"""
+    if not config.GAS_ESTIMATE_ENABLED:
+        return None
+
+    return GasEstimateCache(margin=config.GAS_ESTIMATE_MARGIN, ttl=config.GAS_ESTIMATE_TTL)
@@ -0,0 +1,24 @@
+"""Gunicorn settings, picked up automatically when gunicorn runs from this directory
+
+Workers are threaded (gthread) with WORKER_THREADS threads each; every
+server-sent event stream holds one of them for as long as it is open,
+and the app caps streams below that number.
+
+With --preload the app is created once in the master and forked into
+the workers. Warm-up must then run per worker, after the fork: a
+connection pool or thread started in the master is not usable in its
+children.
+"""
+import os
+
+# Workers warm up from post_worker_init instead of the (possibly preloaded) app factory
+os.environ.setdefault('WARMUP_ON_START', 'false')
+
+worker_class = 'gthread'
+threads = int(os.environ.get('WORKER_THREADS', 32))
+
+
+def post_worker_init(worker):
+    runtime = worker.wsgi.extensions.get('worker_runtime')
+    if runtime is not None:
+        runtime.start_warmup()
@@ -0,0 +1,307 @@
+from typing import Dict, List, Any, Iterator, Optional
+from sqlalchemy import select, delete, func, and_, or_, String, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from web3 import Web3
+from event_indexer import Base, EventIndexer, IndexedEvent
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+
+# uint256 has at most 78 decimal digits; zero-padding makes string order numeric order
+BALANCE_DIGITS = 78
+
+
+class TokenHolderBalance(Base):
+    """Current balance of one holder of one token, derived from Transfer events"""
+    __tablename__ = 'token_holder_balances'
+    __table_args__ = (
+        Index('ix_holder_balances_token_balance', 'token_address', 'balance'),
+    )
+
+    token_address: Mapped[str] = mapped_column(String(42), primary_key=True)
+    holder_address: Mapped[str] = mapped_column(String(42), primary_key=True)
+    balance: Mapped[str] = mapped_column(String(BALANCE_DIGITS))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'holder': self.holder_address, 'balance': str(int(self.balance))}
+
+    @property
+    def cursor(self) -> str:
+        """Keyset position (balance:holder) in get_holders order"""
+        return f"{int(self.balance)}:{self.holder_address}"
+
+
+class TokenHolderDeficit(Base):
+    """Negative derived balance of one holder, kept until later events cover it
+
+    A debit with no matching credit means the index is missing events
+    (e.g. the start block is after the token's deployment). The deficit
+    is kept so later credits and reorg reverts net against it, and so the
+    token can be found and reconciled; holders with a deficit are not
+    listed as holders.
+    """
+    __tablename__ = 'token_holder_deficits'
+
+    token_address: Mapped[str] = mapped_column(String(42), primary_key=True)
+    holder_address: Mapped[str] = mapped_column(String(42), primary_key=True)
+    deficit: Mapped[str] = mapped_column(String(BALANCE_DIGITS))
+
+
+def _encode_balance(value: int) -> str:
+    return str(value).zfill(BALANCE_DIGITS)
+
+
+def _after_cursor(cursor: str):
+    """Condition selecting the holders after a balance:holder cursor, in balance-descending order"""
+    balance, holder = cursor.split(':')
+    balance = _encode_balance(int(balance))
+    holder = Web3.to_checksum_address(holder)
+    return or_(
+        TokenHolderBalance.balance < balance,
+        and_(TokenHolderBalance.balance == balance, TokenHolderBalance.holder_address > holder)
+    )
+
+
+class HolderBalanceTracker:
+    """Materialized holder -> balance table for indexed ERC-20 style tokens
+
+    Registered as an EventIndexer listener: every ingested Transfer applies
+    its debit and credit in the same transaction that stores the event, and
+    events removed by a reorg are reverted the same way. Balances are kept
+    as zero-padded decimal strings so the (token, balance) index serves
+    top-N and range queries for full uint256 values.
+    """
+
+    def __init__(self, indexer: EventIndexer):
+        self.indexer = indexer
+        Base.metadata.create_all(indexer.engine)
+        indexer.add_listener(self)
+
+        # Backfill tokens whose events were indexed before the tracker existed
+        for address in indexer.tracked_contracts():
+            if self.is_token(address) and not self._has_rows(address):
+                self.rebuild(address)
+
+    def is_token(self, token_address: str) -> bool:
+        """Whether the contract is indexed and emits Transfer(from, to, value)"""
+        if not self.indexer.is_tracked(token_address):
+            return False
+        event_abi = self.indexer.get_event_abi(token_address, 'Transfer')
+        return event_abi is not None and len(event_abi['inputs']) == 3
+
+    def _has_rows(self, address: str) -> bool:
+        with self.indexer.Session() as session:
+            return session.scalar(
+                select(TokenHolderBalance.holder_address)
+                .where(TokenHolderBalance.token_address == address)
+                .limit(1)
+            ) is not None
+
+    def on_events(self, session, address: str, events: List[Dict[str, Any]]):
+        self._apply(session, address, events, sign=1)
+
+    def on_rollback(self, session, address: str, removed_events: List[Dict[str, Any]]):
+        self._apply(session, address, removed_events, sign=-1)
+
+    def _apply(self, session, address: str, events: List[Dict[str, Any]], sign: int):
+        # Net the deltas first so each holder row is read and written once per chunk
+        deltas: Dict[str, int] = {}
+        for event in events:
+            if event['event'] != 'Transfer':
+                continue
+            sender, receiver, value = list(event['args'].values())
+            value = int(value)
+            if sender != ZERO_ADDRESS:
+                deltas[sender] = deltas.get(sender, 0) - sign * value
+            if receiver != ZERO_ADDRESS:
+                deltas[receiver] = deltas.get(receiver, 0) + sign * value
+
+        if not deltas:
+            return
+
+        existing = {
+            row.holder_address: row
+            for row in session.scalars(
+                select(TokenHolderBalance).where(
+                    TokenHolderBalance.token_address == address,
+                    TokenHolderBalance.holder_address.in_(list(deltas))
+                )
+            )
+        }
+        deficits = {
+            row.holder_address: row
+            for row in session.scalars(
+                select(TokenHolderDeficit).where(
+                    TokenHolderDeficit.token_address == address,
+                    TokenHolderDeficit.holder_address.in_(list(deltas))
+                )
+            )
+        }
+        for holder, delta in deltas.items():
+            if delta == 0:
+                continue
+            row = existing.get(holder)
+            deficit = deficits.get(holder)
+            if row:
+                balance = int(row.balance) + delta
+            else:
+                balance = (-int(deficit.deficit) if deficit else 0) + delta
+
+            if balance > 0:
+                if row:
+                    row.balance = _encode_balance(balance)
+                else:
+                    session.add(TokenHolderBalance(
+                        token_address=address,
+                        holder_address=holder,
+                        balance=_encode_balance(balance)
+                    ))
+            elif row:
+                session.delete(row)
+
+            if balance < 0:
+                logger.warning('negative_holder_balance', token=address, holder=holder)
+                if deficit:
+                    deficit.deficit = _encode_balance(-balance)
+                else:
+                    session.add(TokenHolderDeficit(
+                        token_address=address,
+                        holder_address=holder,
+                        deficit=_encode_balance(-balance)
+                    ))
+            elif deficit:
+                session.delete(deficit)
+
+    def rebuild(self, token_address: str):
+        """Recompute a token's balances from every indexed Transfer event"""
+        address = Web3.to_checksum_address(token_address)
+        with self.indexer.Session() as session, session.begin():
+            session.execute(delete(TokenHolderBalance).where(TokenHolderBalance.token_address == address))
+            session.execute(delete(TokenHolderDeficit).where(TokenHolderDeficit.token_address == address))
+            rows = session.scalars(
+                select(IndexedEvent)
+                .where(IndexedEvent.contract_address == address, IndexedEvent.event_name == 'Transfer')
+                .order_by(IndexedEvent.block_number, IndexedEvent.log_index)
+            )
+            self._apply(session, address, [row.to_dict() for row in rows], sign=1)
+        logger.info('holder_balances_rebuilt', token=address)
+
+    def get_balance(self, token_address: str, holder_address: str) -> Dict[str, Any]:
+        """Point lookup of one holder's balance by primary key; negative while the holder has a deficit"""
+        token = Web3.to_checksum_address(token_address)
+        holder = Web3.to_checksum_address(holder_address)
+        with self.indexer.Session() as session:
+            row = session.get(TokenHolderBalance, (token, holder))
+            deficit = None if row else session.get(TokenHolderDeficit, (token, holder))
+        if row:
+            balance = int(row.balance)
+        else:
+            balance = -int(deficit.deficit) if deficit else 0
+        return {
+            'holder': holder,
+            'balance': str(balance),
+            'indexed_block': self.indexer.indexed_block(token)
+        }
+
+    def get_holders(self, token_address: str, limit: int = 100, offset: int = 0,
+                    min_balance: Optional[int] = None, max_balance: Optional[int] = None,
+                    cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Holders ordered by balance descending, optionally within a balance range
+
+        Pages continue from either an offset or the next_cursor of the
+        previous page; the cursor stays stable while balances change.
+        """
+        token = Web3.to_checksum_address(token_address)
+        conditions = [TokenHolderBalance.token_address == token]
+        if min_balance is not None:
+            conditions.append(TokenHolderBalance.balance >= _encode_balance(min_balance))
+        if max_balance is not None:
+            conditions.append(TokenHolderBalance.balance <= _encode_balance(max_balance))
+
+        page_conditions = conditions + [_after_cursor(cursor)] if cursor else conditions
+        with self.indexer.Session() as session:
+            rows = session.scalars(
+                select(TokenHolderBalance)
+                .where(*page_conditions)
+                .order_by(TokenHolderBalance.balance.desc(), TokenHolderBalance.holder_address)
+                .offset(0 if cursor else offset)
+                .limit(limit)
+            ).all()
+            holder_count = session.scalar(select(func.count()).where(*conditions).select_from(TokenHolderBalance))
+
+        return {
+            'holders': [row.to_dict() for row in rows],
+            'holder_count': holder_count,
+            'next_cursor': rows[-1].cursor if len(rows) == limit else None,
+            'indexed_block': self.indexer.indexed_block(token)
+        }
+
+    def iter_holders(self, token_address: str, min_balance: Optional[int] = None,
+                     max_balance: Optional[int] = None, cursor: Optional[str] = None,
+                     batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """All holders in get_holders order, read in keyset-paginated batches
+
+        Each holder carries a 'cursor'; passing the last one received
+        resumes right after that holder.
+        """
+        token = Web3.to_checksum_address(token_address)
+        conditions = [TokenHolderBalance.token_address == token]
+        if min_balance is not None:
+            conditions.append(TokenHolderBalance.balance >= _encode_balance(min_balance))
+        if max_balance is not None:
+            conditions.append(TokenHolderBalance.balance <= _encode_balance(max_balance))
+
+        while True:
+            page_conditions = list(conditions)
+            if cursor:
+                # Continue after the last row instead of re-scanning an OFFSET
+                page_conditions.append(_after_cursor(cursor))
+            with self.indexer.Session() as session:
+                rows = session.scalars(
+                    select(TokenHolderBalance)
+                    .where(*page_conditions)
+                    .order_by(TokenHolderBalance.balance.desc(), TokenHolderBalance.holder_address)
+                    .limit(batch_size)
+                ).all()
+            for row in rows:
+                yield {**row.to_dict(), 'cursor': row.cursor}
+            if len(rows) < batch_size:
+                return
+            cursor = rows[-1].cursor
+
+    def check_consistency(self, token_address: str) -> Dict[str, Any]:
+        """Compare the sum of derived balances with on-chain totalSupply at the indexed block
+
+        Deficits count as negative balances; any deficit marks the token as
+        needing reconciliation (a rebuild from a complete index).
+        """
+        token = Web3.to_checksum_address(token_address)
+        indexed_block = self.indexer.indexed_block(token)
+        if indexed_block is None:
+            raise ValueError(f"Token {token} has not been indexed yet")
+
+        with self.indexer.Session() as session:
+            derived_total = sum(
+                int(balance) for balance in session.scalars(
+                    select(TokenHolderBalance.balance).where(TokenHolderBalance.token_address == token)
+                )
+            )
+            deficits = [
+                int(deficit) for deficit in session.scalars(
+                    select(TokenHolderDeficit.deficit).where(TokenHolderDeficit.token_address == token)
+                )
+            ]
+            derived_total -= sum(deficits)
+        contract = self.indexer.w3.eth.contract(address=token, abi=self.indexer.get_abi(token))
+        total_supply = contract.functions.totalSupply().call(block_identifier=indexed_block)
+
+        return {
+            'token_address': token,
+            'indexed_block': indexed_block,
+            'derived_total': str(derived_total),
+            'total_supply': str(total_supply),
+            'negative_holders': len(deficits),
+            'consistent': derived_total == total_supply and not deficits
+        }
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from web3 import Web3
+from read_cache import HeadTracker
+from serialization import to_block_number
+
+NO_CACHE = 'no-cache'
+
+
+class ReadTag(NamedTuple):
+    """Validator and lifetime of a response for one read at one block"""
+    block_number: int
+    etag: str
+    cache_control: str
+    finalized: bool
+
+    def matches(self, if_none_match) -> bool:
+        """Whether a request's If-None-Match header already names this response"""
+        return if_none_match.contains_weak(self.etag)
+
+    def apply(self, response):
+        response.set_etag(self.etag)
+        response.headers['Cache-Control'] = self.cache_control
+        return response
+
+
+class HttpCache:
+    """ETags and Cache-Control lifetimes for reads pinned to a block
+
+    A read's ETag is a digest of the block hash and the request key, so it
+    can be computed before the read: the head comes from the head tracker,
+    hashes of blocks older than the finality depth are kept until LRU
+    eviction, and hashes of recent blocks until the head moves. A matching
+    If-None-Match is then answered without any RPC for the read itself.
+    Responses at finalized blocks never change and get a long, immutable
+    lifetime; reads at recent blocks or at 'latest' get a short one and
+    are revalidated, and a reorg changes their ETag with the block hash.
+    """
+
+    def __init__(self, w3: Web3, head_tracker: HeadTracker, finality_depth: int = 64,
+                 finalized_max_age: int = 31536000, recent_max_age: int = 1, max_entries: int = 10000):
+        self.w3 = w3
+        self.head_tracker = head_tracker
+        self.finality_depth = finality_depth
+        self.finalized_max_age = finalized_max_age
+        self.recent_max_age = recent_max_age
+        self.max_entries = max_entries
+        self._finalized_hashes: OrderedDict = OrderedDict()
+        self._recent_hashes: Dict[int, str] = {}
+        # Mined transaction -> (block number, block hash), so finalized ones revalidate without a lookup
+        self._transactions: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.head_tracker.add_listener(self._on_new_head)
+
+    def _on_new_head(self, old_head, new_head):
+        with self._lock:
+            self._recent_hashes = {new_head[0]: new_head[1]}
+
+    def resolve_block(self, block_identifier: Any = 'latest') -> Tuple[int, str]:
+        """(block_number, block_hash) of 'latest', a block number or a 0x quantity"""
+        head_number, head_hash = self.head_tracker.get_head()
+        if block_identifier in (None, '', 'latest'):
+            return head_number, head_hash
+        block_number = to_block_number(block_identifier)
+        if block_number > head_number:
+            raise ValueError(f"Block {block_number} is beyond the chain head ({head_number})")
+        return block_number, self.block_hash(block_number, head_number)
+
+    def block_hash(self, block_number: int, head_number: int) -> str:
+        finalized = block_number <= head_number - self.finality_depth
+        with self._lock:
+            cached = self._finalized_hashes.get(block_number) if finalized else self._recent_hashes.get(block_number)
+            if cached is not None:
+                if finalized:
+                    self._finalized_hashes.move_to_end(block_number)
+                return cached
+
+        block_hash = Web3.to_hex(self.w3.eth.get_block(block_number)['hash'])
+        with self._lock:
+            if finalized:
+                self._finalized_hashes[block_number] = block_hash
+                if len(self._finalized_hashes) > self.max_entries:
+                    self._finalized_hashes.popitem(last=False)
+            else:
+                self._recent_hashes[block_number] = block_hash
+        return block_hash
+
+    def read_tag(self, key: Tuple, block_identifier: Any = 'latest') -> ReadTag:
+        """Tag for a read of key at a block; the read itself should then use tag.block_number"""
+        block_number, block_hash = self.resolve_block(block_identifier)
+        return self._tag(key, block_number, block_hash)
+
+    def _tag(self, key: Tuple, block_number: int, block_hash: str) -> ReadTag:
+        digest = hashlib.sha256(json.dumps([block_hash, *key], default=str).encode()).hexdigest()[:32]
+        if block_number <= self.head_tracker.get_head()[0] - self.finality_depth:
+            return ReadTag(block_number, digest, f'public, max-age={self.finalized_max_age}, immutable', True)
+        return ReadTag(block_number, digest, f'public, max-age={self.recent_max_age}, must-revalidate', False)
+
+    def known_transaction_tag(self, tx_hash: str) -> Optional[ReadTag]:
+        """Tag of a transaction already served from a finalized block, without any RPC"""
+        with self._lock:
+            location = self._transactions.get(tx_hash.lower())
+        if location is None or location[0] > self.head_tracker.get_head()[0] - self.finality_depth:
+            return None
+        return self._tag(('transaction', tx_hash.lower()), *location)
+
+    def transaction_tag(self, tx_hash: str, details: Dict[str, Any]) -> Optional[ReadTag]:
+        """Tag of fetched transaction details; None while the transaction is pending"""
+        receipt = details.get('receipt')
+        if not receipt or receipt.get('block_hash') is None:
+            return None
+        location = (receipt['block_number'], receipt['block_hash'])
+        tag = self._tag(('transaction', tx_hash.lower()), *location)
+        if tag.finalized:
+            with self._lock:
+                self._transactions[tx_hash.lower()] = location
+                if len(self._transactions) > self.max_entries:
+                    self._transactions.popitem(last=False)
+        return tag
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'finalized_hashes': len(self._finalized_hashes),
+            'recent_hashes': len(self._recent_hashes),
+            'transactions': len(self._transactions)
+        }
+
+
+def create_http_cache(w3: Web3, config, head_tracker: HeadTracker = None) -> Optional[HttpCache]:
+    """Build HTTP cache validation, sharing the read cache's head tracker when there is one"""
+    if not config.HTTP_CACHE_ENABLED:
+        return None
+
+    return HttpCache(
+        w3,
+        head_tracker or HeadTracker(w3, refresh_interval=config.HEAD_REFRESH_INTERVAL),
+        finality_depth=config.FINALITY_DEPTH,
+        finalized_max_age=config.HTTP_CACHE_FINALIZED_MAX_AGE,
+        recent_max_age=config.HTTP_CACHE_RECENT_MAX_AGE,
+        max_entries=config.HTTP_CACHE_MAX_ENTRIES
+    )
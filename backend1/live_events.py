@@ -0,0 +1,479 @@
+import json
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Any, Callable, Iterator, Mapping, NamedTuple, Optional, Tuple
+from web3 import Web3
+from log_decoder import checksum_address, get_event_decoder
+from rpc_batch import rpc_error_message
+from serialization import dumps, to_block_number
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+ADDRESS_TOPIC_PADDING = '0x' + '00' * 12
+
+
+class TooManyClients(RuntimeError):
+    """The hub already serves as many streams as the worker has threads to spare"""
+
+
+class LiveEvent(NamedTuple):
+    """A decoded event with its server-sent event frame, serialized once for every client"""
+    block_number: int
+    log_index: int
+    name: str
+    topics: Tuple[str, ...]  # indexed topics, without the signature topic
+    frame: str
+
+    @property
+    def position(self) -> Tuple[int, int]:
+        return self.block_number, self.log_index
+
+
+def topic_value(value: str) -> str:
+    """Lowercase 32-byte topic for an address, a 32-byte hex value or a decimal integer"""
+    value = value.strip()
+    if Web3.is_address(value):
+        return ADDRESS_TOPIC_PADDING + value[2:].lower()
+    if value.startswith('0x') and len(value) == 66:
+        return value.lower()
+    if value.isdigit():
+        return '0x' + int(value).to_bytes(32, 'big').hex()
+    raise ValueError(f"Cannot filter on {value!r}: expected an address, a 32-byte hex value or an integer")
+
+
+def parse_cursor(cursor: Optional[str] = None, from_block: Any = None) -> Optional[Tuple[int, int]]:
+    """Resume position from a 'block:log_index' cursor (e.g. Last-Event-ID) or a first block"""
+    if cursor:
+        block_number, _, log_index = cursor.partition(':')
+        return int(block_number), int(log_index or -1)
+    if from_block not in (None, ''):
+        return to_block_number(from_block), -1
+    return None
+
+
+class EventFilter:
+    """Per-client filter on event names and indexed arguments
+
+    topics holds the accepted values of the first, second and third indexed
+    argument (None accepts any), like an eth_getLogs topic filter.
+    account matches an address in any indexed argument, e.g. both sides of
+    a Transfer.
+    """
+
+    def __init__(self, events: Optional[List[str]] = None, topics: Optional[List[Optional[set]]] = None,
+                 account: Optional[str] = None):
+        self.events = set(events) if events else None
+        self.topics = list(topics or [None, None, None])
+        self.account = topic_value(account) if account else None
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, str]) -> 'EventFilter':
+        """Build from query parameters: events, topic1-topic3 (comma-separated) and account"""
+        def values(name):
+            raw = params.get(name)
+            return {topic_value(value) for value in raw.split(',') if value.strip()} if raw else None
+
+        events = [name.strip() for name in params.get('events', '').split(',') if name.strip()]
+        return cls(events, [values('topic1'), values('topic2'), values('topic3')], params.get('account'))
+
+    def matches(self, event: LiveEvent) -> bool:
+        if self.events is not None and event.name not in self.events:
+            return False
+        for position, accepted in enumerate(self.topics):
+            if accepted is not None and (position >= len(event.topics) or event.topics[position] not in accepted):
+                return False
+        return self.account is None or self.account in event.topics
+
+
+class LiveClient:
+    """One connected stream: a bounded queue that drops its oldest events when the client falls behind"""
+
+    def __init__(self, address: str, event_filter: EventFilter, queue_size: int,
+                 after: Optional[Tuple[int, int]] = None):
+        self.address = address
+        self.filter = event_filter
+        self.after = after
+        self.backlog: List[LiveEvent] = []
+        self.backfill_range: Optional[Tuple[int, int]] = None
+        self.connected_at = time.time()
+        self._queue = deque(maxlen=queue_size)
+        self._ready = threading.Condition()
+        self._dropped = 0
+        self.closed = False
+
+    def push(self, events: List[LiveEvent]) -> int:
+        """Queue events; returns how many old ones were dropped to make room"""
+        with self._ready:
+            overflow = max(len(self._queue) + len(events) - self._queue.maxlen, 0)
+            self._dropped += overflow
+            self._queue.extend(events)
+            self._ready.notify()
+        return overflow
+
+    def take(self, timeout: float) -> Tuple[List[LiveEvent], int]:
+        """Queued events and the number dropped since the last call, waiting up to timeout seconds"""
+        with self._ready:
+            if not self._queue and not self._dropped and not self.closed:
+                self._ready.wait(timeout)
+            events = list(self._queue)
+            self._queue.clear()
+            dropped, self._dropped = self._dropped, 0
+        return events, dropped
+
+    def close(self):
+        with self._ready:
+            self.closed = True
+            self._ready.notify()
+
+
+class LiveEventHub:
+    """Push decoded events of tracked contracts to many streaming clients
+
+    One thread follows the chain head, through an eth_subscribe newHeads
+    WebSocket or by polling eth_blockNumber, and on each new block fetches
+    the logs of every tracked contract with a single eth_getLogs call. The
+    logs are decoded and serialized once, then appended to the queue of
+    each client whose filter matches. Upstream cost therefore grows with
+    blocks, not with clients. A slow client only loses its own oldest
+    events and is told how many, so it can reconnect from its last cursor.
+
+    The events of the last replay_blocks blocks stay in memory so
+    reconnecting clients resume from their Last-Event-ID without touching
+    the node; older positions, up to max_replay_blocks back, are fetched
+    with eth_getLogs. Events are published confirmations blocks behind
+    the head, which keeps reorged logs out of the stream.
+    """
+
+    def __init__(self, w3: Web3, ws_url: str = None, poll_interval: float = 1.0, confirmations: int = 0,
+                 queue_size: int = 1000, replay_blocks: int = 1000, max_replay_blocks: int = 100000,
+                 max_clients: int = 5000, chunk_size: int = 2000, keepalive_interval: float = 15.0):
+        self.w3 = w3
+        self.ws_url = ws_url
+        self.poll_interval = poll_interval
+        self.confirmations = confirmations
+        self.queue_size = queue_size
+        self.replay_blocks = replay_blocks
+        self.max_replay_blocks = max_replay_blocks
+        self.max_clients = max_clients
+        self.chunk_size = chunk_size
+        self.keepalive_interval = keepalive_interval
+
+        # address -> {'decoders': {topic: EventLogDecoder}, 'buffer': deque of LiveEvent, 'clients': set}
+        self._contracts: Dict[str, Dict[str, Any]] = {}
+        self._client_count = 0
+        self._last_block = None  # highest block published
+        self._buffer_start = None  # first block held in the replay buffers
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.events_published = 0
+        self.events_dropped = 0
+        self.upstream_requests = 0
+        self.last_error = None
+
+    def track(self, contract_address: str, abi: List[Dict]):
+        """Publish the events of a contract"""
+        if not Web3.is_address(contract_address):
+            raise ValueError(f"Invalid contract address: {contract_address}")
+        address = Web3.to_checksum_address(contract_address)
+        decoders = {}
+        for item in abi:
+            if item.get('type') == 'event' and not item.get('anonymous'):
+                decoder = get_event_decoder(item)
+                decoders[decoder.topic] = decoder
+        with self._lock:
+            contract = self._contracts.setdefault(address, {'buffer': deque(), 'clients': set()})
+            contract['decoders'] = decoders
+        logger.info('live_events_tracking', contract=address, events=len(decoders))
+
+    def is_tracked(self, contract_address: str) -> bool:
+        return Web3.is_address(contract_address) and Web3.to_checksum_address(contract_address) in self._contracts
+
+    def start(self):
+        with self._lock:
+            if self._thread:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='live-events', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 5)
+            self._thread = None
+        with self._lock:
+            clients = [client for contract in self._contracts.values() for client in contract['clients']]
+        for client in clients:
+            client.close()
+
+    def subscribe(self, contract_address: str, event_filter: EventFilter = None,
+                  after: Optional[Tuple[int, int]] = None) -> LiveClient:
+        """Register a client; with after, events past that (block, log_index) position are replayed first"""
+        if not self.is_tracked(contract_address):
+            raise ValueError(f"Contract {contract_address} is not tracked for live events")
+        address = Web3.to_checksum_address(contract_address)
+        client = LiveClient(address, event_filter or EventFilter(), self.queue_size, after)
+        if self._last_block is None:
+            # First client before the hub saw a head: fix the starting block now so a resume position can be honoured
+            self.on_head(self.w3.eth.block_number)
+
+        with self._lock:
+            if self._client_count >= self.max_clients:
+                raise TooManyClients(f"Live event stream limit of {self.max_clients} clients reached")
+            contract = self._contracts[address]
+            if after is None:
+                # Live from the next block; also the position a 'dropped' event tells it to resume from
+                client.after = (self._last_block + 1, -1)
+            elif after[0] <= self._last_block:
+                if after[0] >= self._buffer_start:
+                    client.backlog = [event for event in contract['buffer']
+                                      if event.position > after and client.filter.matches(event)]
+                elif self._last_block - after[0] >= self.max_replay_blocks:
+                    raise ValueError(f"Cannot resume more than {self.max_replay_blocks} blocks back")
+                else:
+                    # Fetched in the client's own thread by replay(); live events queue up meanwhile
+                    client.backfill_range = (after[0], self._last_block)
+            contract['clients'].add(client)
+            self._client_count += 1
+
+        self.start()
+        return client
+
+    def unsubscribe(self, client: LiveClient):
+        with self._lock:
+            clients = self._contracts[client.address]['clients']
+            if client in clients:
+                clients.remove(client)
+                self._client_count -= 1
+        client.close()
+
+    def replay(self, client: LiveClient) -> List[LiveEvent]:
+        """Events the client missed before it subscribed"""
+        if client.backfill_range is None:
+            return client.backlog
+        from_block, to_block = client.backfill_range
+        events = []
+        for start in range(from_block, to_block + 1, self.chunk_size):
+            logs = self._get_logs([client.address], start, min(to_block, start + self.chunk_size - 1))
+            events.extend(self._decode(logs).get(client.address, []))
+        return [event for event in events if event.position > client.after and client.filter.matches(event)]
+
+    def stream(self, client: LiveClient) -> Iterator[str]:
+        """Server-sent event frames for a client until it disconnects
+
+        Each event frame carries its 'block:log_index' cursor as the event
+        id, so EventSource resends it as Last-Event-ID when reconnecting.
+        A 'dropped' event reports events lost to backpressure and the
+        cursor to resume from to get them back.
+        """
+        last = client.after
+        try:
+            yield 'retry: 3000\n\n'
+            for event in self.replay(client):
+                last = event.position
+                yield event.frame
+            while not client.closed:
+                events, dropped = client.take(self.keepalive_interval)
+                if dropped:
+                    payload = {'count': dropped, 'resume_from': f'{last[0]}:{last[1]}'}
+                    yield f"event: dropped\ndata: {dumps(payload).decode()}\n\n"
+                elif not events:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ': keepalive\n\n'
+                for event in events:
+                    # Live events may overlap the replayed backlog
+                    if event.position > last:
+                        last = event.position
+                        yield event.frame
+        except Exception as e:
+            logger.error('live_events_stream_failed', contract=client.address, error=str(e))
+            yield f"event: error\ndata: {dumps({'error': str(e)}).decode()}\n\n"
+        finally:
+            self.unsubscribe(client)
+
+    def _run(self):
+        if self.ws_url:
+            while not self._stop.is_set():
+                try:
+                    self._follow_subscription()
+                except Exception as e:
+                    logger.warning('live_events_subscription_failed', error=str(e))
+                    # Keep publishing by polling while the socket is down
+                    deadline = time.monotonic() + 5
+                    while time.monotonic() < deadline and not self._stop.is_set():
+                        self._poll_once()
+                        self._stop.wait(self.poll_interval)
+        else:
+            while not self._stop.is_set():
+                self._poll_once()
+                self._stop.wait(self.poll_interval)
+
+    def _poll_once(self):
+        try:
+            self.on_head(self.w3.eth.block_number)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error('live_events_poll_failed', error=str(e))
+
+    def _follow_subscription(self):
+        from websockets.sync.client import connect
+
+        with connect(self.ws_url) as socket:
+            socket.send(json.dumps({
+                'jsonrpc': '2.0', 'id': 1, 'method': 'eth_subscribe', 'params': ['newHeads']
+            }))
+            logger.info('live_events_subscribed', mode='websocket')
+            while not self._stop.is_set():
+                try:
+                    message = json.loads(socket.recv(timeout=self.poll_interval))
+                except TimeoutError:
+                    continue
+                head = message.get('params', {}).get('result', {})
+                if 'number' in head:
+                    self.on_head(int(head['number'], 16))
+
+    def on_head(self, head: int):
+        """Publish the logs of every block up to head minus the confirmation depth"""
+        to_block = head - self.confirmations
+        with self._lock:
+            if self._last_block is None:
+                # Nothing before the first head is buffered; older positions are backfilled on resume
+                self._last_block = to_block
+                self._buffer_start = to_block + 1
+                return
+
+        with self._lock:
+            addresses = list(self._contracts)
+        while self._last_block < to_block and addresses and not self._stop.is_set():
+            from_block = self._last_block + 1
+            end_block = min(to_block, from_block + self.chunk_size - 1)
+            events = self._decode(self._get_logs(addresses, from_block, end_block))
+            self._publish(events, end_block)
+            self.last_error = None
+
+    def _get_logs(self, addresses: List[str], from_block: int, to_block: int) -> List[Dict[str, Any]]:
+        # Raw results go straight to the bulk decoder, as in ContractHandler._get_event_chunk
+        response = self.w3.provider.make_request('eth_getLogs', [{
+            'address': addresses,
+            'fromBlock': hex(from_block),
+            'toBlock': hex(to_block)
+        }])
+        self.upstream_requests += 1
+        if 'error' in response:
+            raise ValueError(rpc_error_message(self.w3, response['error']))
+        return response['result']
+
+    def _decode(self, logs: List[Dict[str, Any]]) -> Dict[str, List[LiveEvent]]:
+        """LiveEvents per contract, in log order"""
+        groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for log in logs:
+            if log['topics'] and not log.get('removed'):
+                address = checksum_address(bytes.fromhex(log['address'][2:]))
+                groups.setdefault((address, log['topics'][0]), []).append(log)
+
+        events: Dict[str, List[LiveEvent]] = {}
+        for (address, topic), group in groups.items():
+            decoder = self._contracts.get(address, {}).get('decoders', {}).get(topic)
+            if decoder is None:
+                continue
+            for log, event in zip(group, self._decode_group(decoder, group)):
+                if event is None:
+                    continue
+                cursor = f"{event['block_number']}:{event['log_index']}"
+                event['cursor'] = cursor
+                frame = f"id: {cursor}\nevent: {decoder.name}\ndata: {dumps(event).decode()}\n\n"
+                events.setdefault(address, []).append(LiveEvent(
+                    event['block_number'], event['log_index'], decoder.name,
+                    tuple(topic.lower() for topic in log['topics'][1:]), frame
+                ))
+        for address_events in events.values():
+            address_events.sort(key=lambda event: event.position)
+        return events
+
+    @staticmethod
+    def _decode_group(decoder, logs: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        try:
+            return decoder.decode(logs)
+        except Exception:
+            # A log with the same signature but another layout (e.g. an ERC-721 Transfer) is skipped alone
+            decoded = []
+            for log in logs:
+                try:
+                    decoded.append(decoder.decode_log(log))
+                except Exception as e:
+                    logger.warning('live_events_decode_failed', event=decoder.name,
+                                   transaction_hash=log.get('transactionHash'), error=str(e))
+                    decoded.append(None)
+            return decoded
+
+    def _publish(self, events: Dict[str, List[LiveEvent]], to_block: int):
+        dropped = 0
+        with self._lock:
+            for address, contract in self._contracts.items():
+                buffer = contract['buffer']
+                address_events = events.get(address, [])
+                buffer.extend(address_events)
+                while buffer and buffer[0].block_number <= to_block - self.replay_blocks:
+                    buffer.popleft()
+                for client in contract['clients']:
+                    matched = [event for event in address_events if client.filter.matches(event)]
+                    if matched:
+                        dropped += client.push(matched)
+                self.events_published += len(address_events)
+            self._last_block = to_block
+            self._buffer_start = max(self._buffer_start, to_block - self.replay_blocks + 1)
+        self.events_dropped += dropped
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            contracts = {
+                address: {'clients': len(contract['clients']), 'buffered_events': len(contract['buffer'])}
+                for address, contract in self._contracts.items()
+            }
+            clients = self._client_count
+        return {
+            'mode': 'websocket' if self.ws_url else 'polling',
+            'contracts': contracts,
+            'clients': clients,
+            'last_block': self._last_block,
+            'replay_from_block': self._buffer_start,
+            'events_published': self.events_published,
+            'events_dropped': self.events_dropped,
+            'upstream_requests': self.upstream_requests,
+            'last_error': self.last_error
+        }
+
+
+def create_live_event_hub(w3: Web3, config, load_abi: Callable[[str], List[Dict]]) -> Optional[LiveEventHub]:
+    """Build the live event hub and track contracts listed in configuration"""
+    if not config.LIVE_EVENTS_ENABLED:
+        return None
+
+    ws_url = config.LIVE_EVENTS_WS_URL or config.RECEIPT_WS_URL
+    provider_url = config.get_web3_provider_url()
+    if not ws_url and provider_url.startswith('ws'):
+        ws_url = provider_url
+
+    hub = LiveEventHub(
+        w3,
+        ws_url=ws_url,
+        poll_interval=config.LIVE_EVENTS_POLL_INTERVAL,
+        confirmations=config.LIVE_EVENTS_CONFIRMATIONS,
+        queue_size=config.LIVE_EVENTS_QUEUE_SIZE,
+        replay_blocks=config.LIVE_EVENTS_REPLAY_BLOCKS,
+        max_replay_blocks=config.LIVE_EVENTS_MAX_REPLAY_BLOCKS,
+        # Each stream holds a request thread for as long as it is open; receipt streams have their own share
+        max_clients=max(1, min(config.LIVE_EVENTS_MAX_CLIENTS,
+                               config.WORKER_THREADS - config.STREAM_RESERVED_THREADS - config.RECEIPT_MAX_STREAMS)),
+        chunk_size=config.EVENTS_STREAM_CHUNK_SIZE
+    )
+
+    # LIVE_EVENTS_CONTRACTS entries look like address=abi_path, as in INDEXER_CONTRACTS
+    for entry in config.LIVE_EVENTS_CONTRACTS:
+        address, _, spec = entry.partition('=')
+        hub.track(address, load_abi(spec.partition('@')[0]))
+
+    return hub
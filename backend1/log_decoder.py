@@ -0,0 +1,288 @@
+import json
+import re
+from functools import lru_cache
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+from eth_abi import decode as abi_decode
+from eth_utils import event_abi_to_log_topic
+from eth_utils.abi import collapse_if_tuple
+from web3 import Web3
+from web3._utils.abi import map_abi_data, named_tree
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+from serialization import parse_block_identifier
+
+try:
+    import numpy as np
+except ImportError:  # Only the array views (raw / limbs) need numpy
+    np = None
+
+WORD = 32
+UINT_PATTERN = re.compile(r'^uint(\d*)$')
+INT_PATTERN = re.compile(r'^int(\d*)$')
+BYTES_PATTERN = re.compile(r'^bytes(\d+)$')
+
+
+def _word_kind(abi_type: str) -> Optional[Tuple[str, int]]:
+    """(kind, width) of a type that fills exactly one 32-byte word, else None"""
+    if abi_type == 'address':
+        return 'address', 20
+    if abi_type == 'bool':
+        return 'bool', 1
+    if UINT_PATTERN.match(abi_type):
+        return 'uint', WORD
+    if INT_PATTERN.match(abi_type):
+        return 'int', WORD
+    match = BYTES_PATTERN.match(abi_type)
+    if match:
+        return 'bytes', int(match.group(1))
+    return None
+
+
+@lru_cache(maxsize=65536)
+def checksum_address(raw: bytes) -> str:
+    # Holders repeat across logs; the keccak behind each checksum is the costly part
+    return Web3.to_checksum_address(raw)
+
+
+class DecodedLogs:
+    """Logs of one event decoded column by column
+
+    Each argument is kept as one contiguous bytes buffer of 32-byte words
+    (a topic, or a slot of the data section), so decoding a range costs one
+    hex conversion per column instead of an ABI decode per log. Columns
+    are turned into Python values only when asked for; raw() and limbs()
+    expose them as numpy arrays without building any Python objects.
+    """
+
+    def __init__(self, event_name: str, block_numbers: List[int], log_indexes: List[int],
+                 transaction_hashes: List[str], addresses: List[str], fields: List[Tuple[str, str, int]],
+                 buffers: Dict[str, Tuple[bytes, int, int]]):
+        self.event_name = event_name
+        self.block_numbers = block_numbers
+        self.log_indexes = log_indexes
+        self.transaction_hashes = transaction_hashes
+        self.addresses = addresses
+        self.fields = fields
+        # name -> (buffer, offset of the first word, stride between logs)
+        self._buffers = buffers
+        self._columns: Dict[str, List[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.block_numbers)
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _, _ in self.fields]
+
+    def _words(self, name: str) -> Iterator[memoryview]:
+        buffer, offset, stride = self._buffers[name]
+        view = memoryview(buffer)
+        for start in range(offset, len(buffer), stride):
+            yield view[start:start + WORD]
+
+    def column(self, name: str) -> List[Any]:
+        """Python values of one argument, as web3 decodes them"""
+        if name not in self._columns:
+            kind, width = next((kind, width) for field, kind, width in self.fields if field == name)
+            if kind == 'uint':
+                values = [int.from_bytes(word, 'big') for word in self._words(name)]
+            elif kind == 'int':
+                values = [int.from_bytes(word, 'big', signed=True) for word in self._words(name)]
+            elif kind == 'address':
+                values = [checksum_address(bytes(word[12:])) for word in self._words(name)]
+            elif kind == 'bool':
+                values = [word[31] == 1 for word in self._words(name)]
+            else:
+                values = [bytes(word[:width]) for word in self._words(name)]
+            self._columns[name] = values
+        return self._columns[name]
+
+    def raw(self, name: str):
+        """Fixed-width bytes of one argument as a numpy 'S<width>' array, e.g. S20 for addresses"""
+        kind, width = next((kind, width) for field, kind, width in self.fields if field == name)
+        buffer, offset, stride = self._buffers[name]
+        words = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, stride)[:, offset:offset + WORD]
+        start = WORD - width if kind in ('address', 'bool') else 0
+        return np.ascontiguousarray(words[:, start:start + width]).view(f'S{width}').ravel()
+
+    def limbs(self, name: str):
+        """An integer argument as an (n, 4) uint64 array of big-endian limbs, most significant first"""
+        buffer, offset, stride = self._buffers[name]
+        words = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, stride)[:, offset:offset + WORD]
+        return np.ascontiguousarray(words).view('>u8').astype(np.uint64)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Same shape as ContractHandler._format_event results"""
+        names = self.names
+        columns = [self.column(name) for name in names]
+        return [
+            {
+                'event': self.event_name,
+                'transaction_hash': transaction_hash,
+                'block_number': block_number,
+                'args': dict(zip(names, values)),
+                'address': address,
+                'log_index': log_index
+            }
+            for transaction_hash, block_number, address, log_index, *values in zip(
+                self.transaction_hashes, self.block_numbers, self.addresses, self.log_indexes, *columns
+            )
+        ]
+
+
+class EventLogDecoder:
+    """Decode raw eth_getLogs results of one event
+
+    Events whose arguments are all single-word static types (address,
+    uintN, intN, bool, bytesN), such as ERC-20 Transfer and Approval, take
+    the columnar fast path. Other events go through the ABI decoder one log
+    at a time, producing the same result shape.
+    """
+
+    def __init__(self, event_abi: Dict[str, Any]):
+        self.name = event_abi['name']
+        # Anonymous events have no signature topic, so their arguments start at topic 0
+        self.anonymous = bool(event_abi.get('anonymous'))
+        self.topic = None if self.anonymous else '0x' + event_abi_to_log_topic(event_abi).hex()
+        inputs = event_abi.get('inputs', [])
+        self.input_names = [param['name'] for param in inputs]
+        self.indexed = [bool(param.get('indexed')) for param in inputs]
+        self.types = [collapse_if_tuple(param) for param in inputs]
+        self.indexed_types = [collapse_if_tuple(param) for param in inputs if param.get('indexed')]
+        self.data_inputs = [param for param in inputs if not param.get('indexed')]
+        self.data_types = [collapse_if_tuple(param) for param in self.data_inputs]
+        # Arrays and structs need web3's normalizers; other values only need addresses checksummed
+        self.nested_data = any(type_str.endswith(']') or type_str.startswith('(') for type_str in self.data_types)
+        first_topic = 0 if self.anonymous else 1
+        self.topic_count = first_topic + len(self.indexed_types)
+
+        # Word position of each argument: ('topic', k) or ('data', slot)
+        kinds = [_word_kind(type_str) for type_str in self.types]
+        self.fixed = all(kinds)
+        self.fields = []
+        self.positions = []
+        topic_index = first_topic
+        data_slot = 0
+        for param, kind in zip(inputs, kinds):
+            if kind:
+                self.fields.append((param['name'], *kind))
+            if param.get('indexed'):
+                self.positions.append(('topic', topic_index))
+                topic_index += 1
+            else:
+                self.positions.append(('data', data_slot))
+                data_slot += 1
+        self.data_length = 2 + 2 * WORD * data_slot  # hex characters, with 0x
+
+    def filter_params(self, address: str, from_block: Any, to_block: Any) -> Dict[str, Any]:
+        """eth_getLogs parameters for this event of one contract"""
+        return {
+            'address': [address],
+            'topics': [] if self.anonymous else [self.topic],
+            'fromBlock': _block_param(from_block),
+            'toBlock': _block_param(to_block)
+        }
+
+    def matches_layout(self, logs: List[Dict[str, Any]]) -> bool:
+        """Whether every log has this event's topic count and data size (an ERC-721 Transfer does not)"""
+        return all(len(log['topics']) == self.topic_count and len(log['data']) == self.data_length for log in logs)
+
+    def decode(self, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Formatted events, through the fast path when the layout allows it"""
+        if self.fixed and self.matches_layout(logs):
+            return self.decode_columns(logs).to_dicts()
+        return [self.decode_log(log) for log in logs]
+
+    def decode_columns(self, logs: List[Dict[str, Any]]) -> DecodedLogs:
+        """Bulk-decode fixed-layout logs into columns"""
+        if not self.fixed:
+            raise ValueError(f"{self.name} has dynamic or multi-word arguments; use decode()")
+        if not self.matches_layout(logs):
+            raise ValueError(f"Some logs do not match the layout of {self.name}")
+
+        # One hex conversion per topic position and one for all data sections
+        topic_buffers = {
+            index: bytes.fromhex(''.join([log['topics'][index][2:] for log in logs]))
+            for index in range(self.topic_count - len(self.indexed_types), self.topic_count)
+        }
+        data_buffer = bytes.fromhex(''.join([log['data'][2:] for log in logs]))
+        data_stride = (self.data_length - 2) // 2
+
+        buffers = {}
+        for (name, _, _), (source, index) in zip(self.fields, self.positions):
+            if source == 'topic':
+                buffers[name] = (topic_buffers[index], 0, WORD)
+            else:
+                buffers[name] = (data_buffer, index * WORD, data_stride)
+
+        addresses = [log['address'] for log in logs]
+        checksummed = {address: Web3.to_checksum_address(address) for address in set(addresses)}
+        return DecodedLogs(
+            self.name,
+            [int(log['blockNumber'], 16) for log in logs],
+            [int(log['logIndex'], 16) for log in logs],
+            [log['transactionHash'] for log in logs],
+            [checksummed[address] for address in addresses],
+            self.fields,
+            buffers
+        )
+
+    def decode_log(self, log: Dict[str, Any]) -> Dict[str, Any]:
+        """Generic ABI decode of one raw log"""
+        topics = log['topics']
+        if len(topics) != self.topic_count:
+            raise ValueError(f"Log {log.get('transactionHash')}:{log.get('logIndex')} has {len(topics)} topics, "
+                             f"{self.name} expects {self.topic_count}")
+
+        decoded = abi_decode(self.data_types, bytes.fromhex(log['data'][2:]))
+        if self.nested_data:
+            # As web3's get_event_data does: arrays become lists and structs dicts
+            data_values = named_tree(self.data_inputs, map_abi_data(BASE_RETURN_NORMALIZERS, self.data_types, decoded))
+        else:
+            data_values = {param['name']: _normalize(type_str, value)
+                           for param, type_str, value in zip(self.data_inputs, self.data_types, decoded)}
+        indexed_topics = iter(topics[self.topic_count - len(self.indexed_types):])
+        args = {}
+        for name, indexed, type_str in zip(self.input_names, self.indexed, self.types):
+            if not indexed:
+                args[name] = data_values[name]
+                continue
+            topic = next(indexed_topics)
+            if type_str in ('string', 'bytes') or type_str.endswith(']') or type_str.startswith('('):
+                # Indexed dynamic values are only present as their keccak hash
+                args[name] = bytes.fromhex(topic[2:])
+            else:
+                args[name] = _normalize(type_str, abi_decode([type_str], bytes.fromhex(topic[2:]))[0])
+
+        return {
+            'event': self.name,
+            'transaction_hash': log['transactionHash'],
+            'block_number': int(log['blockNumber'], 16),
+            'args': args,
+            'address': checksum_address(bytes.fromhex(log['address'][2:])),
+            'log_index': int(log['logIndex'], 16)
+        }
+
+
+def _normalize(type_str: str, value: Any) -> Any:
+    """Checksum decoded addresses, as web3's return normalizers do"""
+    if type_str == 'address':
+        return checksum_address(bytes.fromhex(value[2:]))
+    if 'address' in type_str:
+        return map_abi_data(BASE_RETURN_NORMALIZERS, [type_str], [value])[0]
+    return value
+
+
+def _block_param(block: Any) -> Any:
+    """Raw RPC block parameter from an int, a decimal string, a 0x quantity or a tag"""
+    block = parse_block_identifier(block)
+    return hex(block) if isinstance(block, int) else block
+
+
+@lru_cache(maxsize=1024)
+def _cached_decoder(event_abi_json: str) -> EventLogDecoder:
+    return EventLogDecoder(json.loads(event_abi_json))
+
+
+def get_event_decoder(event_abi: Dict[str, Any]) -> EventLogDecoder:
+    """Shared decoder for an event ABI; the layout analysis runs once per distinct ABI"""
+    return _cached_decoder(json.dumps(event_abi, sort_keys=True))
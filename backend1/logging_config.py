@@ -0,0 +1,102 @@
+import logging
+import random
+import sys
+from typing import Any, Dict
+
+try:
+    import structlog
+except ImportError:  # structlog is optional; fall back to key=value stdlib logging
+    structlog = None
+
+
+def sample_events(logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep a fraction of high-volume events: log.info('event', sample_rate=0.01)
+
+    Kept events carry the rate so counts can be scaled back up. The rate
+    is applied before any other processor, so dropped events cost almost
+    nothing.
+    """
+    rate = event_dict.get('sample_rate')
+    if rate is not None and rate < 1 and random.random() >= rate:
+        raise structlog.DropEvent
+    return event_dict
+
+
+class _StdlibLogger:
+    """Minimal structlog-style logger used when structlog is not installed"""
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(name)
+
+    def _log(self, level: int, event: str, fields: Dict[str, Any]):
+        if not self._logger.isEnabledFor(level):
+            return
+        rate = fields.get('sample_rate')
+        if rate is not None and rate < 1 and random.random() >= rate:
+            return
+        self._logger.log(level, '%s %s', event, ' '.join(f'{key}={value!r}' for key, value in fields.items()))
+
+    def debug(self, event: str, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, **fields):
+        self._log(logging.ERROR, event, fields)
+
+
+def get_logger(name: str):
+    """Structured logger; fields are only formatted if the event is emitted"""
+    if structlog is None:
+        return _StdlibLogger(name)
+    return structlog.get_logger(name)
+
+
+def configure_logging(config):
+    """Route structlog and stdlib logging through one renderer at LOG_LEVEL
+
+    Events below LOG_LEVEL are dropped by the bound logger before any
+    processing. Modules that still use logging.getLogger are rendered the
+    same way, so the output stays uniform.
+    """
+    level = logging.getLevelName(str(config.LOG_LEVEL).upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+
+    if structlog is None:
+        logging.basicConfig(level=level)
+        return
+
+    shared = [
+        structlog.stdlib.add_log_level,
+        structlog.stdlib.add_logger_name,
+        structlog.processors.TimeStamper(fmt='iso')
+    ]
+    renderer = structlog.processors.JSONRenderer() if config.LOG_FORMAT == 'json' \
+        else structlog.dev.ConsoleRenderer(colors=False)
+
+    structlog.configure(
+        processors=[
+            sample_events,
+            structlog.contextvars.merge_contextvars,
+            *shared,
+            structlog.processors.format_exc_info,
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter
+        ],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.make_filtering_bound_logger(level),
+        cache_logger_on_first_use=True
+    )
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(structlog.stdlib.ProcessorFormatter(
+        processor=renderer,
+        foreign_pre_chain=shared
+    ))
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
@@ -0,0 +1,325 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Latency buckets in seconds, from cache hits to slow archive-node calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Child metric for one label combination, created on first use"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        # Metrics without labels are used directly, e.g. counter.inc()
+        return self.labels()
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def _render_child(self, key, child) -> List[str]:
+        return [f'{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(child.value)}']
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._default().dec(amount)
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def _render_child(self, key, child) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}']
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, key, child) -> List[str]:
+        with child._lock:
+            counts = list(child.counts)
+            total = child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text exposition format
+
+    Hot paths only touch in-memory counters. Values that components
+    already track (cache hit counts, pending receipts) are read by
+    collectors at scrape time, so they cost nothing between scrapes.
+    Each gunicorn worker keeps its own registry, so scrape every worker
+    or run one worker per scrape target.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Iterable[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def set_collector(self, key: str, collector: Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]):
+        """Register (or replace) a callable yielding (name, help, labels, value) gauge samples at scrape time"""
+        self._collectors[key] = collector
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        sampled: Dict[str, Tuple[str, List[str]]] = {}
+        for collector in list(self._collectors.values()):
+            for name, documentation, labels, value in collector():
+                if value is None:
+                    continue
+                names, values = tuple(labels), tuple(labels.values())
+                entry = sampled.setdefault(name, (documentation, []))
+                entry[1].append(f'{name}{_format_labels(names, values)} {_format_value(value)}')
+        for name, (documentation, samples) in sampled.items():
+            lines.extend([f'# HELP {name} {documentation}', f'# TYPE {name} gauge', *samples])
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Flask request latency until the response is returned',
+    ('method', 'route', 'status'))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge('http_requests_in_flight', 'Requests currently being handled')
+RPC_REQUEST_DURATION = REGISTRY.histogram(
+    'rpc_request_duration_seconds', 'JSON-RPC latency per method; batches are recorded as "batch"',
+    ('method',))
+RPC_REQUEST_ERRORS = REGISTRY.counter('rpc_request_errors', 'JSON-RPC requests that raised', ('method',))
+RPC_ENDPOINT_DURATION = REGISTRY.histogram(
+    'rpc_endpoint_request_duration_seconds', 'HTTP round trip per RPC endpoint', ('endpoint',))
+RPC_ENDPOINT_ERRORS = REGISTRY.counter(
+    'rpc_endpoint_errors', 'Transport failures and rate limits per RPC endpoint', ('endpoint',))
+TRANSACTIONS_SENT = REGISTRY.counter('transactions_sent', 'Signed transactions broadcast', ('result',))
+
+
+def metrics_middleware(make_request, w3):
+    """web3 middleware recording per-method latency for the sync handler"""
+    def middleware(method, params):
+        started = time.perf_counter()
+        try:
+            return make_request(method, params)
+        except Exception:
+            RPC_REQUEST_ERRORS.labels(method).inc()
+            raise
+        finally:
+            RPC_REQUEST_DURATION.labels(method).observe(time.perf_counter() - started)
+    return middleware
+
+
+async def async_metrics_middleware(make_request, w3):
+    """web3 middleware recording per-method latency for the async handler"""
+    async def middleware(method, params):
+        started = time.perf_counter()
+        try:
+            return await make_request(method, params)
+        except Exception:
+            RPC_REQUEST_ERRORS.labels(method).inc()
+            raise
+        finally:
+            RPC_REQUEST_DURATION.labels(method).observe(time.perf_counter() - started)
+    return middleware
+
+
+def handler_collector(handler):
+    """Scrape-time gauges from the caches and watchers a contract handler owns"""
+    def collect():
+        if handler.read_cache:
+            stats = handler.read_cache.stats()
+            yield 'read_cache_hits', 'Read cache hits', {}, stats['hits']
+            yield 'read_cache_misses', 'Read cache misses', {}, stats['misses']
+            yield 'read_cache_entries', 'Read cache entries', {}, stats['entries']
+        if handler.gas_estimates:
+            stats = handler.gas_estimates.stats()
+            yield 'gas_estimate_cache_hits', 'Gas estimate cache hits', {}, stats['hits']
+            yield 'gas_estimate_cache_misses', 'Gas estimate cache misses', {}, stats['misses']
+        stats = handler.receipt_watcher.stats()
+        yield 'transactions_pending', 'Transactions waiting for a receipt', {}, stats['pending']
+        yield 'receipt_cache_entries', 'Receipts held by the receipt watcher', {}, stats['cached_receipts']
+        if handler.gas_oracle:
+            stats = handler.gas_oracle.stats()
+            yield 'gas_oracle_base_fee_wei', 'Pending block base fee', {}, stats['pending_base_fee']
+        if handler.single_flight:
+            stats = handler.single_flight.stats()
+            yield 'single_flight_leaders', 'Reads that made an upstream call', {}, stats['leaders']
+            yield 'single_flight_coalesced', 'Reads that shared an in-flight upstream call', {}, stats['coalesced']
+        for signer in handler.signers.stats() if handler.signers else []:
+            labels = {'address': signer['address']}
+            yield 'signer_pending_transactions', 'Transactions reserved or awaiting a receipt per signer', labels, signer['pending']
+            yield 'signer_transactions_sent', 'Transactions broadcast per signer', labels, signer['sent']
+        for endpoint in handler.get_provider_stats() or []:
+            labels = {'endpoint': endpoint['endpoint']}
+            yield 'rpc_endpoint_available', 'Whether the endpoint is out of cooldown', labels, int(endpoint['available'])
+            yield 'rpc_endpoint_error_rate', 'EWMA error rate per endpoint', labels, endpoint['error_rate']
+    return collect
+
+
+def rate_limiter_collector(limiter):
+    """Scrape-time counts of requests allowed and rejected by the rate limiter"""
+    def collect():
+        stats = limiter.stats()
+        yield 'rate_limit_allowed', 'Requests admitted by the rate limiter', {}, stats['allowed']
+        yield 'rate_limit_rejected', 'Requests rejected with 429', {}, stats['rejected']
+    return collect
+
+
+def portfolio_collector(portfolio):
+    """Scrape-time holdings cache counts of the portfolio service"""
+    def collect():
+        stats = portfolio.stats()
+        yield 'portfolio_holdings_hits', 'Portfolio valuations served from cached holdings', {}, stats['hits']
+        yield 'portfolio_holdings_misses', 'Investors whose holdings were read from the node', {}, stats['misses']
+        yield 'portfolio_cached_investors', 'Investors with cached holdings', {}, stats['cached_investors']
+    return collect
+
+
+def live_events_collector(hub):
+    """Scrape-time client and fan-out counts of the live event hub"""
+    def collect():
+        stats = hub.stats()
+        yield 'live_event_clients', 'Connected live event streams', {}, stats['clients']
+        yield 'live_events_published', 'Contract events published to live streams', {}, stats['events_published']
+        yield 'live_events_dropped', 'Queued events dropped for clients that fell behind', {}, stats['events_dropped']
+        yield 'live_events_block', 'Last block published to live streams', {}, stats['last_block']
+    return collect
@@ -0,0 +1,192 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any
+from web3 import Web3
+from logging_config import get_logger
+
+try:
+    import redis
+except ImportError:  # Redis backend is optional
+    redis = None
+
+logger = get_logger(__name__)
+
+# Node error fragments that mean our local nonce view is out of date
+NONCE_ERROR_MARKERS = (
+    'nonce too low', 'nonce too high', 'already known', 'known transaction',
+    'replacement transaction underpriced', 'invalid nonce', 'invalid transaction nonce',
+    'nonce has already been used'
+)
+
+# Node error fragments that mean the node already has this exact transaction
+KNOWN_TRANSACTION_MARKERS = ('already known', 'known transaction')
+
+
+def is_nonce_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(marker in message for marker in NONCE_ERROR_MARKERS)
+
+
+def is_known_transaction_error(error: Any) -> bool:
+    message = str(error).lower()
+    return any(marker in message for marker in KNOWN_TRANSACTION_MARKERS)
+
+
+class MemoryNonceStore:
+    """Nonce state shared by the threads of one process"""
+
+    def __init__(self):
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self, address: str):
+        with self._lock:
+            state = self._states.setdefault(address, {})
+            yield state
+
+
+class FileNonceStore:
+    """Nonce state shared by every worker process on one host through a locked file"""
+
+    def __init__(self, state_dir: str):
+        self.state_dir = state_dir
+        os.makedirs(state_dir, exist_ok=True)
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self, address: str):
+        path = os.path.join(self.state_dir, f"nonce_{address.lower()}.json")
+        with self._thread_lock, open(path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read()
+                state = json.loads(content) if content else {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class RedisNonceStore:
+    """Nonce state shared across hosts through a Redis lock"""
+
+    def __init__(self, redis_url: str, prefix: str = 'nonce:'):
+        if redis is None:
+            raise ImportError("redis package is required for the Redis nonce store")
+        self.client = redis.Redis.from_url(redis_url)
+        self.prefix = prefix
+
+    @contextmanager
+    def transaction(self, address: str):
+        key = f"{self.prefix}{address.lower()}"
+        with self.client.lock(f"{key}:lock", timeout=10, blocking_timeout=10):
+            raw = self.client.get(key)
+            state = json.loads(raw) if raw else {}
+            yield state
+            self.client.set(key, json.dumps(state))
+
+
+class NonceManager:
+    """Allocate transaction nonces locally instead of asking the node per send
+
+    The first reservation syncs from the node's pending transaction count.
+    After that nonces come from local state, so concurrent senders never
+    race on the same value and each send saves a round trip. Nonces that
+    were reserved but never broadcast are released and handed out again.
+    If the node's pending count stays below the local counter for longer
+    than gap_timeout, the missing transactions were dropped and the counter
+    is rewound to the node's view.
+    """
+
+    def __init__(self, w3: Web3, store, gap_timeout: float = 60.0, resync_interval: float = 30.0):
+        self.w3 = w3
+        self.store = store
+        self.gap_timeout = gap_timeout
+        self.resync_interval = resync_interval
+        self._last_resync: Dict[str, float] = {}
+
+    def _chain_nonce(self, address: str) -> int:
+        return self.w3.eth.get_transaction_count(address, 'pending')
+
+    def reserve(self, address: str) -> int:
+        """Reserve the next nonce for address"""
+        return self.reserve_many(address, 1)[0]
+
+    def reserve_many(self, address: str, count: int) -> List[int]:
+        """Reserve count nonces for address in one locked step"""
+        with self.store.transaction(address) as state:
+            if 'next' not in state:
+                state.update(next=self._chain_nonce(address), free=[], stalled_since=None, stalled_at=None)
+
+            free = sorted(state['free'])
+            nonces = free[:count]
+            state['free'] = free[count:]
+            while len(nonces) < count:
+                nonces.append(state['next'])
+                state['next'] += 1
+            return nonces
+
+    def release(self, address: str, nonce: int):
+        """Return a nonce whose transaction was never broadcast"""
+        with self.store.transaction(address) as state:
+            if 'next' not in state:
+                return
+            if nonce == state['next'] - 1:
+                state['next'] = nonce
+            elif nonce < state['next'] and nonce not in state['free']:
+                state['free'].append(nonce)
+
+    def resync(self, address: str):
+        """Reconcile local state with the node after a nonce error or on a timer"""
+        chain_nonce = self._chain_nonce(address)
+        with self.store.transaction(address) as state:
+            if 'next' not in state or chain_nonce > state['next']:
+                # Transactions were sent from elsewhere; skip past them
+                state.update(next=chain_nonce, free=[], stalled_since=None, stalled_at=None)
+            elif chain_nonce < state['next'] and chain_nonce == state.get('stalled_at'):
+                # The node has not accepted anything new since the last check
+                if time.time() - state['stalled_since'] > self.gap_timeout:
+                    logger.warning('nonce_gap_rewind', address=address, chain_nonce=chain_nonce, local_nonce=state['next'])
+                    state.update(next=chain_nonce, free=[], stalled_since=None, stalled_at=None)
+            elif chain_nonce < state['next']:
+                state.update(stalled_since=time.time(), stalled_at=chain_nonce)
+            else:
+                state.update(stalled_since=None, stalled_at=None)
+            state['free'] = [nonce for nonce in state['free'] if nonce >= chain_nonce]
+        self._last_resync[address] = time.monotonic()
+
+    def maybe_resync(self, address: str):
+        """Resync at most once per resync_interval so gaps are noticed without a per-send RPC"""
+        if time.monotonic() - self._last_resync.get(address, 0.0) >= self.resync_interval:
+            self.resync(address)
+
+    def peek(self, address: str) -> Dict[str, Any]:
+        with self.store.transaction(address) as state:
+            return dict(state)
+
+
+def create_nonce_manager(w3: Web3, config) -> NonceManager:
+    """Build the nonce manager with the store selected by configuration"""
+    if config.NONCE_STORE == 'redis':
+        if not config.REDIS_URL:
+            raise ValueError("REDIS_URL must be set to use the redis nonce store")
+        store = RedisNonceStore(config.REDIS_URL)
+    elif config.NONCE_STORE == 'memory':
+        store = MemoryNonceStore()
+    else:
+        store = FileNonceStore(config.NONCE_STATE_DIR)
+    return NonceManager(
+        w3,
+        store,
+        gap_timeout=config.NONCE_GAP_TIMEOUT,
+        resync_interval=config.NONCE_RESYNC_INTERVAL
+    )
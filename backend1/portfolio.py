@@ -0,0 +1,405 @@
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Any, Optional, Tuple
+from eth_abi import decode as abi_decode, encode as abi_encode
+from eth_utils import keccak
+from sqlalchemy import create_engine, select, String, Integer, Float
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
+from web3 import Web3
+from read_cache import HeadTracker
+from rpc_batch import JSONRPCBatch, rpc_error_message
+from serialization import format_wei
+from logging_config import get_logger
+
+try:
+    import numpy as np
+except ImportError:  # Portfolio valuation is optional
+    np = None
+
+logger = get_logger(__name__)
+
+# ERC-20 calls are encoded by hand: building web3 ContractFunctions for
+# thousands of properties per request would cost more than the RPC round trip
+BALANCE_OF_SELECTOR = bytes.fromhex('70a08231')
+TOTAL_SUPPLY_SELECTOR = bytes.fromhex('18160ddd')
+DECIMALS_SELECTOR = bytes.fromhex('313ce567')
+AGGREGATE3_SELECTOR = keccak(text='aggregate3((address,bool,bytes)[])')[:4]
+
+
+class PortfolioBase(DeclarativeBase):
+    pass
+
+
+class PropertyToken(PortfolioBase):
+    """A property token contract and the valuation of the whole property"""
+    __tablename__ = 'property_tokens'
+
+    contract_address: Mapped[str] = mapped_column(String(42), primary_key=True)
+    name: Mapped[str] = mapped_column(String(128))
+    valuation: Mapped[str] = mapped_column(String(64))  # decimal string in the portfolio currency
+    decimals: Mapped[int] = mapped_column(Integer)
+    added_at: Mapped[float] = mapped_column(Float)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'contract_address': self.contract_address,
+            'name': self.name,
+            'valuation': self.valuation,
+            'decimals': self.decimals
+        }
+
+
+def _balance_of_calldata(holder: str) -> bytes:
+    return BALANCE_OF_SELECTOR + bytes(12) + bytes.fromhex(holder[2:])
+
+
+def _to_uint(data: Optional[bytes]) -> Optional[int]:
+    if not data or len(data) < 32:
+        return None
+    return int.from_bytes(data[:32], 'big')
+
+
+class PropertySnapshot:
+    """Registered properties as column vectors with their total supplies at one block"""
+
+    def __init__(self, version: int, block_number: int, properties: List[Dict[str, Any]], supplies: List[int]):
+        self.version = version
+        self.block_number = block_number
+        self.properties = properties
+        self.addresses = [item['contract_address'] for item in properties]
+        self.decimals = [item['decimals'] for item in properties]
+        self.supplies = np.fromiter((float(value) for value in supplies), dtype=np.float64, count=len(supplies))
+        self.scales = np.fromiter((10.0 ** item['decimals'] for item in properties), dtype=np.float64,
+                                  count=len(properties))
+        self.valuations = np.fromiter((float(item['valuation']) for item in properties), dtype=np.float64,
+                                      count=len(properties))
+
+
+class PortfolioService:
+    """Values investor holdings across every registered property token
+
+    For each block, the total supply of every property is read once into
+    a snapshot shared by all investors. Each investor's balanceOf row is
+    read once per block as well, with all properties packed into
+    Multicall3 aggregate3 calls (or JSON-RPC batches), and kept sparse
+    since investors hold few of the properties. Ownership and value are
+    computed for the whole holder x property matrix with NumPy, so a
+    cached portfolio over thousands of properties costs a few vector
+    operations and no RPC calls.
+    """
+
+    def __init__(self, w3: Web3, database_url: str, head_tracker: HeadTracker, multicall_address: str = None,
+                 chunk_size: int = 1000, cache_size: int = 1000, currency: str = 'USD'):
+        if np is None:
+            raise ImportError("numpy package is required for portfolio valuation")
+
+        self.w3 = w3
+        self.head_tracker = head_tracker
+        self.multicall_address = Web3.to_checksum_address(multicall_address) if multicall_address else None
+        self.chunk_size = chunk_size
+        self.cache_size = cache_size
+        self.currency = currency
+
+        self.engine = create_engine(database_url)
+        PortfolioBase.metadata.create_all(self.engine)
+        self.Session = sessionmaker(self.engine, expire_on_commit=False)
+
+        self._snapshot: Optional[PropertySnapshot] = None
+        self._snapshot_lock = threading.Lock()
+        self._versions = 0
+        self._holdings: 'OrderedDict[Tuple[str, int], Tuple[Any, List[int]]]' = OrderedDict()
+        self._holdings_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Configured properties still to be registered: (address, valuation)
+        self._seeds: List[Tuple[str, Any]] = []
+        self._seeds_lock = threading.Lock()
+        self.head_tracker.add_listener(self._on_new_head)
+
+    def _on_new_head(self, old_head, new_head):
+        # Rows are keyed by snapshot, so older ones would never be read again
+        with self._holdings_lock:
+            self._holdings.clear()
+
+    # Registry
+
+    def seed_properties(self, entries: List[Tuple[str, Any]]):
+        """Register properties on first use rather than now, so building the service makes no RPC calls"""
+        for address, valuation in entries:
+            if not Web3.is_address(address):
+                raise ValueError(f"Invalid contract address: {address}")
+        with self._seeds_lock:
+            self._seeds.extend(entries)
+
+    def _register_seeds(self):
+        if not self._seeds:
+            return
+        with self._seeds_lock:
+            remaining = []
+            for address, valuation in self._seeds:
+                try:
+                    self.register_property(address, None, valuation)
+                except ValueError as e:
+                    logger.error('portfolio_seed_failed', contract=address, error=str(e))
+                except Exception as e:
+                    # The node may be unreachable; try again on the next request
+                    logger.warning('portfolio_seed_deferred', contract=address, error=str(e))
+                    remaining.append((address, valuation))
+            self._seeds = remaining
+
+    def list_properties(self) -> List[Dict[str, Any]]:
+        self._register_seeds()
+        return self._load_properties()
+
+    def _load_properties(self) -> List[Dict[str, Any]]:
+        with self.Session() as session:
+            rows = session.scalars(
+                select(PropertyToken).order_by(PropertyToken.added_at, PropertyToken.contract_address)
+            ).all()
+            return [row.to_dict() for row in rows]
+
+    def register_property(self, contract_address: str, name: str, valuation: Any,
+                          decimals: int = None) -> Dict[str, Any]:
+        """Add or update a property token; decimals are read from the contract when omitted"""
+        if not Web3.is_address(contract_address):
+            raise ValueError(f"Invalid contract address: {contract_address}")
+        try:
+            valuation = Decimal(str(valuation))
+        except InvalidOperation:
+            raise ValueError(f"Invalid valuation: {valuation}")
+        if not valuation.is_finite() or valuation < 0:
+            raise ValueError(f"Invalid valuation: {valuation}")
+
+        address = Web3.to_checksum_address(contract_address)
+        with self.Session() as session:
+            existing = session.get(PropertyToken, address)
+        if decimals is None:
+            if existing is not None:
+                decimals = existing.decimals
+            else:
+                decimals = _to_uint(bytes(self.w3.eth.call({'to': address, 'data': Web3.to_hex(DECIMALS_SELECTOR)})))
+                if decimals is None:
+                    raise ValueError(f"{address} does not implement decimals()")
+
+        with self.Session() as session, session.begin():
+            row = session.merge(PropertyToken(
+                contract_address=address,
+                name=name or (existing.name if existing else address),
+                valuation=str(valuation),
+                decimals=int(decimals),
+                added_at=existing.added_at if existing else time.time()
+            ))
+            result = row.to_dict()
+
+        self.invalidate()
+        return result
+
+    def remove_property(self, contract_address: str) -> bool:
+        if not Web3.is_address(contract_address):
+            raise ValueError(f"Invalid contract address: {contract_address}")
+        with self.Session() as session, session.begin():
+            row = session.get(PropertyToken, Web3.to_checksum_address(contract_address))
+            if row is None:
+                return False
+            session.delete(row)
+        self.invalidate()
+        return True
+
+    def invalidate(self):
+        """Drop the snapshot so the next request reloads the registry"""
+        with self._snapshot_lock:
+            self._snapshot = None
+        with self._holdings_lock:
+            self._holdings.clear()
+
+    # Chain reads
+
+    def _call_many(self, calls: List[Tuple[str, bytes]], block_number: int) -> List[Optional[bytes]]:
+        """Return data for (target, calldata) pairs at a block, None where a call failed"""
+        results = []
+        for start in range(0, len(calls), self.chunk_size):
+            chunk = calls[start:start + self.chunk_size]
+            if self.multicall_address:
+                results.extend(self._multicall(chunk, block_number))
+            else:
+                results.extend(self._batch(chunk, block_number))
+        return results
+
+    def _multicall(self, calls: List[Tuple[str, bytes]], block_number: int) -> List[Optional[bytes]]:
+        data = AGGREGATE3_SELECTOR + abi_encode(
+            ['(address,bool,bytes)[]'], [[(target, True, calldata) for target, calldata in calls]]
+        )
+        raw = self.w3.eth.call({'to': self.multicall_address, 'data': Web3.to_hex(data)},
+                               block_identifier=block_number)
+        if not raw:
+            raise ValueError(f"No Multicall3 contract at {self.multicall_address}")
+        (decoded,) = abi_decode(['(bool,bytes)[]'], bytes(raw))
+        return [data if success else None for success, data in decoded]
+
+    def _batch(self, calls: List[Tuple[str, bytes]], block_number: int) -> List[Optional[bytes]]:
+        block = hex(block_number)
+        responses = JSONRPCBatch(self.w3).execute([
+            ('eth_call', [{'to': target, 'data': Web3.to_hex(calldata)}, block]) for target, calldata in calls
+        ])
+        results = []
+        for response in responses:
+            if 'error' in response:
+                logger.debug('portfolio_call_failed', error=rpc_error_message(self.w3, response['error']))
+                results.append(None)
+            else:
+                results.append(Web3.to_bytes(hexstr=response.get('result') or '0x'))
+        return results
+
+    def _read_uints(self, calls: List[Tuple[str, bytes]], block_number: int) -> List[int]:
+        values = [_to_uint(data) for data in self._call_many(calls, block_number)]
+        failed = sum(value is None for value in values)
+        if failed:
+            logger.warning('portfolio_reads_failed', failed=failed, calls=len(calls), block_number=block_number)
+        return [value or 0 for value in values]
+
+    def get_snapshot(self, block_number: int = None) -> PropertySnapshot:
+        """Properties and total supplies at block_number (the current head by default)"""
+        self._register_seeds()
+        if block_number is None:
+            block_number = self.head_tracker.get_head()[0]
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.block_number == block_number:
+            return snapshot
+
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.block_number == block_number:
+                return snapshot
+
+            # The registry is reloaded with each block, so workers pick up properties added elsewhere
+            properties = self._load_properties()
+            supplies = self._read_uints([(item['contract_address'], TOTAL_SUPPLY_SELECTOR) for item in properties],
+                                        block_number)
+            self._versions += 1
+            snapshot = PropertySnapshot(self._versions, block_number, properties, supplies)
+            if self._snapshot is None or block_number >= self._snapshot.block_number:
+                self._snapshot = snapshot
+            return snapshot
+
+    def _holdings_rows(self, investors: List[str], snapshot: PropertySnapshot) -> List[Tuple[Any, List[int]]]:
+        """Sparse (property indices, raw balances) per investor, reading uncached investors together"""
+        rows: Dict[str, Tuple[Any, List[int]]] = {}
+        with self._holdings_lock:
+            for investor in investors:
+                row = self._holdings.get((investor, snapshot.version))
+                if row is not None:
+                    self._holdings.move_to_end((investor, snapshot.version))
+                    rows[investor] = row
+            self.hits += len(rows)
+
+        missing = [investor for investor in investors if investor not in rows]
+        if missing:
+            self.misses += len(missing)
+            calls = [(address, _balance_of_calldata(investor))
+                     for investor in missing for address in snapshot.addresses]
+            values = self._read_uints(calls, snapshot.block_number)
+            count = len(snapshot.addresses)
+            for offset, investor in enumerate(missing):
+                balances = values[offset * count:(offset + 1) * count]
+                indices = np.flatnonzero(np.fromiter((value > 0 for value in balances), dtype=bool, count=count))
+                rows[investor] = (indices, [balances[index] for index in indices])
+
+            with self._holdings_lock:
+                for investor in missing:
+                    self._holdings[(investor, snapshot.version)] = rows[investor]
+                while len(self._holdings) > self.cache_size:
+                    self._holdings.popitem(last=False)
+
+        return [rows[investor] for investor in investors]
+
+    # Valuation
+
+    def valuate(self, investors: List[str], block_number: int = None) -> Dict[str, Any]:
+        """Holdings, ownership and value of each investor across all registered properties"""
+        invalid = [address for address in investors if not isinstance(address, str) or not Web3.is_address(address)]
+        if invalid:
+            raise ValueError(f"Invalid addresses: {', '.join(str(address) for address in invalid[:5])}")
+        investors = list(dict.fromkeys(Web3.to_checksum_address(address) for address in investors))
+
+        snapshot = self.get_snapshot(block_number)
+        rows = self._holdings_rows(investors, snapshot)
+
+        # Holder x property matrix of token amounts, then ownership and value for every cell at once
+        balances = np.zeros((len(investors), len(snapshot.addresses)), dtype=np.float64)
+        for position, (indices, raw) in enumerate(rows):
+            balances[position, indices] = np.fromiter((float(value) for value in raw), dtype=np.float64,
+                                                      count=len(raw))
+        ownership = np.divide(balances, snapshot.supplies, out=np.zeros_like(balances),
+                              where=snapshot.supplies > 0)
+        values = ownership * snapshot.valuations
+        totals = values.sum(axis=1)
+
+        portfolios = []
+        for position, (investor, (indices, raw)) in enumerate(zip(investors, rows)):
+            raw_by_index = dict(zip(indices.tolist(), raw))
+            # Largest positions first
+            order = indices[np.argsort(-values[position, indices], kind='stable')].tolist()
+            portfolios.append({
+                'address': investor,
+                'total_value': round(float(totals[position]), 2),
+                'properties_held': len(order),
+                'holdings': [{
+                    'contract_address': snapshot.addresses[index],
+                    'name': snapshot.properties[index]['name'],
+                    'balance_raw': str(raw_by_index[index]),
+                    'balance': format_wei(raw_by_index[index], snapshot.decimals[index]),
+                    'ownership': float(ownership[position, index]),
+                    'value': round(float(values[position, index]), 2)
+                } for index in order]
+            })
+
+        return {
+            'block_number': snapshot.block_number,
+            'currency': self.currency,
+            'properties': len(snapshot.addresses),
+            'portfolios': portfolios
+        }
+
+    def get_portfolio(self, investor: str, block_number: int = None) -> Dict[str, Any]:
+        result = self.valuate([investor], block_number)
+        return {
+            'block_number': result['block_number'],
+            'currency': result['currency'],
+            'properties': result['properties'],
+            **result['portfolios'][0]
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            'properties': len(snapshot.addresses) if snapshot else None,
+            'snapshot_block': snapshot.block_number if snapshot else None,
+            'cached_investors': len(self._holdings),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+def create_portfolio_service(w3: Web3, config, head_tracker: HeadTracker = None) -> Optional[PortfolioService]:
+    """Build the portfolio service, sharing the read cache's head tracker when there is one"""
+    if not config.PORTFOLIO_ENABLED:
+        return None
+
+    service = PortfolioService(
+        w3,
+        config.PORTFOLIO_DATABASE_URL,
+        head_tracker or HeadTracker(w3, refresh_interval=config.HEAD_REFRESH_INTERVAL),
+        multicall_address=config.MULTICALL3_ADDRESS if config.PORTFOLIO_USE_MULTICALL else None,
+        chunk_size=config.PORTFOLIO_CALL_CHUNK_SIZE,
+        cache_size=config.PORTFOLIO_CACHE_SIZE,
+        currency=config.PORTFOLIO_CURRENCY
+    )
+
+    # PORTFOLIO_PROPERTIES entries look like address=valuation
+    service.seed_properties([
+        (address, valuation or 0)
+        for address, _, valuation in (entry.partition('=') for entry in config.PORTFOLIO_PROPERTIES)
+    ])
+    return service
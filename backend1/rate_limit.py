@@ -0,0 +1,152 @@
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from logging_config import get_logger
+
+try:
+    import redis
+except ImportError:  # Redis backend is optional
+    redis = None
+
+logger = get_logger(__name__)
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Refill and take tokens atomically; the Redis clock keeps all hosts consistent
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """Parse '100/hour' (or '10/second', '5/minute', '1000/day') into (count, tokens per second)"""
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(second|minute|hour|day)s?\s*', rate or '')
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"Invalid rate limit {rate!r}, expected e.g. '100/hour'")
+    count = int(match.group(1))
+    return count, count / _PERIODS[match.group(2)]
+
+
+class InProcessTokenBuckets:
+    """Per-key token buckets kept in worker memory
+
+    Each gunicorn worker enforces the limit on its own, so a client can
+    get up to workers x the limit; use the Redis backend for an exact
+    limit across workers and hosts. Idle keys are evicted LRU first once
+    max_keys is reached (an evicted key starts again with a full bucket).
+    """
+
+    def __init__(self, capacity: int, rate: float, max_keys: int = 100000):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, cost: float = 1) -> Tuple[bool, float]:
+        """Take cost tokens from key's bucket; returns (allowed, tokens left)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens
+
+
+class RedisTokenBuckets:
+    """Per-key token buckets shared by all workers through Redis"""
+
+    def __init__(self, redis_url: str, capacity: int, rate: float, prefix: str = 'ratelimit:'):
+        if redis is None:
+            raise ImportError("redis package is required for the Redis rate limit backend")
+
+        self.client = redis.Redis.from_url(redis_url)
+        self.capacity = capacity
+        self.rate = rate
+        self.prefix = prefix
+        self._script = self.client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    def acquire(self, key: str, cost: float = 1) -> Tuple[bool, float]:
+        """Take cost tokens from key's bucket; returns (allowed, tokens left)"""
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[self.capacity, self.rate, cost])
+        return bool(allowed), float(tokens)
+
+
+class RateLimiter:
+    """Token bucket rate limit per client key
+
+    The bucket holds up to `capacity` requests and refills continuously at
+    the configured rate, so '100/hour' allows a burst of 100 and then one
+    request every 36 seconds. If the backing store fails, requests are let
+    through rather than failing the API.
+    """
+
+    def __init__(self, buckets, limit: str):
+        self.buckets = buckets
+        self.limit = limit
+        self.allowed = 0
+        self.rejected = 0
+
+    def check(self, key: str, cost: float = 1) -> Tuple[bool, int, Optional[int]]:
+        """Return (allowed, remaining requests, seconds until retry when rejected)"""
+        try:
+            allowed, tokens = self.buckets.acquire(key, cost)
+        except Exception as e:
+            logger.warning('rate_limit_store_failed', error=str(e))
+            return True, 0, None
+
+        if allowed:
+            self.allowed += 1
+            return True, int(tokens), None
+        self.rejected += 1
+        return False, int(tokens), max(1, math.ceil((cost - tokens) / self.buckets.rate))
+
+    def stats(self):
+        return {
+            'limit': self.limit,
+            'backend': type(self.buckets).__name__,
+            'allowed': self.allowed,
+            'rejected': self.rejected
+        }
+
+
+def create_rate_limiter(config) -> Optional[RateLimiter]:
+    """Build the API rate limiter from API_RATE_LIMIT, or None when disabled"""
+    if not config.RATE_LIMIT_ENABLED or not config.API_RATE_LIMIT:
+        return None
+
+    count, rate = parse_rate(config.API_RATE_LIMIT)
+    capacity = config.RATE_LIMIT_BURST or count
+    if config.RATE_LIMIT_BACKEND == 'redis':
+        if not config.REDIS_URL:
+            raise ValueError("REDIS_URL must be set to use the redis rate limit backend")
+        buckets = RedisTokenBuckets(config.REDIS_URL, capacity, rate)
+    else:
+        buckets = InProcessTokenBuckets(capacity, rate, max_keys=config.RATE_LIMIT_MAX_KEYS)
+    return RateLimiter(buckets, config.API_RATE_LIMIT)
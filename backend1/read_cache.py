@@ -0,0 +1,227 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from web3 import Web3
+from logging_config import get_logger
+from serialization import to_block_number
+
+try:
+    import redis
+except ImportError:  # Redis backend is optional
+    redis = None
+
+logger = get_logger(__name__)
+
+_MISSING = object()
+
+
+class InProcessCacheStore:
+    """Size-bounded LRU store kept in worker memory"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._volatile_keys = set()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                return _MISSING
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key: str, value: Any, volatile: bool = False):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if volatile:
+                self._volatile_keys.add(key)
+
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._volatile_keys.discard(evicted_key)
+                self.evictions += 1
+
+    def drop_volatile(self) -> int:
+        """Drop every entry that depends on a non-finalized block"""
+        with self._lock:
+            dropped = 0
+            for key in self._volatile_keys:
+                if self._entries.pop(key, _MISSING) is not _MISSING:
+                    dropped += 1
+            self._volatile_keys.clear()
+            return dropped
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheStore:
+    """Store shared by all workers through Redis"""
+
+    def __init__(self, redis_url: str, volatile_ttl: int = 60, prefix: str = 'readcache:'):
+        if redis is None:
+            raise ImportError("redis package is required for the Redis read cache backend")
+
+        self.client = redis.Redis.from_url(redis_url)
+        self.volatile_ttl = volatile_ttl
+        self.prefix = prefix
+        self.evictions = 0  # Eviction is delegated to the Redis maxmemory policy
+
+    def get(self, key: str) -> Any:
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return _MISSING
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any, volatile: bool = False):
+        # Volatile keys embed the head hash, so a short TTL is enough to clean them up
+        self.client.set(
+            self.prefix + key,
+            json.dumps(value),
+            ex=self.volatile_ttl if volatile else None
+        )
+
+    def drop_volatile(self) -> int:
+        return 0
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class HeadTracker:
+    """Track the chain head, refreshing it at most once per interval"""
+
+    def __init__(self, w3: Web3, refresh_interval: float = 1.0):
+        self.w3 = w3
+        self.refresh_interval = refresh_interval
+        self._head: Optional[Tuple[int, str]] = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Register a callback invoked with (old_head, new_head) when the head changes"""
+        self._listeners.append(callback)
+
+    def get_head(self) -> Tuple[int, str]:
+        """Return (block_number, block_hash) of the current head"""
+        now = time.monotonic()
+        if self._head is not None and now - self._fetched_at < self.refresh_interval:
+            return self._head
+
+        with self._lock:
+            if self._head is not None and time.monotonic() - self._fetched_at < self.refresh_interval:
+                return self._head
+
+            block = self.w3.eth.get_block('latest')
+            self.update((block['number'], Web3.to_hex(block['hash'])))
+            return self._head
+
+    def update(self, new_head: Tuple[int, str]):
+        """Record a new head, e.g. from a subscription, and notify listeners"""
+        old_head = self._head
+        self._head = new_head
+        self._fetched_at = time.monotonic()
+
+        if old_head != new_head:
+            for callback in self._listeners:
+                callback(old_head, new_head)
+
+
+class ReadCache:
+    """Read-through cache for chain reads keyed by block
+
+    Reads at blocks older than the finality depth never change and are kept
+    until LRU eviction. Reads at recent blocks are tagged with the current
+    head hash, so a new head or a reorg makes them unreachable.
+    """
+
+    def __init__(self, store, head_tracker: HeadTracker, finality_depth: int = 64):
+        self.store = store
+        self.head_tracker = head_tracker
+        self.finality_depth = finality_depth
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.head_tracker.add_listener(self._on_new_head)
+
+    def _on_new_head(self, old_head, new_head):
+        dropped = self.store.drop_volatile()
+        self.invalidations += dropped
+        if old_head is not None and new_head[0] <= old_head[0]:
+            logger.warning('read_cache_reorg', block=new_head[0], dropped=dropped)
+
+    def resolve_block(self, block_identifier: Any = 'latest') -> int:
+        """Resolve a block identifier to a concrete block number"""
+        if block_identifier in (None, 'latest'):
+            return self.head_tracker.get_head()[0]
+        return to_block_number(block_identifier)
+
+    def make_key(self, namespace: str, key_parts: Tuple, block_number: int) -> Tuple[str, bool]:
+        """Build the store key for a read and report whether it is volatile"""
+        head_number, head_hash = self.head_tracker.get_head()
+        volatile = block_number > head_number - self.finality_depth
+
+        key = ':'.join([namespace, *[str(part) for part in key_parts], str(block_number)])
+        if volatile:
+            key = f"{key}@{head_hash}"
+        return key, volatile
+
+    def lookup(self, key: str) -> Any:
+        """Return the cached value or the missing sentinel, updating counters"""
+        cached = self.store.get(key)
+        if cached is _MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cached
+
+    def get_or_load(self, namespace: str, key_parts: Tuple, block_number: int, loader) -> Any:
+        """Return the cached value for key_parts at block_number, calling loader on a miss"""
+        key, volatile = self.make_key(namespace, key_parts, block_number)
+
+        cached = self.lookup(key)
+        if cached is not _MISSING:
+            return cached
+
+        value = loader()
+        self.store.set(key, value, volatile=volatile)
+        return value
+
+    @staticmethod
+    def is_missing(value: Any) -> bool:
+        return value is _MISSING
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for monitoring"""
+        total = self.hits + self.misses
+        return {
+            'backend': type(self.store).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'invalidations': self.invalidations,
+            'evictions': self.store.evictions,
+            'entries': self.store.size()
+        }
+
+
+def create_read_cache(w3: Web3, config) -> Optional[ReadCache]:
+    """Build the read cache selected by configuration"""
+    if not config.READ_CACHE_ENABLED:
+        return None
+
+    if config.READ_CACHE_BACKEND == 'redis':
+        if not config.REDIS_URL:
+            raise ValueError("REDIS_URL must be set to use the redis read cache backend")
+        store = RedisCacheStore(config.REDIS_URL, volatile_ttl=config.READ_CACHE_VOLATILE_TTL)
+    else:
+        store = InProcessCacheStore(max_entries=config.READ_CACHE_MAX_ENTRIES)
+
+    head_tracker = HeadTracker(w3, refresh_interval=config.HEAD_REFRESH_INTERVAL)
+    return ReadCache(store, head_tracker, finality_depth=config.FINALITY_DEPTH)
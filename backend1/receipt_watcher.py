@@ -0,0 +1,248 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Any, Optional, Tuple
+from web3 import Web3
+from logging_config import get_logger
+from rpc_batch import JSONRPCBatch
+
+logger = get_logger(__name__)
+
+
+def format_receipt(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a raw JSON-RPC receipt into the API's receipt shape"""
+    def to_int(value):
+        return int(value, 16) if isinstance(value, str) else value
+
+    return {
+        'transaction_hash': raw['transactionHash'],
+        'block_number': to_int(raw['blockNumber']),
+        'block_hash': raw['blockHash'],
+        'gas_used': to_int(raw['gasUsed']),
+        'effective_gas_price': to_int(raw.get('effectiveGasPrice')),
+        'status': to_int(raw.get('status')),
+        'contract_address': raw.get('contractAddress'),
+        'logs': raw.get('logs', [])
+    }
+
+
+class ReceiptWatcher:
+    """Resolve transaction receipts for many waiters with one fetch per block
+
+    Callers register hashes and get a Future instead of polling. A single
+    thread follows the chain head, either through an eth_subscribe newHeads
+    WebSocket or by polling eth_blockNumber. On each new block it fetches the
+    receipts of every pending hash in JSON-RPC batches of batch_size, so RPC
+    cost grows with blocks, not with waiters. Resolved receipts are kept in a
+    small LRU so repeated lookups skip the node entirely, but only once they
+    are reorg_depth blocks below the head; waiters still get younger receipts
+    straight away, they are just not remembered, since a reorg may still
+    replace those blocks.
+    """
+
+    def __init__(self, w3: Web3, poll_interval: float = 1.0, ws_url: str = None,
+                 default_timeout: float = 120.0, batch_size: int = 100, cache_size: int = 10000,
+                 reorg_depth: int = 0):
+        self.w3 = w3
+        self.poll_interval = poll_interval
+        self.ws_url = ws_url
+        self.default_timeout = default_timeout
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.reorg_depth = reorg_depth
+
+        self._pending: Dict[str, List[Tuple[Future, float]]] = {}
+        self._fresh = set()  # registered since the last fetch; may already be mined
+        self._receipts: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_block = None
+        self.blocks_processed = 0
+        self.receipt_requests = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='receipt-watcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def watch(self, tx_hash: str, timeout: float = None) -> Future:
+        """Future resolving to the formatted receipt, or TimeoutError after timeout seconds"""
+        tx_hash = tx_hash.lower()
+        future = Future()
+        with self._lock:
+            receipt = self._receipts.get(tx_hash)
+            if receipt is None:
+                deadline = time.monotonic() + (self.default_timeout if timeout is None else timeout)
+                self._pending.setdefault(tx_hash, []).append((future, deadline))
+                self._fresh.add(tx_hash)
+        if receipt is not None:
+            future.set_result(receipt)
+        else:
+            self.start()
+        return future
+
+    def wait(self, tx_hash: str, timeout: float = None) -> Dict[str, Any]:
+        """Block until the receipt is available; prefer watch() in request handlers"""
+        timeout = self.default_timeout if timeout is None else timeout
+        return self.watch(tx_hash, timeout).result(timeout=timeout + self.poll_interval * 2)
+
+    def get_cached(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._receipts.get(tx_hash.lower())
+
+    def fetch_receipts(self, tx_hashes: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Fetch receipts now in JSON-RPC batches; None for hashes not yet mined"""
+        receipts = []
+        for start in range(0, len(tx_hashes), self.batch_size):
+            chunk = tx_hashes[start:start + self.batch_size]
+            responses = JSONRPCBatch(self.w3).execute([
+                ('eth_getTransactionReceipt', [tx_hash]) for tx_hash in chunk
+            ])
+            with self._lock:
+                self.receipt_requests += 1
+            for tx_hash, response in zip(chunk, responses):
+                raw = response.get('result')
+                receipts.append(format_receipt(raw) if raw else None)
+        return receipts
+
+    def _run(self):
+        if self.ws_url:
+            while not self._stop.is_set():
+                try:
+                    self._follow_subscription()
+                except Exception as e:
+                    logger.warning('receipt_subscription_failed', error=str(e))
+                    # Keep resolving receipts by polling while the socket is down
+                    deadline = time.monotonic() + 5
+                    while time.monotonic() < deadline and not self._stop.is_set():
+                        self._poll_once()
+                        self._stop.wait(self.poll_interval)
+        else:
+            while not self._stop.is_set():
+                self._poll_once()
+                self._stop.wait(self.poll_interval)
+
+    def _poll_once(self):
+        try:
+            self.on_head(self.w3.eth.block_number)
+        except Exception as e:
+            logger.error('receipt_poll_failed', error=str(e))
+
+    def _follow_subscription(self):
+        from websockets.sync.client import connect
+
+        with connect(self.ws_url) as socket:
+            socket.send(json.dumps({
+                'jsonrpc': '2.0', 'id': 1, 'method': 'eth_subscribe', 'params': ['newHeads']
+            }))
+            logger.info('receipt_watcher_subscribed')
+            while not self._stop.is_set():
+                try:
+                    message = json.loads(socket.recv(timeout=self.poll_interval))
+                except TimeoutError:
+                    # No block yet; still check newly registered hashes and expire overdue waiters
+                    if self._last_block is not None:
+                        self.on_head(self._last_block)
+                    else:
+                        self._expire(time.monotonic())
+                    continue
+                head = message.get('params', {}).get('result', {})
+                if 'number' in head:
+                    self.on_head(int(head['number'], 16))
+
+    def on_head(self, block_number: int):
+        """Check every pending hash once for a new block, or only new hashes otherwise"""
+        now = time.monotonic()
+        new_block = block_number != self._last_block
+        if new_block:
+            self._last_block = block_number
+            self.blocks_processed += 1
+
+        with self._lock:
+            hashes = list(self._pending) if new_block else [h for h in self._fresh if h in self._pending]
+            self._fresh.clear()
+        if hashes:
+            resolved = {}
+            for tx_hash, receipt in zip(hashes, self.fetch_receipts(hashes)):
+                if receipt is not None:
+                    resolved[tx_hash] = receipt
+            self._resolve(resolved, block_number)
+        self._expire(now)
+
+    def _is_final(self, receipt: Dict[str, Any], head: int) -> bool:
+        if not self.reorg_depth:
+            return True
+        return receipt['block_number'] is not None and receipt['block_number'] <= head - self.reorg_depth
+
+    def _resolve(self, receipts: Dict[str, Dict[str, Any]], head: int):
+        waiters = []
+        with self._lock:
+            for tx_hash, receipt in receipts.items():
+                if self._is_final(receipt, head):
+                    self._receipts[tx_hash] = receipt
+                    self._receipts.move_to_end(tx_hash)
+                waiters.extend((future, receipt) for future, _ in self._pending.pop(tx_hash, []))
+            while len(self._receipts) > self.cache_size:
+                self._receipts.popitem(last=False)
+        # Callbacks run outside the lock so they may register new hashes
+        for future, receipt in waiters:
+            if not future.done():
+                future.set_result(receipt)
+
+    def _expire(self, now: float):
+        expired = []
+        with self._lock:
+            for tx_hash in list(self._pending):
+                waiters = self._pending[tx_hash]
+                expired.extend((tx_hash, future) for future, deadline in waiters if deadline <= now)
+                remaining = [(future, deadline) for future, deadline in waiters if deadline > now]
+                if remaining:
+                    self._pending[tx_hash] = remaining
+                else:
+                    del self._pending[tx_hash]
+        for tx_hash, future in expired:
+            if not future.done():
+                future.set_exception(TimeoutError(f"Transaction {tx_hash} was not mined in time"))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+            cached = len(self._receipts)
+        return {
+            'mode': 'websocket' if self.ws_url else 'polling',
+            'pending': pending,
+            'cached_receipts': cached,
+            'last_block': self._last_block,
+            'blocks_processed': self.blocks_processed,
+            'receipt_requests': self.receipt_requests
+        }
+
+
+def create_receipt_watcher(w3: Web3, config) -> ReceiptWatcher:
+    """Build the receipt watcher; a ws:// provider URL enables the newHeads subscription"""
+    ws_url = config.RECEIPT_WS_URL
+    provider_url = config.get_web3_provider_url()
+    if not ws_url and provider_url.startswith('ws'):
+        ws_url = provider_url
+
+    return ReceiptWatcher(
+        w3,
+        poll_interval=config.RECEIPT_POLL_INTERVAL,
+        ws_url=ws_url,
+        default_timeout=config.RECEIPT_TIMEOUT,
+        batch_size=config.RECEIPT_BATCH_SIZE,
+        cache_size=config.RECEIPT_CACHE_SIZE,
+        reorg_depth=config.RECEIPT_REORG_DEPTH
+    )
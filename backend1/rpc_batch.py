@@ -0,0 +1,183 @@
+import itertools
+import json
+from typing import Dict, List, Any, Tuple
+from web3 import Web3
+from web3._utils.request import get_response_from_post_request
+from logging_config import get_logger
+from metrics import RPC_REQUEST_DURATION, RPC_REQUEST_ERRORS
+from rpc_pool import endpoint_label, redact_url
+
+logger = get_logger(__name__)
+
+ERROR_STRING_SELECTOR = bytes.fromhex('08c379a0')  # Error(string)
+PANIC_SELECTOR = bytes.fromhex('4e487b71')  # Panic(uint256)
+
+# Minimal ABI for Multicall3.aggregate3, deployed at the same address on most chains
+MULTICALL3_ABI = [{
+    'name': 'aggregate3',
+    'type': 'function',
+    'stateMutability': 'payable',
+    'inputs': [{
+        'name': 'calls',
+        'type': 'tuple[]',
+        'components': [
+            {'name': 'target', 'type': 'address'},
+            {'name': 'allowFailure', 'type': 'bool'},
+            {'name': 'callData', 'type': 'bytes'}
+        ]
+    }],
+    'outputs': [{
+        'name': 'returnData',
+        'type': 'tuple[]',
+        'components': [
+            {'name': 'success', 'type': 'bool'},
+            {'name': 'returnData', 'type': 'bytes'}
+        ]
+    }]
+}]
+
+
+class RPCBatchError(Exception):
+    """Raised when a JSON-RPC batch cannot be sent or its response is malformed"""
+
+
+_request_counter = itertools.count()
+
+
+def _build_batch_payload(requests: List[Tuple[str, List]]) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """JSON-RPC request objects with unique ids, and the ids in input order"""
+    payload = []
+    ids = []
+    for method, params in requests:
+        request_id = next(_request_counter)
+        ids.append(request_id)
+        payload.append({
+            'jsonrpc': '2.0',
+            'method': method,
+            'params': params,
+            'id': request_id
+        })
+    return payload, ids
+
+
+def _match_batch_responses(body: Any, ids: List[int]) -> List[Dict[str, Any]]:
+    """Order a batch response body by request id"""
+    if not isinstance(body, list):
+        # Some nodes reply to a rejected batch with a single error object
+        error = body.get('error', body) if isinstance(body, dict) else body
+        raise RPCBatchError(f"Provider rejected JSON-RPC batch: {error}")
+
+    # Batch responses may arrive in any order, so match them back up by id
+    by_id = {item.get('id'): item for item in body}
+    return [
+        by_id.get(request_id, {'error': {'message': 'Missing response for request'}})
+        for request_id in ids
+    ]
+
+
+class JSONRPCBatch:
+    """Send several JSON-RPC requests to the provider in a single round trip"""
+
+    def __init__(self, w3: Web3):
+        self.w3 = w3
+
+    def execute(self, requests: List[Tuple[str, List]]) -> List[Dict[str, Any]]:
+        """Execute (method, params) pairs and return raw responses in input order"""
+        if not requests:
+            return []
+
+        provider = self.w3.provider
+        endpoint_uri = getattr(provider, 'endpoint_uri', None)
+        batch_capable = hasattr(provider, 'make_batch_request')
+
+        # Only HTTP providers accept a JSON array body; fall back to one call per request
+        if not batch_capable and (not endpoint_uri or not str(endpoint_uri).startswith('http')):
+            return [self._execute_single(method, params) for method, params in requests]
+
+        payload, ids = _build_batch_payload(requests)
+        logger.debug('rpc_batch', requests=len(payload),
+                     endpoint=endpoint_label(endpoint_uri) if endpoint_uri else 'pool')
+
+        # Batches bypass web3 middleware, so they are timed here
+        try:
+            with RPC_REQUEST_DURATION.labels('batch').time():
+                if batch_capable:
+                    body = provider.make_batch_request(payload)
+                else:
+                    response = get_response_from_post_request(
+                        endpoint_uri,
+                        data=json.dumps(payload),
+                        **provider.get_request_kwargs()
+                    )
+                    response.raise_for_status()
+                    body = response.json()
+        except Exception as e:
+            RPC_REQUEST_ERRORS.labels('batch').inc()
+            # Not chained: the transport exception's message and traceback carry the URL
+            message = redact_url(str(e), endpoint_uri) if endpoint_uri else str(e)
+            raise RPCBatchError(f"JSON-RPC batch request failed: {message}") from None
+
+        return _match_batch_responses(body, ids)
+
+    def _execute_single(self, method: str, params: List) -> Dict[str, Any]:
+        """Execute one request through the provider, bypassing middleware"""
+        try:
+            return self.w3.provider.make_request(method, params)
+        except Exception as e:
+            return {'error': {'message': str(e)}}
+
+
+class AsyncJSONRPCBatch:
+    """JSONRPCBatch for the async handler, posted over its shared aiohttp session"""
+
+    def __init__(self, session, endpoint_uri: str):
+        self.session = session
+        self.endpoint_uri = endpoint_uri
+
+    async def execute(self, requests: List[Tuple[str, List]]) -> List[Dict[str, Any]]:
+        """Execute (method, params) pairs and return raw responses in input order"""
+        if not requests:
+            return []
+
+        payload, ids = _build_batch_payload(requests)
+        try:
+            with RPC_REQUEST_DURATION.labels('batch').time():
+                async with self.session.post(self.endpoint_uri, json=payload) as response:
+                    body = await response.json(content_type=None)
+        except Exception as e:
+            RPC_REQUEST_ERRORS.labels('batch').inc()
+            raise RPCBatchError(f"JSON-RPC batch request failed: {redact_url(str(e), self.endpoint_uri)}") from None
+
+        return _match_batch_responses(body, ids)
+
+
+def decode_revert_reason(w3: Web3, data: Any) -> str:
+    """Decode Error(string) / Panic(uint256) revert data into a readable reason"""
+    if isinstance(data, str):
+        data = bytes.fromhex(data[2:] if data.startswith('0x') else data)
+    data = bytes(data or b'')
+
+    if not data:
+        return 'execution reverted'
+
+    try:
+        if data[:4] == ERROR_STRING_SELECTOR:
+            return f"execution reverted: {w3.codec.decode(['string'], data[4:])[0]}"
+        if data[:4] == PANIC_SELECTOR:
+            return f"execution reverted: panic code {hex(w3.codec.decode(['uint256'], data[4:])[0])}"
+    except Exception:
+        pass
+
+    return f"execution reverted (data: 0x{data.hex()})"
+
+
+def rpc_error_message(w3: Web3, error: Any) -> str:
+    """Extract a readable message from a JSON-RPC error object"""
+    if isinstance(error, dict):
+        data = error.get('data')
+        if isinstance(data, dict):  # Some nodes nest the revert payload
+            data = data.get('data')
+        if isinstance(data, str) and data.startswith('0x') and len(data) > 2:
+            return decode_revert_reason(w3, data)
+        return error.get('message', 'Unknown RPC error')
+    return str(error)
@@ -0,0 +1,262 @@
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Any, Optional
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from web3.providers.base import JSONBaseProvider
+from logging_config import get_logger
+from metrics import RPC_ENDPOINT_DURATION, RPC_ENDPOINT_ERRORS
+
+logger = get_logger(__name__)
+
+# Read-only methods that are safe to send twice
+HEDGEABLE_METHODS = {
+    'eth_call', 'eth_getBalance', 'eth_getLogs', 'eth_blockNumber', 'eth_getBlockByNumber',
+    'eth_getBlockByHash', 'eth_getTransactionByHash', 'eth_getTransactionReceipt',
+    'eth_getCode', 'eth_getStorageAt', 'eth_chainId', 'eth_gasPrice', 'eth_feeHistory',
+    'eth_estimateGas', 'eth_getTransactionCount'
+}
+
+RATE_LIMIT_ERROR_CODES = {-32005, 429}
+
+
+class EndpointError(Exception):
+    """Raised when an endpoint fails at the transport level or rate-limits us"""
+
+
+def endpoint_label(url: str) -> str:
+    """Scheme, host and port only, so API keys in the path or credentials are not exposed"""
+    parsed = urlparse(str(url))
+    host = f"{parsed.hostname}:{parsed.port}" if parsed.port else parsed.hostname
+    return f"{parsed.scheme}://{host}"
+
+
+def redact_url(message: str, url: str) -> str:
+    """Replace an endpoint URL, or its path (requests quotes either), with its label"""
+    url = str(url)
+    parsed = urlparse(url)
+    message = message.replace(url, endpoint_label(url))
+    path = url[url.index(parsed.netloc) + len(parsed.netloc):] if parsed.netloc else ''
+    if path.strip('/'):
+        message = message.replace(path, '/...')
+    return message
+
+
+class Endpoint:
+    """One RPC endpoint with its pooled session and health statistics"""
+
+    def __init__(self, url: str, pool_size: int, timeout: float, ewma_alpha: float = 0.2):
+        self.url = url
+        self.timeout = timeout
+        self.ewma_alpha = ewma_alpha
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.ewma_latency = None
+        self.ewma_error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.hedged = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self._latencies = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self._duration_metric = RPC_ENDPOINT_DURATION.labels(self.label)
+        self._error_metric = RPC_ENDPOINT_ERRORS.labels(self.label)
+
+    @property
+    def label(self) -> str:
+        return endpoint_label(self.url)
+
+    def redact(self, message: str) -> str:
+        return redact_url(message, self.url)
+
+    def post(self, payload: bytes) -> Any:
+        """POST a JSON-RPC payload and return the decoded JSON body"""
+        started = time.perf_counter()
+        try:
+            response = self.session.post(
+                self.url,
+                data=payload,
+                headers={'Content-Type': 'application/json'},
+                timeout=self.timeout
+            )
+            if response.status_code == 429 or response.status_code >= 500:
+                raise EndpointError(f"HTTP {response.status_code} from {self.label}")
+            response.raise_for_status()
+            body = response.json()
+        except (requests.RequestException, ValueError) as e:
+            self.record_failure()
+            # The original exception is not chained: its message and traceback carry the URL
+            raise EndpointError(f"{self.label}: {self.redact(str(e))}") from None
+        except EndpointError:
+            self.record_failure()
+            raise
+
+        if _is_rate_limited(body):
+            self.record_failure()
+            raise EndpointError(f"Rate limited by {self.label}")
+
+        self.record_success(time.perf_counter() - started)
+        return body
+
+    def record_success(self, latency: float):
+        self._duration_metric.observe(latency)
+        with self._lock:
+            self.requests += 1
+            self._latencies.append(latency)
+            if self.ewma_latency is None:
+                self.ewma_latency = latency
+            else:
+                self.ewma_latency += self.ewma_alpha * (latency - self.ewma_latency)
+            self.ewma_error_rate *= (1 - self.ewma_alpha)
+            self.consecutive_failures = 0
+
+    def record_failure(self, cooldown: float = 5.0, failure_threshold: int = 3):
+        self._error_metric.inc()
+        with self._lock:
+            self.requests += 1
+            self.errors += 1
+            self.ewma_error_rate += self.ewma_alpha * (1 - self.ewma_error_rate)
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= failure_threshold:
+                # Back off exponentially while the endpoint keeps failing
+                backoff = cooldown * 2 ** min(self.consecutive_failures - failure_threshold, 5)
+                self.cooldown_until = time.monotonic() + backoff
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if not self._latencies:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def score(self) -> float:
+        """Lower is healthier: latency inflated by the recent error rate"""
+        latency = self.ewma_latency if self.ewma_latency is not None else 0.0
+        return latency * (1 + 10 * self.ewma_error_rate) + self.ewma_error_rate
+
+    def is_available(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latency_percentile(95)
+        return {
+            'endpoint': self.label,
+            'available': self.is_available(),
+            'ewma_latency_ms': round(self.ewma_latency * 1000, 2) if self.ewma_latency is not None else None,
+            'p95_latency_ms': round(p95 * 1000, 2) if p95 is not None else None,
+            'error_rate': round(self.ewma_error_rate, 4),
+            'requests': self.requests,
+            'errors': self.errors,
+            'hedged': self.hedged
+        }
+
+
+def _is_rate_limited(body: Any) -> bool:
+    """Detect JSON-RPC level rate limiting, which some providers return with HTTP 200"""
+    items = body if isinstance(body, list) else [body]
+    for item in items:
+        error = item.get('error') if isinstance(item, dict) else None
+        if isinstance(error, dict):
+            message = str(error.get('message', '')).lower()
+            if error.get('code') in RATE_LIMIT_ERROR_CODES or 'rate limit' in message:
+                return True
+    return False
+
+
+class MultiEndpointProvider(JSONBaseProvider):
+    """HTTP provider that routes each request to the healthiest of several endpoints
+
+    Endpoints are ranked by EWMA latency and error rate; a failing or
+    rate-limited endpoint is skipped and the request fails over to the next
+    one. Read requests can optionally be hedged: if the chosen endpoint has
+    not answered by its p95 latency, a duplicate goes to the runner-up and
+    the first answer wins.
+    """
+
+    def __init__(self, endpoint_urls: List[str], pool_size: int = 20, timeout: float = 30.0,
+                 hedge: bool = False, hedge_min_delay: float = 0.05):
+        if not endpoint_urls:
+            raise ValueError("At least one RPC endpoint is required")
+
+        self.endpoints = [Endpoint(url, pool_size, timeout) for url in endpoint_urls]
+        self.endpoint_uri = endpoint_urls[0]
+        self.hedge = hedge and len(self.endpoints) > 1
+        self.hedge_min_delay = hedge_min_delay
+        self._hedge_pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='rpc-hedge') if self.hedge else None
+        super().__init__()
+
+    def __str__(self) -> str:
+        return f"Multi-endpoint RPC connection {[endpoint.label for endpoint in self.endpoints]}"
+
+    def ranked_endpoints(self) -> List[Endpoint]:
+        """Available endpoints by score, with cooling-down ones as a last resort"""
+        available = [endpoint for endpoint in self.endpoints if endpoint.is_available()]
+        cooling = [endpoint for endpoint in self.endpoints if not endpoint.is_available()]
+        return (sorted(available, key=Endpoint.score) +
+                sorted(cooling, key=lambda endpoint: endpoint.cooldown_until))
+
+    def make_request(self, method, params):
+        payload = self.encode_rpc_request(method, params)
+        if self.hedge and method in HEDGEABLE_METHODS:
+            return self._send_hedged(payload)
+        return self._send_with_failover(payload)
+
+    def make_batch_request(self, payload: List[Dict[str, Any]]) -> Any:
+        """Send a raw JSON-RPC batch with failover; used by JSONRPCBatch"""
+        return self._send_with_failover(json.dumps(payload).encode())
+
+    def _send_with_failover(self, payload: bytes, endpoints: List[Endpoint] = None) -> Any:
+        last_error = None
+        for endpoint in endpoints or self.ranked_endpoints():
+            try:
+                return endpoint.post(payload)
+            except EndpointError as e:
+                logger.warning('rpc_failover', endpoint=endpoint.label, error=str(e))
+                last_error = e
+        raise ConnectionError(f"All RPC endpoints failed: {str(last_error)}")
+
+    def _send_hedged(self, payload: bytes) -> Any:
+        ranked = self.ranked_endpoints()
+        primary, backup = ranked[0], ranked[1]
+
+        primary_future = self._hedge_pool.submit(self._send_with_failover, payload, [primary])
+        deadline = max(primary.latency_percentile(95) or 0.0, self.hedge_min_delay)
+        done, _ = wait([primary_future], timeout=deadline)
+        if done and not primary_future.exception():
+            return primary_future.result()
+
+        # Primary is slow or failed: race a duplicate against it on the runner-up
+        backup.hedged += 1
+        backup_future = self._hedge_pool.submit(self._send_with_failover, payload, [backup] + ranked[2:])
+        pending = {primary_future, backup_future}
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                last_error = future.exception()
+        raise last_error
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [endpoint.stats() for endpoint in self.endpoints]
+
+
+def create_rpc_provider(config) -> MultiEndpointProvider:
+    """Build the pooled provider over the primary and fallback HTTP endpoints"""
+    return MultiEndpointProvider(
+        config.get_web3_provider_urls(),
+        pool_size=config.RPC_POOL_SIZE,
+        timeout=config.RPC_TIMEOUT,
+        hedge=config.RPC_HEDGE_ENABLED,
+        hedge_min_delay=config.RPC_HEDGE_MIN_DELAY
+    )
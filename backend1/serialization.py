@@ -0,0 +1,132 @@
+import json
+from collections.abc import Mapping
+from decimal import Decimal
+from typing import Any, Callable, Optional
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _encode_default(value: Any) -> Any:
+    """Convert one non-JSON value; nested values are handled by the caller"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # HexBytes included; always 0x-prefixed regardless of the hexbytes version
+        return '0x' + bytes(value).hex()
+    if hasattr(value, '_asdict'):  # Named tuple / ABI struct
+        return value._asdict()
+    if isinstance(value, Mapping):  # AttributeDict and other non-dict mappings
+        return dict(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def to_jsonable(value: Any) -> Any:
+    """Recursively convert Web3 results (HexBytes, AttributeDict, structs) to plain JSON values"""
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_jsonable(item) for item in value]
+    return to_jsonable(_encode_default(value))
+
+
+def format_wei(amount: int, decimals: int = 18) -> str:
+    """Exact decimal string for an integer amount, e.g. 1500000000000000000 -> '1.5'"""
+    sign = '-' if amount < 0 else ''
+    whole, fraction = divmod(abs(int(amount)), 10 ** decimals)
+    fraction_digits = f'{fraction:0{decimals}d}'.rstrip('0') if decimals else ''
+    return f'{sign}{whole}.{fraction_digits}' if fraction_digits else f'{sign}{whole}'
+
+
+BLOCK_TAGS = ('latest', 'earliest', 'pending', 'safe', 'finalized')
+
+
+def parse_block_identifier(value: Any, default: Any = 'latest') -> Any:
+    """Block tag or number from a request value: a tag, an int, a decimal string or a 0x quantity
+
+    Bools, floats and negative numbers are rejected rather than coerced.
+    """
+    if value is None or value == '':
+        return default
+    if isinstance(value, str):
+        if value in BLOCK_TAGS:
+            return value
+        if value[:2].lower() == '0x':
+            return int(value, 16)
+        if value.isdigit():
+            return int(value)
+    elif isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+        return value
+    raise ValueError(f"Invalid block identifier: {value!r}")
+
+
+def to_block_number(value: Any, get_head: Optional[Callable[[], int]] = None) -> int:
+    """Block number for a request value; 'earliest' is 0 and other tags resolve through get_head"""
+    block = parse_block_identifier(value)
+    if isinstance(block, int):
+        return block
+    if block == 'earliest':
+        return 0
+    if get_head is None:
+        raise ValueError(f"A block number is required, not '{block}'")
+    return get_head()
+
+
+def dumps(value: Any, sort_keys: bool = False, indent: bool = False) -> bytes:
+    """Encode to UTF-8 JSON bytes, with orjson when it is installed
+
+    orjson only handles integers up to 64 bits, which uint256 amounts often
+    exceed; those payloads are re-encoded with the standard library's C
+    encoder, which is also the fallback when orjson is missing.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(value, default=_encode_default, option=option)
+        except TypeError as e:
+            if 'Integer exceeds' not in str(e):
+                raise
+
+    return json.dumps(
+        value,
+        default=_encode_default,
+        sort_keys=sort_keys,
+        indent=2 if indent else None,
+        separators=None if indent else (',', ':')
+    ).encode()
+
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class Web3JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes Web3 types and skips the str round trip for responses"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys),
+                     indent=bool(kwargs.get('indent'))).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            dumps(obj, sort_keys=self.sort_keys, indent=indent) + b'\n',
+            mimetype=self.mimetype
+        )
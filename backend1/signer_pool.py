@@ -0,0 +1,236 @@
+import json
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+from eth_account import Account
+from eth_account.signers.local import LocalAccount
+from web3 import Web3
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Signing keys of a worker process in the signing pool, by address
+_process_accounts: Dict[str, LocalAccount] = {}
+
+
+def _init_signing_process(keys: Dict[str, bytes]):
+    _process_accounts.update({address: Account.from_key(key) for address, key in keys.items()})
+
+
+def _sign_chunk(address: str, transactions: List[Dict[str, Any]]) -> List[str]:
+    account = _process_accounts[address]
+    return [Web3.to_hex(account.sign_transaction(transaction).rawTransaction) for transaction in transactions]
+
+
+def signed_transactions(indexes: List[int], senders: List[str], nonces: List[int],
+                        raw_transactions: List[str]) -> List[Dict[str, Any]]:
+    """Describe signed transactions, with the hash they will have on chain, before they are broadcast"""
+    return [
+        {'index': index, 'from': sender, 'nonce': nonce,
+         'transaction_hash': Web3.to_hex(Web3.keccak(hexstr=raw_transaction)), 'raw_transaction': raw_transaction}
+        for index, sender, nonce, raw_transaction in zip(indexes, senders, nonces, raw_transactions)
+    ]
+
+
+def _decrypt_keyfile(keyfile: Dict[str, Any], password: str) -> bytes:
+    return bytes(Account.decrypt(keyfile, password))
+
+
+def load_keystore(directory: str, password: str, processes: int = 1) -> List[LocalAccount]:
+    """Decrypt every V3 keyfile (geth/clef format) in directory, sorted by file name
+
+    Keyfiles use scrypt or pbkdf2 on purpose, so each takes a noticeable
+    amount of CPU; with many keys they are decrypted in parallel.
+    """
+    keyfiles = []
+    for filename in sorted(os.listdir(directory)):
+        path = os.path.join(directory, filename)
+        if not os.path.isfile(path):
+            continue
+        try:
+            with open(path) as f:
+                keyfile = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if isinstance(keyfile, dict) and ('crypto' in keyfile or 'Crypto' in keyfile):
+            keyfiles.append(keyfile)
+
+    if processes > 1 and len(keyfiles) > 1:
+        with ProcessPoolExecutor(max_workers=min(processes, len(keyfiles)),
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            keys = list(executor.map(_decrypt_keyfile, keyfiles, [password] * len(keyfiles)))
+    else:
+        keys = [_decrypt_keyfile(keyfile, password) for keyfile in keyfiles]
+    return [Account.from_key(key) for key in keys]
+
+
+class SignerPool:
+    """Signing accounts that outgoing transactions are sharded across
+
+    Each account has its own nonce sequence, so sends spread over several
+    accounts are not serialized behind one signer's pending transactions.
+    Transactions that opt into sharding go to the account with the fewest
+    pending in this worker: reserved but not yet broadcast, or broadcast
+    and waiting for a receipt from the receipt watcher. Large batches are
+    signed in a pool of processes, since signing is CPU bound and holds
+    the GIL.
+    """
+
+    def __init__(self, accounts: List[LocalAccount], receipt_watcher=None, processes: int = 1,
+                 min_process_batch: int = 64):
+        if not accounts:
+            raise ValueError("SignerPool requires at least one account")
+
+        self.accounts = {account.address: account for account in accounts}
+        self.addresses = list(self.accounts)
+        self.receipt_watcher = receipt_watcher
+        self.processes = processes
+        self.min_process_batch = min_process_batch
+        self._pending = {address: 0 for address in self.addresses}
+        self._sent = {address: 0 for address in self.addresses}
+        self._turn = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def primary(self) -> LocalAccount:
+        """The first account: PRIVATE_KEY when set, otherwise the first keystore account"""
+        return self.accounts[self.addresses[0]]
+
+    def assign(self, count: int = 1) -> List[str]:
+        """Pick a signer address for each of count transactions and count them as pending"""
+        if len(self.addresses) == 1:
+            with self._lock:
+                self._pending[self.addresses[0]] += count
+            return self.addresses * count
+
+        size = len(self.addresses)
+        assigned = []
+        with self._lock:
+            # Ties rotate, so single sends to an idle pool still spread over every account
+            self._turn = (self._turn + 1) % size
+            order = self.addresses[self._turn:] + self.addresses[:self._turn]
+            for _ in range(count):
+                address = min(order, key=self._pending.__getitem__)
+                self._pending[address] += 1
+                assigned.append(address)
+        return assigned
+
+    def assign_transactions(self, transactions: List[Dict[str, Any]]) -> List[str]:
+        """Pick the signer of each transaction request and count it as pending
+
+        A request is sent from its 'from' address when it names one, from
+        any pool account when it opts in with 'shard', and otherwise from
+        the primary account, so calls that depend on msg.sender keep it.
+        """
+        pinned = []
+        for item in transactions:
+            if item.get('from'):
+                address = Web3.to_checksum_address(item['from'])
+                if address not in self.accounts:
+                    raise ValueError(f"Sender {address} is not one of the signing accounts")
+                pinned.append(address)
+            elif item.get('shard'):
+                pinned.append(None)
+            else:
+                pinned.append(self.addresses[0])
+
+        sharded = iter(self.assign(pinned.count(None)) if None in pinned else [])
+        with self._lock:
+            for address in pinned:
+                if address is not None:
+                    self._pending[address] += 1
+        return [address or next(sharded) for address in pinned]
+
+    def release(self, address: str, count: int = 1):
+        """Stop counting transactions that were not sent, or have been mined"""
+        with self._lock:
+            self._pending[address] = max(0, self._pending[address] - count)
+
+    def sent(self, address: str, tx_hash: str):
+        """Record a broadcast; it stays pending until its receipt arrives or the watch times out"""
+        with self._lock:
+            self._sent[address] += 1
+        if self.receipt_watcher is None or len(self.addresses) == 1:
+            self.release(address)
+            return
+        self.receipt_watcher.watch(tx_hash).add_done_callback(lambda _: self.release(address))
+
+    def sign(self, address: str, transaction: Dict[str, Any]) -> str:
+        """Sign one transaction in the calling thread; returns the raw transaction hex"""
+        return Web3.to_hex(self.accounts[address].sign_transaction(transaction).rawTransaction)
+
+    def sign_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+        """Sign (address, transaction) pairs, in the process pool when the batch is large enough"""
+        if self.processes <= 1 or len(items) < self.min_process_batch:
+            return [self.sign(address, transaction) for address, transaction in items]
+
+        by_signer: Dict[str, List[int]] = {}
+        for index, (address, _) in enumerate(items):
+            by_signer.setdefault(address, []).append(index)
+
+        # About one chunk per process, split along signers
+        chunk_size = max(1, math.ceil(len(items) / self.processes))
+        executor = self._get_executor()
+        tasks = []
+        for address, indexes in by_signer.items():
+            for start in range(0, len(indexes), chunk_size):
+                chunk = indexes[start:start + chunk_size]
+                tasks.append((chunk, executor.submit(_sign_chunk, address, [items[index][1] for index in chunk])))
+
+        raw_transactions: List[Optional[str]] = [None] * len(items)
+        for chunk, future in tasks:
+            for index, raw_transaction in zip(chunk, future.result()):
+                raw_transactions[index] = raw_transaction
+        return raw_transactions
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Spawned rather than forked: forking a process that runs threads can copy held locks
+        with self._executor_lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                keys = {address: bytes(account.key) for address, account in self.accounts.items()}
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_signing_process,
+                    initargs=(keys,)
+                )
+                self._executor_pid = os.getpid()
+                logger.info('signing_pool_started', processes=self.processes, signers=len(keys))
+            return self._executor
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {'address': address, 'pending': self._pending[address], 'sent': self._sent[address]}
+                for address in self.addresses
+            ]
+
+
+def create_signer_pool(config, account: LocalAccount = None, receipt_watcher=None) -> Optional[SignerPool]:
+    """Build the signer pool from the PRIVATE_KEY account and SIGNER_KEYSTORE_DIR, or None without any key"""
+    processes = config.SIGNER_PROCESSES or os.cpu_count() or 1
+    accounts = [account] if account else []
+
+    if config.SIGNER_KEYSTORE_DIR:
+        password = config.SIGNER_KEYSTORE_PASSWORD
+        if config.SIGNER_KEYSTORE_PASSWORD_FILE:
+            with open(config.SIGNER_KEYSTORE_PASSWORD_FILE) as f:
+                password = f.read().rstrip('\n')
+        if password is None:
+            raise ValueError("SIGNER_KEYSTORE_PASSWORD or SIGNER_KEYSTORE_PASSWORD_FILE is required to unlock the keystore")
+
+        known = {account.address for account in accounts}
+        loaded = load_keystore(config.SIGNER_KEYSTORE_DIR, password, processes)
+        accounts.extend(account for account in loaded if account.address not in known)
+        logger.info('keystore_loaded', directory=config.SIGNER_KEYSTORE_DIR, accounts=len(loaded))
+
+    if not accounts:
+        return None
+    return SignerPool(accounts, receipt_watcher, processes=processes,
+                      min_process_batch=config.SIGNER_PROCESS_MIN_BATCH)
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """Share one call between concurrent callers asking for the same key
+
+    The first caller for a key runs the loader; callers arriving while it
+    is in flight wait for its result (or exception) instead of making
+    their own upstream request. Nothing is kept once the call finishes,
+    so this only merges requests that overlap in time; the read cache
+    handles reuse after that.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = loader()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {'in_flight': len(self._calls), 'leaders': self.leaders, 'coalesced': self.coalesced}
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on one event loop"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # A cancelled follower must not cancel the shared call
+            return await asyncio.shield(future)
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        self.leaders += 1
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Retrieved here, so no warning when nobody else waited
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {'in_flight': len(self._calls), 'leaders': self.leaders, 'coalesced': self.coalesced}
+
+
+def create_single_flight(config, use_async: bool = False) -> Optional[SingleFlight]:
+    """Build the request coalescer, or None when disabled"""
+    if not config.SINGLE_FLIGHT_ENABLED:
+        return None
+    return AsyncSingleFlight() if use_async else SingleFlight()
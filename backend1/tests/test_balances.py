@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+import pytest
+from hexbytes import HexBytes
+from web3 import Web3
+
+from contract_handler import ContractHandler
+from read_cache import HeadTracker, InProcessCacheStore, ReadCache
+
+ADDRESSES = [Web3.to_checksum_address('0x%040x' % (index + 1)) for index in range(5)]
+
+
+class FakeProvider:
+    """make_batch_request answering eth_getBalance with 10**18 * address + block wei"""
+
+    def __init__(self):
+        self.batches = []
+        self.errors = {}
+
+    def make_batch_request(self, payload):
+        self.batches.append([tuple(request['params']) for request in payload])
+        responses = []
+        for request in payload:
+            address, block = request['params']
+            if address in self.errors:
+                responses.append({'id': request['id'], 'error': {'code': -32000, 'message': self.errors[address]}})
+            else:
+                responses.append({'id': request['id'], 'result': hex(int(address, 16) * 10 ** 18 + int(block, 16))})
+        return responses
+
+
+class FakeEth:
+    def __init__(self, head):
+        self.block_number = head
+        self.balance_reads = 0
+
+    def get_block(self, block_identifier):
+        return {'number': self.block_number, 'hash': HexBytes(self.block_number.to_bytes(32, 'big'))}
+
+    def get_balance(self, address, block_identifier=None):
+        self.balance_reads += 1
+        return int(address, 16) * 10 ** 18 + block_identifier
+
+
+def make_handler(cached=False, batch_size=2):
+    handler = ContractHandler.__new__(ContractHandler)
+    handler.config = SimpleNamespace(BALANCE_BATCH_SIZE=batch_size, LOG_SAMPLE_RATE=1.0)
+    handler.w3 = SimpleNamespace(provider=FakeProvider(), eth=FakeEth(head=100))
+    handler.single_flight = None
+    handler.read_cache = None
+    if cached:
+        tracker = HeadTracker(handler.w3, refresh_interval=60)
+        handler.read_cache = ReadCache(InProcessCacheStore(), tracker, finality_depth=10)
+    return handler
+
+
+def wei(address, block):
+    return int(address, 16) * 10 ** 18 + block
+
+
+def test_balances_are_batched_at_one_pinned_block():
+    handler = make_handler()
+
+    result = handler.get_balances(ADDRESSES)
+
+    assert [len(batch) for batch in handler.w3.provider.batches] == [2, 2, 1]
+    assert {block for batch in handler.w3.provider.batches for _, block in batch} == {hex(100)}
+    assert result['block_number'] == 100
+    assert [entry['wei'] for entry in result['balances']] == [str(wei(address, 100)) for address in ADDRESSES]
+    assert result['total_wei'] == str(sum(wei(address, 100) for address in ADDRESSES))
+    assert result['balances'][0]['balance'] == '1.0000000000000001'
+
+
+def test_duplicates_are_read_once_and_addresses_are_validated():
+    handler = make_handler()
+
+    result = handler.get_balances([ADDRESSES[0].lower(), ADDRESSES[1], ADDRESSES[0]], block_identifier='0x20')
+    assert [entry['address'] for entry in result['balances']] == ADDRESSES[:2]
+    assert handler.w3.provider.batches == [[(ADDRESSES[0], '0x20'), (ADDRESSES[1], '0x20')]]
+
+    with pytest.raises(ValueError, match='Invalid addresses: 0x123, 7'):
+        handler.get_balances([ADDRESSES[0], '0x123', 7])
+
+
+def test_one_failed_read_fails_the_request():
+    handler = make_handler()
+    handler.w3.provider.errors[ADDRESSES[3]] = 'header not found'
+
+    with pytest.raises(ValueError, match=f"eth_getBalance failed for {ADDRESSES[3]}: header not found"):
+        handler.get_balances(ADDRESSES)
+
+
+def test_cached_balances_skip_the_batch():
+    handler = make_handler(cached=True)
+
+    # A single-address read at the pinned head is reused by the batch endpoint
+    assert handler.get_balance(ADDRESSES[0]) == wei(ADDRESSES[0], 100)
+    handler.get_balances(ADDRESSES[:3])
+    assert handler.w3.provider.batches == [[(ADDRESSES[1], '0x64'), (ADDRESSES[2], '0x64')]]
+
+    # ...and the batch results are cached for the next request
+    handler.get_balances(ADDRESSES[:3])
+    assert len(handler.w3.provider.batches) == 1
+    assert handler.get_balance(ADDRESSES[2]) == wei(ADDRESSES[2], 100)
+    assert handler.w3.eth.balance_reads == 1
@@ -0,0 +1,214 @@
+import random
+
+import pytest
+from eth_abi import encode as abi_encode
+from hexbytes import HexBytes
+from web3 import Web3
+from web3._utils.method_formatters import log_entry_formatter
+
+from dividends import BalanceSnapshots, allocate, DUST_RETAIN
+from event_indexer import EventIndexer
+from holder_balances import ZERO_ADDRESS
+from log_decoder import EventLogDecoder
+
+TOKEN = Web3.to_checksum_address('0x' + '77' * 20)
+TRANSFER_ABI = {
+    'anonymous': False, 'name': 'Transfer', 'type': 'event',
+    'inputs': [
+        {'indexed': True, 'name': 'from', 'type': 'address'},
+        {'indexed': True, 'name': 'to', 'type': 'address'},
+        {'indexed': False, 'name': 'value', 'type': 'uint256'}
+    ]
+}
+HOLDERS = [Web3.to_checksum_address('0x%040x' % (index + 1)) for index in range(6)]
+
+
+def block_hash(block_number, fork=0):
+    return '0x' + (block_number + fork * 10 ** 6).to_bytes(32, 'big').hex()
+
+
+def transfer_log(block_number, log_index, sender, receiver, value, fork=0):
+    raw = {
+        'address': TOKEN,
+        'blockHash': block_hash(block_number, fork),
+        'blockNumber': hex(block_number),
+        'data': '0x' + abi_encode(['uint256'], [value]).hex(),
+        'logIndex': hex(log_index),
+        'removed': False,
+        'topics': [EventLogDecoder(TRANSFER_ABI).topic,
+                   '0x' + abi_encode(['address'], [sender]).hex(), '0x' + abi_encode(['address'], [receiver]).hex()],
+        'transactionHash': '0x' + (block_number * 100 + log_index + fork * 10 ** 6).to_bytes(32, 'big').hex(),
+        'transactionIndex': hex(log_index)
+    }
+    return log_entry_formatter(raw)
+
+
+def random_transfers(rng, first_block, last_block):
+    """(block, sender, receiver, value) transfers that never overdraw a holder, with mints"""
+    balances = {}
+    transfers = []
+    for block_number in range(first_block, last_block + 1):
+        for _ in range(rng.randint(0, 3)):
+            funded = [holder for holder in HOLDERS if balances.get(holder, 0) > 0]
+            if not funded or rng.random() < 0.3:
+                sender, value = ZERO_ADDRESS, rng.randint(1, 10 ** 20)
+            else:
+                sender = rng.choice(funded)
+                value = rng.randint(1, balances[sender])
+            receiver = rng.choice(HOLDERS)
+            if sender != ZERO_ADDRESS:
+                balances[sender] -= value
+            balances[receiver] = balances.get(receiver, 0) + value
+            transfers.append((block_number, sender, receiver, value))
+    return transfers
+
+
+def replay(transfers, block_number):
+    """Balances by applying every transfer up to block_number, the slow way"""
+    balances = {}
+    for transfer_block, sender, receiver, value in transfers:
+        if transfer_block > block_number:
+            break
+        if sender != ZERO_ADDRESS:
+            balances[sender] -= value
+        balances[receiver] = balances.get(receiver, 0) + value
+    return {holder: balance for holder, balance in balances.items() if balance > 0}
+
+
+def ingest(indexer, transfers, to_block, fork=0):
+    logs = []
+    for log_index, (block_number, sender, receiver, value) in enumerate(transfers):
+        logs.append(transfer_log(block_number, log_index, sender, receiver, value, fork))
+    indexer._ingest(TOKEN, logs, to_block, block_hash(to_block, fork))
+
+
+@pytest.fixture
+def indexer(tmp_path):
+    indexer = EventIndexer(Web3(), f"sqlite:///{tmp_path}/index.db", reorg_window=5)
+    indexer.track(TOKEN, [TRANSFER_ABI])
+    return indexer
+
+
+def test_allocate_pays_exactly_the_total_by_largest_remainder():
+    result = allocate({HOLDERS[2]: 1, HOLDERS[0]: 1, HOLDERS[1]: 1}, 100)
+
+    # 33 each, and the single leftover unit breaks the three-way tie by address
+    assert [payout['amount'] for payout in result['payouts']] == [34, 33, 33]
+    assert [payout['holder'] for payout in result['payouts']] == HOLDERS[:3]
+    assert result['distributed'] == 100
+    assert result['dust'] == 0
+    assert result['eligible_supply'] == 3
+
+
+def test_allocate_is_pro_rata_within_one_unit():
+    rng = random.Random(5)
+    for _ in range(50):
+        balances = {holder: rng.choice([0, rng.randint(1, 10 ** 24)]) for holder in HOLDERS}
+        if not any(balances.values()):
+            continue
+        total = rng.randint(1, 10 ** 21)
+        supply = sum(balances.values())
+
+        result = allocate(balances, total)
+
+        assert result['distributed'] == total
+        assert sum(payout['amount'] for payout in result['payouts']) == total
+        for payout in result['payouts']:
+            floor = total * balances[payout['holder']] // supply
+            assert payout['amount'] in (floor, floor + 1)
+        assert result['holder_count'] == sum(1 for balance in balances.values() if balance > 0)
+
+
+def test_allocate_retains_dust_and_skips_small_payouts():
+    balances = {HOLDERS[0]: 1, HOLDERS[1]: 1, HOLDERS[2]: 98}
+
+    retained = allocate(balances, 10, dust=DUST_RETAIN)
+    assert [payout['amount'] for payout in retained['payouts']] == [9]
+    assert retained['distributed'] == 9
+    assert retained['dust'] == 1
+
+    minimum = allocate({HOLDERS[0]: 1, HOLDERS[1]: 99}, 1000, min_payout=20)
+    assert minimum['payouts'] == [{'holder': HOLDERS[1], 'balance': 99, 'amount': 990}]
+    assert minimum['dust'] == 10
+
+
+@pytest.mark.parametrize('balances, total, dust', [
+    ({HOLDERS[0]: 1}, 0, 'distribute'),
+    ({HOLDERS[0]: 0}, 10, 'distribute'),
+    ({}, 10, 'distribute'),
+    ({HOLDERS[0]: 1}, 10, 'burn'),
+])
+def test_allocate_rejects_invalid_input(balances, total, dust):
+    with pytest.raises(ValueError):
+        allocate(balances, total, dust=dust)
+
+
+def test_snapshots_match_a_full_replay_and_store_checkpoints(indexer):
+    transfers = random_transfers(random.Random(7), 1, 60)
+    ingest(indexer, transfers, 60)
+    snapshots = BalanceSnapshots(indexer, checkpoint_interval=10)
+
+    for block_number in (0, 9, 10, 23, 40, 54, 55, 60):
+        assert snapshots.balances_at(TOKEN, block_number) == replay(transfers, block_number)
+
+    # Only multiples of the interval outside the reorg window (indexed 60, window 5) are stored
+    assert [checkpoint['block_number'] for checkpoint in snapshots.checkpoints(TOKEN)] == [10, 20, 40, 50]
+
+
+def test_snapshots_replay_from_a_checkpoint_gives_the_same_balances(indexer):
+    transfers = random_transfers(random.Random(8), 1, 60)
+    ingest(indexer, transfers, 60)
+    snapshots = BalanceSnapshots(indexer, checkpoint_interval=10)
+
+    first = snapshots.balances_at(TOKEN, 47)
+    assert [checkpoint['block_number'] for checkpoint in snapshots.checkpoints(TOKEN)] == [40]
+    # Later snapshots start from the stored checkpoint
+    assert snapshots.balances_at(TOKEN, 47) == first == replay(transfers, 47)
+    assert snapshots.balances_at(TOKEN, 52) == replay(transfers, 52)
+
+
+def test_snapshots_reject_blocks_past_the_index(indexer):
+    ingest(indexer, random_transfers(random.Random(9), 1, 20), 20)
+    snapshots = BalanceSnapshots(indexer, checkpoint_interval=10)
+
+    with pytest.raises(ValueError):
+        snapshots.balances_at(TOKEN, 21)
+    with pytest.raises(ValueError):
+        snapshots.balances_at(HOLDERS[0], 5)
+
+
+def test_shallow_reorg_keeps_final_checkpoints(indexer, monkeypatch):
+    transfers = random_transfers(random.Random(10), 1, 60)
+    ingest(indexer, [transfer for transfer in transfers if transfer[0] <= 56], 56)
+    ingest(indexer, [transfer for transfer in transfers if transfer[0] > 56], 60)
+    snapshots = BalanceSnapshots(indexer, checkpoint_interval=10)
+    snapshots.balances_at(TOKEN, 58)
+    assert [checkpoint['block_number'] for checkpoint in snapshots.checkpoints(TOKEN)] == [50]
+
+    # Blocks after 56 are replaced by a fork that only mints
+    monkeypatch.setattr(indexer.w3.eth, 'get_block',
+                        lambda number: {'hash': HexBytes(block_hash(number, fork=1 if number > 56 else 0))})
+    assert indexer._check_reorg(TOKEN) == 57
+    assert [checkpoint['block_number'] for checkpoint in snapshots.checkpoints(TOKEN)] == [50]
+
+    fork = [(block, ZERO_ADDRESS, HOLDERS[block % 6], block) for block in range(57, 61)]
+    ingest(indexer, fork, 60, fork=1)
+    kept = [transfer for transfer in transfers if transfer[0] <= 56]
+    assert snapshots.balances_at(TOKEN, 58) == replay(kept + fork, 58)
+
+
+def test_deep_reorg_drops_every_checkpoint(indexer, monkeypatch):
+    transfers = random_transfers(random.Random(12), 1, 60)
+    ingest(indexer, transfers, 60)
+    snapshots = BalanceSnapshots(indexer, checkpoint_interval=10)
+    snapshots.balances_at(TOKEN, 55)
+    assert snapshots.checkpoints(TOKEN)
+
+    # No checkpointed hash is on the new chain, so everything is indexed again
+    monkeypatch.setattr(indexer.w3.eth, 'get_block', lambda number: {'hash': HexBytes(block_hash(number, fork=1))})
+    assert indexer._check_reorg(TOKEN) == 0
+    assert snapshots.checkpoints(TOKEN) == []
+
+    fork = random_transfers(random.Random(13), 1, 60)
+    ingest(indexer, fork, 60, fork=1)
+    assert snapshots.balances_at(TOKEN, 55) == replay(fork, 55)
@@ -0,0 +1,153 @@
+from types import SimpleNamespace
+
+import pytest
+from eth_abi import encode as abi_encode
+from hexbytes import HexBytes
+from web3 import Web3
+from web3._utils.method_formatters import log_entry_formatter
+
+from event_indexer import EventIndexer
+from log_decoder import EventLogDecoder
+
+TOKEN = Web3.to_checksum_address('0x' + '77' * 20)
+OTHER = Web3.to_checksum_address('0x' + '88' * 20)
+HOLDER = Web3.to_checksum_address('0x' + '11' * 20)
+TRANSFER_ABI = {
+    'anonymous': False, 'name': 'Transfer', 'type': 'event',
+    'inputs': [
+        {'indexed': True, 'name': 'from', 'type': 'address'},
+        {'indexed': True, 'name': 'to', 'type': 'address'},
+        {'indexed': False, 'name': 'value', 'type': 'uint256'}
+    ]
+}
+
+
+def block_hash(block_number, fork=0):
+    return HexBytes((block_number + fork * 10 ** 6).to_bytes(32, 'big'))
+
+
+class FakeEth:
+    """A chain of one Transfer per block, with an optional get_logs range limit per contract"""
+
+    def __init__(self, head):
+        self.block_number = head
+        self.fork_from = None
+        self.max_range = {}
+        self.log_calls = []
+        self.before_logs = None
+        self.after_logs = None
+
+    def fork(self, block_number):
+        return 1 if self.fork_from is not None and block_number >= self.fork_from else 0
+
+    def get_block(self, block_number):
+        return {'number': block_number, 'hash': block_hash(block_number, self.fork(block_number))}
+
+    def get_logs(self, params):
+        start, end = params['fromBlock'], params['toBlock']
+        self.log_calls.append((params['address'], start, end))
+        if end - start + 1 > self.max_range.get(params['address'], 10 ** 9):
+            raise ValueError('query returned more than 10000 results')
+        if self.before_logs:
+            self.before_logs()
+        logs = [self.transfer_log(params['address'], block_number) for block_number in range(start, end + 1)]
+        if self.after_logs:
+            self.after_logs()
+        return logs
+
+    def transfer_log(self, address, block_number):
+        fork = self.fork(block_number)
+        return log_entry_formatter({
+            'address': address,
+            'blockHash': '0x' + block_hash(block_number, fork).hex(),
+            'blockNumber': hex(block_number),
+            'data': '0x' + abi_encode(['uint256'], [block_number]).hex(),
+            'logIndex': '0x1' if address == OTHER else '0x0',
+            'removed': False,
+            'topics': [EventLogDecoder(TRANSFER_ABI).topic, '0x' + '00' * 32,
+                       '0x' + abi_encode(['address'], [HOLDER]).hex()],
+            'transactionHash': '0x' + block_hash(block_number, fork).hex(),
+            'transactionIndex': '0x0'
+        })
+
+
+@pytest.fixture
+def indexer(tmp_path):
+    indexer = EventIndexer(Web3(), f"sqlite:///{tmp_path}/index.db", chunk_size=8, max_chunk_size=64,
+                           reorg_window=5)
+    indexer.track(TOKEN, [TRANSFER_ABI], start_block=1)
+    indexer.track(OTHER, [TRANSFER_ABI], start_block=1)
+    indexer.w3 = SimpleNamespace(eth=FakeEth(head=40))
+    return indexer
+
+
+def test_chunks_shrink_and_grow_per_contract(indexer):
+    eth = indexer.w3.eth
+    eth.max_range[TOKEN] = 4
+
+    assert indexer.run_once() == 80
+
+    # Only the contract whose ranges were rejected shrank; both grew back after successes
+    token_ranges = [end - start + 1 for address, start, end in eth.log_calls if address == TOKEN]
+    other_ranges = [end - start + 1 for address, start, end in eth.log_calls if address == OTHER]
+    assert token_ranges[:3] == [8, 4, 7]
+    assert other_ranges[:2] == [8, 13]
+    assert indexer.status()['chunk_sizes'][OTHER] > 8
+    assert indexer.indexed_block(TOKEN) == indexer.indexed_block(OTHER) == 40
+
+
+def indexed_hashes(indexer):
+    return [event['transaction_hash'] for event in indexer.query_events(TOKEN, 'Transfer', limit=100)['events']]
+
+
+def reorg_once(eth, hook):
+    def reorg():
+        eth.fork_from = 38
+        setattr(eth, hook, None)
+    setattr(eth, hook, reorg)
+
+
+def test_checkpoint_hash_is_read_before_the_logs(indexer):
+    eth = indexer.w3.eth
+    del indexer._contracts[OTHER]
+    indexer.chunk_size = 64
+
+    # The last blocks are replaced right after the logs are read
+    reorg_once(eth, 'after_logs')
+    indexer.run_once()
+    indexer.run_once()
+
+    # The checkpoint was taken from the same fork as the logs, so the next pass saw the reorg
+    assert indexed_hashes(indexer) == ['0x' + block_hash(n, 1 if n >= 38 else 0).hex() for n in range(1, 41)]
+
+
+def test_chunk_is_refetched_when_its_end_moved(indexer):
+    eth = indexer.w3.eth
+    del indexer._contracts[OTHER]
+    indexer.chunk_size = 64
+
+    # The last blocks are replaced between the hash read and the log read
+    reorg_once(eth, 'before_logs')
+    indexer.run_once()
+
+    assert eth.log_calls == [(TOKEN, 1, 40), (TOKEN, 1, 40)]
+    assert indexed_hashes(indexer) == ['0x' + block_hash(n, 1 if n >= 38 else 0).hex() for n in range(1, 41)]
+
+    eth.log_calls.clear()
+    indexer.run_once()
+    assert eth.log_calls == []
+
+
+def test_reorg_rolls_back_to_the_last_canonical_checkpoint(indexer):
+    eth = indexer.w3.eth
+    del indexer._contracts[OTHER]
+    indexer.chunk_size = 1
+    indexer.max_chunk_size = 1
+    indexer.run_once()
+
+    eth.fork_from = 38
+    eth.log_calls.clear()
+    indexer.run_once()
+
+    assert eth.log_calls == [(TOKEN, 38, 38), (TOKEN, 39, 39), (TOKEN, 40, 40)]
+    assert indexed_hashes(indexer) == ['0x' + block_hash(n, 1 if n >= 38 else 0).hex() for n in range(1, 41)]
@@ -0,0 +1,147 @@
+from types import SimpleNamespace
+
+import pytest
+
+import gas_oracle
+from gas_oracle import GasEstimateCache, GasOracle, parse_urgency_percentiles
+
+GWEI = 10 ** 9
+
+
+class FakeEth:
+    """eth_feeHistory over a chain whose block N pays N gwei of priority fee at every percentile"""
+
+    def __init__(self, head=200, base_fee=10 * GWEI):
+        self.block_number = head
+        self.base_fee = base_fee
+        self.gas_price = 7 * GWEI
+        self.history_calls = []
+        self.unsupported = False
+
+    def fee_history(self, block_count, newest_block, reward_percentiles):
+        self.history_calls.append((block_count, newest_block))
+        if self.unsupported:
+            raise ValueError({'code': -32601, 'message': 'the method eth_feeHistory does not exist'})
+        oldest = newest_block - block_count + 1
+        return {
+            'oldestBlock': oldest,
+            'baseFeePerGas': [self.base_fee] * (block_count + 1),
+            'reward': [[block * GWEI] * len(reward_percentiles) for block in range(oldest, newest_block + 1)]
+        }
+
+
+@pytest.fixture
+def eth():
+    return FakeEth()
+
+
+def make_oracle(eth, **kwargs):
+    oracle = GasOracle(SimpleNamespace(eth=eth), {'slow': 10, 'standard': 50, 'fast': 90},
+                       refresh_interval=60, window_blocks=100, **kwargs)
+    # Refresh inline only, so every RPC call in a test is one the test made
+    oracle.start = lambda: None
+    return oracle
+
+
+def test_priority_fee_is_a_percentile_of_the_window(eth):
+    oracle = make_oracle(eth)
+
+    # The window holds blocks 101..200, so the percentiles pick from 101..200 gwei
+    assert oracle.get_fees('slow') == {'maxFeePerGas': 20 * GWEI + 111 * GWEI, 'maxPriorityFeePerGas': 111 * GWEI}
+    assert oracle.get_fees()['maxPriorityFeePerGas'] == 151 * GWEI
+    assert oracle.get_fees('fast')['maxPriorityFeePerGas'] == 191 * GWEI
+    assert eth.history_calls == [(100, 200)]
+
+
+def test_refresh_fetches_only_new_blocks(eth):
+    oracle = make_oracle(eth)
+    oracle.refresh()
+
+    eth.block_number = 203
+    eth.base_fee = 12 * GWEI
+    oracle.refresh()
+    oracle.refresh()
+
+    # The last pass saw no new block and made no call
+    assert eth.history_calls == [(100, 200), (3, 203)]
+    assert oracle.stats()['window_blocks'] == 100
+    assert oracle.stats()['pending_base_fee'] == 12 * GWEI
+    assert oracle.get_fees('slow')['maxPriorityFeePerGas'] == 114 * GWEI
+
+
+def test_stale_window_is_refreshed_inline(eth, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(gas_oracle.time, 'monotonic', lambda: now[0])
+    oracle = make_oracle(eth)
+    oracle.get_fees()
+
+    now[0] += 60
+    oracle.get_fees()
+    assert len(eth.history_calls) == 1
+
+    # Three refresh intervals without a pass means the sampler stalled
+    now[0] += 200
+    eth.block_number = 201
+    oracle.get_fees()
+    assert eth.history_calls[-1] == (1, 201)
+
+
+def test_max_fee_cap_bounds_both_fees(eth):
+    oracle = make_oracle(eth, max_fee_cap=100 * GWEI)
+
+    assert oracle.get_fees('fast') == {'maxFeePerGas': 100 * GWEI, 'maxPriorityFeePerGas': 100 * GWEI}
+
+
+def test_chains_without_fee_history_use_the_gas_price(eth):
+    eth.unsupported = True
+    oracle = make_oracle(eth)
+
+    assert oracle.get_fees('fast') == {'gasPrice': 7 * GWEI}
+    assert oracle.get_gas_price() == 7 * GWEI
+    assert oracle.stats()['eip1559'] is False
+
+    # Once detected, refreshes go straight to eth_gasPrice
+    oracle.refresh()
+    assert len(eth.history_calls) == 1
+
+
+def test_chains_without_a_base_fee_use_the_gas_price(eth):
+    eth.base_fee = 0
+    oracle = make_oracle(eth)
+
+    assert oracle.get_fees() == {'gasPrice': 7 * GWEI}
+
+
+def test_unknown_urgency_is_rejected(eth):
+    with pytest.raises(ValueError, match='Unknown urgency'):
+        make_oracle(eth).get_fees('urgent')
+    with pytest.raises(ValueError):
+        GasOracle(SimpleNamespace(eth=eth), {'fast': 90}, default_urgency='standard')
+
+
+def test_estimates_are_keyed_per_sender_and_arguments():
+    cache = GasEstimateCache(margin=0.5)
+    key = cache.make_key('0xABCDEF', 'transfer', ['0xAbCd', 5], 0, '0xSENDER')
+
+    assert cache.put(key, 20000) == 30000
+    assert cache.get(cache.make_key('0xabcdef', 'transfer', ['0xAbCd', 5], 0, '0xsender')) == 30000
+    assert cache.get(cache.make_key('0xabcdef', 'transfer', ['0xAbCd', 6], 0, '0xsender')) is None
+    assert cache.get(cache.make_key('0xabcdef', 'transfer', ['0xAbCd', 5], 0, '0xother')) is None
+
+
+def test_highest_estimate_is_kept_until_it_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(gas_oracle.time, 'monotonic', lambda: now[0])
+    cache = GasEstimateCache(margin=0.0, ttl=300)
+    key = cache.make_key('0xabc', 'mint', [], 0, None)
+
+    cache.put(key, 50000)
+    assert cache.put(key, 40000) == 50000
+
+    now[0] += 301
+    assert cache.get(key) is None
+    assert cache.put(key, 40000) == 40000
+
+
+def test_parse_urgency_percentiles():
+    assert parse_urgency_percentiles('slow:10, standard:50,fast:90') == {'slow': 10.0, 'standard': 50.0, 'fast': 90.0}
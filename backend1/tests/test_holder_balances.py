@@ -0,0 +1,154 @@
+from types import SimpleNamespace
+
+import pytest
+from eth_abi import encode as abi_encode
+from hexbytes import HexBytes
+from web3 import Web3
+from web3._utils.method_formatters import log_entry_formatter
+
+from event_indexer import EventIndexer
+from holder_balances import HolderBalanceTracker, ZERO_ADDRESS
+from log_decoder import EventLogDecoder
+
+TOKEN = Web3.to_checksum_address('0x' + '77' * 20)
+TRANSFER_ABI = {
+    'anonymous': False, 'name': 'Transfer', 'type': 'event',
+    'inputs': [
+        {'indexed': True, 'name': 'from', 'type': 'address'},
+        {'indexed': True, 'name': 'to', 'type': 'address'},
+        {'indexed': False, 'name': 'value', 'type': 'uint256'}
+    ]
+}
+HOLDERS = [Web3.to_checksum_address('0x%040x' % (index + 1)) for index in range(6)]
+
+
+def block_hash(block_number, fork=0):
+    return '0x' + (block_number + fork * 10 ** 6).to_bytes(32, 'big').hex()
+
+
+def ingest(indexer, block_number, transfers, fork=0):
+    """Store (sender, receiver, value) transfers as the logs of one block"""
+    logs = [log_entry_formatter({
+        'address': TOKEN,
+        'blockHash': block_hash(block_number, fork),
+        'blockNumber': hex(block_number),
+        'data': '0x' + abi_encode(['uint256'], [value]).hex(),
+        'logIndex': hex(log_index),
+        'removed': False,
+        'topics': [EventLogDecoder(TRANSFER_ABI).topic,
+                   '0x' + abi_encode(['address'], [sender]).hex(), '0x' + abi_encode(['address'], [receiver]).hex()],
+        'transactionHash': '0x' + (block_number * 100 + log_index + fork * 10 ** 6).to_bytes(32, 'big').hex(),
+        'transactionIndex': hex(log_index)
+    }) for log_index, (sender, receiver, value) in enumerate(transfers)]
+    indexer._ingest(TOKEN, logs, block_number, block_hash(block_number, fork))
+
+
+@pytest.fixture
+def indexer(tmp_path):
+    indexer = EventIndexer(Web3(), f"sqlite:///{tmp_path}/index.db", reorg_window=5)
+    indexer.track(TOKEN, [TRANSFER_ABI])
+    return indexer
+
+
+@pytest.fixture
+def tracker(indexer):
+    return HolderBalanceTracker(indexer)
+
+
+def balances(tracker):
+    return {holder['holder']: int(holder['balance']) for holder in tracker.get_holders(TOKEN, limit=100)['holders']}
+
+
+def test_transfers_update_balances_in_the_ingest_transaction(indexer, tracker):
+    ingest(indexer, 1, [(ZERO_ADDRESS, HOLDERS[0], 100), (ZERO_ADDRESS, HOLDERS[1], 50)])
+    ingest(indexer, 2, [(HOLDERS[0], HOLDERS[2], 30), (HOLDERS[1], HOLDERS[0], 50)])
+
+    assert balances(tracker) == {HOLDERS[0]: 120, HOLDERS[2]: 30}
+    assert tracker.get_balance(TOKEN, HOLDERS[1])['balance'] == '0'
+
+
+def test_full_uint256_balances_sort_numerically(indexer, tracker):
+    ingest(indexer, 1, [(ZERO_ADDRESS, HOLDERS[0], 2 ** 256 - 1), (ZERO_ADDRESS, HOLDERS[1], 9),
+                        (ZERO_ADDRESS, HOLDERS[2], 10)])
+
+    page = tracker.get_holders(TOKEN, limit=10)
+    assert [holder['holder'] for holder in page['holders']] == [HOLDERS[0], HOLDERS[2], HOLDERS[1]]
+    assert page['holders'][0]['balance'] == str(2 ** 256 - 1)
+    assert tracker.get_holders(TOKEN, min_balance=10, max_balance=10)['holders'] == [
+        {'holder': HOLDERS[2], 'balance': '10'}
+    ]
+
+
+def test_debits_without_credits_are_kept_as_deficits(indexer, tracker):
+    # The index starts after HOLDERS[0] received its tokens
+    ingest(indexer, 1, [(HOLDERS[0], HOLDERS[1], 40)])
+
+    assert balances(tracker) == {HOLDERS[1]: 40}
+    assert tracker.get_balance(TOKEN, HOLDERS[0])['balance'] == '-40'
+
+    # A later credit nets against the deficit instead of starting from zero
+    ingest(indexer, 2, [(ZERO_ADDRESS, HOLDERS[0], 100)])
+    assert balances(tracker) == {HOLDERS[0]: 60, HOLDERS[1]: 40}
+    assert tracker.get_balance(TOKEN, HOLDERS[0])['balance'] == '60'
+
+
+def test_rollback_reverts_balances_and_restores_deficits(indexer, tracker):
+    ingest(indexer, 1, [(HOLDERS[0], HOLDERS[1], 40)])
+    ingest(indexer, 2, [(ZERO_ADDRESS, HOLDERS[0], 100)])
+
+    # Block 2 is replaced: its mint is reverted and the deficit comes back
+    def get_block(block_number):
+        return {'hash': HexBytes(block_hash(block_number, 1 if block_number >= 2 else 0))}
+    indexer.w3 = SimpleNamespace(eth=SimpleNamespace(get_block=get_block))
+    assert indexer._check_reorg(TOKEN) == 2
+
+    assert balances(tracker) == {HOLDERS[1]: 40}
+    assert tracker.get_balance(TOKEN, HOLDERS[0])['balance'] == '-40'
+
+
+def test_rebuild_matches_incremental_balances(indexer, tracker):
+    ingest(indexer, 1, [(ZERO_ADDRESS, HOLDERS[0], 100), (HOLDERS[3], HOLDERS[4], 5)])
+    ingest(indexer, 2, [(HOLDERS[0], HOLDERS[1], 25)])
+    before = balances(tracker)
+
+    tracker.rebuild(TOKEN)
+
+    assert balances(tracker) == before
+    assert tracker.get_balance(TOKEN, HOLDERS[3])['balance'] == '-5'
+
+
+def test_cursor_pages_are_stable_while_balances_change(indexer, tracker):
+    ingest(indexer, 1, [(ZERO_ADDRESS, holder, 10 * (index + 1)) for index, holder in enumerate(HOLDERS)])
+
+    first = tracker.get_holders(TOKEN, limit=2)
+    assert [holder['holder'] for holder in first['holders']] == [HOLDERS[5], HOLDERS[4]]
+
+    # A holder already returned moves down: an OFFSET would shift, the cursor does not
+    ingest(indexer, 2, [(HOLDERS[5], HOLDERS[0], 55)])
+    second = tracker.get_holders(TOKEN, limit=2, cursor=first['next_cursor'])
+    assert [holder['holder'] for holder in second['holders']] == [HOLDERS[3], HOLDERS[2]]
+    assert second['holder_count'] == 6
+
+
+def test_equal_balances_are_ordered_by_holder_across_pages(indexer, tracker):
+    ingest(indexer, 1, [(ZERO_ADDRESS, holder, 7) for holder in reversed(HOLDERS)])
+
+    seen = []
+    cursor = None
+    while True:
+        page = tracker.get_holders(TOKEN, limit=4, cursor=cursor)
+        seen.extend(holder['holder'] for holder in page['holders'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert seen == sorted(HOLDERS)
+
+
+def test_iter_holders_resumes_after_a_cursor(indexer, tracker):
+    ingest(indexer, 1, [(ZERO_ADDRESS, holder, 10 * (index + 1)) for index, holder in enumerate(HOLDERS)])
+
+    streamed = list(tracker.iter_holders(TOKEN, batch_size=4))
+    assert [holder['holder'] for holder in streamed] == list(reversed(HOLDERS))
+
+    resumed = list(tracker.iter_holders(TOKEN, cursor=streamed[2]['cursor'], batch_size=2))
+    assert resumed == streamed[3:]
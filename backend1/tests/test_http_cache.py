@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+
+import pytest
+from flask import Response
+from hexbytes import HexBytes
+from werkzeug.http import parse_etags
+
+from app import not_modified
+from http_cache import HttpCache
+from read_cache import HeadTracker
+
+TX_HASH = '0x' + 'ab' * 32
+
+
+class FakeEth:
+    """get_block by number or 'latest' on a chain the test can extend or fork"""
+
+    def __init__(self, head):
+        self.head = head
+        self.fork_from = None
+        self.block_reads = []
+
+    def block_hash(self, block_number):
+        fork = 1 if self.fork_from is not None and block_number >= self.fork_from else 0
+        return HexBytes((block_number + fork * 10 ** 6).to_bytes(32, 'big'))
+
+    def get_block(self, block_identifier):
+        block_number = self.head if block_identifier == 'latest' else block_identifier
+        if block_identifier != 'latest':
+            self.block_reads.append(block_number)
+        return {'number': block_number, 'hash': self.block_hash(block_number)}
+
+
+@pytest.fixture
+def eth():
+    return FakeEth(head=100)
+
+
+@pytest.fixture
+def cache(eth):
+    w3 = SimpleNamespace(eth=eth)
+    return HttpCache(w3, HeadTracker(w3, refresh_interval=0), finality_depth=10, recent_max_age=1,
+                     finalized_max_age=3600)
+
+
+def test_latest_is_tagged_from_the_head_without_a_block_read(cache, eth):
+    tag = cache.read_tag(('balance', '0xabc'))
+
+    assert tag.block_number == 100 and not tag.finalized
+    assert tag.cache_control == 'public, max-age=1, must-revalidate'
+    assert eth.block_reads == []
+    assert tag == cache.read_tag(('balance', '0xabc'), '0x64')
+    assert tag.etag != cache.read_tag(('balance', '0xdef')).etag
+
+
+def test_new_blocks_change_recent_etags_but_not_finalized_ones(cache, eth):
+    latest = cache.read_tag(('balance', '0xabc'))
+    old = cache.read_tag(('balance', '0xabc'), 50)
+    assert old.finalized and old.cache_control == 'public, max-age=3600, immutable'
+
+    eth.head = 101
+    assert cache.read_tag(('balance', '0xabc')).etag != latest.etag
+    assert cache.read_tag(('balance', '0xabc'), 100).etag == latest.etag
+    assert cache.read_tag(('balance', '0xabc'), 50) == old
+
+    # The finalized hash was looked up once and then kept
+    assert eth.block_reads.count(50) == 1
+
+
+def test_reorg_changes_the_etag_of_replaced_blocks(cache, eth):
+    before = cache.read_tag(('call', '0xabc', '0x01'), 98)
+
+    # Block 98 is replaced and the new head is reported at the same height
+    eth.fork_from = 98
+    assert cache.read_tag(('call', '0xabc', '0x01'), 98).etag != before.etag
+
+
+def test_future_blocks_are_rejected(cache):
+    with pytest.raises(ValueError, match='beyond the chain head'):
+        cache.read_tag(('balance', '0xabc'), 101)
+
+
+def test_if_none_match_answers_with_a_304(cache):
+    tag = cache.read_tag(('balance', '0xabc'))
+
+    assert tag.matches(parse_etags(f'"other", W/"{tag.etag}"'))
+    assert not tag.matches(parse_etags('"other"'))
+    assert not tag.matches(parse_etags(None))
+
+    response = not_modified(tag)
+    assert response.status_code == 304 and response.get_data() == b''
+    assert response.headers['ETag'] == f'"{tag.etag}"'
+    assert response.headers['Cache-Control'] == tag.cache_control
+    assert tag.apply(Response('{}')).headers['ETag'] == response.headers['ETag']
+
+
+def test_finalized_transactions_revalidate_without_a_lookup(cache, eth):
+    receipt = {'block_number': 50, 'block_hash': '0x' + '01' * 32}
+    assert cache.transaction_tag(TX_HASH, {'receipt': None}) is None
+    assert cache.known_transaction_tag(TX_HASH) is None
+
+    tag = cache.transaction_tag(TX_HASH.upper().replace('0X', '0x'), {'receipt': receipt})
+    assert tag.finalized
+    assert cache.known_transaction_tag(TX_HASH) == tag
+
+    # Recent transactions are not remembered: a reorg could still move them
+    recent = cache.transaction_tag('0x' + 'cd' * 32, {'receipt': {'block_number': 99, 'block_hash': '0x' + '02' * 32}})
+    assert not recent.finalized
+    assert cache.known_transaction_tag('0x' + 'cd' * 32) is None
@@ -0,0 +1,175 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from eth_abi import encode as abi_encode
+from web3 import Web3
+
+from live_events import EventFilter, LiveEventHub, TooManyClients, parse_cursor, topic_value
+from log_decoder import EventLogDecoder
+
+TOKEN = Web3.to_checksum_address('0x' + '77' * 20)
+MINTER = Web3.to_checksum_address('0x' + '11' * 20)
+HOLDER = Web3.to_checksum_address('0x' + '22' * 20)
+TRANSFER_ABI = {
+    'anonymous': False, 'name': 'Transfer', 'type': 'event',
+    'inputs': [
+        {'indexed': True, 'name': 'from', 'type': 'address'},
+        {'indexed': True, 'name': 'to', 'type': 'address'},
+        {'indexed': False, 'name': 'value', 'type': 'uint256'}
+    ]
+}
+APPROVAL_ABI = dict(TRANSFER_ABI, name='Approval')
+
+
+class FakeProvider:
+    """eth_getLogs over a chain where every block has a Transfer MINTER -> HOLDER and an Approval"""
+
+    def __init__(self):
+        self.log_calls = []
+
+    def make_request(self, method, params):
+        assert method == 'eth_getLogs'
+        start, end = int(params[0]['fromBlock'], 16), int(params[0]['toBlock'], 16)
+        self.log_calls.append((start, end))
+        return {'result': [self.log(block_number, log_index, abi)
+                           for block_number in range(start, end + 1)
+                           for log_index, abi in enumerate((TRANSFER_ABI, APPROVAL_ABI))]}
+
+    @staticmethod
+    def log(block_number, log_index, abi):
+        return {
+            'address': TOKEN.lower(),
+            'blockHash': '0x' + block_number.to_bytes(32, 'big').hex(),
+            'blockNumber': hex(block_number),
+            'data': '0x' + abi_encode(['uint256'], [block_number]).hex(),
+            'logIndex': hex(log_index),
+            'removed': False,
+            'topics': [EventLogDecoder(abi).topic, topic_value(MINTER), topic_value(HOLDER)],
+            'transactionHash': '0x' + (block_number * 10 + log_index).to_bytes(32, 'big').hex(),
+            'transactionIndex': '0x0'
+        }
+
+
+@pytest.fixture
+def hub():
+    w3 = SimpleNamespace(eth=SimpleNamespace(block_number=100), provider=FakeProvider())
+    hub = LiveEventHub(w3, queue_size=4, replay_blocks=10, max_replay_blocks=50, max_clients=3, chunk_size=20)
+    hub.track(TOKEN, [TRANSFER_ABI, APPROVAL_ABI])
+    hub.start = lambda: None  # heads are driven by the test
+    return hub
+
+
+def cursors(events):
+    return [f'{event.block_number}:{event.log_index}' for event in events]
+
+
+def test_one_upstream_read_per_block_for_all_clients(hub):
+    everything = hub.subscribe(TOKEN)
+    transfers = hub.subscribe(TOKEN, EventFilter(events=['Transfer']))
+    to_minter = hub.subscribe(TOKEN, EventFilter.from_params({'topic2': MINTER}))
+
+    hub.on_head(101)
+    hub.on_head(102)
+
+    assert hub.w3.provider.log_calls == [(101, 101), (102, 102)]
+    assert cursors(everything.take(0)[0]) == ['101:0', '101:1', '102:0', '102:1']
+    assert cursors(transfers.take(0)[0]) == ['101:0', '102:0']
+    assert to_minter.take(0)[0] == []
+    assert hub.stats()['events_published'] == 4
+
+
+def test_frames_are_serialized_once_with_their_cursor(hub):
+    client = hub.subscribe(TOKEN, EventFilter(account=HOLDER.lower()))
+    other = hub.subscribe(TOKEN)
+    hub.on_head(101)
+
+    event = client.take(0)[0][0]
+    assert other.take(0)[0][0].frame is event.frame
+    header, name, data = event.frame.strip().split('\n')
+    assert (header, name) == ('id: 101:0', 'event: Transfer')
+    payload = json.loads(data[len('data: '):])
+    assert payload['cursor'] == '101:0'
+    assert payload['args'] == {'from': MINTER, 'to': HOLDER, 'value': 101}
+
+
+def test_slow_clients_lose_their_oldest_events_and_are_told(hub):
+    client = hub.subscribe(TOKEN)
+    hub.on_head(103)
+
+    events, dropped = client.take(0)
+    assert cursors(events) == ['102:0', '102:1', '103:0', '103:1']
+    assert dropped == 2
+    assert hub.stats()['events_dropped'] == 2
+
+
+def test_stream_reports_drops_with_a_resume_cursor(hub):
+    client = hub.subscribe(TOKEN, EventFilter(events=['Transfer']))
+    stream = hub.stream(client)
+    assert next(stream) == 'retry: 3000\n\n'
+
+    hub.on_head(101)
+    assert next(stream).startswith('id: 101:0\n')
+    hub.on_head(106)
+    dropped = next(stream)
+    assert dropped.startswith('event: dropped\n')
+    assert json.loads(dropped.split('data: ')[1]) == {'count': 1, 'resume_from': '101:0'}
+    assert [next(stream).split('\n')[0] for _ in range(4)] == ['id: 103:0', 'id: 104:0', 'id: 105:0', 'id: 106:0']
+
+    stream.close()
+    assert hub.stats()['clients'] == 0
+
+
+def test_recent_resumes_are_served_from_the_buffer(hub):
+    hub.subscribe(TOKEN)
+    hub.on_head(103)
+    hub.w3.provider.log_calls.clear()
+
+    client = hub.subscribe(TOKEN, after=parse_cursor('102:0'))
+    assert cursors(hub.replay(client)) == ['102:1', '103:0', '103:1']
+    assert hub.w3.provider.log_calls == []
+
+
+def test_older_resumes_are_backfilled_in_chunks(hub):
+    hub.subscribe(TOKEN)
+    hub.on_head(130)
+    hub.w3.provider.log_calls.clear()
+
+    client = hub.subscribe(TOKEN, after=parse_cursor(from_block='95'))
+    replayed = hub.replay(client)
+    assert hub.w3.provider.log_calls == [(95, 114), (115, 130)]
+    assert cursors(replayed)[:2] == ['95:0', '95:1'] and len(replayed) == 72
+
+    with pytest.raises(ValueError, match='more than 50 blocks'):
+        hub.subscribe(TOKEN, after=(80, -1))
+
+
+def test_client_limit(hub):
+    for _ in range(3):
+        hub.subscribe(TOKEN)
+    with pytest.raises(TooManyClients):
+        hub.subscribe(TOKEN)
+
+
+def test_confirmations_hold_back_recent_blocks(hub):
+    hub.confirmations = 2
+    client = hub.subscribe(TOKEN, EventFilter(events=['Approval']))
+
+    # Subscribing at head 100 starts after block 98
+    hub.on_head(100)
+    assert client.take(0)[0] == []
+    hub.on_head(102)
+    assert cursors(client.take(0)[0]) == ['99:1', '100:1']
+
+
+def test_filters_and_cursors_parse_query_values():
+    event_filter = EventFilter.from_params({'events': 'Transfer, Approval', 'topic1': f'{MINTER},7', 'account': HOLDER})
+    assert event_filter.events == {'Transfer', 'Approval'}
+    assert event_filter.topics[0] == {topic_value(MINTER), '0x' + '00' * 31 + '07'}
+    assert event_filter.account == '0x' + '00' * 12 + HOLDER[2:].lower()
+
+    with pytest.raises(ValueError):
+        topic_value('not-a-topic')
+    assert parse_cursor('12:3') == (12, 3)
+    assert parse_cursor(from_block='0x10') == (16, -1)
+    assert parse_cursor() is None
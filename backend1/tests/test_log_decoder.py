@@ -0,0 +1,176 @@
+import random
+
+import pytest
+from eth_abi import encode as abi_encode
+from web3 import Web3
+from web3._utils.events import get_event_data
+from web3._utils.method_formatters import log_entry_formatter
+
+from contract_handler import ContractHandler
+from log_decoder import EventLogDecoder
+
+TOKEN_ADDRESS = '0x' + 'ab' * 20
+
+TRANSFER_ABI = {
+    'anonymous': False, 'name': 'Transfer', 'type': 'event',
+    'inputs': [
+        {'indexed': True, 'name': 'from', 'type': 'address'},
+        {'indexed': True, 'name': 'to', 'type': 'address'},
+        {'indexed': False, 'name': 'value', 'type': 'uint256'}
+    ]
+}
+
+# Every single-word kind, in topics and in data
+MIXED_ABI = {
+    'anonymous': False, 'name': 'Mixed', 'type': 'event',
+    'inputs': [
+        {'indexed': True, 'name': 'delta', 'type': 'int256'},
+        {'indexed': False, 'name': 'flag', 'type': 'bool'},
+        {'indexed': True, 'name': 'tag', 'type': 'bytes4'},
+        {'indexed': False, 'name': 'small', 'type': 'int8'},
+        {'indexed': False, 'name': 'root', 'type': 'bytes32'},
+        {'indexed': True, 'name': 'count', 'type': 'uint8'},
+        {'indexed': False, 'name': 'owner', 'type': 'address'}
+    ]
+}
+
+# Takes the per-log fallback: dynamic data and an indexed string (present only as its hash)
+DYNAMIC_ABI = {
+    'anonymous': False, 'name': 'Named', 'type': 'event',
+    'inputs': [
+        {'indexed': True, 'name': 'key', 'type': 'string'},
+        {'indexed': True, 'name': 'account', 'type': 'address'},
+        {'indexed': False, 'name': 'label', 'type': 'string'},
+        {'indexed': False, 'name': 'amounts', 'type': 'uint256[]'},
+        {'indexed': False, 'name': 'pair', 'type': 'int16[2]'},
+        {'indexed': False, 'name': 'point', 'type': 'tuple',
+         'components': [{'name': 'x', 'type': 'uint256'}, {'name': 'holders', 'type': 'address[]'}]},
+        {'indexed': False, 'name': 'payload', 'type': 'bytes'}
+    ]
+}
+
+
+def make_log(decoder, index, topics, data):
+    return {
+        'address': TOKEN_ADDRESS,
+        'blockHash': '0x' + (100 + index // 3).to_bytes(32, 'big').hex(),
+        'blockNumber': hex(100 + index // 3),
+        'data': '0x' + data.hex(),
+        'logIndex': hex(index % 3),
+        'removed': False,
+        'topics': [decoder.topic] + ['0x' + topic.hex() for topic in topics],
+        'transactionHash': '0x' + index.to_bytes(32, 'big').hex(),
+        'transactionIndex': hex(index % 3)
+    }
+
+
+def web3_decode(event_abi, logs):
+    """The path the fast decoder replaces: web3's log formatter, get_event_data, then _format_event"""
+    codec = Web3().codec
+    return [
+        ContractHandler._format_event(event_abi['name'], get_event_data(codec, event_abi, log_entry_formatter(log)))
+        for log in logs
+    ]
+
+
+def assert_identical(actual, expected):
+    assert actual == expected
+    for got, want in zip(actual, expected):
+        for name, value in want['args'].items():
+            assert type(got['args'][name]) is type(value), name
+        for key in ('transaction_hash', 'block_number', 'address', 'log_index'):
+            assert type(got[key]) is type(want[key]), key
+
+
+def random_address(rng):
+    return Web3.to_checksum_address(rng.randbytes(20))
+
+
+def transfer_logs(count, seed=1):
+    rng = random.Random(seed)
+    decoder = EventLogDecoder(TRANSFER_ABI)
+    values = [0, 1, 2 ** 256 - 1, 2 ** 255] + [rng.getrandbits(rng.choice([8, 96, 256])) for _ in range(count)]
+    return [
+        make_log(decoder, index,
+                 [abi_encode(['address'], [random_address(rng)]), abi_encode(['address'], [random_address(rng)])],
+                 abi_encode(['uint256'], [value]))
+        for index, value in enumerate(values[:count])
+    ]
+
+
+def mixed_logs(count, seed=2):
+    rng = random.Random(seed)
+    decoder = EventLogDecoder(MIXED_ABI)
+    logs = []
+    for index in range(count):
+        delta = rng.choice([-2 ** 255, -1, 0, 2 ** 255 - 1, rng.randint(-2 ** 200, 2 ** 200)])
+        topics = [abi_encode(['int256'], [delta]), abi_encode(['bytes4'], [rng.randbytes(4)]),
+                  abi_encode(['uint8'], [rng.randint(0, 255)])]
+        data = abi_encode(['bool', 'int8', 'bytes32', 'address'],
+                          [rng.random() < 0.5, rng.randint(-128, 127), rng.randbytes(32), random_address(rng)])
+        logs.append(make_log(decoder, index, topics, data))
+    return logs
+
+
+def test_erc20_transfer_fast_path_matches_web3():
+    logs = transfer_logs(200)
+    decoder = EventLogDecoder(TRANSFER_ABI)
+
+    assert decoder.fixed and decoder.matches_layout(logs)
+    assert_identical(decoder.decode(logs), web3_decode(TRANSFER_ABI, logs))
+
+
+def test_every_single_word_type_matches_web3():
+    logs = mixed_logs(100)
+    decoder = EventLogDecoder(MIXED_ABI)
+
+    assert decoder.fixed
+    assert_identical(decoder.decode(logs), web3_decode(MIXED_ABI, logs))
+
+
+def test_generic_fallback_matches_web3():
+    rng = random.Random(3)
+    decoder = EventLogDecoder(DYNAMIC_ABI)
+    logs = []
+    for index in range(20):
+        key = 'key-%d' % index
+        topics = [Web3.keccak(text=key), abi_encode(['address'], [random_address(rng)])]
+        data = abi_encode(['string', 'uint256[]', 'int16[2]', '(uint256,address[])', 'bytes'],
+                          ['label é %d' % index, [rng.getrandbits(256) for _ in range(index % 4)],
+                           [rng.randint(-2 ** 15, 2 ** 15 - 1) for _ in range(2)],
+                           (index, [random_address(rng) for _ in range(index % 3)]), rng.randbytes(index)])
+        logs.append(make_log(decoder, index, topics, data))
+
+    assert not decoder.fixed
+    assert_identical(decoder.decode(logs), web3_decode(DYNAMIC_ABI, logs))
+
+
+def test_logs_with_another_layout_use_the_fallback():
+    logs = transfer_logs(5)
+    # An ERC-721 Transfer: same signature, but the token id is a fourth topic and data is empty
+    logs[2] = dict(logs[2], topics=logs[2]['topics'] + ['0x' + '00' * 31 + '07'], data='0x')
+    decoder = EventLogDecoder(TRANSFER_ABI)
+
+    assert not decoder.matches_layout(logs)
+    with pytest.raises(ValueError):
+        decoder.decode_columns(logs)
+    with pytest.raises(ValueError):
+        decoder.decode(logs)
+
+
+def test_array_views_match_the_columns():
+    logs = transfer_logs(50)
+    columns = EventLogDecoder(TRANSFER_ABI).decode_columns(logs)
+
+    assert [Web3.to_checksum_address(raw) for raw in columns.raw('to').tolist()] == columns.column('to')
+    limbs = columns.limbs('value').tolist()
+    assert [sum(limb << (64 * (3 - position)) for position, limb in enumerate(row)) for row in limbs] == \
+        columns.column('value')
+
+
+def test_filter_params_address_is_a_list():
+    decoder = EventLogDecoder(TRANSFER_ABI)
+
+    assert decoder.filter_params(TOKEN_ADDRESS, 10, 'latest') == {
+        'address': [TOKEN_ADDRESS], 'topics': [decoder.topic], 'fromBlock': '0xa', 'toBlock': 'latest'
+    }
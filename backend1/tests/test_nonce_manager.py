@@ -0,0 +1,125 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import nonce_manager
+from nonce_manager import (
+    FileNonceStore, MemoryNonceStore, NonceManager, is_known_transaction_error, is_nonce_error
+)
+
+ADDRESS = '0x' + '11' * 20
+
+
+class FakeEth:
+    def __init__(self, pending=5):
+        self.pending = pending
+        self.reads = 0
+
+    def get_transaction_count(self, address, block_identifier):
+        assert block_identifier == 'pending'
+        self.reads += 1
+        return self.pending
+
+
+@pytest.fixture
+def eth():
+    return FakeEth()
+
+
+@pytest.fixture(params=['memory', 'file'])
+def manager(request, eth, tmp_path):
+    store = MemoryNonceStore() if request.param == 'memory' else FileNonceStore(str(tmp_path))
+    return NonceManager(SimpleNamespace(eth=eth), store, gap_timeout=60, resync_interval=30)
+
+
+def test_nonces_come_from_local_state_after_the_first_sync(manager, eth):
+    assert manager.reserve(ADDRESS) == 5
+    assert manager.reserve_many(ADDRESS, 3) == [6, 7, 8]
+    assert eth.reads == 1
+
+
+def test_concurrent_reservations_never_repeat(manager):
+    reserved = []
+    lock = threading.Lock()
+
+    def reserve():
+        for _ in range(20):
+            nonce = manager.reserve(ADDRESS)
+            with lock:
+                reserved.append(nonce)
+
+    threads = [threading.Thread(target=reserve) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(reserved) == list(range(5, 85))
+
+
+def test_released_nonces_are_reused_lowest_first(manager):
+    manager.reserve_many(ADDRESS, 4)  # 5..8
+    manager.release(ADDRESS, 6)
+    manager.release(ADDRESS, 5)
+    manager.release(ADDRESS, 8)  # the newest nonce just moves the counter back
+
+    assert manager.peek(ADDRESS)['next'] == 8
+    assert manager.reserve_many(ADDRESS, 3) == [5, 6, 8]
+
+
+def test_resync_skips_past_transactions_sent_elsewhere(manager, eth):
+    manager.reserve(ADDRESS)
+    eth.pending = 20
+
+    manager.resync(ADDRESS)
+
+    assert manager.reserve(ADDRESS) == 20
+
+
+def test_gap_is_rewound_only_after_it_persists(manager, eth, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(nonce_manager.time, 'time', lambda: now[0])
+    manager.reserve_many(ADDRESS, 3)  # 5..7 were reserved but the node never saw them
+
+    manager.resync(ADDRESS)
+    assert manager.peek(ADDRESS)['next'] == 8
+    assert manager.peek(ADDRESS)['stalled_at'] == 5
+
+    now[0] += 30
+    manager.resync(ADDRESS)
+    assert manager.peek(ADDRESS)['next'] == 8
+
+    now[0] += 31
+    manager.resync(ADDRESS)
+    assert manager.peek(ADDRESS)['next'] == 5
+    assert manager.reserve(ADDRESS) == 5
+
+
+def test_progress_resets_the_gap_timer(manager, eth, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(nonce_manager.time, 'time', lambda: now[0])
+    manager.reserve_many(ADDRESS, 3)
+    manager.resync(ADDRESS)
+
+    # The node accepted one more transaction, so the counter is not rewound
+    eth.pending = 6
+    now[0] += 61
+    manager.resync(ADDRESS)
+    assert manager.peek(ADDRESS)['next'] == 8
+    assert manager.peek(ADDRESS)['stalled_at'] == 6
+
+
+def test_maybe_resync_is_rate_limited(manager, eth):
+    manager.reserve(ADDRESS)
+    manager.maybe_resync(ADDRESS)
+    manager.maybe_resync(ADDRESS)
+    assert eth.reads == 2
+
+
+def test_node_error_classification():
+    assert is_nonce_error(ValueError({'message': 'nonce too low'}))
+    assert is_nonce_error(ValueError('Replacement transaction underpriced'))
+    assert is_known_transaction_error(ValueError('already known'))
+    assert not is_known_transaction_error(ValueError('nonce too low'))
+    assert not is_nonce_error(ValueError('insufficient funds for gas * price + value'))
@@ -0,0 +1,70 @@
+import pytest
+
+import rate_limit
+from rate_limit import InProcessTokenBuckets, RateLimiter, parse_rate
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_parse_rate():
+    assert parse_rate('100/hour') == (100, 100 / 3600)
+    assert parse_rate(' 10 / seconds ') == (10, 10.0)
+    for rate in ('', '0/minute', '5/week', 'ten/second'):
+        with pytest.raises(ValueError):
+            parse_rate(rate)
+
+
+def test_burst_then_refill_at_the_configured_rate(clock):
+    limiter = RateLimiter(InProcessTokenBuckets(capacity=3, rate=1 / 36), '100/hour')
+
+    assert [limiter.check('client')[:2] for _ in range(3)] == [(True, 2), (True, 1), (True, 0)]
+    assert limiter.check('client') == (False, 0, 36)
+
+    clock[0] += 18
+    assert limiter.check('client') == (False, 0, 18)
+    clock[0] += 18
+    assert limiter.check('client')[0]
+    assert limiter.stats()['allowed'] == 4 and limiter.stats()['rejected'] == 2
+
+
+def test_refill_never_exceeds_capacity(clock):
+    buckets = InProcessTokenBuckets(capacity=2, rate=1)
+    buckets.acquire('client', cost=2)
+
+    clock[0] += 3600
+    assert buckets.acquire('client') == (True, 1)
+
+
+def test_clients_have_separate_buckets(clock):
+    limiter = RateLimiter(InProcessTokenBuckets(capacity=1, rate=0.01), '1/minute')
+
+    assert limiter.check('a')[0]
+    assert not limiter.check('a')[0]
+    assert limiter.check('b')[0]
+
+
+def test_idle_keys_are_evicted_least_recently_used_first(clock):
+    buckets = InProcessTokenBuckets(capacity=1, rate=0.01, max_keys=2)
+    buckets.acquire('a')
+    buckets.acquire('b')
+    buckets.acquire('a', cost=0)
+    buckets.acquire('c')
+
+    # 'a' was used more recently than 'b', so it is still empty and 'b' starts again full
+    assert not buckets.acquire('a')[0]
+    assert buckets.acquire('b')[0]
+
+
+def test_store_failures_let_requests_through():
+    class BrokenBuckets:
+        rate = 1.0
+
+        def acquire(self, key, cost=1):
+            raise ConnectionError('redis unavailable')
+
+    assert RateLimiter(BrokenBuckets(), '1/second').check('client') == (True, 0, None)
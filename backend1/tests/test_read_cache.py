@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+
+import pytest
+from hexbytes import HexBytes
+
+from read_cache import HeadTracker, InProcessCacheStore, ReadCache
+
+
+class FakeEth:
+    """get_block('latest') for a head the test moves, on one of several forks"""
+
+    def __init__(self, number):
+        self.number = number
+        self.fork = 0
+        self.head_reads = 0
+
+    def get_block(self, block_identifier):
+        self.head_reads += 1
+        return {'number': self.number, 'hash': HexBytes((self.number + self.fork * 10 ** 6).to_bytes(32, 'big'))}
+
+
+@pytest.fixture
+def eth():
+    return FakeEth(100)
+
+
+@pytest.fixture
+def cache(eth):
+    # refresh_interval=0 reads the head on every lookup, so each step sees the moved head
+    tracker = HeadTracker(SimpleNamespace(eth=eth), refresh_interval=0)
+    return ReadCache(InProcessCacheStore(max_entries=100), tracker, finality_depth=10)
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+def test_reads_are_served_from_the_cache_until_the_head_moves(cache, eth):
+    load = Loader()
+    assert cache.get_or_load('balance', ('0xabc',), 100, load) == 1
+    assert cache.get_or_load('balance', ('0xabc',), 100, load) == 1
+    assert load.calls == 1
+
+    eth.number = 101
+    assert cache.get_or_load('balance', ('0xabc',), 100, load) == 2
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_finalized_reads_survive_new_heads(cache, eth):
+    load = Loader()
+    cache.get_or_load('call', ('0xabc', '0x01'), 80, load)
+
+    eth.number = 120
+    assert cache.get_or_load('call', ('0xabc', '0x01'), 80, load) == 1
+    assert load.calls == 1
+
+
+def test_reorg_at_the_same_height_drops_recent_reads(cache, eth):
+    load = Loader()
+    cache.get_or_load('balance', ('0xabc',), 100, load)
+    cache.get_or_load('balance', ('0xabc',), 95, load)
+
+    # Same block number, different hash: every read tagged with the old head is unreachable
+    eth.fork = 1
+    assert cache.get_or_load('balance', ('0xabc',), 100, load) == 3
+    assert cache.get_or_load('balance', ('0xabc',), 95, load) == 4
+    assert cache.stats()['invalidations'] == 2
+
+
+def test_volatile_keys_embed_the_head_hash(cache, eth):
+    key, volatile = cache.make_key('balance', ('0xabc',), 95)
+    assert volatile and key.endswith('@0x' + (100).to_bytes(32, 'big').hex())
+
+    key, volatile = cache.make_key('balance', ('0xabc',), 90)
+    assert not volatile and key == 'balance:0xabc:90'
+
+
+def test_resolve_block_pins_latest_to_the_tracked_head(cache, eth):
+    assert cache.resolve_block('latest') == 100
+    assert cache.resolve_block('0x10') == 16
+    assert cache.resolve_block('42') == 42
+    with pytest.raises(ValueError):
+        cache.resolve_block(True)
+
+
+def test_head_is_refreshed_at_most_once_per_interval(eth):
+    tracker = HeadTracker(SimpleNamespace(eth=eth), refresh_interval=60)
+    for _ in range(5):
+        tracker.get_head()
+    assert eth.head_reads == 1
+
+
+def test_store_evicts_least_recently_used_entries():
+    store = InProcessCacheStore(max_entries=2)
+    store.set('a', 1)
+    store.set('b', 2, volatile=True)
+    store.get('a')
+    store.set('c', 3)
+
+    assert ReadCache.is_missing(store.get('b'))
+    assert store.get('a') == 1
+    assert store.evictions == 1
+    assert store.drop_volatile() == 0
@@ -0,0 +1,115 @@
+from types import SimpleNamespace
+
+import pytest
+
+from receipt_watcher import ReceiptWatcher
+
+TX_A = '0x' + 'aa' * 32
+TX_B = '0x' + 'bb' * 32
+
+
+class FakeProvider:
+    """make_batch_request answering eth_getTransactionReceipt from a dict of mined receipts"""
+
+    def __init__(self):
+        self.mined = {}
+        self.batches = []
+
+    def make_batch_request(self, payload):
+        self.batches.append([request['params'][0] for request in payload])
+        return [{'id': request['id'], 'result': self.mined.get(request['params'][0])} for request in payload]
+
+
+def raw_receipt(tx_hash, block_number, status=1):
+    return {'transactionHash': tx_hash, 'blockNumber': hex(block_number), 'blockHash': '0x' + '01' * 32,
+            'gasUsed': '0x5208', 'effectiveGasPrice': '0x1', 'status': hex(status), 'logs': []}
+
+
+@pytest.fixture
+def provider():
+    return FakeProvider()
+
+
+def make_watcher(provider, **kwargs):
+    watcher = ReceiptWatcher(SimpleNamespace(provider=provider), **kwargs)
+    watcher.start = lambda: None  # heads are driven by the test
+    return watcher
+
+
+def test_one_batch_per_block_for_all_waiters(provider):
+    watcher = make_watcher(provider)
+    futures = [watcher.watch(TX_A), watcher.watch(TX_A), watcher.watch(TX_B)]
+
+    provider.mined[TX_A] = raw_receipt(TX_A, 10)
+    watcher.on_head(10)
+
+    assert provider.batches == [[TX_A, TX_B]]
+    assert futures[0].result(0)['block_number'] == 10
+    assert futures[1].result(0) is futures[0].result(0)
+    assert not futures[2].done()
+    assert watcher.stats()['pending'] == 1
+
+    # Same head again: only hashes registered since the last fetch are checked
+    watcher.on_head(10)
+    assert len(provider.batches) == 1
+
+
+def test_fresh_hashes_are_checked_before_the_next_block(provider):
+    watcher = make_watcher(provider)
+    watcher.on_head(10)
+    provider.mined[TX_A] = raw_receipt(TX_A, 10)
+
+    future = watcher.watch(TX_A)
+    watcher.on_head(10)
+
+    assert provider.batches == [[TX_A]]
+    assert future.result(0)['status'] == 1
+
+
+def test_receipts_near_the_head_are_not_cached(provider):
+    watcher = make_watcher(provider, reorg_depth=3)
+    future = watcher.watch(TX_A)
+    provider.mined[TX_A] = raw_receipt(TX_A, 10)
+    watcher.on_head(11)
+
+    # The waiter is resolved, but a reorg could still replace block 10
+    assert future.result(0)['block_number'] == 10
+    assert watcher.get_cached(TX_A) is None
+
+    watcher.watch(TX_B)
+    provider.mined[TX_B] = raw_receipt(TX_B, 10)
+    watcher.on_head(13)
+    assert watcher.get_cached(TX_B)['block_number'] == 10
+
+
+def test_cached_receipts_skip_the_node(provider):
+    watcher = make_watcher(provider)
+    watcher.watch(TX_A)
+    provider.mined[TX_A] = raw_receipt(TX_A, 10)
+    watcher.on_head(10)
+
+    future = watcher.watch(TX_A)
+
+    assert future.result(0)['transaction_hash'] == TX_A
+    assert len(provider.batches) == 1
+    assert watcher.stats()['receipt_requests'] == 1
+
+
+def test_cache_is_bounded(provider):
+    watcher = make_watcher(provider, cache_size=1)
+    watcher.watch(TX_A)
+    watcher.watch(TX_B)
+    provider.mined.update({TX_A: raw_receipt(TX_A, 10), TX_B: raw_receipt(TX_B, 10)})
+    watcher.on_head(10)
+
+    assert watcher.stats()['cached_receipts'] == 1
+
+
+def test_overdue_waiters_time_out(provider):
+    watcher = make_watcher(provider)
+    future = watcher.watch(TX_A, timeout=0)
+    watcher.on_head(10)
+
+    with pytest.raises(TimeoutError):
+        future.result(0)
+    assert watcher.stats()['pending'] == 0
@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+
+import pytest
+from eth_abi import decode as abi_decode, encode as abi_encode
+from web3 import Web3
+
+from abi_registry import AbiRegistry
+from contract_handler import ContractHandler
+from gas_oracle import GasEstimateCache
+from rpc_batch import ERROR_STRING_SELECTOR
+
+TOKEN = Web3.to_checksum_address('0x' + '77' * 20)
+SENDER = Web3.to_checksum_address('0x' + '11' * 20)
+OTHER_SENDER = Web3.to_checksum_address('0x' + '22' * 20)
+RECEIVER = Web3.to_checksum_address('0x' + '33' * 20)
+TRANSFER_ABI = [{
+    'name': 'transfer', 'type': 'function', 'stateMutability': 'nonpayable',
+    'inputs': [{'name': 'to', 'type': 'address'}, {'name': 'amount', 'type': 'uint256'}],
+    'outputs': [{'name': '', 'type': 'bool'}]
+}]
+
+
+class FakeProvider:
+    """make_batch_request simulating transfer(to, amount): amounts over 1000 revert, gas is 30000 + amount"""
+
+    def __init__(self):
+        self.batches = []
+
+    def make_batch_request(self, payload):
+        self.batches.append([(request['method'], request['params'][1]) for request in payload])
+        return [dict(self.respond(request['method'], request['params'][0]), id=request['id']) for request in payload]
+
+    @staticmethod
+    def respond(method, call):
+        _, amount = abi_decode(['address', 'uint256'], bytes.fromhex(call['data'][10:]))
+        if amount > 1000:
+            revert = ERROR_STRING_SELECTOR + abi_encode(['string'], ['insufficient balance'])
+            return {'error': {'code': 3, 'message': 'execution reverted', 'data': '0x' + revert.hex()}}
+        if method == 'eth_call':
+            return {'result': '0x' + abi_encode(['bool'], [True]).hex()}
+        return {'result': hex(30000 + amount)}
+
+
+def make_handler(batch_size=10, gas_estimates=None):
+    handler = ContractHandler.__new__(ContractHandler)
+    handler.config = SimpleNamespace(SIMULATION_BATCH_SIZE=batch_size, GAS_ESTIMATE_MARGIN=0.2, LOG_SAMPLE_RATE=1.0)
+    handler.w3 = Web3()
+    handler.w3.provider = FakeProvider()
+    handler.account = SimpleNamespace(address=SENDER)
+    handler.abi_registry = AbiRegistry()
+    handler._contract_cache = {}
+    handler.read_cache = None
+    handler.gas_estimates = gas_estimates
+    return handler
+
+
+def transfer(amount, **item):
+    return {'contract_address': TOKEN, 'function_name': 'transfer', 'function_args': [RECEIVER, amount],
+            'abi': TRANSFER_ABI, **item}
+
+
+def test_items_are_simulated_in_batches_at_one_block():
+    handler = make_handler(batch_size=2)
+
+    simulation = handler.simulate_transactions([transfer(100), transfer(2000), transfer(5)], block_identifier=50)
+
+    # Two items per batch, each an eth_call and an eth_estimateGas at the pinned block
+    assert [len(batch) for batch in handler.w3.provider.batches] == [4, 2]
+    assert {block for batch in handler.w3.provider.batches for _, block in batch} == {'0x32'}
+    assert simulation['block_number'] == 50
+    assert (simulation['passed'], simulation['failed']) == (2, 1)
+
+    passed, reverted, small = simulation['results']
+    assert passed == {'success': True, 'from': SENDER, 'result': True, 'gas_estimate': 30100, 'gas_limit': 36120}
+    assert reverted == {'success': False, 'from': SENDER, 'error': 'execution reverted: insufficient balance'}
+    assert small['gas_estimate'] == 30005
+
+
+def test_items_that_cannot_be_encoded_fail_without_an_rpc_call():
+    handler = make_handler()
+
+    results = handler.simulate_transactions([
+        transfer(1), transfer(1, function_name='burn'), transfer(1, contract_address='0x123')
+    ], block_identifier=50)['results']
+
+    assert results[0]['success']
+    assert not results[1]['success'] and 'burn' in results[1]['error']
+    assert results[2]['error'] == 'Invalid contract address: 0x123'
+    assert len(handler.w3.provider.batches[0]) == 2
+
+
+def test_items_run_from_their_senders():
+    handler = make_handler()
+
+    results = handler.simulate_transactions([transfer(1), transfer(1, **{'from': OTHER_SENDER})],
+                                            block_identifier=50)['results']
+    assert [result['from'] for result in results] == [SENDER, OTHER_SENDER]
+
+    results = handler.simulate_transactions([transfer(1)], block_identifier=50, senders=[OTHER_SENDER])['results']
+    assert results[0]['from'] == OTHER_SENDER
+
+
+def test_simulated_estimates_warm_the_gas_cache():
+    cache = GasEstimateCache(margin=0.5)
+    handler = make_handler(gas_estimates=cache)
+
+    handler.simulate_transactions([transfer(100)], block_identifier=50)
+
+    assert cache.get(cache.make_key(TOKEN, 'transfer', [RECEIVER, 100], 0, SENDER)) == 45150
+
+
+@pytest.mark.parametrize('require_all, expected', [(False, {0: 36000}), (True, {})])
+def test_failed_simulations_are_not_sent(require_all, expected):
+    outcomes = [{'success': True, 'from': SENDER, 'gas_limit': 36000},
+                {'success': False, 'from': SENDER, 'error': 'execution reverted'}]
+    results = [None, None]
+
+    assert ContractHandler._screen_simulation(outcomes, results, require_all) == expected
+    assert results[1]['error'] == 'Simulation failed: execution reverted'
+    if require_all:
+        assert results[0]['error'] == 'Not sent: another transaction failed simulation'
+    else:
+        assert results[0] is None
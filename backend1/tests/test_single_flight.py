@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_overlapping_calls_share_one_load():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'balance'
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(flight.do, 'key', load)
+        started.wait(5)
+        followers = [pool.submit(flight.do, 'key', load) for _ in range(3)]
+        while flight.coalesced < 3:
+            time.sleep(0.001)
+        release.set()
+        results = [leader.result()] + [future.result() for future in followers]
+
+    assert results == ['balance'] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {'in_flight': 0, 'leaders': 1, 'coalesced': 3}
+
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise ValueError('execution reverted')
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, 'key', fail)
+        started.wait(5)
+        follower = pool.submit(flight.do, 'key', fail)
+        while flight.coalesced < 1:
+            time.sleep(0.001)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError, match='reverted'):
+                future.result()
+
+    # Nothing is cached once the call finishes
+    assert flight.do('key', lambda: 'retried') == 'retried'
+
+
+def test_async_calls_share_one_load():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 42
+
+        results = await asyncio.gather(*(flight.do('key', load) for _ in range(5)))
+        return results, calls, flight.stats()
+
+    results, calls, stats = asyncio.run(scenario())
+    assert results == [42] * 5
+    assert len(calls) == 1
+    assert stats == {'in_flight': 0, 'leaders': 1, 'coalesced': 4}
+
+
+def test_cancelled_follower_does_not_cancel_the_shared_call():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        release = asyncio.Event()
+
+        async def load():
+            await release.wait()
+            return 'done'
+
+        leader = asyncio.ensure_future(flight.do('key', load))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do('key', load))
+        await asyncio.sleep(0)
+        follower.cancel()
+        release.set()
+        return await leader, follower.cancelled()
+
+    assert asyncio.run(scenario()) == ('done', True)
@@ -0,0 +1,214 @@
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+from web3 import Web3
+
+from transaction_jobs import (
+    TransactionJobManager, TransactionJob, TransactionJobItem,
+    ITEM_QUEUED, ITEM_SENDING, ITEM_SUBMITTED, ITEM_CONFIRMED, ITEM_FAILED, ITEM_TIMEOUT,
+    JOB_QUEUED, JOB_SUBMITTING, JOB_CONFIRMING, JOB_COMPLETED
+)
+
+SENDER = '0x' + '11' * 20
+
+
+class FakeHandler:
+    """send_transactions that signs every item, then reports the configured broadcast outcome"""
+
+    def __init__(self, outcome='unknown'):
+        self.account = SimpleNamespace(address=SENDER)
+        self.outcome = outcome
+        self.next_nonce = 0
+
+    def send_transactions(self, transactions, on_signed=None):
+        signed = []
+        for index, _ in enumerate(transactions):
+            raw = '0x%064x' % (self.next_nonce + 1)
+            signed.append({'index': index, 'from': SENDER, 'nonce': self.next_nonce,
+                           'transaction_hash': Web3.to_hex(Web3.keccak(hexstr=raw)), 'raw_transaction': raw})
+            self.next_nonce += 1
+        on_signed(signed)
+        if self.outcome == 'unknown':
+            return [{'success': False, 'unknown': True, 'error': 'connection reset'} for _ in signed]
+        return [{'success': True, 'transaction_hash': entry['transaction_hash'], 'nonce': entry['nonce'],
+                 'from': SENDER} for entry in signed]
+
+
+class FakeEth:
+    def __init__(self):
+        self.account_nonce = 0
+        self.broadcast = []
+        self.broadcast_error = None
+
+    def get_transaction_count(self, address, block_identifier):
+        return self.account_nonce
+
+    def send_raw_transaction(self, raw_transaction):
+        self.broadcast.append(raw_transaction)
+        if self.broadcast_error:
+            raise self.broadcast_error
+
+
+class FakeReceiptWatcher:
+    def __init__(self):
+        self.receipts = {}
+
+    def fetch_receipts(self, tx_hashes):
+        return [self.receipts.get(tx_hash) for tx_hash in tx_hashes]
+
+    def watch(self, tx_hash, timeout=None):
+        future = Future()
+        if tx_hash in self.receipts:
+            future.set_result(self.receipts[tx_hash])
+        return future
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = TransactionJobManager(
+        FakeHandler(), SimpleNamespace(eth=FakeEth()), f"sqlite:///{tmp_path}/jobs.db", FakeReceiptWatcher(),
+        workers=1, submit_batch_size=10, lease_timeout=60
+    )
+    yield manager
+    manager._pool.shutdown(wait=True)
+
+
+def run_job(manager, count=3):
+    job_id = manager.create_job([{'contract_address': SENDER, 'function_name': 'mint'}] * count)['job_id']
+    manager._queue.get_nowait()
+    assert manager._claim(job_id)
+    manager._submit_job(job_id)
+    return job_id
+
+
+def items(manager, job_id):
+    return {item['index']: item for item in manager.get_job(job_id)['items']}
+
+
+def set_job(manager, job_id, **values):
+    with manager.Session() as session, session.begin():
+        job = session.get(TransactionJob, job_id)
+        for name, value in values.items():
+            setattr(job, name, value)
+
+
+def set_item(manager, job_id, index, **values):
+    with manager.Session() as session, session.begin():
+        item = session.get(TransactionJobItem, (job_id, index))
+        for name, value in values.items():
+            setattr(item, name, value)
+
+
+def test_unknown_broadcast_keeps_signed_items_sending(manager):
+    job_id = run_job(manager)
+
+    job = manager.get_job(job_id)
+    assert job['status'] == JOB_CONFIRMING
+    for index, item in items(manager, job_id).items():
+        assert item['status'] == ITEM_SENDING
+        assert item['nonce'] == index
+        assert item['transaction_hash']
+    with manager.Session() as session:
+        assert all(item.raw_transaction for item in session.query(TransactionJobItem))
+
+
+def test_settle_confirms_sending_items_from_late_receipts(manager):
+    job_id = run_job(manager)
+    for item in items(manager, job_id).values():
+        manager.receipt_watcher.receipts[item['transaction_hash']] = {'status': 1, 'block_number': 7}
+    manager.w3.eth.account_nonce = 3
+
+    manager.settle_sending()
+
+    assert {item['status'] for item in items(manager, job_id).values()} == {ITEM_CONFIRMED}
+    assert manager.get_job(job_id)['status'] == JOB_COMPLETED
+    assert manager.w3.eth.broadcast == []
+
+
+def test_settle_rebroadcasts_the_stored_signed_bytes(manager):
+    job_id = run_job(manager, count=1)
+    with manager.Session() as session:
+        raw_transaction = session.get(TransactionJobItem, (job_id, 0)).raw_transaction
+
+    manager.settle_sending()
+
+    assert manager.w3.eth.broadcast == [raw_transaction]
+    assert items(manager, job_id)[0]['status'] == ITEM_SUBMITTED
+    assert manager.handler.next_nonce == 1
+
+
+def test_settle_treats_already_known_as_submitted(manager):
+    job_id = run_job(manager, count=1)
+    manager.w3.eth.broadcast_error = ValueError({'code': -32000, 'message': 'already known'})
+
+    manager.settle_sending()
+
+    assert items(manager, job_id)[0]['status'] == ITEM_SUBMITTED
+
+
+def test_settle_fails_items_whose_nonce_was_taken(manager):
+    job_id = run_job(manager, count=2)
+    # Nonce 0 was mined by some other transaction; nonce 1 is still free
+    manager.w3.eth.account_nonce = 1
+
+    manager.settle_sending()
+
+    result = items(manager, job_id)
+    assert result[0]['status'] == ITEM_FAILED
+    assert 'nonce was used' in result[0]['error']
+    assert result[1]['status'] == ITEM_SUBMITTED
+    assert len(manager.w3.eth.broadcast) == 1
+
+
+def test_retry_requeues_failed_items_and_settles_timed_out_ones(manager):
+    manager.handler.outcome = 'sent'
+    job_id = run_job(manager, count=2)
+    sent = items(manager, job_id)
+    set_item(manager, job_id, 0, status=ITEM_FAILED, error='reverted in simulation')
+    set_item(manager, job_id, 1, status=ITEM_TIMEOUT, error='No receipt before timeout')
+    set_job(manager, job_id, status=JOB_CONFIRMING)
+    manager.receipt_watcher.receipts[sent[1]['transaction_hash']] = {'status': 1, 'block_number': 9}
+    manager.w3.eth.account_nonce = 2
+
+    result = manager.retry_job(job_id)
+
+    assert result == {'job_id': job_id, 'requeued': 1, 'still_pending': 0}
+    retried = items(manager, job_id)
+    assert retried[0]['status'] == ITEM_QUEUED
+    assert retried[0]['transaction_hash'] is None
+    assert retried[1]['status'] == ITEM_CONFIRMED
+    assert retried[1]['block_number'] == 9
+    assert manager.get_job(job_id)['status'] == JOB_QUEUED
+    assert manager._queue.get_nowait() == job_id
+
+
+def test_retry_rejects_jobs_still_submitting(manager):
+    job_id = manager.create_job([{'function_name': 'mint'}])['job_id']
+    set_job(manager, job_id, status=JOB_SUBMITTING)
+
+    with pytest.raises(ValueError):
+        manager.retry_job(job_id)
+    with pytest.raises(KeyError):
+        manager.retry_job('missing')
+
+
+def test_reclaim_requeues_submitting_and_adopts_confirming_jobs(manager):
+    stale = time.time() - 120
+    submitting = run_job(manager, count=1)
+    confirming = run_job(manager, count=1)
+    fresh = run_job(manager, count=1)
+    set_job(manager, submitting, status=JOB_SUBMITTING, owner='gone', heartbeat_at=stale)
+    set_job(manager, confirming, owner='gone', heartbeat_at=stale)
+    set_job(manager, fresh, owner='alive', heartbeat_at=time.time())
+
+    assert manager.reclaim_stale() == 2
+
+    assert manager.get_job(submitting)['status'] == JOB_QUEUED
+    assert manager._queue.get_nowait() == submitting
+    with manager.Session() as session:
+        assert session.get(TransactionJob, confirming).owner == manager.owner
+        assert session.get(TransactionJob, fresh).owner == 'alive'
+    # A second pass finds nothing left to take over
+    assert manager.reclaim_stale() == 0
@@ -0,0 +1,657 @@
+import asyncio
+import functools
+import inspect
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+from sqlalchemy import create_engine, event, inspect as inspect_schema, select, text, update, String, Integer, Float, Text, Index
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
+from web3 import Web3
+from logging_config import get_logger
+from receipt_watcher import ReceiptWatcher
+from nonce_manager import is_known_transaction_error, is_nonce_error
+
+logger = get_logger(__name__)
+
+# Item states; confirmed, reverted and failed are terminal. A sending item
+# was signed but whether the node received it is unknown until it is settled
+ITEM_QUEUED = 'queued'
+ITEM_SENDING = 'sending'
+ITEM_SUBMITTED = 'submitted'
+ITEM_CONFIRMED = 'confirmed'
+ITEM_REVERTED = 'reverted'
+ITEM_FAILED = 'failed'
+ITEM_TIMEOUT = 'timeout'
+
+# Job states
+JOB_QUEUED = 'queued'
+JOB_SUBMITTING = 'submitting'
+JOB_CONFIRMING = 'confirming'
+JOB_COMPLETED = 'completed'
+JOB_COMPLETED_WITH_ERRORS = 'completed_with_errors'
+
+
+class JobBase(DeclarativeBase):
+    pass
+
+
+class TransactionJob(JobBase):
+    """A batch of contract transactions submitted by one API request"""
+    __tablename__ = 'transaction_jobs'
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(128), unique=True, nullable=True)
+    status: Mapped[str] = mapped_column(String(32))
+    owner: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    total: Mapped[int] = mapped_column(Integer)
+    created_at: Mapped[float] = mapped_column(Float)
+    started_at: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    finished_at: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    heartbeat_at: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    stats: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+
+class TransactionJobItem(JobBase):
+    """One contract call within a job and its submission/receipt state"""
+    __tablename__ = 'transaction_job_items'
+    __table_args__ = (
+        Index('ix_job_items_status', 'status'),
+    )
+
+    job_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    item_index: Mapped[int] = mapped_column(Integer, primary_key=True)
+    request: Mapped[str] = mapped_column(Text)
+    status: Mapped[str] = mapped_column(String(16))
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    nonce: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    sender: Mapped[Optional[str]] = mapped_column(String(42), nullable=True)
+    transaction_hash: Mapped[Optional[str]] = mapped_column(String(66), nullable=True)
+    raw_transaction: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    block_number: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    submitted_at: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    finished_at: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'index': self.item_index,
+            'status': self.status,
+            'attempts': self.attempts,
+            'nonce': self.nonce,
+            'sender': self.sender,
+            'transaction_hash': self.transaction_hash,
+            'block_number': self.block_number,
+            'error': self.error
+        }
+
+
+def _enable_sqlite_wal(dbapi_connection, connection_record):
+    # Let status reads from other workers proceed while a job is writing
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.close()
+
+
+# Columns added after the first release; create_all never alters existing tables
+ADDED_COLUMNS = (
+    (TransactionJobItem.__tablename__, 'sender', 'VARCHAR(42)'),
+    (TransactionJobItem.__tablename__, 'raw_transaction', 'TEXT'),
+    (TransactionJob.__tablename__, 'heartbeat_at', 'FLOAT'),
+)
+
+
+def _add_missing_columns(engine):
+    schema = inspect_schema(engine)
+    existing = {table: {column['name'] for column in schema.get_columns(table)}
+                for table in {table for table, _, _ in ADDED_COLUMNS}}
+    with engine.begin() as connection:
+        for table, column, column_type in ADDED_COLUMNS:
+            if column not in existing[table]:
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class TransactionJobManager:
+    """Queue bulk mint/transfer jobs and run them on a bounded worker pool
+
+    A job is persisted and its id returned immediately. The dispatcher
+    thread claims queued jobs and splits them into chunks; up to
+    `workers` chunks are signed and broadcast concurrently through the
+    handler's pipelined send_transactions. Submitted transactions are
+    handed to the shared ReceiptWatcher, and the job is closed with
+    throughput and latency statistics once every item is final.
+
+    Every signed transaction is stored (nonce, sender, hash and raw bytes)
+    before it is broadcast. An item whose broadcast outcome is unknown is
+    settled by its receipt, by rebroadcasting the same signed bytes, or as
+    failed once its nonce has been taken by another transaction; it is
+    never signed again with a new nonce while it could still be mined.
+    Running jobs carry an owner heartbeat, and a job whose owner has
+    stopped beating for lease_timeout seconds is taken over by another
+    worker process.
+    """
+
+    def __init__(self, handler, w3: Web3, database_url: str, receipt_watcher: ReceiptWatcher, workers: int = 4,
+                 submit_batch_size: int = 25, receipt_poll_interval: float = 2.0,
+                 receipt_timeout: float = 600.0, lease_timeout: float = 60.0):
+        self.handler = handler
+        self.w3 = w3
+        self.receipt_watcher = receipt_watcher
+        self.submit_batch_size = submit_batch_size
+        self.receipt_poll_interval = receipt_poll_interval
+        self.receipt_timeout = receipt_timeout
+        self.lease_timeout = lease_timeout
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        connect_args = {'check_same_thread': False} if database_url.startswith('sqlite') else {}
+        self.engine = create_engine(database_url, connect_args=connect_args)
+        if database_url.startswith('sqlite'):
+            event.listen(self.engine, 'connect', _enable_sqlite_wal)
+        JobBase.metadata.create_all(self.engine)
+        _add_missing_columns(self.engine)
+        self.Session = sessionmaker(self.engine, expire_on_commit=False)
+
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job-worker')
+        self._queue: 'queue.Queue[str]' = queue.Queue()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._watching = set()
+        self._watching_lock = threading.Lock()
+
+    def start(self):
+        """Start the dispatcher and receipt threads, resuming unclaimed jobs and jobs with a stale owner"""
+        if self._threads:
+            return
+        with self.Session() as session:
+            for job_id in session.scalars(select(TransactionJob.id).where(TransactionJob.status == JOB_QUEUED)):
+                self._queue.put(job_id)
+        self.reclaim_stale()
+        for target, name in ((self._dispatch_loop, 'job-dispatcher'), (self._receipt_loop, 'job-receipts')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        self._pool.shutdown(wait=False)
+
+    def create_job(self, transactions: List[Dict[str, Any]], idempotency_key: str = None) -> Dict[str, Any]:
+        """Persist a job and queue it; a repeated idempotency key returns the existing job"""
+        with self.Session() as session, session.begin():
+            if idempotency_key:
+                existing = session.scalar(
+                    select(TransactionJob).where(TransactionJob.idempotency_key == idempotency_key)
+                )
+                if existing:
+                    return self._job_summary(session, existing)
+
+            job = TransactionJob(
+                id=uuid.uuid4().hex,
+                idempotency_key=idempotency_key,
+                status=JOB_QUEUED,
+                total=len(transactions),
+                created_at=time.time()
+            )
+            session.add(job)
+            session.add_all(
+                TransactionJobItem(
+                    job_id=job.id,
+                    item_index=index,
+                    request=json.dumps(item),
+                    status=ITEM_QUEUED,
+                    attempts=0
+                )
+                for index, item in enumerate(transactions)
+            )
+            summary = self._job_summary(session, job, counts={ITEM_QUEUED: len(transactions)})
+
+        self._queue.put(job.id)
+        logger.info('job_queued', job_id=job.id, items=len(transactions))
+        return summary
+
+    def retry_job(self, job_id: str) -> Dict[str, Any]:
+        """Requeue items that never took effect on chain
+
+        Failed and reverted items are sent again. Timed-out items and items
+        whose broadcast outcome is unknown are settled first: by a late
+        receipt, by rebroadcasting the same signed transaction, or, once
+        their nonce has been used by another transaction, as failed. Only
+        then are they resent, so no call can apply twice.
+        """
+        with self.Session() as session:
+            job = session.get(TransactionJob, job_id)
+            if job is None:
+                raise KeyError(job_id)
+            if job.status in (JOB_QUEUED, JOB_SUBMITTING):
+                raise ValueError(f"Job {job_id} is still being submitted")
+            items = session.scalars(
+                select(TransactionJobItem).where(
+                    TransactionJobItem.job_id == job_id,
+                    TransactionJobItem.status.in_([ITEM_FAILED, ITEM_REVERTED, ITEM_TIMEOUT, ITEM_SENDING])
+                )
+            ).all()
+
+        unsettled = [item for item in items if item.status in (ITEM_TIMEOUT, ITEM_SENDING)]
+        if unsettled:
+            self._settle(unsettled)
+
+        retry_indexes = [item.item_index for item in items if item.status in (ITEM_FAILED, ITEM_REVERTED)]
+        if retry_indexes:
+            with self.Session() as session, session.begin():
+                session.execute(
+                    update(TransactionJobItem)
+                    .where(TransactionJobItem.job_id == job_id, TransactionJobItem.item_index.in_(retry_indexes))
+                    .values(status=ITEM_QUEUED, error=None, transaction_hash=None, raw_transaction=None, nonce=None,
+                            sender=None, block_number=None, submitted_at=None, finished_at=None)
+                )
+                session.execute(
+                    update(TransactionJob)
+                    .where(TransactionJob.id == job_id)
+                    .values(status=JOB_QUEUED, owner=None, finished_at=None, stats=None)
+                )
+            self._queue.put(job_id)
+        else:
+            # Rebroadcast items are in flight again
+            self._maybe_finish(job_id)
+
+        logger.info('job_requeued', job_id=job_id, items=len(retry_indexes))
+        return {
+            'job_id': job_id,
+            'requeued': len(retry_indexes),
+            'still_pending': sum(1 for item in unsettled
+                                 if item.status in (ITEM_TIMEOUT, ITEM_SENDING, ITEM_SUBMITTED))
+        }
+
+    def _settle(self, items: List[TransactionJobItem]):
+        """Resolve signed items that may or may not be on chain, without signing them again
+
+        Account nonces are read before receipts: a nonce that is already
+        used while no receipt exists for the item's hash was taken by
+        another transaction, so the item can never be mined and is failed.
+        Otherwise the stored signed transaction is broadcast again, which
+        is harmless if the node already has it.
+        """
+        # Items from before signer sharding were all sent by the primary account
+        primary = self.handler.account.address
+        account_nonces = {
+            sender: self.w3.eth.get_transaction_count(sender, 'latest')
+            for sender in {item.sender or primary for item in items}
+        }
+        receipts = self.receipt_watcher.fetch_receipts([item.transaction_hash for item in items])
+        now = time.time()
+        self._apply_receipts(items, receipts, now)
+
+        with self.Session() as session, session.begin():
+            for item, receipt in zip(items, receipts):
+                if receipt:
+                    continue
+                if item.nonce is not None and item.nonce < account_nonces[item.sender or primary]:
+                    values = {'status': ITEM_FAILED, 'error': 'Not mined: its nonce was used by another transaction',
+                              'finished_at': now}
+                elif item.raw_transaction:
+                    values = self._rebroadcast(item, now)
+                else:
+                    continue
+                if values is None:
+                    continue
+                session.execute(
+                    update(TransactionJobItem)
+                    .where(TransactionJobItem.job_id == item.job_id, TransactionJobItem.item_index == item.item_index)
+                    .values(**values)
+                )
+                item.status = values['status']
+
+    def _rebroadcast(self, item: TransactionJobItem, now: float) -> Optional[Dict[str, Any]]:
+        """New state of an unmined item after sending its signed bytes again; None while still unknown"""
+        try:
+            self.w3.eth.send_raw_transaction(item.raw_transaction)
+        except ValueError as e:
+            if is_known_transaction_error(e):
+                return {'status': ITEM_SUBMITTED, 'error': None, 'submitted_at': now, 'finished_at': None}
+            if is_nonce_error(e):
+                # The nonce was used after it was read; the next settle sees the receipt or the replacement
+                return None
+            # It may still be in another node's pool, so it waits for its nonce like a timed-out item
+            return {'status': ITEM_TIMEOUT, 'error': f"Rebroadcast rejected: {str(e)}", 'finished_at': now}
+        except Exception as e:
+            logger.warning('job_rebroadcast_failed', tx_hash=item.transaction_hash, error=str(e))
+            if item.status == ITEM_SENDING and now - item.submitted_at >= self.receipt_timeout:
+                return {'status': ITEM_TIMEOUT, 'error': 'Broadcast outcome unknown', 'finished_at': now}
+            return None
+        return {'status': ITEM_SUBMITTED, 'error': None, 'submitted_at': now, 'finished_at': None}
+
+    def get_job(self, job_id: str, include_items: bool = True) -> Optional[Dict[str, Any]]:
+        with self.Session() as session:
+            job = session.get(TransactionJob, job_id)
+            if job is None:
+                return None
+            summary = self._job_summary(session, job)
+            if include_items:
+                summary['items'] = [
+                    item.to_dict() for item in session.scalars(
+                        select(TransactionJobItem)
+                        .where(TransactionJobItem.job_id == job_id)
+                        .order_by(TransactionJobItem.item_index)
+                    )
+                ]
+        return summary
+
+    def _job_summary(self, session, job: TransactionJob, counts: Dict[str, int] = None) -> Dict[str, Any]:
+        if counts is None:
+            counts = {}
+            for status in session.scalars(
+                select(TransactionJobItem.status).where(TransactionJobItem.job_id == job.id)
+            ):
+                counts[status] = counts.get(status, 0) + 1
+        done = sum(counts.get(status, 0) for status in (ITEM_CONFIRMED, ITEM_REVERTED, ITEM_FAILED, ITEM_TIMEOUT))
+        return {
+            'job_id': job.id,
+            'status': job.status,
+            'total': job.total,
+            'progress': round(done / job.total, 4) if job.total else 1.0,
+            'counts': counts,
+            'created_at': job.created_at,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at,
+            'stats': json.loads(job.stats) if job.stats else None
+        }
+
+    def _claim(self, job_id: str) -> bool:
+        """Atomically take a queued job so only one worker process runs it"""
+        with self.Session() as session, session.begin():
+            result = session.execute(
+                update(TransactionJob)
+                .where(TransactionJob.id == job_id, TransactionJob.status == JOB_QUEUED)
+                .values(status=JOB_SUBMITTING, owner=self.owner, heartbeat_at=time.time())
+            )
+            if result.rowcount:
+                session.execute(
+                    update(TransactionJob)
+                    .where(TransactionJob.id == job_id, TransactionJob.started_at.is_(None))
+                    .values(started_at=time.time())
+                )
+            return bool(result.rowcount)
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            job_id = self._queue.get()
+            if job_id is None:
+                break
+            try:
+                if self._claim(job_id):
+                    self._submit_job(job_id)
+            except Exception as e:
+                logger.error('job_run_failed', job_id=job_id, error=str(e))
+
+    def _submit_job(self, job_id: str):
+        with self.Session() as session:
+            items = session.scalars(
+                select(TransactionJobItem)
+                .where(TransactionJobItem.job_id == job_id, TransactionJobItem.status == ITEM_QUEUED)
+                .order_by(TransactionJobItem.item_index)
+            ).all()
+
+        chunks = [items[i:i + self.submit_batch_size] for i in range(0, len(items), self.submit_batch_size)]
+        for future in [self._pool.submit(self._submit_chunk, job_id, chunk) for chunk in chunks]:
+            future.result()
+
+        with self.Session() as session, session.begin():
+            session.execute(
+                update(TransactionJob)
+                .where(TransactionJob.id == job_id, TransactionJob.status == JOB_SUBMITTING)
+                .values(status=JOB_CONFIRMING)
+            )
+        # Jobs whose items all failed to submit have nothing to wait for
+        self._maybe_finish(job_id)
+
+    def _record_signed(self, job_id: str, chunk: List[TransactionJobItem], signed: List[Dict[str, Any]]):
+        """Store signed transactions before they are broadcast, so a crash or lost response cannot resend them"""
+        now = time.time()
+        with self.Session() as session, session.begin():
+            for entry in signed:
+                session.execute(
+                    update(TransactionJobItem)
+                    .where(TransactionJobItem.job_id == job_id,
+                           TransactionJobItem.item_index == chunk[entry['index']].item_index)
+                    .values(status=ITEM_SENDING, nonce=entry['nonce'], sender=entry['from'],
+                            transaction_hash=entry['transaction_hash'], raw_transaction=entry['raw_transaction'],
+                            error=None, submitted_at=now)
+                )
+
+    def _submit_chunk(self, job_id: str, chunk: List[TransactionJobItem]):
+        signed_positions = set()
+
+        def on_signed(signed):
+            self._record_signed(job_id, chunk, signed)
+            signed_positions.update(entry['index'] for entry in signed)
+
+        try:
+            results = self.handler.send_transactions([json.loads(item.request) for item in chunk], on_signed=on_signed)
+            if inspect.isawaitable(results):
+                # AsyncContractHandler: the coroutine hops onto the handler loop itself
+                results = asyncio.run(results)
+        except Exception as e:
+            # Items signed before the failure stay 'sending' and are settled by the receipt loop
+            results = [{'success': False, 'unknown': position in signed_positions, 'error': str(e)}
+                       for position in range(len(chunk))]
+
+        now = time.time()
+        with self.Session() as session, session.begin():
+            for item, result in zip(chunk, results):
+                values = {'attempts': item.attempts + 1}
+                if result.get('success'):
+                    values.update(status=ITEM_SUBMITTED, transaction_hash=result['transaction_hash'],
+                                  nonce=result.get('nonce'), sender=result.get('from'), submitted_at=now)
+                elif result.get('unknown'):
+                    values.update(status=ITEM_SENDING, error=f"Broadcast outcome unknown: {result.get('error')}")
+                else:
+                    values.update(status=ITEM_FAILED, error=result.get('error'), nonce=result.get('nonce'),
+                                  sender=result.get('from'), finished_at=now)
+                session.execute(
+                    update(TransactionJobItem)
+                    .where(TransactionJobItem.job_id == job_id, TransactionJobItem.item_index == item.item_index)
+                    .values(**values)
+                )
+
+    def _receipt_loop(self):
+        while not self._stop.wait(self.receipt_poll_interval):
+            try:
+                self.heartbeat()
+                self.reclaim_stale()
+                self.settle_sending()
+                self.watch_submitted()
+            except Exception as e:
+                logger.error('job_receipt_watch_failed', error=str(e))
+
+    def heartbeat(self):
+        """Renew this process's lease on the jobs it is running"""
+        with self.Session() as session, session.begin():
+            session.execute(
+                update(TransactionJob)
+                .where(TransactionJob.owner == self.owner,
+                       TransactionJob.status.in_([JOB_SUBMITTING, JOB_CONFIRMING]))
+                .values(heartbeat_at=time.time())
+            )
+
+    def reclaim_stale(self) -> int:
+        """Take over running jobs whose owner stopped renewing its lease, e.g. after a restart
+
+        A job that was still being submitted goes back to the queue: its
+        signed items are 'sending' and only its unsigned items are sent
+        again. A confirming job is adopted, so its receipts are watched here.
+        """
+        stale_before = time.time() - self.lease_timeout
+        with self.Session() as session:
+            stale = session.execute(
+                select(TransactionJob.id, TransactionJob.status, TransactionJob.owner)
+                .where(TransactionJob.status.in_([JOB_SUBMITTING, JOB_CONFIRMING]),
+                       TransactionJob.owner != self.owner,
+                       (TransactionJob.heartbeat_at.is_(None)) | (TransactionJob.heartbeat_at < stale_before))
+            ).all()
+
+        reclaimed = 0
+        for job_id, status, owner in stale:
+            requeue = status == JOB_SUBMITTING
+            if requeue:
+                values = {'status': JOB_QUEUED, 'owner': None, 'heartbeat_at': None}
+            else:
+                values = {'owner': self.owner, 'heartbeat_at': time.time()}
+            with self.Session() as session, session.begin():
+                # Conditional on the old owner, so only one process takes the job over
+                result = session.execute(
+                    update(TransactionJob)
+                    .where(TransactionJob.id == job_id, TransactionJob.status == status, TransactionJob.owner == owner)
+                    .values(**values)
+                )
+            if not result.rowcount:
+                continue
+            reclaimed += 1
+            logger.warning('job_reclaimed', job_id=job_id, stale_owner=owner)
+            if requeue:
+                self._queue.put(job_id)
+            else:
+                self._maybe_finish(job_id)
+        return reclaimed
+
+    def settle_sending(self):
+        """Settle items of this process's confirming jobs whose broadcast outcome is unknown"""
+        with self.Session() as session:
+            items = session.scalars(
+                select(TransactionJobItem)
+                .join(TransactionJob, TransactionJob.id == TransactionJobItem.job_id)
+                .where(TransactionJob.owner == self.owner, TransactionJob.status == JOB_CONFIRMING,
+                       TransactionJobItem.status == ITEM_SENDING)
+            ).all()
+        if not items:
+            return
+        self._settle(items)
+        for job_id in {item.job_id for item in items}:
+            self._maybe_finish(job_id)
+
+    def watch_submitted(self):
+        """Hand every submitted item this process owns to the shared receipt watcher"""
+        with self.Session() as session:
+            items = session.scalars(
+                select(TransactionJobItem)
+                .join(TransactionJob, TransactionJob.id == TransactionJobItem.job_id)
+                .where(TransactionJob.owner == self.owner, TransactionJobItem.status == ITEM_SUBMITTED)
+            ).all()
+
+        now = time.time()
+        for item in items:
+            key = (item.job_id, item.item_index)
+            with self._watching_lock:
+                if key in self._watching:
+                    continue
+                self._watching.add(key)
+            remaining = max(self.receipt_timeout - (now - item.submitted_at), 0)
+            future = self.receipt_watcher.watch(item.transaction_hash, timeout=remaining)
+            future.add_done_callback(functools.partial(self._on_receipt, item))
+
+    def _on_receipt(self, item: TransactionJobItem, future):
+        with self._watching_lock:
+            self._watching.discard((item.job_id, item.item_index))
+        try:
+            receipt = future.result()
+        except TimeoutError:
+            receipt = None
+        try:
+            for job_id in self._apply_receipts([item], [receipt], time.time()):
+                self._maybe_finish(job_id)
+        except Exception as e:
+            logger.error('job_receipt_failed', job_id=item.job_id, item=item.item_index, error=str(e))
+
+    def _apply_receipts(self, items: List[TransactionJobItem], receipts: List[Optional[Dict[str, Any]]],
+                        now: float) -> set:
+        job_ids = set()
+        with self.Session() as session, session.begin():
+            for item, receipt in zip(items, receipts):
+                if receipt:
+                    succeeded = receipt['status'] == 1
+                    values = {
+                        'status': ITEM_CONFIRMED if succeeded else ITEM_REVERTED,
+                        'block_number': receipt['block_number'],
+                        'error': None if succeeded else 'Transaction reverted',
+                        'finished_at': now
+                    }
+                    item.status = values['status']
+                elif item.status == ITEM_SUBMITTED and now - item.submitted_at >= self.receipt_timeout:
+                    values = {'status': ITEM_TIMEOUT, 'error': 'No receipt before timeout', 'finished_at': now}
+                else:
+                    continue
+                session.execute(
+                    update(TransactionJobItem)
+                    .where(TransactionJobItem.job_id == item.job_id, TransactionJobItem.item_index == item.item_index)
+                    .values(**values)
+                )
+                job_ids.add(item.job_id)
+        return job_ids
+
+    def _maybe_finish(self, job_id: str):
+        """Close the job and record its statistics once no item is in flight"""
+        with self.Session() as session, session.begin():
+            job = session.get(TransactionJob, job_id)
+            if job is None or job.status != JOB_CONFIRMING:
+                return
+            items = session.scalars(select(TransactionJobItem).where(TransactionJobItem.job_id == job_id)).all()
+            if any(item.status in (ITEM_QUEUED, ITEM_SENDING, ITEM_SUBMITTED) for item in items):
+                return
+
+            finished_at = time.time()
+            duration = finished_at - job.started_at
+            confirmed = [item for item in items if item.status == ITEM_CONFIRMED]
+            inclusion = [item.finished_at - item.submitted_at for item in confirmed]
+            end_to_end = [item.finished_at - job.started_at for item in confirmed]
+            job.stats = json.dumps({
+                'duration_seconds': round(duration, 3),
+                'submitted': sum(1 for item in items if item.submitted_at is not None),
+                'confirmed': len(confirmed),
+                'throughput_per_second': round(len(confirmed) / duration, 3) if duration > 0 else None,
+                'inclusion_latency_seconds': {
+                    'p50': _percentile(inclusion, 50),
+                    'p95': _percentile(inclusion, 95),
+                    'max': max(inclusion) if inclusion else None
+                },
+                'end_to_end_latency_seconds': {
+                    'p50': _percentile(end_to_end, 50),
+                    'p95': _percentile(end_to_end, 95),
+                    'max': max(end_to_end) if end_to_end else None
+                }
+            })
+            job.status = JOB_COMPLETED if len(confirmed) == len(items) else JOB_COMPLETED_WITH_ERRORS
+            job.finished_at = finished_at
+        logger.info('job_finished', job_id=job_id, confirmed=len(confirmed), items=len(items),
+                    duration=round(duration, 2))
+
+
+def create_job_manager(handler, w3: Web3, config) -> Optional[TransactionJobManager]:
+    """Build the transaction job manager when a signing account is configured"""
+    if not handler.account:
+        return None
+
+    return TransactionJobManager(
+        handler,
+        w3,
+        config.JOBS_DATABASE_URL,
+        handler.receipt_watcher,
+        workers=config.JOB_WORKERS,
+        submit_batch_size=config.JOB_SUBMIT_BATCH_SIZE,
+        receipt_poll_interval=config.JOB_RECEIPT_POLL_INTERVAL,
+        receipt_timeout=config.JOB_RECEIPT_TIMEOUT,
+        lease_timeout=config.JOB_LEASE_TIMEOUT
+    )
@@ -0,0 +1,227 @@
+import asyncio
+import inspect
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from contract_handler import ContractHandler
+from event_indexer import create_event_indexer
+from event_export import create_event_exporter
+from live_events import create_live_event_hub
+from holder_balances import HolderBalanceTracker
+from transaction_jobs import create_job_manager
+from dividends import create_dividend_engine
+from portfolio import create_portfolio_service
+from http_cache import create_http_cache
+from metrics import REGISTRY, handler_collector, live_events_collector, portfolio_collector
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class WorkerRuntime:
+    """The contract handler and background services of one worker process
+
+    Nothing here is built when the app is created. Connection pools,
+    event loops, database engines and threads are made on first use (or
+    by the warm-up thread) in the process that uses them, so an app
+    created before gunicorn forks (--preload) shares only read-only state
+    such as configuration and the parsed ABI registry with its workers.
+    A child process forked after services were built starts over with
+    none, instead of inheriting pools and threads that belong to its
+    parent.
+    """
+
+    def __init__(self, config, abi_registry):
+        self.config = config
+        self.abi_registry = abi_registry
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # Runs again in forked children: locks held by another thread at fork
+        # time would stay locked forever, and pools and threads stay with the parent
+        self._lock = threading.Lock()
+        self._services: Optional[Dict[str, Any]] = None
+        self._warmup_thread = None
+        self.pid = os.getpid()
+        self.state = 'starting'
+        self.error = None
+        self.started_at = time.time()
+        self.ready_at = None
+
+    def _build(self) -> Dict[str, Any]:
+        config = self.config
+        started = time.perf_counter()
+
+        if config.ASYNC_HANDLER:
+            from async_contract_handler import AsyncContractHandler
+            handler = AsyncContractHandler(abi_registry=self.abi_registry)
+        else:
+            handler = ContractHandler(abi_registry=self.abi_registry)
+
+        try:
+            # Background threads need a sync Web3; the async handler's AsyncWeb3 is bound to its loop
+            sync_w3 = handler.w3 if isinstance(handler, ContractHandler) else handler.sync_w3
+
+            # Local event index
+            event_indexer = create_event_indexer(sync_w3, config, handler.load_contract_abi)
+            holder_balances = HolderBalanceTracker(event_indexer) if event_indexer else None
+            event_exporter = create_event_exporter(event_indexer, sync_w3, config)
+
+            # Server-sent event fan-out: one head follower per worker, however many clients connect
+            live_events = create_live_event_hub(sync_w3, config, handler.load_contract_abi)
+
+            # Bulk transaction jobs
+            job_manager = create_job_manager(handler, sync_w3, config)
+
+            # Rental-income distributions: snapshots from the indexer, payouts through the job manager
+            dividends = create_dividend_engine(event_indexer, job_manager, config)
+
+            # Investor portfolios follow the read cache's view of the head when there is one
+            portfolio = create_portfolio_service(sync_w3, config,
+                                                 handler.read_cache.head_tracker if handler.read_cache else None)
+
+            # Conditional GETs validate against the same head, so an ETag never runs ahead of the cached reads
+            http_cache = create_http_cache(sync_w3, config,
+                                           handler.read_cache.head_tracker if handler.read_cache else None)
+
+            if config.METRICS_ENABLED:
+                REGISTRY.set_collector('contract_handler', handler_collector(handler))
+                if portfolio:
+                    REGISTRY.set_collector('portfolio', portfolio_collector(portfolio))
+                if live_events:
+                    REGISTRY.set_collector('live_events', live_events_collector(live_events))
+
+            # Threads start only once everything is built, so a failed build leaves none behind
+            startable = [live_events, job_manager]
+            if config.INDEXER_RUN_IN_APP:
+                startable.insert(0, event_indexer)
+            self._start_services([service for service in startable if service])
+        except Exception:
+            # The async handler runs its own loop thread from construction
+            if hasattr(handler, 'close'):
+                handler.close()
+            raise
+
+        logger.info('worker_services_built', pid=self.pid, duration_ms=round((time.perf_counter() - started) * 1000, 2))
+        return {
+            'handler': handler,
+            'event_indexer': event_indexer,
+            'holder_balances': holder_balances,
+            'event_exporter': event_exporter,
+            'live_events': live_events,
+            'job_manager': job_manager,
+            'dividends': dividends,
+            'portfolio': portfolio,
+            'http_cache': http_cache
+        }
+
+    @staticmethod
+    def _start_services(services):
+        """Start background services in order, stopping the ones already started if one fails"""
+        started = []
+        try:
+            for service in services:
+                service.start()
+                started.append(service)
+        except Exception:
+            for service in reversed(started):
+                try:
+                    service.stop()
+                except Exception as e:
+                    logger.warning('worker_service_stop_failed', service=type(service).__name__, error=str(e))
+            raise
+
+    def _get(self, name: str) -> Any:
+        services = self._services
+        if services is None:
+            with self._lock:
+                if self._services is None:
+                    self._services = self._build()
+                services = self._services
+        return services[name]
+
+    @property
+    def handler(self):
+        return self._get('handler')
+
+    @property
+    def event_indexer(self):
+        return self._get('event_indexer')
+
+    @property
+    def holder_balances(self):
+        return self._get('holder_balances')
+
+    @property
+    def event_exporter(self):
+        return self._get('event_exporter')
+
+    @property
+    def live_events(self):
+        return self._get('live_events')
+
+    @property
+    def job_manager(self):
+        return self._get('job_manager')
+
+    @property
+    def dividends(self):
+        return self._get('dividends')
+
+    @property
+    def portfolio(self):
+        return self._get('portfolio')
+
+    @property
+    def http_cache(self):
+        return self._get('http_cache')
+
+    def check_ready(self) -> Dict[str, Any]:
+        """Build the services if needed and make one round trip to the node"""
+        network = self.handler.get_network_info()
+        if inspect.isawaitable(network):
+            network = asyncio.run(network)
+        # get_network_info reports failures in its result rather than raising
+        if 'error' in network:
+            raise ConnectionError(network['error'])
+        if not network.get('connected'):
+            raise ConnectionError("Web3 provider is not connected")
+        if self.state != 'ready':
+            self.state = 'ready'
+            self.error = None
+            self.ready_at = time.time()
+            logger.info('worker_ready', pid=self.pid, startup_ms=round((self.ready_at - self.started_at) * 1000, 2))
+        return network
+
+    def start_warmup(self, max_backoff: float = 30.0):
+        """Build services and reach the node in a background thread, retrying with backoff"""
+        if self._warmup_thread is not None:
+            return
+
+        def warm_up():
+            delay = 0.5
+            while True:
+                try:
+                    self.check_ready()
+                    return
+                except Exception as e:
+                    self.state = 'unavailable'
+                    self.error = str(e)
+                    logger.warning('worker_warmup_failed', pid=self.pid, error=str(e), retry_in=delay)
+                time.sleep(delay)
+                delay = min(delay * 2, max_backoff)
+
+        self._warmup_thread = threading.Thread(target=warm_up, name='worker-warmup', daemon=True)
+        self._warmup_thread.start()
+
+    def readiness(self) -> Dict[str, Any]:
+        """Warm-up state for the readiness probe; makes no RPC calls"""
+        return {
+            'ready': self.state == 'ready',
+            'state': self.state,
+            'error': self.error,
+            'pid': self.pid,
+            'startup_seconds': round(self.ready_at - self.started_at, 3) if self.ready_at else None
+        }